@@ -1,11 +1,15 @@
 # ai_tuning_scheduler.py
 
 import os
+import sys
 import json
-import sqlite3
+import numpy as np
 import pandas as pd
 from openai import OpenAI
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from trading_bot.analytics import trade_summary
+
 # ──────────────────────────────────────────────────────────────
 # 설정: 환경 변수 읽기
 # ──────────────────────────────────────────────────────────────
@@ -46,49 +50,19 @@ def compute_overall_metrics(db_path: str) -> dict:
     """
     만약 'trade_log' 기반의 종합 성과 지표(승률, 평균 수익률 등)를 함께 AI에게 전달하고 싶다면,
     아래 함수를 활용해 'metrics' 딕셔너리를 생성할 수 있습니다.
+    - 매도 필터링·집계는 trading_bot.analytics가 SQL에서 처리 (trade_log 전체를 읽지 않음)
     """
-    conn = sqlite3.connect(db_path)
-    df = pd.read_sql_query(
-        "SELECT ts, decision, percentage, reason, btc_balance, krw_balance, avg_price, price FROM trade_log",
-        conn,
-    )
-    conn.close()
-
-    # 매도 거래만 필터
-    sell_df = df[df["decision"] == "sell"].copy()
-    if sell_df.empty:
-        return {
-            "total_trades": len(df),
-            "total_sells": 0,
-            "win_rate": None,
-            "avg_profit_pct": None,
-            "avg_loss_pct": None,
-        }
-
-    sell_df["pnl_pct"] = (
-        (sell_df["price"] - sell_df["avg_price"]) / sell_df["avg_price"] * 100
-    )
-    total_sells = len(sell_df)
-    winning_sells = (sell_df["pnl_pct"] > 0).sum()
-    win_rate = round(winning_sells / total_sells * 100, 2)
-
-    avg_profit_pct = (
-        round(sell_df[sell_df["pnl_pct"] > 0]["pnl_pct"].mean(), 2)
-        if any(sell_df["pnl_pct"] > 0)
-        else None
-    )
-    avg_loss_pct = (
-        round(sell_df[sell_df["pnl_pct"] <= 0]["pnl_pct"].mean(), 2)
-        if any(sell_df["pnl_pct"] <= 0)
-        else None
-    )
+    summary = trade_summary(db_file=db_path)[0]
+
+    def _pct(val: float) -> float | None:
+        return None if np.isnan(val) else round(float(val), 2)
 
     return {
-        "total_trades": len(df),
-        "total_sells": total_sells,
-        "win_rate": win_rate,
-        "avg_profit_pct": avg_profit_pct,
-        "avg_loss_pct": avg_loss_pct,
+        "total_trades": int(summary["total_trades"]),
+        "total_sells": int(summary["closed"]),
+        "win_rate": _pct(summary["win_rate"] * 100),
+        "avg_profit_pct": _pct(summary["avg_profit_pct"]),
+        "avg_loss_pct": _pct(summary["avg_loss_pct"]),
     }
 
 
@@ -1,9 +1,16 @@
 # fetch_ohlcv_to_csv.py
 
+import os
+import sys
 import time
 import pandas as pd
 import pyupbit
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from trading_bot.db_helpers import init_db
+from trading_bot.ohlcv_gaps import rebuild_gaps
+from trading_bot.ohlcv_store import upsert_ohlcv
+
 def fetch_15min_ohlcv(ticker: str, since: str = None, count: int = 200) -> pd.DataFrame:
     """
     PyUpbit을 통해 15분봉 OHLCV를 fetch합니다.
@@ -19,14 +26,17 @@ def fetch_15min_ohlcv(ticker: str, since: str = None, count: int = 200) -> pd.Da
         df = pyupbit.get_ohlcv(ticker, interval="minute15", count=count)
     return df
 
-def build_full_history(ticker: str, start_dt: str, output_csv: str):
+def build_full_history(ticker: str, start_dt: str, output_csv: str, to_db: bool = True):
     """
     start_dt 이전 모든 (또는 start_dt 이후 최근) 15분봉을 모아서 CSV로 저장합니다.
     - ticker: "KRW-BTC" 등
     - start_dt: 불러오기를 시작할 기준 시각 (ISO 포맷). e.g. "2024-01-01 00:00:00"
     - output_csv: 저장할 파일명, 예) "historical_ohlcv.csv"
+    - to_db: True이면 받은 배치를 trading.db의 ohlcv 테이블에도 바로 upsert
     """
     all_data = []
+    if to_db:
+        init_db()
 
     # 1) 처음에는 최신 200개 봉을 가져옴 (since=None)
     df = fetch_15min_ohlcv(ticker)
@@ -34,6 +44,8 @@ def build_full_history(ticker: str, start_dt: str, output_csv: str):
         print("데이터를 가져오지 못했습니다.")
         return
     all_data.append(df)
+    if to_db:
+        upsert_ohlcv(ticker, "minute15", df)
 
     # 2) 가장 오래된 봉의 시각(인덱스)을 기준으로 루프 시작
     oldest_ts = df.index[0]  # DataFrame 처음 인덱스(가장 오래된 타임스탬프)
@@ -52,6 +64,8 @@ def build_full_history(ticker: str, start_dt: str, output_csv: str):
         print(f"불러온 봉 개수: {len(df)} | 가장 오래된 시각 = {df.index[0]} → 모두 누적")
 
         all_data.append(df)
+        if to_db:
+            upsert_ohlcv(ticker, "minute15", df)
         oldest_ts = df.index[0]
 
         # 만약 이번에 가져온 가장 오래된 시각이 start_dt 이전이라면, 반복 종료
@@ -62,6 +76,10 @@ def build_full_history(ticker: str, start_dt: str, output_csv: str):
         # API 호출 제한 완화(1초 휴식)
         time.sleep(1)
 
+    # 백필로 채운 구간까지 포함해 빈 구간 색인 재구성
+    if to_db:
+        print(f"ohlcv 빈 구간 {rebuild_gaps(ticker, 'minute15')}개")
+
     # 4) 리스트에 쌓인 DataFrame들을 하나로 합치기
     full_df = pd.concat(all_data)
     # 인덱스를 기준(datetime)으로 중복 제거 후 정렬
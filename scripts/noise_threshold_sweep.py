@@ -0,0 +1,60 @@
+# noise_threshold_sweep.py
+
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from trading_bot.config import INTERVAL, NOISE_VOL_THRESHOLD, PRICE_RANGE_THRESHOLD, TICKER
+from trading_bot.filters import filter_noise_history, sweep_noise_thresholds
+from trading_bot.ohlcv_store import load_ohlcv_frame
+
+# ──────────────────────────────────────────────────────────────
+# 노이즈 필터 임계치 스윕
+# - ohlcv 테이블(또는 CSV)의 전체 히스토리에 filter_noise 판정을 벡터 연산으로 적용
+# - NOISE_VOL_THRESHOLD × PRICE_RANGE_THRESHOLD 조합별 스킵·AI 질의 비율과
+#   스킵/통과 봉의 다음 봉 |수익률| 평균을 비교
+# ──────────────────────────────────────────────────────────────
+
+
+def _floats(text: str) -> list[float]:
+    return [float(x) for x in text.split(",") if x.strip()]
+
+
+def load_frame(csv_path: str | None) -> pd.DataFrame:
+    if csv_path:
+        df = pd.read_csv(csv_path, parse_dates=["datetime"])
+        return df.sort_values("datetime").set_index("datetime")
+    return load_ohlcv_frame(TICKER, INTERVAL)
+
+
+def run(csv_path: str | None, vol_thresholds: list[float], range_thresholds: list[float]) -> None:
+    df = load_frame(csv_path)
+    if len(df) < 5:
+        print(f"봉이 부족합니다 ({len(df)}개). 백필 후 다시 실행하세요.")
+        return
+    print(f"{len(df)}봉 ({df.index[0]} ~ {df.index[-1]})")
+
+    current = filter_noise_history(df)["decision"].value_counts(normalize=True)
+    print(f"\n현재 설정 (NOISE_VOL_THRESHOLD={NOISE_VOL_THRESHOLD}, "
+          f"PRICE_RANGE_THRESHOLD={PRICE_RANGE_THRESHOLD}) 판정 비율:")
+    for decision, share in current.items():
+        print(f"  {decision:<12} {share:.2%}")
+
+    res = sweep_noise_thresholds(df, vol_thresholds, range_thresholds)
+    print("\n=== 임계치 스윕 ===")
+    with pd.option_context("display.width", 200, "display.float_format", "{:.4f}".format):
+        print(res.to_string(index=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="노이즈 필터 임계치 스윕 (전체 히스토리 판정)")
+    parser.add_argument("--csv", help="datetime 열이 있는 OHLCV CSV (생략 시 ohlcv 테이블)")
+    parser.add_argument("--vol", default="0.002,0.004,0.01,0.02,0.05",
+                        help="NOISE_VOL_THRESHOLD 후보 (쉼표 구분)")
+    parser.add_argument("--range", default="0.02,0.05,0.10,0.15",
+                        help="PRICE_RANGE_THRESHOLD 후보 (쉼표 구분)")
+    args = parser.parse_args()
+    run(args.csv, _floats(args.vol), _floats(args.range))
@@ -1,5 +1,7 @@
 # parameter_tuning.py
 
+import os
+import sys
 import pandas as pd
 import numpy as np
 import itertools
@@ -20,6 +22,16 @@ def load_historical_ohlcv(csv_path: str) -> pd.DataFrame:
     df.set_index('datetime', inplace=True)
     return df
 
+
+def load_historical_ohlcv_db(ticker: str = "KRW-BTC", interval: str = "minute15") -> pd.DataFrame:
+    """
+    trading.db의 ohlcv 테이블(라이브 봇·백필 스크립트가 함께 채움)에서 과거 봉을 불러옵니다.
+    """
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+    from trading_bot.ohlcv_store import load_ohlcv_frame
+
+    return load_ohlcv_frame(ticker, interval)
+
 # ──────────────────────────────────────────────────────────────
 # 2) 지표 계산 함수
 # ──────────────────────────────────────────────────────────────
@@ -144,13 +156,15 @@ def grid_search_parameters(df: pd.DataFrame, sma_range: list[int], atr_range: li
 # 5) 메인: 실행 예시
 # ──────────────────────────────────────────────────────────────
 if __name__ == "__main__":
-    # 1) CSV로부터 과거 OHLCV 로드
-    csv_path = "historical_ohlcv.csv"  # 이미 준비된 CSV 파일
-    try:
-        df_hist = load_historical_ohlcv(csv_path)
-    except FileNotFoundError:
-        print(f"CSV 파일이 없습니다: {csv_path}")
-        exit(1)
+    # 1) DB(ohlcv 테이블) → CSV 순으로 과거 OHLCV 로드
+    csv_path = "historical_ohlcv.csv"  # DB가 비어 있을 때 사용할 CSV 파일
+    df_hist = load_historical_ohlcv_db()
+    if df_hist.empty:
+        try:
+            df_hist = load_historical_ohlcv(csv_path)
+        except FileNotFoundError:
+            print(f"CSV 파일이 없습니다: {csv_path}")
+            exit(1)
 
     # 2) 파라미터 후보 범위 설정 (원하는 값으로 조정 가능)
     sma_candidates    = [20, 25, 30, 35, 40]       # SMA 기간 후보
@@ -0,0 +1,137 @@
+# prompt_encoding_ab.py
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from trading_bot.ai_helpers import candle_pattern_prompt
+from trading_bot.ai_schemas import (
+    CandlePatternBars,
+    CandlePatterns,
+    parse_response,
+    response_format,
+)
+from trading_bot.config import AI_MODEL, INTERVAL, TICKER
+from trading_bot.ohlcv_store import load_ohlcv_frame
+from trading_bot.pattern_store import normalize_pattern_name
+from trading_bot.prompt_encoding import (
+    bars_to_patterns,
+    candles_json,
+    encode_candles,
+    estimate_tokens,
+)
+
+# ──────────────────────────────────────────────────────────────
+# 패턴 태깅 프롬프트 A/B: (A) 기존 JSON 레코드 vs (B) 압축 인코딩
+# - ohlcv 테이블에서 100봉 창을 무작위로 골라 같은 창을 두 형식으로 질의
+# - 실제 prompt_tokens(API usage)·지연 시간과 답의 일치도(패턴 이름 Jaccard,
+#   마지막 봉을 덮는 패턴 일치 여부)를 비교
+# - --dry-run: API 호출 없이 토큰 근사치만 비교
+# ──────────────────────────────────────────────────────────────
+WINDOW = 100
+
+
+def legacy_prompt(df: pd.DataFrame) -> str:
+    """기존(JSON 레코드) 프롬프트. 응답 스키마만 현재와 같이 강제."""
+    return (
+        "You are a chart pattern recognition assistant.\n"
+        f"Below is JSON for the most recent {len(df)} 15-minute candles. "
+        "Each object has keys: 'datetime','open','high','low','close','volume'.\n\n"
+        f"{candles_json(df)}\n\n"
+        "List every composite chart pattern in 'patterns' with its name and the "
+        "'start'/'end' datetimes of the candles it spans. "
+        "Use an empty list if no patterns are found."
+    )
+
+
+def sample_windows(df: pd.DataFrame, n: int, seed: int = 0) -> list[pd.DataFrame]:
+    rng = np.random.default_rng(seed)
+    starts = rng.choice(len(df) - WINDOW + 1, size=min(n, len(df) - WINDOW + 1), replace=False)
+    return [df.iloc[s:s + WINDOW] for s in sorted(starts)]
+
+
+def _names(patterns: list[dict]) -> set[str]:
+    return {normalize_pattern_name(p["pattern"]) for p in patterns}
+
+
+def _current(patterns: list[dict], last_ts: pd.Timestamp) -> str:
+    """마지막 봉을 덮는 첫 패턴 이름 (check_ai_patterns가 쓰는 값)."""
+    for p in patterns:
+        start = pd.to_datetime(p["start"], errors="coerce")
+        end = pd.to_datetime(p["end"], errors="coerce")
+        if not pd.isna(start) and not pd.isna(end) and start <= last_ts <= end:
+            return normalize_pattern_name(p["pattern"])
+    return ""
+
+
+def _ask(client, prompt: str, model_cls):
+    t0 = time.perf_counter()
+    resp = client.chat.completions.create(
+        model=AI_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=500,
+        response_format=response_format(model_cls),
+    )
+    elapsed = time.perf_counter() - t0
+    parsed = parse_response(model_cls, resp.choices[0].message.content or "")
+    return parsed, resp.usage.prompt_tokens, elapsed
+
+
+def run(n: int, seed: int, dry_run: bool) -> None:
+    df = load_ohlcv_frame(TICKER, INTERVAL)
+    if len(df) < WINDOW:
+        print(f"ohlcv 테이블에 봉이 부족합니다 ({len(df)} < {WINDOW}). 백필 후 다시 실행하세요.")
+        return
+    windows = sample_windows(df, n, seed)
+
+    client = None
+    if not dry_run:
+        from openai import OpenAI
+
+        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY", ""))
+
+    rows = []
+    for w in windows:
+        enc = encode_candles(w)
+        a_prompt, b_prompt = legacy_prompt(w), candle_pattern_prompt(enc)
+        row = {
+            "end": w.index[-1],
+            "est_a": estimate_tokens(a_prompt),
+            "est_b": estimate_tokens(b_prompt),
+        }
+        if client is not None:
+            a, row["tok_a"], row["sec_a"] = _ask(client, a_prompt, CandlePatterns)
+            b, row["tok_b"], row["sec_b"] = _ask(client, b_prompt, CandlePatternBars)
+            a_pats = a.patterns
+            b_pats = bars_to_patterns(b.patterns, enc)
+            names_a, names_b = _names(a_pats), _names(b_pats)
+            union = names_a | names_b
+            row["jaccard"] = len(names_a & names_b) / len(union) if union else 1.0
+            row["same_current"] = _current(a_pats, w.index[-1]) == _current(b_pats, w.index[-1])
+        rows.append(row)
+        print({k: (round(v, 3) if isinstance(v, float) else v) for k, v in row.items()})
+
+    res = pd.DataFrame(rows)
+    print("\n=== 요약 ===")
+    print(f"창 {len(res)}개, 추정 토큰 A={res.est_a.mean():.0f} B={res.est_b.mean():.0f} "
+          f"(B/A={res.est_b.mean() / res.est_a.mean():.1%})")
+    if client is not None:
+        print(f"실측 prompt_tokens A={res.tok_a.mean():.0f} B={res.tok_b.mean():.0f} "
+              f"(B/A={res.tok_b.mean() / res.tok_a.mean():.1%})")
+        print(f"지연 p50 A={res.sec_a.median():.2f}s B={res.sec_b.median():.2f}s")
+        print(f"패턴 이름 Jaccard 평균={res.jaccard.mean():.2f}, "
+              f"마지막 봉 패턴 일치율={res.same_current.mean():.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="패턴 태깅 프롬프트 인코딩 A/B 비교")
+    parser.add_argument("-n", type=int, default=20, help="비교할 100봉 창 개수")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dry-run", action="store_true", help="API 호출 없이 토큰 근사치만 비교")
+    args = parser.parse_args()
+    run(args.n, args.seed, args.dry_run)
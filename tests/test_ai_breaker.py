@@ -0,0 +1,151 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import asyncio
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import trading_bot.ai_client as ai_client
+from trading_bot import ai_breaker, ai_metrics
+
+
+class _FakeCompletions:
+    """요청마다 delays에서 지연을 꺼내 쓰는 AsyncOpenAI 대역 (비면 default_delay)."""
+
+    def __init__(self, *delays: float, default_delay: float = 0.0):
+        self.delays = list(delays)
+        self.default_delay = default_delay
+        self.calls = 0
+        self.cancelled = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        n = self.calls
+        delay = self.delays.pop(0) if self.delays else self.default_delay
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        msg = SimpleNamespace(content=f"reply{n}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=msg)], usage=None)
+
+
+class AIBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        db = Path(self.tmp.name) / "m.db"
+        self.patches = [
+            patch("trading_bot.ai_metrics.AI_METRICS_FILE", db),
+            patch("trading_bot.ai_metrics._ready", False),
+            patch("trading_bot.ai_breaker.AI_METRICS_FILE", db),
+            patch("trading_bot.ai_breaker._ready", False),
+            patch("trading_bot.ai_breaker.AI_BREAKER_FAILURES", 2),
+            patch("trading_bot.ai_breaker.AI_BREAKER_COOLDOWN_SEC", 0.3),
+            patch("trading_bot.ai_client.AI_CALL_TIMEOUT_SEC", 0.2),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        self.tmp.cleanup()
+
+    def _use(self, fake):
+        client = SimpleNamespace(chat=SimpleNamespace(completions=fake))
+        p = patch("trading_bot.ai_client._get_client", return_value=client)
+        p.start()
+        self.addCleanup(p.stop)
+        return fake
+
+    def _ask(self, kind="noise_filter"):
+        with ai_metrics.track(kind) as rec:
+            rec.cache = "miss"
+            out = ai_client.chat([{"role": "user", "content": "q"}], max_tokens=5)
+        return out, rec
+
+    def test_opens_after_consecutive_failures_and_skips_requests(self):
+        fake = self._use(_FakeCompletions(default_delay=1.0))
+        self.assertIsNone(self._ask()[0])
+        self.assertEqual(ai_breaker.breaker_state("noise_filter"), ai_breaker.CLOSED)
+        self.assertIsNone(self._ask()[0])
+        self.assertEqual(ai_breaker.breaker_state("noise_filter"), ai_breaker.OPEN)
+
+        t0 = time.monotonic()
+        out, rec = self._ask()
+        self.assertIsNone(out)
+        self.assertLess(time.monotonic() - t0, 0.1)       # 대기 없이 바로 기본값
+        self.assertEqual((rec.status, rec.requests), ("breaker_open", 0))
+        self.assertEqual(fake.calls, 2)
+        # 다른 종류는 영향 없음
+        fake.default_delay = 0.0
+        self.assertEqual(self._ask("pattern_decision")[0], "reply3")
+
+    def test_half_open_probe_closes_or_reopens(self):
+        fake = self._use(_FakeCompletions(1.0, 1.0, 1.0))
+        self._ask()
+        self._ask()
+        time.sleep(0.35)
+        # 쿨다운 뒤 첫 호출이 시험 호출 → 실패하면 다시 열림
+        self.assertIsNone(self._ask()[0])
+        self.assertEqual(fake.calls, 3)
+        self.assertEqual(ai_breaker.breaker_state("noise_filter"), ai_breaker.OPEN)
+
+        time.sleep(0.35)
+        self.assertTrue(ai_breaker.allow("noise_filter"))   # 시험 호출 1건만 허용
+        self.assertFalse(ai_breaker.allow("noise_filter"))
+        ai_breaker.record("noise_filter", True, 0.01)
+        self.assertEqual(ai_breaker.breaker_state("noise_filter"), ai_breaker.CLOSED)
+        self.assertEqual(self._ask()[0], "reply4")
+
+    def test_latency_slo_breach_counts_as_failure(self):
+        self._use(_FakeCompletions(default_delay=0.1))
+        with patch("trading_bot.ai_breaker.AI_BREAKER_SLO_SEC", 0.05):
+            self.assertEqual(self._ask()[0], "reply1")     # 응답은 쓰지만 SLO 초과로 실패 1회
+            self.assertEqual(self._ask()[0], "reply2")
+        self.assertEqual(ai_breaker.breaker_state("noise_filter"), ai_breaker.OPEN)
+
+    def test_success_resets_failure_count(self):
+        self._use(_FakeCompletions(1.0, 0.0, 1.0))
+        self._ask()
+        self._ask()
+        self._ask()
+        self.assertEqual(ai_breaker.breaker_state("noise_filter"), ai_breaker.CLOSED)
+
+    def test_hedged_request_wins_when_first_is_slow(self):
+        fake = self._use(_FakeCompletions(1.0, 0.0))
+        with patch("trading_bot.ai_client.AI_HEDGE", True), \
+                patch("trading_bot.ai_client.AI_HEDGE_MIN_SEC", 0.05), \
+                patch("trading_bot.ai_client.AI_CALL_TIMEOUT_SEC", 2.0):
+            t0 = time.monotonic()
+            out, rec = self._ask()
+            elapsed = time.monotonic() - t0
+        self.assertEqual(out, "reply2")
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual((rec.requests, rec.retries), (2, 1))
+        time.sleep(0.05)
+        self.assertEqual(fake.cancelled, 1)                # 느린 첫 요청은 취소
+
+    def test_no_hedge_when_fast_or_disabled(self):
+        fake = self._use(_FakeCompletions(0.0, 0.15))
+        with patch("trading_bot.ai_client.AI_HEDGE", True), \
+                patch("trading_bot.ai_client.AI_HEDGE_MIN_SEC", 0.1):
+            self.assertEqual(self._ask()[1].requests, 1)
+        self.assertEqual(self._ask()[0], "reply2")         # 헤지 꺼짐: 0.15초 기다림
+        self.assertEqual(fake.calls, 2)
+
+    def test_hedge_threshold_uses_recent_p95(self):
+        with patch("trading_bot.ai_client.AI_HEDGE", True), \
+                patch("trading_bot.ai_client.AI_HEDGE_MIN_SEC", 0.5), \
+                patch("trading_bot.ai_client.request_latency_p95", return_value=3.0):
+            self.assertEqual(ai_client._hedge_after("noise_filter", 10.0), 3.0)
+            self.assertIsNone(ai_client._hedge_after("noise_filter", 2.0))
+            self.assertIsNone(ai_client._hedge_after(None, 10.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
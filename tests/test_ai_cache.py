@@ -0,0 +1,248 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import multiprocessing
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import trading_bot.ai_cache as ai_cache
+
+
+class AICacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.legacy = Path(self.tmp.name) / "reflection_cache.json"
+        self.patches = [
+            patch("trading_bot.ai_cache.AI_CACHE_FILE", Path(self.tmp.name) / "ai_cache.db"),
+            patch("trading_bot.ai_cache.REFLECTION_CACHE_FILE", self.legacy),
+            patch("trading_bot.ai_cache._ready", False),
+            patch("trading_bot.ai_cache.AI_CACHE_MAX_ENTRIES", 3),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        self.tmp.cleanup()
+
+    def test_hit_miss_and_ttl(self):
+        self.assertIsNone(ai_cache.cache_get("noise_filter", "k"))
+        ai_cache.cache_set("noise_filter", False, "k")
+        self.assertIs(ai_cache.cache_get("noise_filter", "k"), False)
+        ai_cache.cache_set("candle_patterns", [{"pattern": "flag"}], "k", ttl=-1)
+        self.assertIsNone(ai_cache.cache_get("candle_patterns", "k"))
+
+        stats = ai_cache.get_cache_stats()
+        self.assertEqual(stats["noise_filter"]["hits"], 1)
+        self.assertEqual(stats["noise_filter"]["misses"], 1)
+        self.assertEqual(stats["candle_patterns"]["expirations"], 1)
+        self.assertEqual(stats["candle_patterns"]["entries"], 0)
+
+    def test_lru_eviction_by_entries_and_bytes(self):
+        ai_cache.purge_expired()  # 스키마 준비를 먼저 끝내 시각 목록과 호출 수를 맞춤
+        now = time.time()
+        ticks = [now - 5 + i for i in range(5)]
+        with patch("trading_bot.ai_cache.time.time", side_effect=ticks):
+            for k in ("a", "b", "c"):
+                ai_cache.cache_set("pattern_decision", "buy", k)
+            ai_cache.cache_get("pattern_decision", "a")      # a를 최근 사용으로 갱신
+            ai_cache.cache_set("pattern_decision", "sell", "d")
+        self.assertIsNone(ai_cache.cache_get("pattern_decision", "b"))
+        self.assertEqual(ai_cache.cache_get("pattern_decision", "a"), "buy")
+        self.assertEqual(ai_cache.get_cache_stats()["pattern_decision"]["evictions"], 1)
+
+        with patch("trading_bot.ai_cache.AI_CACHE_MAX_BYTES", 10):
+            ai_cache.cache_set("pattern_decision", "x" * 8, "e")
+        stats = ai_cache.get_cache_stats()["pattern_decision"]
+        self.assertLessEqual(stats["bytes"], 10)
+        self.assertEqual(stats["entries"], 1)
+
+    def test_hits_are_read_only_until_flush(self):
+        ai_cache.cache_set("noise_filter", True, "k")
+        db = sqlite3.connect(ai_cache.AI_CACHE_FILE)
+        try:
+            row = lambda: db.execute("SELECT last_access FROM ai_cache").fetchone()[0]
+            before = row()
+            version = db.execute("PRAGMA data_version").fetchone()[0]
+            with patch("trading_bot.ai_cache.time.time", return_value=before + 100):
+                for _ in range(3):
+                    self.assertIs(ai_cache.cache_get("noise_filter", "k"), True)
+            self.assertEqual(row(), before)             # 조회는 DB에 쓰지 않음
+            self.assertEqual(db.execute("PRAGMA data_version").fetchone()[0], version)
+            with patch("trading_bot.ai_cache.AI_CACHE_FLUSH_SEC", 0):
+                ai_cache.cache_get("noise_filter", "k")
+            self.assertEqual(row(), before + 100)
+        finally:
+            db.close()
+        self.assertEqual(ai_cache.get_cache_stats()["noise_filter"]["hits"], 4)
+
+    def test_running_totals_match_table(self):
+        with patch("trading_bot.ai_cache.AI_CACHE_MAX_ENTRIES", 100):
+            for i in range(5):
+                ai_cache.cache_set("pattern_decision", "x" * i, i)
+            ai_cache.cache_set("pattern_decision", "longer value", 2)   # 같은 키 덮어쓰기
+            ai_cache.cache_set("pattern_decision", "gone", "e", ttl=-1)
+            ai_cache.purge_expired()
+        db = sqlite3.connect(ai_cache.AI_CACHE_FILE)
+        try:
+            totals = db.execute("SELECT entries, bytes FROM ai_cache_totals").fetchone()
+            actual = db.execute("SELECT COUNT(*), SUM(size) FROM ai_cache").fetchone()
+        finally:
+            db.close()
+        self.assertEqual(totals, actual)
+        self.assertEqual(totals[0], 5)
+
+    def test_reflection_entries_and_first_access_cleanup(self):
+        self.legacy.write_text("{}", encoding="utf-8")
+        ai_cache.cache_set("reflection", ["text", {"RSI_OVERRIDE": "25"}], "fp", 40)
+        self.assertFalse(self.legacy.exists())
+        self.assertTrue(Path(str(self.legacy) + ".bak").exists())
+        self.assertEqual(
+            ai_cache.cache_get("reflection", "fp", 40), ["text", {"RSI_OVERRIDE": "25"}]
+        )
+
+        ai_cache.cache_set("reflection", ["old", {}], "stale", ttl=-1)
+        # 새 프로세스의 첫 접근에서 만료 항목이 디스크에서 삭제됨
+        with patch("trading_bot.ai_cache._ready", False):
+            ai_cache.cache_get("reflection", "fp", 40)
+        self.assertEqual(ai_cache.get_cache_stats()["reflection"]["entries"], 1)
+
+
+def _slow_compute(log_path, value):
+    """다른 프로세스의 실행자 역할: 호출 기록을 남기고 느리게 결과를 캐시."""
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write(f"{os.getpid()}\n")
+    time.sleep(0.5)
+    ai_cache.cache_set("pattern_decision", value, "shared")
+    return value
+
+
+def _flight_worker(log_path, out):
+    out.put(ai_cache.single_flight(
+        "pattern_decision", lambda: _slow_compute(log_path, "buy"), "shared", default="hold"
+    ))
+
+
+class SingleFlightTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patches = [
+            patch("trading_bot.ai_cache.AI_CACHE_FILE", Path(self.tmp.name) / "ai_cache.db"),
+            patch("trading_bot.ai_cache.REFLECTION_CACHE_FILE", Path(self.tmp.name) / "r.json"),
+            patch("trading_bot.ai_cache._ready", False),
+        ]
+        for p in self.patches:
+            p.start()
+        self.calls = 0
+        self.key = ai_cache.make_key("pattern_decision", ("shared",))
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        self.tmp.cleanup()
+
+    def _compute(self, value="buy", delay=0.3):
+        def run():
+            self.calls += 1
+            time.sleep(delay)
+            ai_cache.cache_set("pattern_decision", value, "shared")
+            return value
+        return run
+
+    def _flight(self, compute, default="hold"):
+        return ai_cache.single_flight("pattern_decision", compute, "shared", default=default)
+
+    def _hold_lease(self, owner="other-process", ttl=60.0):
+        ai_cache.purge_expired()
+        self.assertTrue(ai_cache._acquire_lease(
+            self.key, owner, time.time(), ttl, db_file=ai_cache.AI_CACHE_FILE
+        ))
+
+    def test_concurrent_threads_share_one_call(self):
+        results = []
+        compute = self._compute()
+        threads = [threading.Thread(target=lambda: results.append(self._flight(compute)))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, ["buy"] * 8)
+        # 끝난 뒤에는 캐시 적중, 리스는 남지 않음
+        self.assertEqual(self._flight(self._compute("sell")), "buy")
+        self.assertFalse(ai_cache._lease_held(self.key, time.time(), db_file=ai_cache.AI_CACHE_FILE))
+
+    def test_waits_for_other_process_lease(self):
+        self._hold_lease()
+
+        def finish_elsewhere():
+            time.sleep(0.3)
+            ai_cache.cache_set("pattern_decision", "sell", "shared")
+            ai_cache._release_lease(self.key, "other-process", db_file=ai_cache.AI_CACHE_FILE)
+
+        threading.Thread(target=finish_elsewhere).start()
+        self.assertEqual(self._flight(self._compute()), "sell")
+        self.assertEqual(self.calls, 0)
+
+    def test_takes_over_when_other_process_leaves_no_result(self):
+        self._hold_lease(ttl=0.3)   # 실행 중 죽은 프로세스: 리스만 남고 만료됨
+        self.assertEqual(self._flight(self._compute(delay=0)), "buy")
+        self.assertEqual(self.calls, 1)
+
+    def test_wait_limit_returns_default(self):
+        self._hold_lease()
+        with patch("trading_bot.ai_cache.AI_SINGLE_FLIGHT_WAIT_SEC", 0.3):
+            t0 = time.monotonic()
+            self.assertEqual(self._flight(self._compute()), "hold")
+        self.assertLess(time.monotonic() - t0, 1.0)
+        self.assertEqual(self.calls, 0)
+
+    def test_leader_error_reaches_waiters(self):
+        started = threading.Event()
+
+        def boom():
+            started.set()
+            time.sleep(0.2)
+            raise RuntimeError("upstream")
+
+        errors = []
+
+        def follower():
+            started.wait()
+            try:
+                self._flight(self._compute())
+            except RuntimeError as e:
+                errors.append(e)
+
+        t = threading.Thread(target=follower)
+        t.start()
+        with self.assertRaises(RuntimeError):
+            self._flight(boom)
+        t.join()
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(self.calls, 0)
+
+    @unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "fork 필요")
+    def test_processes_share_one_call(self):
+        ai_cache.purge_expired()
+        log_path = Path(self.tmp.name) / "calls.log"
+        ctx = multiprocessing.get_context("fork")
+        out = ctx.Queue()
+        procs = [ctx.Process(target=_flight_worker, args=(log_path, out)) for _ in range(3)]
+        for p in procs:
+            p.start()
+        results = [out.get(timeout=10) for _ in procs]
+        for p in procs:
+            p.join(timeout=10)
+        self.assertEqual(results, ["buy"] * 3)
+        self.assertEqual(len(log_path.read_text(encoding="utf-8").splitlines()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
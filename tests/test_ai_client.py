@@ -0,0 +1,70 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import asyncio
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import trading_bot.ai_client as ai_client
+
+
+class _FakeCompletions:
+    """지정한 지연 후 content를 돌려주는 AsyncOpenAI 대역."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.cancelled = 0
+
+    async def create(self, **kwargs):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        msg = SimpleNamespace(content=f" {kwargs['messages'][0]['content']} ")
+        return SimpleNamespace(choices=[SimpleNamespace(message=msg)])
+
+
+class AIClientTest(unittest.TestCase):
+    def _patch_client(self, delay):
+        fake = _FakeCompletions(delay)
+        client = SimpleNamespace(chat=SimpleNamespace(completions=fake))
+        p = patch("trading_bot.ai_client._get_client", return_value=client)
+        p.start()
+        self.addCleanup(p.stop)
+        return fake
+
+    def _ask(self, text):
+        return ai_client.chat([{"role": "user", "content": text}], max_tokens=5)
+
+    def test_concurrent_submits_share_budget(self):
+        self._patch_client(0.2)
+        with ai_client.cycle_budget(5):
+            t0 = time.monotonic()
+            futs = [ai_client.submit(self._ask, f"q{i}") for i in range(3)]
+            self.assertEqual([f.result() for f in futs], ["q0", "q1", "q2"])
+            self.assertLess(time.monotonic() - t0, 0.5)
+
+    def test_budget_exhaustion_cancels_and_returns_none(self):
+        fake = self._patch_client(5.0)
+        with ai_client.cycle_budget(0.2):
+            t0 = time.monotonic()
+            self.assertIsNone(self._ask("slow"))
+            self.assertLess(time.monotonic() - t0, 1.0)
+            self.assertIsNone(self._ask("after"))  # 예산 소진 후에는 호출 자체를 생략
+        time.sleep(0.05)
+        self.assertEqual(fake.cancelled, 1)
+
+    def test_leaving_cycle_cancels_outstanding_requests(self):
+        fake = self._patch_client(5.0)
+        with ai_client.cycle_budget(10):
+            fut = ai_client.submit(self._ask, "pending")
+            time.sleep(0.1)
+        self.assertIsNone(fut.result(timeout=2))
+        time.sleep(0.05)
+        self.assertEqual(fake.cancelled, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
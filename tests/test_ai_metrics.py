@@ -0,0 +1,127 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pandas as pd
+
+import trading_bot.ai_helpers as ai_helpers
+from trading_bot import ai_metrics
+
+
+class _FakeCompletions:
+    """지연 후 스키마에 맞는 응답과 usage를 돌려주는 AsyncOpenAI 대역."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    async def create(self, **kwargs):
+        await asyncio.sleep(self.delay)
+        name = kwargs["response_format"]["json_schema"]["name"]
+        body = {"noise_verdict": {"is_glitch": False},
+                "pattern_decision": {"reasoning": "ok", "decision": "buy"}}[name]
+        msg = SimpleNamespace(content=json.dumps(body))
+        usage = SimpleNamespace(prompt_tokens=1000, completion_tokens=100)
+        return SimpleNamespace(choices=[SimpleNamespace(message=msg)], usage=usage)
+
+
+class AIMetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.fake = _FakeCompletions()
+        client = SimpleNamespace(chat=SimpleNamespace(completions=self.fake))
+        self.patches = [
+            patch("trading_bot.ai_cache.AI_CACHE_FILE", Path(self.tmp.name) / "ai_cache.db"),
+            patch("trading_bot.ai_cache.REFLECTION_CACHE_FILE", Path(self.tmp.name) / "r.json"),
+            patch("trading_bot.ai_cache._ready", False),
+            patch("trading_bot.ai_metrics.AI_METRICS_FILE", Path(self.tmp.name) / "m.db"),
+            patch("trading_bot.ai_metrics._ready", False),
+            patch("trading_bot.ai_breaker.AI_METRICS_FILE", Path(self.tmp.name) / "m.db"),
+            patch("trading_bot.ai_breaker._ready", False),
+            patch("trading_bot.ai_metrics.AI_PRICE_INPUT_PER_1M", 2.0),
+            patch("trading_bot.ai_metrics.AI_PRICE_OUTPUT_PER_1M", 10.0),
+            patch("trading_bot.db_helpers.DB_FILE", Path(self.tmp.name) / "t.db"),
+            patch("trading_bot.pattern_store.PATTERN_HISTORY_FILE", Path(self.tmp.name) / "p.json"),
+            patch("trading_bot.pattern_store._ready", False),
+            patch("trading_bot.ai_helpers.ai_enabled", return_value=True),
+            patch("trading_bot.ai_client._get_client", return_value=client),
+        ]
+        for p in self.patches:
+            p.start()
+        idx = pd.date_range("2024-01-01", periods=10, freq="15min")
+        self.df = pd.DataFrame(
+            {c: range(10) for c in ("open", "high", "low", "close", "volume")}, index=idx
+        )
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        self.tmp.cleanup()
+
+    def test_records_usage_cost_and_cache_outcome(self):
+        self.assertEqual(ai_helpers.ask_pattern_decision("flag", self.df), "buy")
+        self.assertEqual(ai_helpers.ask_pattern_decision("flag", self.df), "buy")  # 캐시 적중
+        self.assertIs(ai_helpers.ask_noise_filter(self.df.iloc[-5:]), False)
+
+        df = ai_metrics.load_metrics(1)
+        self.assertEqual(list(df["kind"]), ["pattern_decision", "pattern_decision", "noise_filter"])
+        self.assertEqual(list(df["cache"]), ["miss", "hit", "miss"])
+        first = df.iloc[0]
+        self.assertEqual((first.requests, first.prompt_tokens, first.completion_tokens), (1, 1000, 100))
+        self.assertAlmostEqual(first.cost_usd, (1000 * 2.0 + 100 * 10.0) / 1e6)
+        self.assertEqual(df.iloc[1].requests, 0)
+        self.assertTrue((df["status"] == "ok").all())
+        self.assertTrue((df["wall_sec"] >= df["ai_sec"]).all())
+
+        summary = ai_metrics.summarize(df)
+        self.assertEqual(summary.loc["pattern_decision", "calls"], 2)
+        self.assertAlmostEqual(summary.loc["pattern_decision", "hit_rate"], 0.5)
+        self.assertAlmostEqual(summary["time_share"].sum(), 1.0)
+        spend = ai_metrics.daily_spend(df)
+        self.assertAlmostEqual(spend.to_numpy().sum(), 2 * 0.003)
+
+    def test_timeout_is_recorded_as_failure(self):
+        self.fake.delay = 2.0
+        with patch("trading_bot.ai_client.AI_CALL_TIMEOUT_SEC", 0.2):
+            self.assertEqual(ai_helpers.ask_pattern_decision("wedge", self.df), "hold")
+        row = ai_metrics.load_metrics(1).iloc[0]
+        self.assertEqual((row.status, row.requests, row.prompt_tokens), ("timeout", 1, 0))
+        self.assertGreaterEqual(row.ai_sec, 0.2)
+
+    def test_percentiles(self):
+        df = pd.DataFrame({
+            "ts": [0.0] * 100, "kind": ["candle_patterns"] * 100,
+            "wall_sec": [float(i) for i in range(1, 101)],
+            "cache": ["miss"] * 100, "requests": [1] * 100, "retries": [0] * 100,
+            "status": ["ok"] * 100, "prompt_tokens": [10] * 100,
+            "completion_tokens": [1] * 100, "cost_usd": [0.01] * 100,
+        })
+        r = ai_metrics.summarize(df).loc["candle_patterns"]
+        self.assertAlmostEqual(r.p50, 50.5)
+        self.assertAlmostEqual(r.p95, 95.05)
+        self.assertAlmostEqual(r.p99, 99.01)
+        self.assertEqual(r.hit_rate, 0.0)
+
+    def test_request_latency_p95_from_recent_successes(self):
+        with patch.dict("trading_bot.ai_metrics._p95_memo", clear=True):
+            for i in range(1, 41):
+                with ai_metrics.track("candle_patterns"):
+                    ai_metrics.note_request("m", i / 10, status="ok" if i <= 30 else "timeout")
+            p95 = ai_metrics.request_latency_p95("candle_patterns")
+        self.assertAlmostEqual(p95, 2.855)                 # 시간 초과 10건 제외한 0.1~3.0초
+        with patch.dict("trading_bot.ai_metrics._p95_memo", clear=True):
+            self.assertIsNone(ai_metrics.request_latency_p95("noise_filter"))  # 표본 부족
+
+    def test_calls_without_ai_work_are_not_recorded(self):
+        with patch("trading_bot.ai_helpers.ai_enabled", return_value=False):
+            ai_helpers.ask_pattern_decision("flag", self.df)
+        self.assertTrue(ai_metrics.load_metrics(1).empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
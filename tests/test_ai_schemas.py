@@ -0,0 +1,117 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+
+import trading_bot.ai_helpers as ai_helpers
+from trading_bot.ai_schemas import (
+    CandlePatterns,
+    PatternDecision,
+    Reflection,
+    SchemaError,
+    parse_response,
+    response_format,
+)
+
+
+class SchemaValidationTest(unittest.TestCase):
+    def test_response_format_is_strict_json_schema(self):
+        fmt = response_format(PatternDecision)
+        self.assertEqual(fmt["type"], "json_schema")
+        self.assertTrue(fmt["json_schema"]["strict"])
+        schema = fmt["json_schema"]["schema"]
+        self.assertFalse(schema["additionalProperties"])
+        self.assertEqual(sorted(schema["required"]), ["decision", "reasoning"])
+
+    def test_parse_and_reject(self):
+        tags = parse_response(
+            CandlePatterns, '{"patterns": [{"pattern": "flag", "start": "a", "end": "b"}]}'
+        )
+        self.assertEqual(tags.patterns, [{"pattern": "flag", "start": "a", "end": "b"}])
+
+        bad = [
+            "```json\n{}\n```",                                       # JSON 아님
+            '{"reasoning": "x", "decision": "strong buy"}',          # enum 위반
+            '{"reasoning": "x"}',                                     # 필드 누락
+            '{"reasoning": "x", "decision": "buy", "size": 1}',      # 추가 필드
+        ]
+        for raw in bad:
+            with self.assertRaises(SchemaError, msg=raw):
+                parse_response(PatternDecision, raw)
+        with self.assertRaises(SchemaError):
+            parse_response(CandlePatterns, '{"patterns": [{"pattern": 1, "start": "a", "end": "b"}]}')
+
+
+class StructuredHelpersTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.calls = []
+        self.replies = []
+        self.patches = [
+            patch("trading_bot.ai_cache.AI_CACHE_FILE", Path(self.tmp.name) / "ai_cache.db"),
+            patch("trading_bot.ai_cache.REFLECTION_CACHE_FILE", Path(self.tmp.name) / "r.json"),
+            patch("trading_bot.ai_cache._ready", False),
+            patch("trading_bot.ai_metrics.AI_METRICS_FILE", Path(self.tmp.name) / "m.db"),
+            patch("trading_bot.ai_metrics._ready", False),
+            patch("trading_bot.db_helpers.DB_FILE", Path(self.tmp.name) / "t.db"),
+            patch("trading_bot.pattern_store.PATTERN_HISTORY_FILE", Path(self.tmp.name) / "p.json"),
+            patch("trading_bot.pattern_store._ready", False),
+            patch("trading_bot.ai_helpers.ai_enabled", return_value=True),
+            patch("trading_bot.ai_helpers.chat", side_effect=self._fake_chat),
+        ]
+        for p in self.patches:
+            p.start()
+        idx = pd.date_range("2024-01-01", periods=10, freq="15min")
+        self.df = pd.DataFrame(
+            {c: range(10) for c in ("open", "high", "low", "close", "volume")}, index=idx
+        )
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        self.tmp.cleanup()
+
+    def _fake_chat(self, messages, max_tokens, **kwargs):
+        self.calls.append(kwargs)
+        return self.replies.pop(0)
+
+    def test_pattern_decision_uses_enum_not_substring(self):
+        # 이유 문장에 'sell'이 들어 있어도 decision 필드만 사용
+        self.replies = [json.dumps({"reasoning": "no reason to sell yet", "decision": "buy"})]
+        self.assertEqual(ai_helpers.ask_pattern_decision("bull flag", self.df), "buy")
+        self.assertEqual(
+            self.calls[0]["response_format"]["json_schema"]["name"], PatternDecision.NAME
+        )
+
+    def test_invalid_reply_falls_back_without_retry(self):
+        self.replies = ["buy"]
+        self.assertEqual(ai_helpers.ask_pattern_decision("bear flag", self.df), "hold")
+        self.assertEqual(len(self.calls), 1)
+
+    def test_reflection_single_round_trip(self):
+        self.replies = [json.dumps({
+            "reflection": "Entries were late.",
+            "tweaks": [{"key": "rsi_override", "value": "55"}, {"key": "BAD KEY", "value": "x"}],
+        })]
+        text, params = ai_helpers.ask_ai_reflection(self.df, 40, self.df, recursive=False)
+        self.assertEqual(params, {"RSI_OVERRIDE": "55"})
+        self.assertIn("Entries were late.", text)
+        self.assertIn("rsi_override=55", text)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.calls[0]["response_format"]["json_schema"]["name"], Reflection.NAME)
+
+    def test_reflection_refinement_stops_when_unchanged(self):
+        reply = json.dumps({"reflection": "ok", "tweaks": [{"key": "BASE_RISK", "value": "0.01"}]})
+        self.replies = [reply, reply]
+        text, params = ai_helpers.ask_ai_reflection(self.df, 40, None, recursive=True, max_iter=3)
+        self.assertEqual(params, {"BASE_RISK": "0.01"})
+        self.assertEqual(len(self.calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import concurrent.futures
+import json
+import random
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+import requests
+
+import trading_bot.ai_client as ai_client
+import trading_bot.ai_helpers as ai_helpers
+from trading_bot.ai_schemas import NoiseVerdict, PatternDecision, response_format
+from trading_bot.ai_stub_server import (
+    Cassette,
+    StubConfig,
+    parse_latency,
+    request_key,
+    start_background,
+    synthesize,
+)
+
+
+class LatencyAndSchemaTest(unittest.TestCase):
+    def test_parse_latency(self):
+        rng = random.Random(1)
+        self.assertEqual(parse_latency("fixed:0.25")(), 0.25)
+        draws = [parse_latency("uniform:0.1,0.2", rng)() for _ in range(200)]
+        self.assertTrue(all(0.1 <= d <= 0.2 for d in draws))
+        self.assertTrue(all(parse_latency("normal:0,1", rng)() >= 0 for _ in range(200)))
+        for bad in ("gamma:1,2", "fixed", "uniform:1", "fixed:x"):
+            with self.assertRaises(ValueError, msg=bad):
+                parse_latency(bad)
+
+    def test_synthesize_matches_schema(self):
+        self.assertEqual(synthesize(PatternDecision.SCHEMA), {"reasoning": "", "decision": "hold"})
+        self.assertEqual(synthesize(NoiseVerdict.SCHEMA), {"is_glitch": False})
+
+
+class StubServerTest(unittest.TestCase):
+    """스텁을 스레드로 띄우고 실제 ai_client(AsyncOpenAI) 경로로 호출."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.servers = []
+        self.patches = [
+            patch("trading_bot.ai_cache.AI_CACHE_FILE", Path(self.tmp.name) / "ai_cache.db"),
+            patch("trading_bot.ai_cache.REFLECTION_CACHE_FILE", Path(self.tmp.name) / "r.json"),
+            patch("trading_bot.ai_cache._ready", False),
+            patch("trading_bot.ai_metrics.AI_METRICS_FILE", Path(self.tmp.name) / "m.db"),
+            patch("trading_bot.ai_metrics._ready", False),
+            patch("trading_bot.ai_breaker.AI_METRICS_FILE", Path(self.tmp.name) / "m.db"),
+            patch("trading_bot.ai_breaker._ready", False),
+            patch("trading_bot.db_helpers.DB_FILE", Path(self.tmp.name) / "t.db"),
+            patch("trading_bot.pattern_store.PATTERN_HISTORY_FILE", Path(self.tmp.name) / "p.json"),
+            patch("trading_bot.pattern_store._ready", False),
+        ]
+        for p in self.patches:
+            p.start()
+        idx = pd.date_range("2024-01-01", periods=10, freq="15min")
+        self.df = pd.DataFrame(
+            {c: range(10) for c in ("open", "high", "low", "close", "volume")}, index=idx
+        )
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+        self.tmp.cleanup()
+
+    def _serve(self, cfg):
+        server, url = start_background(cfg)
+        self.servers.append(server)
+        for p in (
+            patch("trading_bot.ai_client.OPENAI_KEY", "stub"),
+            patch("trading_bot.ai_client.OPENAI_BASE_URL", url),
+            patch("trading_bot.ai_client._client", None),
+        ):
+            p.start()
+            self.patches.append(p)
+        return url
+
+    def _ask(self, model_cls):
+        return ai_client.chat(
+            [{"role": "user", "content": "hi"}], 50, response_format=response_format(model_cls)
+        )
+
+    def test_synthetic_and_scripted_replies(self):
+        script = {PatternDecision.NAME: [{"reasoning": "breakout", "decision": "buy"},
+                                         {"reasoning": "fade", "decision": "sell"}]}
+        self._serve(StubConfig(script=script))
+        # 같은 입력은 AI 캐시에 걸리므로 패턴 이름을 바꿔 가며 호출
+        got = [ai_helpers.ask_pattern_decision(name, self.df) for name in ("flag", "wedge", "cup")]
+        self.assertEqual(got, ["buy", "sell", "buy"])  # 스크립트 응답 순환
+        self.assertEqual(json.loads(self._ask(NoiseVerdict)), {"is_glitch": False})
+
+    def test_concurrent_calls_overlap(self):
+        self._serve(StubConfig(latency=parse_latency("fixed:0.3")))
+        t0 = time.perf_counter()
+        futs = [ai_client.submit(self._ask, NoiseVerdict) for _ in range(4)]
+        results = [f.result() for f in concurrent.futures.as_completed(futs)]
+        elapsed = time.perf_counter() - t0
+        self.assertEqual(len([r for r in results if r]), 4)
+        self.assertLess(elapsed, 0.3 * 4 * 0.75)
+
+    def test_slow_reply_hits_timeout(self):
+        self._serve(StubConfig(latency=parse_latency("fixed:1.0")))
+        t0 = time.perf_counter()
+        out = ai_client.chat([{"role": "user", "content": "hi"}], 10, timeout=0.2)
+        self.assertIsNone(out)
+        self.assertLess(time.perf_counter() - t0, 0.9)
+
+    def test_record_then_replay(self):
+        # 업스트림 역할의 스텁(스크립트 응답) 앞에 record 스텁을 두고 카세트 기록
+        upstream = StubConfig(
+            latency=parse_latency("fixed:0.15"),
+            script={"*": [{"reasoning": "recorded", "decision": "sell"}]},
+        )
+        up_server, up_url = start_background(upstream)
+        self.servers.append(up_server)
+        path = Path(self.tmp.name) / "cassette.jsonl"
+        rec_server, rec_url = start_background(
+            StubConfig(mode="record", cassette=Cassette(path), upstream=up_url)
+        )
+        self.servers.append(rec_server)
+
+        body = {
+            "model": "gpt-test",
+            "messages": [{"role": "user", "content": "decide"}],
+            "response_format": response_format(PatternDecision),
+        }
+        resp = requests.post(rec_url + "/chat/completions", json=body, timeout=5)
+        self.assertEqual(resp.status_code, 200)
+        lines = path.read_text(encoding="utf-8").splitlines()
+        self.assertEqual(len(lines), 1)
+        rec = json.loads(lines[0])
+        self.assertEqual(rec["key"], request_key(body))
+        self.assertGreaterEqual(rec["latency"], 0.15)
+
+        # 오프라인 재생: 같은 요청은 기록된 응답·지연, 다른 요청은 strict 모드에서 404
+        up_server.shutdown()
+        play_server, play_url = start_background(
+            StubConfig(mode="replay", cassette=Cassette(path), strict=True)
+        )
+        self.servers.append(play_server)
+        t0 = time.perf_counter()
+        resp = requests.post(play_url + "/chat/completions", json=dict(body, max_tokens=80), timeout=5)
+        self.assertGreaterEqual(time.perf_counter() - t0, 0.15)
+        content = resp.json()["choices"][0]["message"]["content"]
+        self.assertEqual(json.loads(content)["decision"], "sell")
+
+        miss = dict(body, messages=[{"role": "user", "content": "other"}])
+        self.assertEqual(requests.post(play_url + "/chat/completions", json=miss, timeout=5).status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import math
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from trading_bot.db_helpers import init_db, log_trade
+from trading_bot.analytics import pattern_stats, time_bucket_stats, trade_summary
+
+
+def _log(ts, decision, pct, pattern, avg_price, price):
+    log_trade(ts, decision, pct, pattern, pattern, 0.0, 0.0, avg_price, price, "virtual", 0)
+
+
+class AnalyticsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_patch = patch("trading_bot.db_helpers.DB_FILE", Path(self.tmp.name) / "t.db")
+        self.db_patch.start()
+        init_db()
+        # 100 → 110 (+10%) 청산, 200 → 190 (-5%) 청산, 사이사이 hold/미체결 신호
+        _log(1000, "buy", 5.0, "hammer", 100.0, 100.0)
+        _log(1900, "hold", 0.0, "", 100.0, 105.0)
+        _log(2800, "sell", 100.0, "take_profit", 0.0, 110.0)
+        _log(3700, "sell", 0.0, "trend_sell", 0.0, 111.0)
+        _log(90000, "buy", 5.0, "doji", 200.0, 200.0)
+        _log(90900, "sell", 100.0, "stop_loss", 0.0, 190.0)
+
+    def tearDown(self):
+        self.db_patch.stop()
+        self.tmp.cleanup()
+
+    def test_summary_uses_entry_price_of_previous_fill(self):
+        s = trade_summary()[0]
+        self.assertEqual(s["total_trades"], 6)
+        self.assertEqual(s["fills"], 4)
+        self.assertEqual(s["closed"], 2)
+        self.assertEqual(s["wins"], 1)
+        self.assertAlmostEqual(s["win_rate"], 0.5)
+        self.assertAlmostEqual(s["avg_profit_pct"], 10.0)
+        self.assertAlmostEqual(s["avg_loss_pct"], -5.0)
+        self.assertAlmostEqual(s["avg_pnl_pct"], 2.5)
+
+    def test_summary_since_filters_and_empty_is_nan(self):
+        s = trade_summary(since_ts=50000)[0]
+        self.assertEqual(s["closed"], 1)
+        self.assertTrue(math.isnan(trade_summary(since_ts=10**9)[0]["win_rate"]))
+
+    def test_pattern_and_bucket_stats(self):
+        pats = {r["pattern"]: r for r in pattern_stats()}
+        self.assertEqual(set(pats), {"hammer", "doji"})
+        self.assertAlmostEqual(pats["hammer"]["avg_pnl_pct"], 10.0)
+        self.assertEqual(pats["doji"]["wins"], 0)
+
+        buckets = time_bucket_stats(86400)
+        self.assertListEqual(buckets["bucket"].tolist(), [0, 86400])
+        self.assertListEqual(buckets["closed"].tolist(), [1, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
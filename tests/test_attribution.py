@@ -0,0 +1,107 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from trading_bot.db_helpers import init_db, log_trade
+import trading_bot.pattern_store as pattern_store
+from trading_bot.attribution import (
+    _attribute,
+    attribute_new_trades,
+    net_pnl_pct,
+    rebuild_attribution,
+)
+
+
+def _trade(ts, decision, pct, pattern, avg_price, price):
+    log_trade(ts, decision, pct, pattern, pattern, 0.0, 0.0, avg_price, price, "virtual", 0)
+
+
+def _entry(ts, pattern, decision, result=None):
+    return pattern_store.append_pattern_entry(
+        {"timestamp": ts, "pattern": pattern, "decision": decision, "result": result}
+    )
+
+
+class AttributionTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        tmp = Path(self.tmp.name)
+        self.patches = [
+            patch("trading_bot.db_helpers.DB_FILE", tmp / "t.db"),
+            patch("trading_bot.pattern_store.PATTERN_HISTORY_FILE", tmp / "pattern_history.json"),
+            patch("trading_bot.pattern_store._ready", False),
+            patch("trading_bot.attribution.TRADING_FEE", 0.001),
+        ]
+        for p in self.patches:
+            p.start()
+        self.legacy = tmp / "pattern_history.json"
+        init_db()
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        self.tmp.cleanup()
+
+    def _results(self):
+        return {r["id"]: r["result"] for r in pattern_store.load_pattern_entries()}
+
+    def test_buys_paired_with_closing_sell_incrementally(self):
+        flag = _entry(990, "Bull Flag", "buy")
+        late = _entry(1500, "bull flag", "buy")      # 체결 없는 신호 → 미확정 유지
+        _trade(1000, "buy", 5.0, "bull flag", 100.0, 100.0)
+        _trade(1900, "hold", 0.0, "", 100.0, 105.0)
+        self.assertEqual(attribute_new_trades(), 0)  # 아직 미청산
+
+        cup = _entry(1995, "cup", "buy")
+        _trade(2000, "buy", 5.0, "cup", 105.0, 110.0)
+        top = _entry(2790, "rising wedge", "sell")
+        _trade(2800, "sell", 100.0, "rising wedge", 0.0, 121.0)
+        self.assertEqual(attribute_new_trades(), 3)
+
+        res = self._results()
+        self.assertAlmostEqual(res[flag], net_pnl_pct(100.0, 121.0, 0.001))
+        self.assertAlmostEqual(res[cup], net_pnl_pct(110.0, 121.0, 0.001))
+        self.assertAlmostEqual(res[top], net_pnl_pct(105.0, 121.0, 0.001))
+        self.assertIsNone(res[late])
+        stats = pattern_store.get_pattern_stats("bull flag")
+        self.assertEqual((stats.seen, stats.count, stats.wins), (2, 1, 1))
+
+        self.assertEqual(attribute_new_trades(), 0)  # 같은 체결 재처리 없음
+
+    def test_rebuild_clears_placeholders_and_reattributes(self):
+        stale = _entry(10, "doji star", "buy", 0.0)
+        e = _entry(995, "doji star", "buy")
+        _trade(1000, "buy", 5.0, "doji star", 200.0, 200.0)
+        _trade(1100, "sell", 100.0, "stop_loss", 0.0, 190.0)
+        self.assertEqual(_attribute(window=60), 1)
+
+        self.assertEqual(rebuild_attribution(), 1)
+        res = self._results()
+        self.assertIsNone(res[stale])
+        self.assertLess(res[e], -5.0)
+        self.assertEqual(pattern_store.get_pattern_stats("doji star").count, 1)
+
+    def test_rebuild_clears_legacy_json_and_hold_placeholders(self):
+        self.legacy.write_text(json.dumps([
+            {"timestamp": 900.0, "pattern": "flag", "decision": "hold", "result": 0.0},
+            {"timestamp": 995.0, "pattern": "flag", "decision": "buy", "result": 0.0},
+        ]), encoding="utf-8")
+        # 수정 전 이전 코드가 남긴 행: hold에도 0.0 결과
+        old_hold = _entry(950, "flag", "hold", 0.0)
+        _trade(1000, "buy", 5.0, "flag", 100.0, 100.0)
+        _trade(1100, "sell", 100.0, "stop_loss", 0.0, 110.0)
+
+        self.assertEqual(rebuild_attribution(), 1)
+        res = self._results()
+        self.assertIsNone(res[old_hold])
+        self.assertEqual(sum(r is not None for r in res.values()), 1)   # 체결된 매수 항목만
+        stats = pattern_store.get_pattern_stats("flag")
+        self.assertEqual((stats.seen, stats.count, stats.wins), (3, 1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -25,6 +25,37 @@ class ConfigLogEnvInfoTest(unittest.TestCase):
             self.assertNotIn("abcd1234efgh5678", log_output)
             self.assertIn("abcd...5678", log_output)
 
+class ApplyOverridesTest(unittest.TestCase):
+    def test_overrides_are_cast_and_propagated(self):
+        import trading_bot.config as cfg
+        import trading_bot.executor as executor
+
+        old = {"MIN_ORDER_KRW": cfg.MIN_ORDER_KRW, "STOP_LOSS_PCT": cfg.STOP_LOSS_PCT,
+               "GAP_REPAIR": cfg.GAP_REPAIR}
+        executor.MIN_ORDER_KRW = cfg.MIN_ORDER_KRW
+        try:
+            self.assertEqual(cfg.apply_overrides({"MIN_ORDER_KRW": "7000"}, dry_run=True),
+                             {"MIN_ORDER_KRW": 7000})
+            self.assertEqual(cfg.MIN_ORDER_KRW, old["MIN_ORDER_KRW"])
+
+            applied = cfg.apply_overrides(
+                {"MIN_ORDER_KRW": "7000", "STOP_LOSS_PCT": "0.03 # 주석", "GAP_REPAIR": "false"}
+            )
+            self.assertEqual(applied, {"MIN_ORDER_KRW": 7000, "STOP_LOSS_PCT": 0.03, "GAP_REPAIR": False})
+            self.assertEqual(cfg.MIN_ORDER_KRW, 7000)
+            self.assertEqual(executor.MIN_ORDER_KRW, 7000)
+        finally:
+            cfg.apply_overrides(old)
+
+    def test_invalid_overrides_rejected(self):
+        import trading_bot.config as cfg
+
+        for bad in ({"NO_SUCH_KEY": 1}, {"log_env_info": 1}, {"SMA_WINDOW": "abc"},
+                    {"AI_CACHE_TTL": {}}):
+            with self.assertRaises(ValueError):
+                cfg.apply_overrides(bad)
+
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,93 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import dataclasses
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import trading_bot.config as cfg
+import trading_bot.strategies as strategies
+from trading_bot.config_service import ConfigService
+from trading_bot.markets import MarketEngine
+from trading_bot.ohlcv_gaps import repair_gaps
+
+KEYS = ["SMA_WINDOW", "STOP_LOSS_PCT", "REFLECTION_INTERVAL_HOURS", "REFLECTION_INTERVAL_SEC",
+        "MARKET_MAX_SHARE", "GAP_REPAIR_MAX_REQUESTS"]
+
+
+class ConfigServiceTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.env = Path(self.tmp.name) / ".env"
+        self.env.write_text("SMA_WINDOW=30\n", encoding="utf-8")
+        self.old = {k: getattr(cfg, k) for k in KEYS}
+        self.old_ticker = cfg.TICKER
+        self.tick = 0
+        self.service = ConfigService(env_path=self.env)
+
+    def tearDown(self):
+        cfg.apply_overrides(self.old)
+        self.tmp.cleanup()
+
+    def _write(self, text):
+        self.env.write_text(text, encoding="utf-8")
+        self.tick += 1
+        stamp = os.stat(self.env).st_mtime + self.tick
+        os.utime(self.env, (stamp, stamp))
+
+    def test_changed_values_swap_in_new_snapshot(self):
+        before = self.service.snapshot()
+        self.assertEqual(self.service.reload(), {})     # 파일 그대로면 아무것도 안 함
+
+        self._write(
+            "SMA_WINDOW=12\nSTOP_LOSS_PCT=0.04 # 손절\nREFLECTION_INTERVAL_HOURS=2\n"
+            "TICKER=KRW-ETH\nSTOP_LOSS_PCT_UNKNOWN=1\n"
+        )
+        with self.assertLogs("trading_bot.config_service", level="INFO") as cm:
+            changes = self.service.reload()
+        self.assertEqual(changes["SMA_WINDOW"], (before.SMA_WINDOW, 12))
+        self.assertEqual(changes["STOP_LOSS_PCT"][1], 0.04)
+        self.assertEqual(changes["REFLECTION_INTERVAL_SEC"][1], 7200)
+        self.assertIn("SMA_WINDOW", "\n".join(cm.output))
+
+        # config·모듈 전역에 반영, 정적 항목(TICKER)은 무시
+        self.assertEqual(cfg.SMA_WINDOW, 12)
+        self.assertEqual(strategies.SMA_WINDOW, 12)
+        self.assertEqual(cfg.TICKER, self.old_ticker)
+
+        snap = self.service.snapshot()
+        self.assertEqual(snap.version, before.version + 1)
+        self.assertEqual(snap.SMA_WINDOW, 12)
+        self.assertEqual(before.SMA_WINDOW, self.old["SMA_WINDOW"])   # 이전 스냅샷은 그대로
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            snap.version = 99
+        with self.assertRaises(TypeError):
+            snap.values["SMA_WINDOW"] = 1
+
+    def test_invalid_file_is_rejected_as_a_whole(self):
+        before = self.service.snapshot()
+        for text in ("SMA_WINDOW=12\nSTOP_LOSS_PCT=abc\n", "SMA_WINDOW=0\n",
+                     "SMA_WINDOW=12\nSTOP_LOSS_PCT=1.5\n"):
+            self._write(text)
+            with self.assertLogs("trading_bot.config_service", level="ERROR"):
+                self.assertEqual(self.service.reload(), {})
+            self.assertEqual(cfg.SMA_WINDOW, self.old["SMA_WINDOW"])
+            self.assertIs(self.service.snapshot(), before)
+
+    def test_defaults_are_read_at_call_time(self):
+        engine = MarketEngine(["KRW-BTC", "KRW-ETH"], workers=1)   # 리로드 전에 만든 엔진
+        gaps = [("KRW-BTC", "minute15", i * 9000, i * 9000 + 900) for i in range(5)]
+        try:
+            self._write("MARKET_MAX_SHARE=0.25\nGAP_REPAIR_MAX_REQUESTS=2\n")
+            self.service.reload()
+            self.assertEqual(engine.max_share, 0.25)
+            with patch("trading_bot.ohlcv_gaps._repairable", return_value=gaps), \
+                    patch("trading_bot.ohlcv_gaps._mark_attempt"):
+                self.assertEqual(repair_gaps("KRW-BTC", "minute15", fetch=lambda *a: None)["requests"], 2)
+        finally:
+            engine.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,17 +1,18 @@
 import os, sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import importlib.util
 import unittest
 from types import SimpleNamespace
 from unittest.mock import patch
 
 # Provide dummy pyupbit module if missing
-if 'pyupbit' not in sys.modules:
+if importlib.util.find_spec('pyupbit') is None:
     sys.modules['pyupbit'] = SimpleNamespace(Upbit=lambda *a, **k: None)
-if 'requests' not in sys.modules:
+if importlib.util.find_spec('requests') is None:
     sys.modules['requests'] = SimpleNamespace(post=lambda *a, **k: None)
-if 'pandas' not in sys.modules:
+if importlib.util.find_spec('pandas') is None:
     sys.modules['pandas'] = SimpleNamespace(DataFrame=object)
-if 'dotenv' not in sys.modules:
+if importlib.util.find_spec('dotenv') is None:
     sys.modules['dotenv'] = SimpleNamespace(load_dotenv=lambda *a, **k: None)
 
 from trading_bot.executor import execute_trade
@@ -0,0 +1,67 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from trading_bot.fingerprint import frame_fingerprint
+
+COLS = ["open", "high", "low", "close", "volume"]
+# _frame() OHLCV 지문 고정값 (해시 규칙 변경 감지용)
+GOLDEN = "388332bf46cc22ca5f9a5c261ae294e1"
+
+
+def _frame(n=20, tz=None):
+    idx = pd.date_range("2024-01-01", periods=n, freq="15min", tz=tz)
+    base = np.arange(n, dtype=float)
+    return pd.DataFrame(
+        {"open": base, "high": base + 2, "low": base - 1, "close": base + 1,
+         "volume": base * 10, "rsi": base / 2},
+        index=idx,
+    )
+
+
+class FingerprintTest(unittest.TestCase):
+    def test_stable_and_content_sensitive(self):
+        a, b = _frame(), _frame()
+        fp = frame_fingerprint(a, COLS)
+        self.assertEqual(len(fp), 32)
+        self.assertEqual(fp, frame_fingerprint(b, COLS))
+        # 해시 규칙이 바뀌면 기존 캐시 키가 모두 무효화되므로 고정값으로 확인
+        self.assertEqual(fp, GOLDEN)
+
+        b.iloc[-1, b.columns.get_loc("close")] += 1e-9
+        self.assertNotEqual(fp, frame_fingerprint(b, COLS))
+        c = _frame()
+        c.index = c.index + pd.Timedelta(minutes=15)
+        self.assertNotEqual(fp, frame_fingerprint(c, COLS))
+
+    def test_column_selection_rows_and_timezones(self):
+        a = _frame()
+        b = _frame()
+        b["rsi"] = 0.0
+        self.assertEqual(frame_fingerprint(a, COLS), frame_fingerprint(b, COLS))
+        self.assertNotEqual(frame_fingerprint(a), frame_fingerprint(b))
+        self.assertEqual(frame_fingerprint(a, COLS, rows=10), frame_fingerprint(a.iloc[-10:], COLS))
+
+        utc = _frame(tz="UTC")
+        kst = utc.tz_convert("Asia/Seoul")
+        self.assertEqual(frame_fingerprint(utc, COLS), frame_fingerprint(kst, COLS))
+        self.assertEqual(frame_fingerprint(utc, COLS), frame_fingerprint(a, COLS))
+
+        nan1, nan2 = _frame(), _frame()
+        nan1.iloc[0, 0] = np.nan
+        nan2.iloc[0, 0] = -np.float64("nan")
+        self.assertEqual(frame_fingerprint(nan1, COLS), frame_fingerprint(nan2, COLS))
+
+    def test_mixed_trade_frame(self):
+        trades = pd.DataFrame({"ts": [1.0, 2.0], "decision": ["buy", None], "percentage": [5, 0]})
+        other = trades.copy()
+        other.loc[1, "decision"] = "sell"
+        self.assertNotEqual(frame_fingerprint(trades), frame_fingerprint(other))
+        self.assertEqual(frame_fingerprint(None), frame_fingerprint(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
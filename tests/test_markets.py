@@ -0,0 +1,213 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from trading_bot.config import LIVE_MODE, TICKER
+from trading_bot.db_helpers import init_db, load_account, save_account
+from trading_bot.markets import KrwAllocator, MarketEngine, load_ledger, load_positions
+from trading_bot.strategies import check_trend_1h
+
+MARKETS = ["KRW-BTC", "KRW-ETH", "KRW-XRP"]
+PRICES = {"KRW-BTC": 1.4e8, "KRW-ETH": 5e6, "KRW-XRP": 800.0}
+
+
+def _candles(base: float, n: int = 100) -> pd.DataFrame:
+    idx = pd.date_range("2024-01-01", periods=n, freq="15min")
+    close = base * (1 + 0.001 * np.sin(np.arange(n) / 5))
+    return pd.DataFrame(
+        {"open": close, "high": close * 1.001, "low": close * 0.999, "close": close,
+         "volume": np.full(n, 10.0)},
+        index=idx,
+    )
+
+
+class KrwAllocatorTest(unittest.TestCase):
+    def test_concurrent_reservations_never_oversubscribe(self):
+        alloc = KrwAllocator(krw=10_000, equity=20_000, max_share=0.3)
+        got = []
+        threads = [threading.Thread(target=lambda: got.append(alloc.reserve(0.0))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertAlmostEqual(sum(got), 10_000)
+        self.assertLessEqual(max(got), 6_000)
+        self.assertEqual(alloc.reserve(5_000), 0.0)
+        alloc.settle(2_500)
+        self.assertEqual(alloc.reserve(5_000), 1_000)   # 상한 6000 - 보유 5000
+
+
+class TrendFilterTest(unittest.TestCase):
+    def _ctx(self, price, macd, ticker=None):
+        last_1h = {"sma50_1h": price * 1.05, "rsi_1h": 55.0, "macd_diff_1h": macd}
+        return SimpleNamespace(df_1h=object(), last_1h=last_1h, price=price, fear_idx=70,
+                               ticker=ticker)
+
+    @patch("trading_bot.strategies.MACD_1H_THRESHOLD_PCT", 0.00002)
+    @patch("trading_bot.strategies.RSI_OVERRIDE", 40.0)
+    @patch("trading_bot.strategies.FG_EXTREME_FEAR", 50.0)
+    def test_macd_exception_scales_with_price(self):
+        # 800 KRW 마켓이 1h SMA50 아래에서 뚜렷한 하락 MACD(가격의 0.5%) → 보류
+        ok, detail = check_trend_1h(self._ctx(800.0, -4.0))
+        self.assertFalse(ok, detail)
+        # 같은 비율이면 BTC도 보류, 가격 대비 미미한 MACD는 어느 마켓이든 예외 통과
+        self.assertFalse(check_trend_1h(self._ctx(1.4e8, -7e5))[0])
+        self.assertTrue(check_trend_1h(self._ctx(800.0, -0.01))[0])
+        self.assertTrue(check_trend_1h(self._ctx(1.4e8, -2000.0))[0])
+
+    @patch("trading_bot.strategies.MACD_1H_THRESHOLD", 5000.0)
+    @patch("trading_bot.strategies.MACD_1H_THRESHOLD_PCT", 0.00002)
+    @patch("trading_bot.strategies.RSI_OVERRIDE", 40.0)
+    @patch("trading_bot.strategies.FG_EXTREME_FEAR", 50.0)
+    def test_legacy_krw_threshold_applies_to_main_ticker_only(self):
+        # 기존 .env의 MACD_1H_THRESHOLD=5000 → TICKER에는 KRW 기준 그대로 (4000 ≤ 5000 통과)
+        self.assertTrue(check_trend_1h(self._ctx(1.4e8, -4000.0))[0])
+        self.assertTrue(check_trend_1h(self._ctx(1.4e8, -4000.0, TICKER))[0])
+        # 다른 마켓은 비율 기준 (4 KRW = 800 KRW의 0.5% → 보류)
+        other = next(t for t in MARKETS if t != TICKER)
+        self.assertFalse(check_trend_1h(self._ctx(800.0, -4.0, other))[0])
+
+        import trading_bot.config as cfg
+        with patch.object(cfg, "MACD_1H_THRESHOLD", 5000.0), \
+                self.assertLogs(cfg.logger, level="WARNING") as cm:
+            cfg.log_env_info()
+        self.assertIn("MACD_1H_THRESHOLD_PCT", "\n".join(cm.output))
+
+
+class MarketEngineTest(unittest.TestCase):
+    def setUp(self):
+        if LIVE_MODE:
+            self.skipTest("LIVE_MODE enabled")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.signal = (True, False, "test")
+        self.delay = {}
+        self.patches = [
+            patch("trading_bot.db_helpers.DB_FILE", Path(self.tmp.name) / "t.db"),
+            patch("trading_bot.markets.fetch_market_15m", side_effect=self._fetch),
+            patch("trading_bot.markets.fetch_data_1h", return_value=None),
+            patch("trading_bot.markets.filter_noise", return_value=False),
+            patch("trading_bot.markets.get_fear_and_greed", return_value=50),
+            patch("trading_bot.strategies.check_rule_patterns", side_effect=lambda ctx: self.signal),
+        ]
+        for p in self.patches:
+            p.start()
+        init_db()
+        load_account()
+        save_account(12_000.0, 0.0, 0.0)
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        self.tmp.cleanup()
+
+    def _fetch(self, ticker):
+        time.sleep(self.delay.get(ticker, 0.0))
+        return _candles(PRICES[ticker])
+
+    def _run(self, engine, timeout=30.0):
+        return engine.run_once(time.time() + timeout)
+
+    def test_shared_krw_is_split_across_markets(self):
+        engine = MarketEngine(MARKETS, workers=3, max_share=0.5)
+        try:
+            decisions = self._run(engine)
+        finally:
+            engine.close()
+        self.assertEqual(decisions, {t: "buy" for t in MARKETS})
+
+        positions = load_positions(MARKETS)
+        held = [t for t, (q, _) in positions.items() if q > 0]
+        self.assertEqual(len(held), 2)                  # 12000 KRW, 마켓당 상한 6000 → 5000씩 2건
+        krw, btc, _ = load_account()
+        self.assertAlmostEqual(krw, 2_000.0)
+        for t in held:
+            q, avg = positions[t]
+            self.assertAlmostEqual(q * avg, 5_000.0)
+        self.assertAlmostEqual(btc, positions[TICKER][0])
+
+        ledger = load_ledger()
+        self.assertEqual(sorted(ledger.ticker), sorted(MARKETS))
+        self.assertEqual(set(ledger.decision), {"buy"})
+
+    def test_main_ticker_position_follows_single_market_account(self):
+        engine = MarketEngine(MARKETS, workers=3, max_share=0.5)
+        try:
+            self._run(engine)
+        finally:
+            engine.close()
+        # 이후 단일 마켓 경로(execute_trade → save_account)가 account만 갱신
+        krw = load_account()[0]
+        save_account(krw, 0.25, 1.3e8)
+        self.assertEqual(load_positions([TICKER])[TICKER], (0.25, 1.3e8))
+        save_account(krw, 0.0, 0.0)
+        self.assertEqual(load_positions(MARKETS)[TICKER], (0.0, 0.0))
+
+    def test_processed_candle_is_not_traded_again(self):
+        engine = MarketEngine(MARKETS, workers=3, max_share=0.5)
+        try:
+            self._run(engine)
+            krw_before = load_account()[0]
+            second = MarketEngine(MARKETS, workers=3, max_share=0.5)   # 재시작해도 장부가 막음
+            try:
+                self.assertEqual(set(self._run(second).values()), {"skip"})
+            finally:
+                second.close()
+        finally:
+            engine.close()
+        self.assertEqual(load_account()[0], krw_before)
+        self.assertEqual(len(load_ledger()), len(MARKETS))
+
+    def test_sell_returns_krw_to_shared_pool(self):
+        engine = MarketEngine(["KRW-ETH", "KRW-XRP"], workers=2, max_share=1.0)
+        try:
+            self._run(engine)
+            self.signal = (False, True, "test")
+            with patch("trading_bot.markets.fetch_market_15m",
+                       side_effect=lambda t: _candles(PRICES[t] * 1.1, 101)):
+                self.assertEqual(set(self._run(engine).values()), {"sell"})
+        finally:
+            engine.close()
+        self.assertEqual(load_positions(["KRW-ETH", "KRW-XRP"]),
+                         {"KRW-ETH": (0.0, 0.0), "KRW-XRP": (0.0, 0.0)})
+        self.assertGreater(load_account()[0], 12_000.0)
+
+    def test_slow_market_misses_window_without_blocking_others(self):
+        self.delay = {"KRW-XRP": 1.5}
+        engine = MarketEngine(MARKETS, workers=3, max_share=0.5)
+        try:
+            decisions = self._run(engine, timeout=1.0)
+        finally:
+            engine.close()
+        self.assertEqual(decisions["KRW-XRP"], "none")
+        self.assertEqual(decisions["KRW-BTC"], "buy")
+        self.assertEqual(engine.states["KRW-XRP"].skipped, 1)
+        self.assertNotIn("KRW-XRP", set(load_ledger().ticker))
+
+
+    def test_slow_fear_greed_does_not_block_decisions(self):
+        def slow_fng():
+            time.sleep(1.5)
+            return 10
+        engine = MarketEngine(MARKETS, workers=4, max_share=0.5)
+        try:
+            with patch("trading_bot.markets.get_fear_and_greed", side_effect=slow_fng):
+                t0 = time.time()
+                decisions = self._run(engine, timeout=1.0)
+                elapsed = time.time() - t0
+        finally:
+            engine.close()
+        self.assertLess(elapsed, 1.0)
+        self.assertNotIn("none", decisions.values())   # 모든 마켓이 판정 시간 안에 처리됨
+        self.assertEqual(engine.fear_idx, 0)            # 시간 초과 → 직전 값 유지
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from trading_bot import noise_detector as nd
+from trading_bot import filters
+from trading_bot.filters import filter_noise
+from trading_bot.noise_filters import is_rule_based_noise, rule_noise_history
+
+
+def _series(n=400, seed=0):
+    """두꺼운 꼬리 수익률 + 하루 주기 거래량의 15분봉 합성 데이터."""
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2024-01-01", periods=n, freq="15min")
+    ret = rng.standard_t(4, n) * 0.002
+    close = 1.4e8 * np.exp(np.cumsum(ret))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.001, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.001, n)))
+    season = np.exp(0.8 * np.sin(np.arange(n) * 2 * np.pi / 96))
+    volume = rng.gamma(1.5, 10, n) * season * (1 + 30 * np.abs(ret))
+    return pd.DataFrame(
+        {"open": open_, "high": high, "low": low, "close": close, "volume": volume}, index=idx
+    )
+
+
+class NoiseDetectorTest(unittest.TestCase):
+    def setUp(self):
+        self.df = _series().iloc[-97:].copy()
+
+    def _set_last(self, **values):
+        for col, v in values.items():
+            self.df.iloc[-1, self.df.columns.get_loc(col)] = v
+
+    def test_ordinary_bar_is_clean(self):
+        self._set_last(close=self.df["open"].iloc[-1] * 1.0005,
+                       high=self.df["open"].iloc[-1] * 1.001,
+                       low=self.df["open"].iloc[-1] * 0.999,
+                       volume=self.df["volume"].median())
+        s = nd.score_last_bar(self.df)
+        self.assertEqual(s.label, nd.CLEAN)
+        self.assertLess(s.confidence, 0.9)
+        self.assertEqual(s.reasons, ())
+
+    def test_low_volume_spike_is_noise(self):
+        price = self.df["open"].iloc[-1] * 1.10
+        self._set_last(close=price, high=price, volume=self.df["volume"].median() * 0.5)
+        s = nd.score_last_bar(self.df)
+        self.assertEqual(s.label, nd.NOISE)
+        self.assertIn("price_outlier", s.reasons)
+
+    def test_volume_backed_move_is_not_noise(self):
+        price = self.df["open"].iloc[-1] * 1.03
+        self._set_last(close=price, high=price, volume=self.df["volume"].median() * 8)
+        self.assertNotEqual(nd.score_last_bar(self.df).label, nd.NOISE)
+
+    def test_ohlc_violation_and_timestamp(self):
+        self._set_last(high=self.df["close"].iloc[-1] * 0.99)
+        s = nd.score_last_bar(self.df)
+        self.assertEqual((s.label, s.confidence), (nd.NOISE, 1.0))
+        self.assertIn("high_below_body", s.reasons)
+
+        df = _series().iloc[-97:].copy()
+        df.index = df.index[:-1].append(pd.DatetimeIndex([df.index[-2]]))
+        self.assertIn("timestamp_not_increasing", nd.score_last_bar(df).reasons)
+
+    def test_gap_is_reported_and_return_scaled(self):
+        df = self.df.drop(self.df.index[-5:-1])
+        s = nd.score_last_bar(df)
+        self.assertIn("gap_4_bars", s.reasons)
+
+    def test_insufficient_history(self):
+        self.assertIsNone(nd.score_last_bar(self.df.iloc[-10:]))
+
+    def test_confidence_is_monotonic(self):
+        c = [nd.score_to_confidence(s) for s in (0, 1, 3, 6, 10, np.inf)]
+        self.assertEqual(c, sorted(c))
+        self.assertEqual((c[0], c[-1]), (0.0, 1.0))
+
+
+class FilterNoiseTest(unittest.TestCase):
+    def test_ai_only_for_ambiguous_and_fewer_calls_than_volume_gate(self):
+        df = _series(n=1200, seed=1)
+        calls, old_gate = [], 0
+        with patch("trading_bot.filters.ask_noise_filter",
+                   side_effect=lambda d: calls.append(d) or False):
+            for i in range(100, len(df)):
+                window = df.iloc[i - 96:i + 1]
+                vol = window["volume"].to_numpy()
+                old_gate += vol[-1] <= vol[-5:-1].mean() * 0.10
+                before = len(calls)
+                filter_noise(window)
+                if len(calls) > before:
+                    self.assertEqual(nd.score_last_bar(window).label, nd.AMBIGUOUS)
+                    self.assertEqual(len(calls[-1]), 5)
+        self.assertLess(len(calls), old_gate)
+
+    def test_falls_back_to_volume_gate_without_history(self):
+        df = _series().iloc[-5:].copy()
+        df.iloc[-1, df.columns.get_loc("volume")] = 0.0
+        with patch("trading_bot.filters.ask_noise_filter", return_value=True) as ask, \
+                patch("trading_bot.filters.is_rule_based_noise", return_value=(False, 1.0)):
+            self.assertTrue(filter_noise(df))
+        ask.assert_called_once()
+
+
+class NoiseHistoryTest(unittest.TestCase):
+    """전체 히스토리 일괄 판정이 봉마다 실시간 함수를 부른 결과와 같은지."""
+
+    def setUp(self):
+        df = _series(n=500, seed=3)
+        cols = {c: df.columns.get_loc(c) for c in df.columns}
+        df.iloc[150, cols["high"]] = df.iloc[150, cols["close"]] * 0.9     # OHLC 위반
+        df.iloc[200, cols["volume"]] = 0.0                                  # 거래량 급감
+        df.iloc[230, cols["volume"]] = np.nan                               # 결측
+        df.iloc[250, cols["high"]] = df.iloc[250, cols["low"]] * 1.2        # 넓은 범위
+        df.iloc[300, cols["close"]] *= 1.08                                 # 가격 튐
+        df.iloc[300, cols["high"]] = df.iloc[300, cols["close"]]
+        self.df = df.drop(df.index[400:404])                                # 시간 간격
+
+    def test_rule_noise_matches_live(self):
+        hist = rule_noise_history(self.df)
+        for i in range(len(self.df)):
+            live = is_rule_based_noise(self.df.iloc[max(0, i - 4):i + 1])
+            self.assertEqual(bool(hist["is_noise"].iloc[i]), live[0], i)
+            self.assertAlmostEqual(hist["avg_vol4"].iloc[i], live[1], msg=i)
+        self.assertGreaterEqual(hist["is_noise"].sum(), 3)
+
+    def test_score_history_matches_score_last_bar(self):
+        hist = nd.score_history(self.df)
+        for i in range(len(self.df)):
+            live = nd.score_last_bar(self.df.iloc[max(0, i - nd.NOISE_WINDOW):i + 1])
+            row = hist.iloc[i]
+            if live is None:
+                self.assertTrue(pd.isna(row["label"]), i)
+                continue
+            self.assertEqual(row["label"], live.label, i)
+            self.assertAlmostEqual(row["confidence"], live.confidence, msg=i)
+            if np.isfinite(live.score):
+                self.assertAlmostEqual(row["score"], live.score, msg=i)
+        self.assertIn(nd.NOISE, set(hist["label"]))
+
+    def test_filter_history_matches_filter_noise(self):
+        hist = filters.filter_noise_history(self.df)["decision"]
+        with patch("trading_bot.filters.ask_noise_filter", return_value=False) as ask:
+            for i in range(len(self.df)):
+                ask.reset_mock()
+                skipped = filter_noise(self.df.iloc[max(0, i - nd.NOISE_WINDOW):i + 1])
+                expected = (
+                    (filters.ASK_AI,) if ask.called
+                    else (filters.RULE_NOISE, filters.LOCAL_NOISE) if skipped
+                    else (filters.PASS,)
+                )
+                self.assertIn(hist.iloc[i], expected, i)
+        self.assertEqual(set(hist), {filters.RULE_NOISE, filters.LOCAL_NOISE,
+                                     filters.ASK_AI, filters.PASS})
+
+    def test_sweep_is_monotonic_in_thresholds(self):
+        res = filters.sweep_noise_thresholds(self.df, [0.001, 0.05, 0.5], [0.02, 0.5])
+        self.assertEqual(len(res), 6)
+        loose = res[res.range_threshold == 0.5].set_index("vol_threshold")["rule_skip"]
+        self.assertTrue(loose.is_monotonic_increasing)
+        tight_range = res[res.vol_threshold == 0.001].set_index("range_threshold")["rule_skip"]
+        self.assertTrue(tight_range.is_monotonic_decreasing)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+
+from trading_bot.data_fetcher import fetch_ohlcv_before, store_ohlcv
+from trading_bot.db_helpers import init_db
+from trading_bot.ohlcv_gaps import load_gaps, lookback_complete, rebuild_gaps, repair_gaps
+from trading_bot.ohlcv_store import index_to_epoch, load_ohlcv_frame, upsert_ohlcv
+
+T, IV = "KRW-BTC", "minute15"
+
+
+def _candles(start: str, n: int) -> pd.DataFrame:
+    index = pd.date_range(start, periods=n, freq="15min")
+    base = pd.Series(range(n), index=index, dtype=float)
+    return pd.DataFrame({
+        "open": 100 + base,
+        "high": 101 + base,
+        "low": 99 + base,
+        "close": 100.5 + base,
+        "volume": 10 + base,
+    })
+
+
+def _epoch(s: str) -> int:
+    return int(index_to_epoch(pd.DatetimeIndex([s]))[0])
+
+
+class OhlcvGapsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_patch = patch("trading_bot.db_helpers.DB_FILE", Path(self.tmp.name) / "t.db")
+        self.db_patch.start()
+        init_db()
+        self.full = _candles("2024-01-01 00:00", 40)
+
+    def tearDown(self):
+        self.db_patch.stop()
+        self.tmp.cleanup()
+
+    def _gaps(self):
+        g = load_gaps(T, IV).sort_values("start_ts")
+        return [(pd.to_datetime(a, unit="s").strftime("%H:%M"), b) for a, b in zip(g.start_ts, g.bars)]
+
+    def test_gaps_tracked_split_and_closed_incrementally(self):
+        store_ohlcv(T, IV, self.full.iloc[:10])
+        store_ohlcv(T, IV, self.full.iloc[20:30])        # 02:30~04:45 (10봉) 빠짐
+        self.assertEqual(self._gaps(), [("02:30", 10)])
+
+        store_ohlcv(T, IV, self.full.iloc[14:16])        # 가운데만 채우면 둘로 나뉨
+        self.assertEqual(self._gaps(), [("02:30", 4), ("04:00", 4)])
+
+        store_ohlcv(T, IV, self.full.iloc[35:40])        # 뒤쪽에 새 빈 구간
+        self.assertEqual(self._gaps(), [("02:30", 4), ("04:00", 4), ("07:30", 5)])
+
+        store_ohlcv(T, IV, self.full.iloc[8:38])         # 전부 채움
+        self.assertTrue(load_gaps(T, IV).empty)
+
+    def test_rebuild_matches_incremental(self):
+        upsert_ohlcv(T, IV, self.full.drop(self.full.index[[3, 4, 17]]))
+        self.assertEqual(rebuild_gaps(T, IV), 2)
+        self.assertEqual(self._gaps(), [("00:45", 2), ("04:15", 1)])
+
+    def test_lookback_complete(self):
+        store_ohlcv(T, IV, self.full.drop(self.full.index[5]))
+        end = _epoch("2024-01-01 09:45")                  # 마지막 봉
+        self.assertTrue(lookback_complete(T, IV, end, 34))
+        self.assertFalse(lookback_complete(T, IV, end, 35))   # 01:15 빠짐
+        self.assertFalse(lookback_complete(T, IV, end, 41))   # 히스토리 부족
+        self.assertFalse(lookback_complete(T, IV, end + 900, 2))  # 최신 봉 없음
+
+    def test_repair_fetches_only_missing_ranges(self):
+        store_ohlcv(T, IV, self.full.drop(self.full.index[list(range(5, 9)) + [30]]))
+        calls = []
+
+        def fetch(ticker, interval, to_ts, count):
+            calls.append((to_ts, count))
+            idx = index_to_epoch(self.full.index)
+            sel = idx < to_ts
+            return self.full[sel].iloc[-count:]
+
+        res = repair_gaps(T, IV, fetch=fetch)
+        self.assertEqual(res, {"requests": 2, "filled": 5, "remaining": 0})
+        self.assertEqual(calls, [(_epoch("2024-01-01 07:45"), 1), (_epoch("2024-01-01 02:15"), 4)])
+        self.assertEqual(len(load_ohlcv_frame(T, IV)), 40)
+        self.assertTrue(lookback_complete(T, IV, _epoch("2024-01-01 09:45"), 40))
+
+    def test_unfillable_gap_is_retried_up_to_limit(self):
+        store_ohlcv(T, IV, self.full.drop(self.full.index[10]))
+        empty_fetch = lambda *a: self.full.iloc[9:10]  # noqa: E731  거래소에도 없는 봉
+        with patch("trading_bot.ohlcv_gaps.GAP_REPAIR_MAX_ATTEMPTS", 2):
+            self.assertEqual(repair_gaps(T, IV, fetch=empty_fetch)["remaining"], 1)
+            self.assertEqual(repair_gaps(T, IV, fetch=empty_fetch)["remaining"], 0)
+            self.assertEqual(repair_gaps(T, IV, fetch=empty_fetch)["requests"], 0)
+        self.assertEqual(load_gaps(T, IV).iloc[0].attempts, 2)
+
+    def test_request_budget(self):
+        store_ohlcv(T, IV, self.full.iloc[::2])           # 빈 구간 19개
+        res = repair_gaps(T, IV, max_requests=3, fetch=lambda *a: None)
+        self.assertEqual(res["requests"], 3)
+
+
+class FetchBeforeTest(unittest.TestCase):
+    def test_to_is_utc_and_requests_are_spaced(self):
+        seen = []
+
+        def fake(ticker, interval, to, count):
+            seen.append((time.monotonic(), to, count))
+            return _candles("2024-01-01", 3)
+
+        with patch("trading_bot.data_fetcher.pyupbit.get_ohlcv", side_effect=fake), \
+                patch("trading_bot.data_fetcher.UPBIT_REQUEST_INTERVAL_SEC", 0.05):
+            fetch_ohlcv_before(T, IV, _epoch("2024-01-01 09:15"), 500)
+            fetch_ohlcv_before(T, IV, _epoch("2024-01-01 09:15"), 10)
+        self.assertEqual(seen[0][1:], ("2024-01-01 00:15:00", 200))
+        self.assertGreaterEqual(seen[1][0] - seen[0][0], 0.045)
+
+
+if __name__ == "__main__":
+    unittest.main()
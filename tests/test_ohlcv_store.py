@@ -0,0 +1,66 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+
+from trading_bot.db_helpers import init_db
+from trading_bot.ohlcv_store import load_ohlcv_frame, load_ohlcv_range, upsert_ohlcv
+
+
+def _candles(start: str, n: int) -> pd.DataFrame:
+    index = pd.date_range(start, periods=n, freq="15min")
+    base = pd.Series(range(n), index=index, dtype=float)
+    return pd.DataFrame({
+        "open": 100 + base,
+        "high": 101 + base,
+        "low": 99 + base,
+        "close": 100.5 + base,
+        "volume": 10 + base,
+    })
+
+
+class OhlcvStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_patch = patch("trading_bot.db_helpers.DB_FILE", Path(self.tmp.name) / "t.db")
+        self.db_patch.start()
+        init_db()
+
+    def tearDown(self):
+        self.db_patch.stop()
+        self.tmp.cleanup()
+
+    def test_upsert_overwrites_and_range_query(self):
+        df = _candles("2024-01-01 00:00", 10)
+        self.assertEqual(upsert_ohlcv("KRW-BTC", "minute15", df), 10)
+
+        revised = df.iloc[-1:].copy()
+        revised["close"] = 999.0
+        upsert_ohlcv("KRW-BTC", "minute15", revised)
+
+        arr = load_ohlcv_range("KRW-BTC", "minute15")
+        self.assertEqual(len(arr), 10)
+        self.assertEqual(arr["close"][-1], 999.0)
+        self.assertTrue((arr["ts"][1:] > arr["ts"][:-1]).all())
+
+        last3 = load_ohlcv_range("KRW-BTC", "minute15", limit=3)
+        self.assertListEqual(last3["ts"].tolist(), arr["ts"][-3:].tolist())
+
+        window = load_ohlcv_range("KRW-BTC", "minute15", start_ts=arr["ts"][2], end_ts=arr["ts"][4])
+        self.assertEqual(len(window), 3)
+        self.assertEqual(len(load_ohlcv_range("KRW-ETH", "minute15")), 0)
+
+    def test_frame_roundtrip_keeps_index(self):
+        df = _candles("2024-01-01 00:00", 5)
+        upsert_ohlcv("KRW-BTC", "minute15", df)
+        out = load_ohlcv_frame("KRW-BTC", "minute15")
+        self.assertTrue(out.index.equals(df.index))
+        pd.testing.assert_frame_equal(out, df, check_freq=False, check_index_type=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
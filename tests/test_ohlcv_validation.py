@@ -0,0 +1,127 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from trading_bot import data_fetcher
+from trading_bot.db_helpers import init_db
+from trading_bot.ohlcv_store import load_ohlcv_frame
+from trading_bot.ohlcv_validation import (
+    load_quarantine,
+    validate_batch,
+    validate_ohlcv,
+)
+
+
+def _candles(start: str, n: int) -> pd.DataFrame:
+    index = pd.date_range(start, periods=n, freq="15min")
+    base = pd.Series(range(n), index=index, dtype=float)
+    return pd.DataFrame({
+        "open": 100 + base,
+        "high": 101 + base,
+        "low": 99 + base,
+        "close": 100.5 + base,
+        "volume": 10 + base,
+    })
+
+
+class ValidateOhlcvTest(unittest.TestCase):
+    def test_clean_batch_passes_unchanged(self):
+        df = _candles("2024-01-01", 20)
+        res = validate_ohlcv(df, "minute15")
+        pd.testing.assert_frame_equal(res.clean, df)
+        self.assertTrue(res.rejected.empty)
+        self.assertEqual(res.missing_bars, 0)
+
+    def test_row_checks_and_reasons(self):
+        df = _candles("2024-01-01", 10)
+        cols = {c: df.columns.get_loc(c) for c in df.columns}
+        df.iloc[1, cols["high"]] = 99.0                 # high < close
+        df.iloc[2, cols["low"]] = 200.0                 # low > open
+        df.iloc[3, cols["volume"]] = -1.0
+        df.iloc[4, cols["close"]] = np.nan
+        df.iloc[5, cols["open"]] = 0.0
+        df.iloc[6, cols["volume"]] = 0.0                # 거래량 0은 정상
+        res = validate_ohlcv(df, "minute15")
+
+        reasons = dict(zip(res.rejected.index, res.rejected["reason"]))
+        self.assertEqual(reasons[df.index[1]], "high_below_body")
+        self.assertEqual(reasons[df.index[2]], "low_above_body")
+        self.assertEqual(reasons[df.index[3]], "negative_volume")
+        self.assertEqual(reasons[df.index[4]], "nan")
+        self.assertIn("non_positive_price", reasons[df.index[5]])
+        self.assertEqual(len(res.clean), 5)
+        self.assertIn(df.index[6], res.clean.index)
+        self.assertEqual(res.missing_bars, 5)           # 격리된 자리는 빠진 봉
+
+    def test_timestamps_sorted_deduplicated_and_on_grid(self):
+        df = _candles("2024-01-01", 6)
+        later = df.iloc[[2]].assign(close=101.0)        # 같은 시각의 보정된 봉
+        off = df.iloc[[5]].set_axis(pd.DatetimeIndex(["2024-01-01 01:20"]))
+        bad = df.iloc[[0]].set_axis(pd.Index(["not-a-date"]))
+        df = pd.concat([df.iloc[::-1], later, off, bad])
+        res = validate_ohlcv(df, "minute15")
+
+        self.assertTrue(res.clean.index.is_monotonic_increasing)
+        self.assertTrue(res.clean.index.is_unique)
+        self.assertEqual(res.clean.loc["2024-01-01 00:30", "close"], 101.0)
+        self.assertEqual(
+            sorted(res.rejected["reason"]), ["bad_timestamp", "duplicate_ts", "off_grid"]
+        )
+        self.assertTrue(np.isnan(res.rejected.set_index("reason").loc["bad_timestamp", "ts"]))
+
+    def test_missing_bars_and_grid_offset(self):
+        df = _candles("2024-01-01", 10).drop(pd.Timestamp("2024-01-01 01:00"))
+        self.assertEqual(validate_ohlcv(df, "minute15").missing_bars, 1)
+        # 일봉은 KST 09:00 시작 → 그 위치가 격자
+        days = _candles("2024-01-01", 5).set_axis(pd.date_range("2024-01-01 09:00", periods=5, freq="D"))
+        res = validate_ohlcv(days, "day")
+        self.assertEqual((len(res.clean), res.missing_bars), (5, 0))
+
+
+class QuarantineTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patches = [
+            patch("trading_bot.db_helpers.DB_FILE", Path(self.tmp.name) / "t.db"),
+            patch("trading_bot.data_io.CACHE_FILE", os.path.join(self.tmp.name, "cache.json")),
+        ]
+        for p in self.patches:
+            p.start()
+        init_db()
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        self.tmp.cleanup()
+
+    def test_bad_rows_quarantined_once_per_bar(self):
+        df = _candles("2024-01-01", 5)
+        df.iloc[2, df.columns.get_loc("volume")] = -5.0
+        self.assertEqual(len(validate_batch("KRW-BTC", "minute15", df)), 4)
+        validate_batch("KRW-BTC", "minute15", df)
+        q = load_quarantine("KRW-BTC")
+        self.assertEqual(len(q), 1)
+        row = q.iloc[0]
+        self.assertEqual((row.reason, row.seen, row.volume), ("negative_volume", 2, -5.0))
+        self.assertIsNone(validate_batch("KRW-BTC", "minute15", df.iloc[[2]]))
+
+    def test_fetch_stores_only_validated_rows(self):
+        df = _candles("2024-01-01", 8)
+        df.iloc[3, df.columns.get_loc("high")] = 50.0
+        with patch("trading_bot.data_fetcher.safe_ohlcv", return_value=df):
+            out = data_fetcher.fetch_data_15m(use_cache=False)
+        self.assertEqual(len(out), 7)
+        self.assertNotIn(df.index[3], out.index)
+        stored = load_ohlcv_frame(data_fetcher.TICKER, data_fetcher.INTERVAL)
+        self.assertEqual(len(stored), 7)
+        self.assertEqual(load_quarantine().iloc[0].reason, "high_below_body")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import json
+import re
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+import trading_bot.ai_helpers as ai_helpers
+from trading_bot.ohlcv_store import interval_seconds
+from trading_bot.pattern_prefetch import (
+    next_close,
+    prefetch_candle_patterns,
+    prefix_window,
+)
+
+
+def _candles(n, start="2024-01-01 00:00"):
+    idx = pd.date_range(start, periods=n, freq="15min")
+    close = 100 + np.arange(n, dtype=float)
+    return pd.DataFrame(
+        {"open": close - 1, "high": close + 1, "low": close - 2, "close": close,
+         "volume": np.full(n, 10.0)},
+        index=idx,
+    )
+
+
+class PatternPrefetchTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.prompts = []
+        self.patches = [
+            patch("trading_bot.ai_cache.AI_CACHE_FILE", Path(self.tmp.name) / "ai_cache.db"),
+            patch("trading_bot.ai_cache.REFLECTION_CACHE_FILE", Path(self.tmp.name) / "r.json"),
+            patch("trading_bot.ai_cache._ready", False),
+            patch("trading_bot.ai_metrics.AI_METRICS_FILE", Path(self.tmp.name) / "m.db"),
+            patch("trading_bot.ai_metrics._ready", False),
+            patch("trading_bot.ai_helpers.ai_enabled", return_value=True),
+            patch("trading_bot.ai_helpers.chat", side_effect=self._fake_chat),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        self.tmp.cleanup()
+
+    def _fake_chat(self, messages, max_tokens, **kwargs):
+        prompt = messages[0]["content"]
+        self.prompts.append(prompt)
+        # 프롬프트에 실린 봉 번호 중 마지막 봉까지 이어지는 패턴 하나를 돌려줌
+        bars = [int(i) for i in re.findall(r"^(\d+),", prompt, flags=re.M)]
+        return json.dumps({"patterns": [{"pattern": "bull flag", "start": bars[0], "end": bars[-1]}]})
+
+    def test_interval_helpers(self):
+        self.assertEqual(interval_seconds("minute15"), 900)
+        self.assertEqual(interval_seconds("minute60"), 3600)
+        self.assertEqual(interval_seconds("day"), 86400)
+        with self.assertRaises(ValueError):
+            interval_seconds("tick")
+        self.assertEqual(next_close(1800.0, 900), 2700.0)
+        self.assertEqual(next_close(1799.5, 900), 1800.0)
+
+    def test_prefetched_prefix_turns_decision_into_delta_call(self):
+        # 마감 전: 확정 100봉 + 진행 중 1봉
+        forming = _candles(101)
+        self.assertEqual(prefix_window(forming).index[-1], forming.index[-2])
+        self.assertTrue(prefetch_candle_patterns(forming))
+        self.assertEqual(len(self.prompts), 1)
+        self.assertIn(f"most recent {ai_helpers.PATTERN_PREFIX_BARS} 15-minute", self.prompts[0])
+
+        # 마감 후: 진행 중이던 봉이 확정 값으로 바뀌고 새 봉이 하나 생김
+        closed = _candles(102)
+        closed.iloc[-2, closed.columns.get_loc("close")] += 0.5
+        window = closed.iloc[-100:]
+        patterns = ai_helpers.ask_candle_patterns(window)
+        self.assertEqual(patterns[0]["end"], str(window.index[-1]))
+        self.assertEqual(len(self.prompts), 2)
+        delta_prompt = self.prompts[1]
+        self.assertIn("the last 2 are new since that analysis", delta_prompt)
+        self.assertIn(f"most recent {2 + ai_helpers.PATTERN_DELTA_CONTEXT_BARS} candles", delta_prompt)
+        self.assertLess(len(delta_prompt), len(self.prompts[0]) / 3)
+
+        # 같은 창은 이제 캐시 적중
+        self.assertEqual(ai_helpers.ask_candle_patterns(window), patterns)
+        self.assertEqual(len(self.prompts), 2)
+
+    def test_without_prefetch_falls_back_to_full_call(self):
+        df = _candles(100)
+        patterns = ai_helpers.ask_candle_patterns(df)
+        self.assertEqual(patterns, [{"pattern": "bull flag", "start": str(df.index[0]),
+                                     "end": str(df.index[-1])}])
+        self.assertEqual(len(self.prompts), 1)
+        self.assertIn("most recent 100 15-minute", self.prompts[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import trading_bot.pattern_store as pattern_store
+
+
+class PatternStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        tmp = Path(self.tmp.name)
+        self.json_file = tmp / "pattern_history.json"
+        self.patches = [
+            patch("trading_bot.db_helpers.DB_FILE", tmp / "t.db"),
+            patch("trading_bot.pattern_store.PATTERN_HISTORY_FILE", self.json_file),
+            patch("trading_bot.pattern_store._ready", False),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        self.tmp.cleanup()
+
+    def test_json_migrated_once_then_appends(self):
+        self.json_file.write_text(json.dumps([
+            {"timestamp": 1.0, "pattern": "cup and handle", "decision": "buy", "result": 1.5},
+            {"timestamp": 2.0, "pattern": "flag", "decision": "hold", "result": 0.0},
+        ]), encoding="utf-8")
+
+        pattern_store.append_pattern_entry(
+            {"timestamp": 3.0, "pattern": "flag", "decision": "sell", "result": None}
+        )
+        self.assertFalse(self.json_file.exists())
+        self.assertTrue(Path(str(self.json_file) + ".migrated").exists())
+
+        rows = pattern_store.load_pattern_entries()
+        self.assertEqual([r["timestamp"] for r in rows], [1.0, 2.0, 3.0])
+        flags = pattern_store.load_pattern_entries("flag")
+        self.assertEqual([r["decision"] for r in flags], ["hold", "sell"])
+        self.assertEqual([r["result"] for r in flags], [None, None])   # 0.0 자리표시는 미확정으로
+        self.assertEqual(pattern_store.get_pattern_stats("flag").count, 0)
+        self.assertEqual(pattern_store.get_pattern_stats("cup and handle").count, 1)
+        self.assertEqual(len(pattern_store.load_pattern_entries(limit=1)), 1)
+
+    def test_corrupt_json_is_backed_up(self):
+        self.json_file.write_text("{not json", encoding="utf-8")
+        self.assertEqual(pattern_store.load_pattern_entries(), [])
+        self.assertTrue(Path(str(self.json_file) + ".bak").exists())
+
+    def test_stats_index_tracks_inserts_and_backfill(self):
+        a = pattern_store.append_pattern_entry(
+            {"timestamp": 1.0, "pattern": "Bull_Flag Pattern", "decision": "buy", "result": 2.0}
+        )
+        b = pattern_store.append_pattern_entry(
+            {"timestamp": 2.0, "pattern": "bull flag", "decision": "buy", "result": None}
+        )
+        s = pattern_store.get_pattern_stats("bull-flag")
+        self.assertEqual((s.seen, s.count, s.wins), (2, 1, 1))
+
+        pattern_store.update_pattern_results([(b, -1.0), (a, 4.0)])
+        s = pattern_store.get_pattern_stats("BULL FLAG")
+        self.assertEqual((s.count, s.wins), (2, 1))
+        self.assertAlmostEqual(s.avg_return, 1.5)
+        self.assertAlmostEqual(s.std_return, 3.5355339, places=6)
+
+        before = pattern_store.get_pattern_stats("bull flag")
+        pattern_store.rebuild_pattern_stats()
+        self.assertEqual(pattern_store.get_pattern_stats("bull flag"), before)
+        self.assertEqual(pattern_store.get_pattern_stats("unknown").count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
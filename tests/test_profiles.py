@@ -0,0 +1,81 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from trading_bot.profiles import ProfileRunner, load_profiles, make_payload
+
+
+def _candles(n=120):
+    idx = pd.date_range("2024-01-01", periods=n, freq="15min")
+    close = 1.0e8 * (1 + 0.0005 * np.arange(n))
+    volume = np.full(n, 10.0)
+    volume[-1] = 200.0                                  # 볼륨 스파이크 + 상승 추세 → 보조 전략 A 매수
+    return pd.DataFrame(
+        {"open": close * 0.9995, "high": close * 1.001, "low": close * 0.999, "close": close,
+         "volume": volume},
+        index=idx,
+    )
+
+
+class LoadProfilesTest(unittest.TestCase):
+    def test_validation(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "p.json"
+            path.write_text(json.dumps({"a": {"SMA_WINDOW": "20"}, "b": {}}))
+            self.assertEqual(set(load_profiles(path)), {"a", "b"})
+            for bad in ({"a/b": {}}, {"a": {"NO_SUCH_KEY": 1}}, {"a": {"SMA_WINDOW": "x"}}, {}):
+                path.write_text(json.dumps(bad))
+                with self.assertRaises(ValueError):
+                    load_profiles(path)
+
+
+class ProfileRunnerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        root = Path(cls.tmp.name)
+        cls.runner = ProfileRunner(
+            {"base": {}, "fast": {"SMA_WINDOW": 5, "MIN_ORDER_KRW": "6000"}},
+            root=root / "db", log_dir=root / "logs",
+        )
+        cls.runner.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.runner.close()
+        cls.tmp.cleanup()
+
+    def test_shared_candle_fans_out_to_isolated_profiles(self):
+        df = _candles()
+        payload = make_payload(df, None, 50)
+        results = {r["profile"]: r for r in self.runner.run_candle(payload)}
+
+        self.assertEqual({r["decision"] for r in results.values()}, {"buy"})
+        # fast는 자기 SMA 창으로 지표를 다시 계산
+        self.assertAlmostEqual(results["base"]["sma"], payload.df_15m["sma"].iloc[-1])
+        self.assertAlmostEqual(results["fast"]["sma"], df["close"].iloc[-5:].mean())
+        # 가상 계좌는 프로필마다 따로 (MIN_ORDER_KRW 덮어쓰기 반영)
+        summary = self.runner.summary().set_index("profile")
+        start = summary["krw"] + summary["btc"] * df["close"].iloc[-1]
+        self.assertAlmostEqual(start["base"] - summary.loc["base", "krw"], 5000.0, places=3)
+        self.assertAlmostEqual(start["fast"] - summary.loc["fast", "krw"], 6000.0, places=3)
+        self.assertEqual(list(summary["fills"]), [1, 1])
+
+        # 같은 봉은 다시 처리하지 않음
+        again = self.runner.run_candle(payload)
+        self.assertEqual({r["decision"] for r in again}, {"skip"})
+
+        # 로그는 프로필별 파일로 분리
+        logs = Path(self.tmp.name) / "logs"
+        self.assertIn("[fast]", (logs / "fast.log").read_text(encoding="utf-8"))
+        self.assertNotIn("[fast]", (logs / "base.log").read_text(encoding="utf-8"))
+
+
+if __name__ == "__main__":
+    unittest.main()
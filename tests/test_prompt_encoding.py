@@ -0,0 +1,127 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import json
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from trading_bot.prompt_encoding import (
+    bars_to_patterns,
+    candles_json,
+    decode_candles,
+    encode_candles,
+    encode_table,
+    estimate_tokens,
+    patterns_to_bars,
+)
+
+
+def _market(n=100, seed=7):
+    """실제 KRW-BTC 15분봉과 비슷한 크기(1억대 가격, 1000원 호가, 수십 BTC 거래량)."""
+    rng = np.random.default_rng(seed)
+    close = np.round(1.43e8 * np.exp(np.cumsum(rng.normal(0, 0.002, n))), -3)
+    open_ = np.round(close * (1 + rng.normal(0, 0.001, n)), -3)
+    high = np.maximum(open_, close) + np.round(rng.uniform(0, 3e5, n), -3)
+    low = np.minimum(open_, close) - np.round(rng.uniform(0, 3e5, n), -3)
+    volume = np.round(rng.gamma(2.0, 15.0, n), 8)
+    idx = pd.date_range("2024-05-01 09:00", periods=n, freq="15min")
+    return pd.DataFrame(
+        {"open": open_, "high": high, "low": low, "close": close, "volume": volume}, index=idx
+    )
+
+
+def _oracle(df):
+    """결정적 '모델': 최저가 봉 → 최고가 봉 구간을 패턴 하나로 태깅."""
+    lo, hi = df["low"].idxmin(), df["high"].idxmax()
+    return {"pattern": "swing", "start": min(lo, hi), "end": max(lo, hi)}
+
+
+class PromptEncodingTest(unittest.TestCase):
+    def test_round_trip_within_fixed_precision(self):
+        df = _market()
+        enc = encode_candles(df)
+        back = decode_candles(enc.text)
+        self.assertTrue(back.index.equals(df.index))
+        prices = ["open", "high", "low", "close"]
+        ref = df["close"].iloc[0]
+        err_bp = ((back[prices] - df[prices]).abs() / ref * 1e4).to_numpy().max()
+        self.assertLessEqual(err_bp, 0.05 + 1e-9)       # 기준가 대비 0.1bp 반올림 오차 이내
+        vol_rel = (back["volume"] / df["volume"] - 1).abs().max()
+        self.assertLess(vol_rel, 5e-4)                  # 유효숫자 4자리
+        self.assertEqual((enc.start_index, enc.last_index, enc.rows), (0, 99, 100))
+
+    def test_missing_bars_skip_numbers(self):
+        df = _market(10).drop(index=_market(10).index[[3, 4]])
+        enc = encode_candles(df)
+        numbers = [int(ln.split(",")[0]) for ln in enc.text.splitlines()[2:]]
+        self.assertEqual(numbers, [0, 1, 2, 5, 6, 7, 8, 9])
+        self.assertTrue(decode_candles(enc.text).index.equals(df.index))
+        self.assertEqual(enc.bar_time(5), df.index[3])
+
+    def test_token_comparison_against_json_records(self):
+        df = _market()
+        compact = estimate_tokens(encode_candles(df).text)
+        legacy = estimate_tokens(candles_json(df))
+        self.assertLess(compact, legacy * 0.35)
+        self.assertLess(len(encode_candles(df).text), len(candles_json(df)) * 0.35)
+
+    def test_token_budget_keeps_most_recent_bars(self):
+        df = _market()
+        full = encode_candles(df)
+        enc = encode_candles(df, max_tokens=full.tokens // 3)
+        self.assertLessEqual(enc.tokens, full.tokens // 3)
+        self.assertLess(enc.rows, 100)
+        self.assertEqual(enc.last_index, 99)
+        self.assertEqual(enc.bar_time(enc.start_index), df.index[100 - enc.rows])
+        self.assertEqual(enc.bar_time(enc.last_index), df.index[-1])
+
+    def test_bar_numbers_map_back_to_timestamps(self):
+        df = _market()
+        enc = encode_candles(df.iloc[-8:], start_index=92)
+        known = [{"pattern": "flag", "start": str(df.index[80]), "end": str(df.index[95])}]
+        self.assertEqual(patterns_to_bars(known, enc), [{"pattern": "flag", "start": 80, "end": 95}])
+
+        got = bars_to_patterns(
+            [{"pattern": "flag", "start": 80, "end": 99}, {"pattern": "ghost", "start": 90, "end": 104}],
+            enc,
+        )
+        self.assertEqual(got, [{"pattern": "flag", "start": str(df.index[80]), "end": str(df.index[99])}])
+
+    def test_ab_same_answer_from_both_encodings(self):
+        # A: 기존 JSON 레코드를 읽은 결과 / B: 압축 인코딩을 읽고 봉 번호로 답한 결과
+        for seed in range(20):
+            df = _market(seed=seed)
+            rows = json.loads(candles_json(df))
+            legacy_df = pd.DataFrame(rows).set_index("datetime")
+            legacy_df.index = pd.to_datetime(legacy_df.index)
+            a = _oracle(legacy_df)
+
+            enc = encode_candles(df)
+            decoded = decode_candles(enc.text)
+            b = _oracle(decoded)
+            b_bars = {"pattern": "swing", "start": enc.bar_index(b["start"]),
+                      "end": enc.bar_index(b["end"])}
+            b_mapped = bars_to_patterns([b_bars], enc)[0]
+            self.assertEqual(str(a["start"]), b_mapped["start"], seed)
+            self.assertEqual(str(a["end"]), b_mapped["end"], seed)
+
+    def test_encode_table(self):
+        trades = pd.DataFrame({
+            "ts": ["05-01 09:15"], "decision": ["buy"], "percentage": [12.3456789],
+            "reason": ["hammer, volume"], "price": [143250000.0], "avg_price": [float("nan")],
+        })
+        self.assertEqual(
+            encode_table(trades),
+            "ts,decision,percentage,reason,price,avg_price\n"
+            "05-01 09:15,buy,12.3457,hammer volume,143250000,",
+        )
+
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens("hello world"), 2)
+        self.assertEqual(estimate_tokens("143250000"), 3)
+        self.assertEqual(estimate_tokens('{"open": 1}'), 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import sqlite3
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from trading_bot.config import REFLECTION_JOB_RETRY_SEC
+from trading_bot.db_helpers import init_db, log_trade
+from trading_bot.reflection_worker import drain, enqueue_reflection
+
+
+class ReflectionWorkerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = Path(self.tmp.name) / "t.db"
+        self.patches = [
+            patch("trading_bot.db_helpers.DB_FILE", self.db),
+            patch("trading_bot.ai_helpers.apply_to_env"),
+            patch("trading_bot.rollups.format_rollup_summary", return_value=""),
+        ]
+        for p in self.patches:
+            p.start()
+        init_db()
+        self.trade_id = log_trade(1000.0, "hold", 0.0, "", "No signal", 0.0, 1e6, 0.0, 100.0, "virtual", 0)
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        self.tmp.cleanup()
+
+    def _query(self, sql):
+        with sqlite3.connect(self.db) as conn:
+            return conn.execute(sql).fetchall()
+
+    def test_job_links_reflection_to_trade(self):
+        job = enqueue_reflection(self.trade_id, {"fear_idx": 30})
+        self.assertGreater(job, 0)
+        self.assertEqual(enqueue_reflection(self.trade_id), 0)  # 대기 작업이 있으면 중복 등록 안 함
+
+        with patch("trading_bot.ai_helpers.ask_ai_reflection",
+                   return_value=("keep risk small", {"RSI_OVERRIDE": "55"})) as ask:
+            self.assertEqual(drain(), 1)
+        self.assertEqual(ask.call_args.args[1], 30)
+
+        (rid, text), = self._query("SELECT id, reflection FROM reflection_log")
+        self.assertEqual(text, "keep risk small")
+        self.assertEqual(self._query("SELECT reflection_id FROM trade_log"), [(rid,)])
+        self.assertEqual(self._query("SELECT status, reflection_id FROM reflection_jobs"), [("done", rid)])
+
+    def test_failed_job_waits_for_backoff(self):
+        enqueue_reflection(self.trade_id)
+        with patch("trading_bot.ai_helpers.ask_ai_reflection", return_value=(None, {})):
+            self.assertEqual(drain(), 1)                # 같은 drain()에서 바로 다시 가져가지 않음
+        self.assertEqual(self._query("SELECT status, attempts FROM reflection_jobs"), [("pending", 1)])
+
+        with patch("trading_bot.ai_helpers.ask_ai_reflection",
+                   return_value=("recovered", {})) as ask:
+            self.assertEqual(drain(), 0)                # 대기 시간 전
+            ask.assert_not_called()
+            later = time.time() + REFLECTION_JOB_RETRY_SEC + 1
+            with patch("trading_bot.reflection_worker.time.time", return_value=later):
+                self.assertEqual(drain(), 1)
+        self.assertEqual(self._query("SELECT status, attempts FROM reflection_jobs"), [("done", 2)])
+
+    def test_failed_job_retried_until_max_attempts(self):
+        enqueue_reflection(self.trade_id)
+        with patch("trading_bot.ai_helpers.ask_ai_reflection", return_value=(None, {})), \
+                patch("trading_bot.reflection_worker.REFLECTION_JOB_RETRY_SEC", 0), \
+                patch("trading_bot.reflection_worker.REFLECTION_JOB_MAX_ATTEMPTS", 2):
+            self.assertEqual(drain(max_jobs=1), 1)
+            self.assertEqual(self._query("SELECT status, attempts FROM reflection_jobs"), [("pending", 1)])
+            self.assertEqual(drain(), 1)
+        self.assertEqual(self._query("SELECT status, attempts FROM reflection_jobs"), [("failed", 2)])
+        self.assertEqual(self._query("SELECT COUNT(*) FROM reflection_log"), [(0,)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from trading_bot.db_helpers import init_db, log_trade
+from trading_bot.analytics import trade_summary
+from trading_bot.rollups import (
+    format_rollup_summary,
+    get_daily_rollups,
+    get_hourly_rollups,
+    get_pattern_rollups,
+    rebuild_rollups,
+)
+
+
+class RollupsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_patch = patch("trading_bot.db_helpers.DB_FILE", Path(self.tmp.name) / "t.db")
+        self.db_patch.start()
+        init_db()
+        # (ts, decision, pct, pattern, btc, krw, avg_price, price)
+        trades = [
+            (1000, "buy", 5.0, "hammer", 1.0, 900.0, 100.0, 100.0),
+            (4000, "hold", 0.0, "", 1.0, 900.0, 100.0, 80.0),
+            (5000, "sell", 100.0, "take_profit", 0.0, 1010.0, 0.0, 110.0),
+            (90000, "buy", 5.0, "doji", 1.0, 810.0, 200.0, 200.0),
+            (90900, "sell", 100.0, "stop_loss", 0.0, 1000.0, 0.0, 190.0),
+        ]
+        for ts, dec, pct, pat, btc, krw, avg, price in trades:
+            log_trade(ts, dec, pct, pat, pat, btc, krw, avg, price, "virtual", 0)
+
+    def tearDown(self):
+        self.db_patch.stop()
+        self.tmp.cleanup()
+
+    def test_failed_rollup_keeps_trade_and_catches_up(self):
+        from trading_bot import db_helpers
+
+        real = db_helpers.apply_trade_rollups
+        calls = []
+
+        def flaky(*args):
+            calls.append(args[1])
+            if len(calls) == 1:
+                real(*args)                         # 일부 반영 후 실패 → 롤업 변경만 되돌림
+                raise sqlite3.OperationalError("disk I/O error")
+            real(*args)
+
+        with patch("trading_bot.db_helpers.apply_trade_rollups", side_effect=flaky):
+            failed = log_trade(91000, "buy", 5.0, "hammer", "hammer", 1.0, 810.0, 190.0, 190.0,
+                               "virtual", 0)
+            self.assertGreater(failed, 0)           # 체결 기록은 남음
+            self.assertEqual(get_hourly_rollups()["rows"].sum(), 5)
+            nxt = log_trade(92000, "hold", 0.0, "", "", 1.0, 810.0, 190.0, 195.0,
+                            "virtual", 0)
+        self.assertEqual(calls, [failed, failed, nxt])
+        self.assertEqual(get_hourly_rollups()["rows"].sum(), 7)
+        self.assertEqual(rebuild_rollups(verify_only=True), [])
+
+    def test_incremental_matches_rebuild(self):
+        self.assertEqual(rebuild_rollups(verify_only=True), [])
+        self.assertEqual(rebuild_rollups(), [])
+
+    def test_rollup_values(self):
+        daily = get_daily_rollups()
+        self.assertListEqual(daily["bucket"].tolist(), [0, 86400])
+        self.assertListEqual(daily["closed"].tolist(), [1, 1])
+        self.assertAlmostEqual(daily["pnl_sum"].sum(), trade_summary()[0]["pnl_sum"])
+        # 첫날 peak 1000 → 평가금액 980 (80원) 시점 낙폭 2%
+        self.assertAlmostEqual(daily["max_drawdown"][0], 2.0)
+        self.assertEqual(get_hourly_rollups()["rows"].sum(), 5)
+
+        pats = {r["pattern"]: r for r in get_pattern_rollups()}
+        self.assertEqual(pats["hammer"]["closed"], 1)
+        self.assertEqual(pats["hammer"]["wins"], 1)
+        self.assertEqual(pats["take_profit"]["signals"], 1)
+        self.assertEqual(pats["take_profit"]["closed"], 0)
+        self.assertIn("2 closed trades", format_rollup_summary())
+
+
+if __name__ == '__main__':
+    unittest.main()
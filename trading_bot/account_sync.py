@@ -7,9 +7,10 @@ import requests
 
 logger = logging.getLogger(__name__)
 
-def sync_account_upbit() -> tuple[float, float, float]:
+def sync_account_upbit(currency: str = "BTC") -> tuple[float, float, float]:
     """
-    Upbit 실계좌에서 잔고(krw, btc, avg_price)를 가져옴.
+    Upbit 실계좌에서 잔고(krw, 코인 수량, avg_price)를 가져옴.
+    - currency: 보유 수량·평균단가를 읽을 코인 (다중 마켓 모드는 마켓별로 지정, 기본 BTC)
     - 인증 오류 vs 네트워크 오류를 구분하여 로깅
     - 인증 오류 발생 시 (0.0, 0.0, 0.0) 리턴
     """
@@ -35,8 +36,8 @@ def sync_account_upbit() -> tuple[float, float, float]:
             return float(raw or 0.0)
 
         krw = _get_balance("KRW")
-        btc = _get_balance("BTC")
-        avg_price = _get_balance("BTC", "avg_buy_price")
+        btc = _get_balance(currency)
+        avg_price = _get_balance(currency, "avg_buy_price")
         return krw, btc, avg_price
 
     except requests.exceptions.RequestException as e:
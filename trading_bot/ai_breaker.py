@@ -0,0 +1,151 @@
+# trading_bot/ai_breaker.py
+
+import logging
+import sqlite3
+import time
+from typing import Optional
+
+from trading_bot.config import (
+    AI_BREAKER_COOLDOWN_SEC,
+    AI_BREAKER_FAILURES,
+    AI_BREAKER_SLO_SEC,
+    AI_CALL_TIMEOUT_SEC,
+    AI_METRICS_FILE,
+)
+from trading_bot.db_helpers import with_db
+
+logger = logging.getLogger(__name__)
+
+# ──────────────────────────────────────────────────────────────────────
+# AI 호출 종류별 회로 차단기 (ai_breaker 테이블, data/ai_metrics.db)
+# - closed: 정상. 연속 실패가 AI_BREAKER_FAILURES회에 이르면 open
+#   (실패 = 시간 초과·API 오류·지연 AI_BREAKER_SLO_SEC 초과, 사이클 예산 취소는 제외)
+# - open: AI_BREAKER_COOLDOWN_SEC 동안 요청을 보내지 않음 → chat()은 즉시 None(호출 측 기본값)
+# - half_open: 쿨다운 뒤 시험 호출 1건만 허용. 성공하면 closed, 실패하면 다시 open
+# - cron 실행마다 프로세스가 새로 뜨므로 상태는 DB에 두고 프로세스 간 공유
+# - 차단기 DB 오류는 호출을 막지 않음 (허용으로 처리)
+# ──────────────────────────────────────────────────────────────────────
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+# 시험 호출이 끝나지 않은 채 프로세스가 죽었을 때 다른 프로세스가 다시 시험할 수 있게 되는 시간
+PROBE_GRACE_SEC = 5.0
+
+_ready = False
+
+
+@with_db
+def _init_schema(conn: sqlite3.Connection) -> None:
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS ai_breaker (
+      kind TEXT PRIMARY KEY,
+      state TEXT NOT NULL,
+      failures INTEGER NOT NULL DEFAULT 0,
+      opened_at REAL NOT NULL DEFAULT 0,
+      probe_until REAL NOT NULL DEFAULT 0
+    )""")
+
+
+def _ensure_ready() -> None:
+    global _ready
+    if _ready:
+        return
+    AI_METRICS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    _init_schema(db_file=AI_METRICS_FILE)
+    _ready = True
+
+
+@with_db
+def _allow(conn: sqlite3.Connection, kind: str, now: float) -> bool:
+    conn.execute("BEGIN IMMEDIATE")
+    row = conn.execute(
+        "SELECT state, opened_at, probe_until FROM ai_breaker WHERE kind=?", (kind,)
+    ).fetchone()
+    if row is None or row["state"] == CLOSED:
+        return True
+    if row["state"] == OPEN and now - row["opened_at"] < AI_BREAKER_COOLDOWN_SEC:
+        return False
+    if row["state"] == HALF_OPEN and now < row["probe_until"]:
+        return False
+    # 쿨다운 종료(또는 시험 호출 중단) → 이 호출이 시험 호출
+    conn.execute(
+        "UPDATE ai_breaker SET state=?, probe_until=? WHERE kind=?",
+        (HALF_OPEN, now + AI_CALL_TIMEOUT_SEC + PROBE_GRACE_SEC, kind),
+    )
+    logger.info(f"ai_breaker: {kind} 쿨다운 종료 → 시험 호출")
+    return True
+
+
+@with_db
+def _record(conn: sqlite3.Connection, kind: str, failed: bool, now: float) -> None:
+    conn.execute("BEGIN IMMEDIATE")
+    row = conn.execute(
+        "SELECT state, failures FROM ai_breaker WHERE kind=?", (kind,)
+    ).fetchone()
+    state = row["state"] if row else CLOSED
+    failures = row["failures"] if row else 0
+
+    if not failed:
+        if state != CLOSED or failures:
+            if state != CLOSED:
+                logger.info(f"ai_breaker: {kind} 시험 호출 성공 → 닫힘")
+            conn.execute(
+                "UPDATE ai_breaker SET state=?, failures=0, probe_until=0 WHERE kind=?",
+                (CLOSED, kind),
+            )
+        return
+
+    failures += 1
+    if state == HALF_OPEN or failures >= AI_BREAKER_FAILURES:
+        logger.warning(
+            f"ai_breaker: {kind} 연속 실패 {failures}회 → 열림 ({AI_BREAKER_COOLDOWN_SEC:.0f}초간 기본값)"
+        )
+        state, opened_at = OPEN, now
+    else:
+        opened_at = 0.0
+    conn.execute(
+        """INSERT INTO ai_breaker (kind, state, failures, opened_at, probe_until)
+           VALUES (?, ?, ?, ?, 0)
+           ON CONFLICT(kind) DO UPDATE SET
+             state=excluded.state, failures=excluded.failures,
+             opened_at=CASE WHEN excluded.state='open' THEN excluded.opened_at
+                            ELSE ai_breaker.opened_at END,
+             probe_until=0""",
+        (kind, state, failures, opened_at),
+    )
+
+
+def allow(kind: str) -> bool:
+    """kind 호출을 보내도 되는지 (open이면 False, 쿨다운이 끝났으면 시험 호출 1건 허용)."""
+    try:
+        _ensure_ready()
+        return _allow(kind, time.time(), db_file=AI_METRICS_FILE)
+    except Exception as e:
+        logger.warning(f"allow: 회로 차단기 조회 실패 → 허용: {e}")
+        return True
+
+
+def record(kind: str, ok: bool, seconds: float) -> None:
+    """요청 결과 반영. ok여도 지연이 AI_BREAKER_SLO_SEC를 넘으면 실패로 셈."""
+    try:
+        _ensure_ready()
+        _record(kind, (not ok) or seconds > AI_BREAKER_SLO_SEC, time.time(),
+                db_file=AI_METRICS_FILE)
+    except Exception as e:
+        logger.warning(f"record: 회로 차단기 갱신 실패: {e}")
+
+
+@with_db
+def _state(conn: sqlite3.Connection, kind: str) -> Optional[str]:
+    row = conn.execute("SELECT state FROM ai_breaker WHERE kind=?", (kind,)).fetchone()
+    return row["state"] if row else None
+
+
+def breaker_state(kind: str) -> str:
+    """현재 상태 (closed/open/half_open, 기록 없으면 closed)."""
+    try:
+        _ensure_ready()
+        return _state(kind, db_file=AI_METRICS_FILE) or CLOSED
+    except Exception as e:
+        logger.warning(f"breaker_state: 예외 발생: {e}")
+        return CLOSED
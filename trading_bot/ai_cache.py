@@ -0,0 +1,516 @@
+# trading_bot/ai_cache.py
+
+import argparse
+import atexit
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from trading_bot.ai_client import budget_remaining
+from trading_bot.ai_metrics import note_cache
+from trading_bot.config import (
+    AI_CACHE_FILE,
+    AI_CACHE_FLUSH_SEC,
+    AI_CACHE_MAX_BYTES,
+    AI_CACHE_MAX_ENTRIES,
+    AI_CACHE_TTL,
+    AI_SINGLE_FLIGHT_LEASE_SEC,
+    AI_SINGLE_FLIGHT_WAIT_SEC,
+    REFLECTION_CACHE_FILE,
+)
+from trading_bot.db_helpers import with_db
+
+logger = logging.getLogger(__name__)
+
+# ──────────────────────────────────────────────────────────────────────
+# AI 응답 공용 캐시 (SQLite, 프로세스 간 공유)
+# - 모든 ask_* 헬퍼가 (kind, key 구성요소)로 조회/저장
+# - 종류별 TTL + 전체 항목 수/바이트 상한, 초과 시 last_access 기준 LRU 삭제
+#   (항목 수·바이트 합계는 트리거가 ai_cache_totals 한 행에 유지 → 저장 때 전체 스캔 없음)
+# - 적중/미스/만료/삭제 횟수를 ai_cache_stats에 누적
+# - 조회는 읽기만: 적중 시 last_access·적중/미스 통계는 메모리에 모았다가
+#   다음 저장·정리 때 또는 AI_CACHE_FLUSH_SEC마다 한 트랜잭션으로 기록
+# - 캐시 오류는 AI 호출을 막지 않도록 경고만 남기고 미스로 처리
+# - single_flight(): 캐시 미스인 같은 키의 요청이 동시에 들어오면 한 번만 실행하고 결과 공유
+#   (프로세스 내: 스레드 Event / 프로세스 간: ai_inflight 리스 행 + 캐시)
+# ──────────────────────────────────────────────────────────────────────
+
+DEFAULT_TTL_SEC = 300
+
+# 프로세스당 한 번만 스키마 확인
+_ready = False
+
+
+@with_db
+def _init_schema(conn: sqlite3.Connection) -> None:
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript("""
+    CREATE TABLE IF NOT EXISTS ai_cache (
+      key TEXT PRIMARY KEY,
+      kind TEXT NOT NULL,
+      value TEXT NOT NULL,
+      size INTEGER NOT NULL,
+      created REAL NOT NULL,
+      expires REAL NOT NULL,
+      last_access REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_ai_cache_lru ON ai_cache(last_access);
+    CREATE INDEX IF NOT EXISTS idx_ai_cache_expires ON ai_cache(expires);
+
+    CREATE TABLE IF NOT EXISTS ai_inflight (
+      key TEXT PRIMARY KEY,
+      owner TEXT NOT NULL,
+      expires REAL NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS ai_cache_totals (
+      id INTEGER PRIMARY KEY CHECK (id = 1),
+      entries INTEGER NOT NULL,
+      bytes INTEGER NOT NULL
+    );
+    CREATE TRIGGER IF NOT EXISTS trg_ai_cache_ins AFTER INSERT ON ai_cache BEGIN
+      UPDATE ai_cache_totals SET entries=entries+1, bytes=bytes+new.size WHERE id=1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_ai_cache_del AFTER DELETE ON ai_cache BEGIN
+      UPDATE ai_cache_totals SET entries=entries-1, bytes=bytes-old.size WHERE id=1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_ai_cache_size AFTER UPDATE OF size ON ai_cache BEGIN
+      UPDATE ai_cache_totals SET bytes=bytes+new.size-old.size WHERE id=1;
+    END;
+    -- 기존 DB: 합계 행이 없을 때 한 번만 집계
+    INSERT OR IGNORE INTO ai_cache_totals (id, entries, bytes)
+      SELECT 1, COUNT(*), COALESCE(SUM(size), 0) FROM ai_cache;
+
+    CREATE TABLE IF NOT EXISTS ai_cache_stats (
+      kind TEXT PRIMARY KEY,
+      hits INTEGER NOT NULL DEFAULT 0,
+      misses INTEGER NOT NULL DEFAULT 0,
+      expirations INTEGER NOT NULL DEFAULT 0,
+      evictions INTEGER NOT NULL DEFAULT 0
+    );
+    """)
+
+
+def _retire_legacy_reflection_cache() -> None:
+    """
+    (구) reflection_cache.json 정리.
+    - 예전 키는 수십 KB JSON 원문이라 지문 기반 키로 변환할 수 없으므로 옮기지 않고 .bak로 보관
+      (TTL이 11시간이므로 잃는 것은 최대 반성문 호출 1회)
+    """
+    if not REFLECTION_CACHE_FILE.exists():
+        return
+    bak_path = str(REFLECTION_CACHE_FILE) + ".bak"
+    os.replace(REFLECTION_CACHE_FILE, bak_path)
+    logger.info(f"_retire_legacy_reflection_cache: {REFLECTION_CACHE_FILE.name} → {bak_path}")
+
+
+def _ensure_ready() -> None:
+    """첫 접근 시 스키마 생성, 구 캐시 파일 정리, 만료 항목 삭제를 프로세스당 한 번 수행."""
+    global _ready
+    if _ready:
+        return
+    AI_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    _init_schema(db_file=AI_CACHE_FILE)
+    with _pending_lock:
+        _pending_touch.clear()
+        _pending_stats.clear()
+    _ready = True
+    try:
+        _retire_legacy_reflection_cache()
+    except OSError as e:
+        logger.warning(f"_retire_legacy_reflection_cache 실패: {e}")
+    _purge(time.time(), db_file=AI_CACHE_FILE)
+
+
+def make_key(kind: str, parts: Iterable[Any]) -> str:
+    """(kind, 구성요소)를 고정 길이 캐시 키로 변환 ("kind:" + blake2b 16바이트 hex)."""
+    raw = json.dumps(list(parts), default=str, separators=(",", ":"))
+    return f"{kind}:{hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()}"
+
+
+# 아직 기록하지 않은 조회 결과: {key: last_access}, {(kind, 통계 열): 횟수}
+_pending_touch: Dict[str, float] = {}
+_pending_stats: Dict[Tuple[str, str], int] = {}
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def _note(kind: str, column: Optional[str], key: Optional[str] = None, now: float = 0.0) -> None:
+    with _pending_lock:
+        if column is not None:
+            _pending_stats[(kind, column)] = _pending_stats.get((kind, column), 0) + 1
+        if key is not None:
+            _pending_touch[key] = max(now, _pending_touch.get(key, now))
+
+
+def _flush_pending(conn: sqlite3.Connection) -> None:
+    """모아 둔 last_access 갱신·통계를 현재 트랜잭션에 기록."""
+    global _last_flush
+    with _pending_lock:
+        touches = list(_pending_touch.items())
+        stats = list(_pending_stats.items())
+        _pending_touch.clear()
+        _pending_stats.clear()
+        _last_flush = time.monotonic()
+    # 다른 프로세스가 그사이 더 최근에 쓴 시각은 되돌리지 않음
+    conn.executemany(
+        "UPDATE ai_cache SET last_access=? WHERE key=? AND last_access<?",
+        [(t, k, t) for k, t in touches],
+    )
+    for (kind, column), n in stats:
+        _bump(conn, kind, column, n)
+
+
+@with_db
+def _flush(conn: sqlite3.Connection) -> None:
+    _flush_pending(conn)
+
+
+def flush_pending() -> None:
+    """모아 둔 적중 기록을 즉시 DB에 반영 (프로세스 종료 시 자동 호출)."""
+    with _pending_lock:
+        empty = not _pending_touch and not _pending_stats
+    if empty or not _ready:
+        return
+    try:
+        _flush(db_file=AI_CACHE_FILE)
+    except Exception as e:
+        logger.warning(f"flush_pending: AI 캐시 기록 실패: {e}")
+
+
+atexit.register(flush_pending)
+
+
+def _bump(conn: sqlite3.Connection, kind: str, column: str, n: int = 1) -> None:
+    if n <= 0:
+        return
+    conn.execute(
+        f"""INSERT INTO ai_cache_stats (kind, {column}) VALUES (?, ?)
+            ON CONFLICT(kind) DO UPDATE SET {column}={column}+excluded.{column}""",
+        (kind, n),
+    )
+
+
+@with_db
+def _get(conn: sqlite3.Connection, kind: str, key: str, now: float,
+         count: bool = True) -> Optional[str]:
+    row = conn.execute("SELECT value, expires FROM ai_cache WHERE key=?", (key,)).fetchone()
+    if row is None:
+        if count:
+            _note(kind, "misses")
+        return None
+    if row["expires"] <= now:
+        conn.execute("DELETE FROM ai_cache WHERE key=?", (key,))
+        _bump(conn, kind, "expirations")
+        if count:
+            _note(kind, "misses")
+        return None
+    _note(kind, "hits" if count else None, key, now)
+    return row["value"]
+
+
+def _evict(conn: sqlite3.Connection, now: float) -> None:
+    """만료 항목을 지우고, 상한을 넘으면 오래 안 쓰인 항목부터 삭제."""
+    for r in conn.execute(
+        "SELECT kind, COUNT(*) AS n FROM ai_cache WHERE expires <= ? GROUP BY kind", (now,)
+    ).fetchall():
+        _bump(conn, r["kind"], "expirations", r["n"])
+    conn.execute("DELETE FROM ai_cache WHERE expires <= ?", (now,))
+
+    count, total = conn.execute("SELECT entries, bytes FROM ai_cache_totals WHERE id=1").fetchone()
+    if count <= AI_CACHE_MAX_ENTRIES and total <= AI_CACHE_MAX_BYTES:
+        return
+
+    victims = []
+    evicted: Dict[str, int] = {}
+    # 인덱스 순서로 필요한 만큼만 읽음
+    for r in conn.execute("SELECT key, kind, size FROM ai_cache ORDER BY last_access ASC"):
+        if count <= AI_CACHE_MAX_ENTRIES and total <= AI_CACHE_MAX_BYTES:
+            break
+        victims.append((r["key"],))
+        evicted[r["kind"]] = evicted.get(r["kind"], 0) + 1
+        count -= 1
+        total -= r["size"]
+    conn.executemany("DELETE FROM ai_cache WHERE key=?", victims)
+    for kind, n in evicted.items():
+        _bump(conn, kind, "evictions", n)
+
+
+@with_db
+def _set(conn: sqlite3.Connection, kind: str, key: str, value: str,
+         ttl: float, now: float) -> None:
+    conn.execute(
+        """INSERT INTO ai_cache (key, kind, value, size, created, expires, last_access)
+           VALUES (?, ?, ?, ?, ?, ?, ?)
+           ON CONFLICT(key) DO UPDATE SET
+             value=excluded.value, size=excluded.size, created=excluded.created,
+             expires=excluded.expires, last_access=excluded.last_access""",
+        (key, kind, value, len(value.encode("utf-8")), now, now + ttl, now),
+    )
+    _flush_pending(conn)
+    _evict(conn, now)
+
+
+def cache_get(kind: str, *parts: Any, count: bool = True) -> Any:
+    """
+    캐시된 AI 응답을 반환 (없거나 만료 시 None).
+    - parts: 캐시 키를 이루는 값들 (kind와 함께 make_key로 해시)
+    - count=False: 적중/미스 통계에 넣지 않음 (single_flight의 재확인용)
+    """
+    try:
+        _ensure_ready()
+        raw = _get(kind, make_key(kind, parts), time.time(), count, db_file=AI_CACHE_FILE)
+        if time.monotonic() - _last_flush >= AI_CACHE_FLUSH_SEC:
+            _flush(db_file=AI_CACHE_FILE)
+        return json.loads(raw) if raw is not None else None
+    except Exception as e:
+        logger.warning(f"cache_get: AI 캐시 조회 실패 → 미스로 처리: {e}")
+        return None
+
+
+def cache_set(kind: str, value: Any, *parts: Any, ttl: Optional[float] = None) -> None:
+    """
+    AI 응답을 캐시에 저장 (JSON 직렬화 가능한 값, None은 저장하지 않음).
+    - ttl 생략 시 AI_CACHE_TTL[kind] (없으면 DEFAULT_TTL_SEC)
+    """
+    if value is None:
+        return
+    if ttl is None:
+        ttl = AI_CACHE_TTL.get(kind, DEFAULT_TTL_SEC)
+    try:
+        _ensure_ready()
+        _set(kind, make_key(kind, parts), json.dumps(value), float(ttl), time.time(),
+             db_file=AI_CACHE_FILE)
+    except Exception as e:
+        logger.warning(f"cache_set: AI 캐시 저장 실패: {e}")
+
+
+# ──────────────────────────────────────────────────────────────────────
+# single-flight
+# - 겹친 cron 실행, 같은 최근 창을 보는 여러 실행기가 같은 요청을 동시에 보내지 않도록
+#   캐시 키마다 실행자 하나만 compute()를 호출하고 나머지는 그 결과를 기다림
+# - 리스는 AI_SINGLE_FLIGHT_LEASE_SEC 뒤 만료되므로 실행 중 프로세스가 죽어도 영구히 막히지 않음
+# ──────────────────────────────────────────────────────────────────────
+
+SINGLE_FLIGHT_POLL_SEC = 0.2
+_OWNER_TOKEN = uuid.uuid4().hex[:8]
+
+
+def _owner() -> str:
+    """리스 소유자 식별자 (fork된 자식도 pid로 구분)."""
+    return f"{os.getpid()}-{_OWNER_TOKEN}"
+
+
+class _Flight:
+    """프로세스 내에서 진행 중인 요청 1건 (대기자는 done을 기다림)."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+_flights: Dict[str, _Flight] = {}
+_flights_lock = threading.Lock()
+
+
+@with_db
+def _acquire_lease(conn: sqlite3.Connection, key: str, owner: str,
+                   now: float, ttl: float) -> bool:
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute("DELETE FROM ai_inflight WHERE key=? AND expires<=?", (key, now))
+    cur = conn.execute(
+        "INSERT OR IGNORE INTO ai_inflight (key, owner, expires) VALUES (?, ?, ?)",
+        (key, owner, now + ttl),
+    )
+    return cur.rowcount == 1
+
+
+@with_db
+def _lease_held(conn: sqlite3.Connection, key: str, now: float) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM ai_inflight WHERE key=? AND expires>?", (key, now)
+    ).fetchone()
+    return row is not None
+
+
+@with_db
+def _release_lease(conn: sqlite3.Connection, key: str, owner: str) -> None:
+    conn.execute("DELETE FROM ai_inflight WHERE key=? AND owner=?", (key, owner))
+
+
+def _wait_limit() -> float:
+    """대기 상한: AI_SINGLE_FLIGHT_WAIT_SEC와 사이클 남은 예산 중 작은 값."""
+    remaining = budget_remaining()
+    if remaining is None:
+        return AI_SINGLE_FLIGHT_WAIT_SEC
+    return min(AI_SINGLE_FLIGHT_WAIT_SEC, remaining)
+
+
+def _run_with_lease(kind: str, key: str, parts: tuple,
+                    compute: Callable[[], Any], default: Any) -> Any:
+    """프로세스 간 리스를 잡고 compute() 실행. 다른 프로세스가 실행 중이면 끝날 때까지 기다렸다가 캐시에서 읽음."""
+    deadline = time.monotonic() + _wait_limit()
+    while True:
+        try:
+            acquired = _acquire_lease(key, _owner(), time.time(), AI_SINGLE_FLIGHT_LEASE_SEC,
+                                      db_file=AI_CACHE_FILE)
+        except Exception as e:
+            logger.warning(f"single_flight: 리스 획득 실패 → 단독 실행: {e}")
+            note_cache("miss")
+            return compute()
+        if acquired:
+            break
+
+        logger.info(f"single_flight: {kind} 다른 프로세스에서 실행 중 → 결과 대기")
+        while True:
+            try:
+                held = _lease_held(key, time.time(), db_file=AI_CACHE_FILE)
+            except Exception as e:
+                logger.warning(f"single_flight: 리스 조회 실패 → 단독 실행: {e}")
+                note_cache("miss")
+                return compute()
+            if not held:
+                break
+            if time.monotonic() >= deadline:
+                logger.warning(f"single_flight: {kind} 대기 시간 초과 → 기본값")
+                note_cache("wait_timeout")
+                return default
+            time.sleep(SINGLE_FLIGHT_POLL_SEC)
+        cached = cache_get(kind, *parts, count=False)
+        if cached is not None:
+            note_cache("shared")
+            return cached
+        # 실행하던 프로세스가 결과를 남기지 못함(시간 초과·실패) → 직접 리스를 잡고 실행
+
+    try:
+        # 리스를 잡기 직전에 다른 프로세스가 끝냈을 수 있음
+        cached = cache_get(kind, *parts, count=False)
+        if cached is not None:
+            note_cache("shared")
+            return cached
+        note_cache("miss")
+        return compute()
+    finally:
+        try:
+            _release_lease(key, _owner(), db_file=AI_CACHE_FILE)
+        except Exception as e:
+            logger.warning(f"single_flight: 리스 해제 실패 (만료 후 자동 해제): {e}")
+
+
+def single_flight(kind: str, compute: Callable[[], Any], *parts: Any,
+                  default: Any = None) -> Any:
+    """
+    캐시를 먼저 보고, 미스면 같은 키의 compute()를 한 번만 실행해 결과를 공유.
+    - 같은 프로세스의 동시 호출자는 실행 중인 스레드의 반환값(예외 포함)을 그대로 받음
+    - 다른 프로세스는 리스가 풀릴 때까지 기다린 뒤 캐시에서 결과를 읽음
+      → compute()는 공유할 결과를 직접 cache_set 해야 함
+    - 대기 시간이 상한(_wait_limit)을 넘으면 default 반환
+    """
+    cached = cache_get(kind, *parts)
+    if cached is not None:
+        logger.info(f"{kind} cache hit")
+        note_cache("hit")
+        return cached
+
+    key = make_key(kind, parts)
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        logger.info(f"single_flight: {kind} 같은 요청 진행 중 → 결과 공유")
+        if not flight.done.wait(max(0.0, _wait_limit())):
+            logger.warning(f"single_flight: {kind} 대기 시간 초과 → 기본값")
+            note_cache("wait_timeout")
+            return default
+        note_cache("shared")
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    try:
+        flight.value = _run_with_lease(kind, key, parts, compute, default)
+        return flight.value
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+
+@with_db
+def _stats(conn: sqlite3.Connection) -> Dict[str, Dict[str, int]]:
+    _flush_pending(conn)
+    out: Dict[str, Dict[str, int]] = {}
+    for r in conn.execute("SELECT kind, hits, misses, expirations, evictions FROM ai_cache_stats"):
+        out[r["kind"]] = {k: r[k] for k in ("hits", "misses", "expirations", "evictions")}
+    for r in conn.execute(
+        "SELECT kind, COUNT(*) AS entries, COALESCE(SUM(size), 0) AS bytes FROM ai_cache GROUP BY kind"
+    ):
+        d = out.setdefault(r["kind"], {"hits": 0, "misses": 0, "expirations": 0, "evictions": 0})
+        d["entries"] = r["entries"]
+        d["bytes"] = r["bytes"]
+    for d in out.values():
+        d.setdefault("entries", 0)
+        d.setdefault("bytes", 0)
+    return out
+
+
+def get_cache_stats() -> Dict[str, Dict[str, int]]:
+    """종류별 {hits, misses, expirations, evictions, entries, bytes} 반환."""
+    try:
+        _ensure_ready()
+        return _stats(db_file=AI_CACHE_FILE)
+    except Exception as e:
+        logger.warning(f"get_cache_stats: 예외 발생: {e}")
+        return {}
+
+
+@with_db
+def _purge(conn: sqlite3.Connection, now: float) -> None:
+    _flush_pending(conn)
+    _evict(conn, now)
+
+
+def purge_expired() -> None:
+    """만료 항목 삭제 및 상한 적용 (주기적 정리용)."""
+    try:
+        _ensure_ready()
+        _purge(time.time(), db_file=AI_CACHE_FILE)
+    except Exception as e:
+        logger.warning(f"purge_expired: 예외 발생: {e}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AI 응답 캐시 통계/정리")
+    parser.add_argument("--purge", action="store_true", help="만료 항목 삭제 후 통계 출력")
+    args = parser.parse_args()
+
+    if args.purge:
+        purge_expired()
+    stats = get_cache_stats()
+    if not stats:
+        print("AI 캐시 비어 있음")
+    for kind, d in sorted(stats.items()):
+        lookups = d["hits"] + d["misses"]
+        rate = d["hits"] / lookups if lookups else 0.0
+        print(
+            f"{kind}: entries={d['entries']} bytes={d['bytes']} hits={d['hits']} "
+            f"misses={d['misses']} hit_rate={rate:.1%} expired={d['expirations']} "
+            f"evicted={d['evictions']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+# trading_bot/ai_client.py
+
+import asyncio
+import concurrent.futures
+import contextvars
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+from openai import AsyncOpenAI
+
+from trading_bot import ai_breaker
+from trading_bot.ai_metrics import current_kind, note_request, note_status, request_latency_p95
+from trading_bot.config import (
+    AI_CALL_TIMEOUT_SEC,
+    AI_CYCLE_BUDGET_SEC,
+    AI_HEDGE,
+    AI_HEDGE_MIN_SEC,
+    AI_MAX_CONCURRENCY,
+    AI_MODEL,
+)
+
+logger = logging.getLogger(__name__)
+
+# ──────────────────────────────────────────────────────────────────────
+# 비동기 OpenAI 클라이언트 계층
+# - AsyncOpenAI는 백그라운드 스레드의 전용 이벤트 루프에서 실행
+# - 동기 코드(ask_* 헬퍼)는 chat()으로 호출하고 결과를 기다림
+# - cycle_budget(): 사이클 전체 AI 시간 예산. 호출마다 남은 예산만큼만 기다리고,
+#   예산 소진/블록 종료 시 진행 중인 요청을 취소 → chat()은 None 반환
+# - submit(): 서로 독립적인 ask_* 호출(노이즈 판정, 패턴 태깅 등)을 동시에 실행
+# - OPENAI_BASE_URL: 로컬 스텁(ai_stub_server) 등 OpenAI 호환 엔드포인트로 교체
+#   (키 없이 지정하면 'stub' 키로 AI 분기 활성화)
+# - ask_* 호출 안의 요청은 종류별 회로 차단기(ai_breaker)를 거침: 열려 있으면 요청 없이 None
+# - AI_HEDGE=true면 첫 요청이 그 종류의 최근 p95 지연을 넘을 때 같은 요청을 한 번 더 보내 먼저 온 응답 사용
+# ──────────────────────────────────────────────────────────────────────
+
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "").strip() or None
+OPENAI_KEY = os.getenv("OPENAI_API_KEY", "") or ("stub" if OPENAI_BASE_URL else "")
+if OPENAI_BASE_URL:
+    logger.info(f"OpenAI base URL override: {OPENAI_BASE_URL}")
+if not OPENAI_KEY:
+    logger.warning("OPENAI_API_KEY not set; AI features disabled (returns 'hold')")
+
+_client: Optional[AsyncOpenAI] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_init_lock = threading.Lock()
+
+
+class CycleBudget:
+    """한 사이클의 AI 호출 마감 시각과 진행 중인 요청 목록."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.deadline = time.monotonic() + seconds
+        self.closed = False
+        self._pending: Set[concurrent.futures.Future] = set()
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+    def track(self, fut: concurrent.futures.Future) -> bool:
+        with self._lock:
+            if self.closed:
+                return False
+            self._pending.add(fut)
+            return True
+
+    def untrack(self, fut: concurrent.futures.Future) -> None:
+        with self._lock:
+            self._pending.discard(fut)
+
+    def cancel_all(self) -> int:
+        """진행 중인 요청을 모두 취소하고 이후 호출을 막는다. 반환값: 취소한 요청 수."""
+        with self._lock:
+            self.closed = True
+            pending, self._pending = self._pending, set()
+        return sum(1 for f in pending if f.cancel())
+
+
+_budget: contextvars.ContextVar[Optional[CycleBudget]] = contextvars.ContextVar(
+    "ai_cycle_budget", default=None
+)
+
+
+@contextmanager
+def cycle_budget(seconds: Optional[float] = None) -> Iterator[CycleBudget]:
+    """
+    with 블록 안의 모든 AI 호출(submit으로 띄운 호출 포함)에 총 시간 예산을 적용.
+    - 블록을 빠져나갈 때 끝나지 않은 요청은 취소
+    """
+    budget = CycleBudget(AI_CYCLE_BUDGET_SEC if seconds is None else seconds)
+    token = _budget.set(budget)
+    try:
+        yield budget
+    finally:
+        cancelled = budget.cancel_all()
+        if cancelled:
+            logger.info(f"cycle_budget: 사이클 종료로 AI 요청 {cancelled}건 취소")
+        _budget.reset(token)
+
+
+def budget_remaining() -> Optional[float]:
+    """현재 cycle_budget의 남은 시간(초). 예산 블록 밖이면 None."""
+    budget = _budget.get()
+    return None if budget is None else max(0.0, budget.remaining())
+
+
+def ai_enabled() -> bool:
+    return bool(OPENAI_KEY)
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _init_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="ai-client-loop", daemon=True).start()
+        return _loop
+
+
+def _get_client() -> Optional[AsyncOpenAI]:
+    global _client
+    if not OPENAI_KEY:
+        return None
+    with _init_lock:
+        if _client is None:
+            _client = AsyncOpenAI(api_key=OPENAI_KEY, base_url=OPENAI_BASE_URL, max_retries=0)
+        return _client
+
+
+def _hedge_after(kind: Optional[str], limit: float) -> Optional[float]:
+    """헤지 요청을 보낼 시점(초). 헤지 꺼짐·종류 모름·제한 시간 안에 못 보내면 None."""
+    if not AI_HEDGE or kind is None:
+        return None
+    after = max(AI_HEDGE_MIN_SEC, request_latency_p95(kind) or 0.0)
+    return after if after < limit else None
+
+
+async def _send(create: Callable[[], Any], hedge_after: Optional[float], sent: List[int]) -> Any:
+    """
+    요청 1건 전송. hedge_after초 안에 응답이 없으면 같은 요청을 한 번 더 보내 먼저 성공한 응답을 반환.
+    - sent[0]: 실제로 보낸 요청 수 (지표용)
+    - 남은 요청은 반환·취소 시 모두 취소
+    """
+    sent[0] = 1
+    if hedge_after is None:
+        return await create()
+    tasks = [asyncio.ensure_future(create())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if done:
+            return tasks[0].result()
+        logger.info(f"chat: {hedge_after:.1f}초 내 응답 없음 → 헤지 요청")
+        tasks.append(asyncio.ensure_future(create()))
+        sent[0] = 2
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                if t.exception() is None:
+                    return t.result()
+                error = t.exception()
+        raise error
+    finally:
+        for t in tasks:
+            if not t.done():
+                t.cancel()
+
+
+def chat(messages: List[Dict[str, Any]], max_tokens: int, model: Optional[str] = None,
+         timeout: Optional[float] = None, **kwargs: Any) -> Optional[str]:
+    """
+    chat.completions 요청을 보내고 응답 본문을 반환 (동기 호출용).
+    - 대기 시간 = min(timeout 또는 AI_CALL_TIMEOUT_SEC, 사이클 남은 예산)
+    - 예산 소진·시간 초과·취소 시 None (호출 측은 기존 기본값으로 처리)
+    - API 오류는 그대로 예외로 전달
+    - 요청마다 지연·usage를 ai_metrics에, 성공/실패를 ai_breaker에 알림
+    - 그 종류의 회로가 열려 있으면 요청 없이 None
+    """
+    client = _get_client()
+    if client is None:
+        return None
+
+    limit = AI_CALL_TIMEOUT_SEC if timeout is None else timeout
+    budget = _budget.get()
+    if budget is not None:
+        limit = min(limit, budget.remaining())
+        if budget.closed or limit <= 0:
+            logger.warning("chat: 사이클 AI 예산 소진 → 호출 생략")
+            return None
+
+    kind = current_kind()
+    if kind is not None and not ai_breaker.allow(kind):
+        note_status("breaker_open")
+        logger.info(f"chat: {kind} 회로 열림 → 호출 생략")
+        return None
+
+    model = model or AI_MODEL
+    sent = [0]
+    coro = asyncio.wait_for(
+        _send(
+            lambda: client.chat.completions.create(
+                model=model, messages=messages, max_tokens=max_tokens, **kwargs
+            ),
+            _hedge_after(kind, limit),
+            sent,
+        ),
+        timeout=limit,
+    )
+    fut = asyncio.run_coroutine_threadsafe(coro, _get_loop())
+    if budget is not None and not budget.track(fut):
+        fut.cancel()
+        return None
+    t0 = time.perf_counter()
+    try:
+        resp = fut.result(timeout=limit + 1.0)
+    except (asyncio.TimeoutError, concurrent.futures.TimeoutError):
+        fut.cancel()
+        elapsed = time.perf_counter() - t0
+        note_request(model, elapsed, status="timeout", requests=max(sent[0], 1))
+        if kind is not None:
+            ai_breaker.record(kind, False, elapsed)
+        logger.warning(f"chat: AI 응답 {limit:.1f}초 초과 → 요청 취소")
+        return None
+    except concurrent.futures.CancelledError:
+        note_request(model, time.perf_counter() - t0, status="cancelled", requests=max(sent[0], 1))
+        logger.warning("chat: AI 요청이 취소됨 (사이클 예산 종료)")
+        return None
+    except Exception:
+        elapsed = time.perf_counter() - t0
+        note_request(model, elapsed, status="error", requests=max(sent[0], 1))
+        if kind is not None:
+            ai_breaker.record(kind, False, elapsed)
+        raise
+    finally:
+        if budget is not None:
+            budget.untrack(fut)
+    elapsed = time.perf_counter() - t0
+    note_request(model, elapsed, getattr(resp, "usage", None), requests=sent[0])
+    if kind is not None:
+        ai_breaker.record(kind, True, elapsed)
+    return (resp.choices[0].message.content or "").strip()
+
+
+def submit(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> concurrent.futures.Future:
+    """
+    fn(*args, **kwargs)를 AI 전용 스레드 풀에서 실행하고 Future 반환.
+    - 호출 시점의 cycle_budget이 그대로 적용됨
+    """
+    global _executor
+    with _init_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=AI_MAX_CONCURRENCY, thread_name_prefix="ai-call"
+            )
+    ctx = contextvars.copy_context()
+    return _executor.submit(ctx.run, fn, *args, **kwargs)
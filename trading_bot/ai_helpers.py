@@ -5,116 +5,75 @@ import logging
 import os
 import re
 import tempfile
-import time
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar
 
 import pandas as pd
-from openai import OpenAI
 import requests
 import fcntl
 
-from trading_bot.config import (
-    PATTERN_HISTORY_FILE,
-    REFLECTION_CACHE_FILE,
-    REFLECTION_KV_RETRY,
+from trading_bot.config import AI_PROMPT_TOKEN_BUDGET, ENV_PATH
+from trading_bot.ai_cache import cache_get, cache_set, single_flight
+from trading_bot.ai_client import ai_enabled, chat
+from trading_bot.ai_metrics import instrumented
+from trading_bot.ai_schemas import (
+    CandlePatternBars,
+    NoiseVerdict,
+    PatternDecision,
+    Reflection,
+    SchemaError,
+    parse_response,
+    response_format,
+)
+from trading_bot.fingerprint import frame_fingerprint
+from trading_bot.ohlcv_store import OHLCV_COLUMNS
+from trading_bot.prompt_encoding import (
+    FORMAT_NOTE,
+    EncodedCandles,
+    bars_to_patterns,
+    encode_candles,
+    encode_table,
+    patterns_to_bars,
+)
+from trading_bot.pattern_store import (
+    append_pattern_entry,
+    get_pattern_stats,
+    load_pattern_entries,
 )
 
 logger = logging.getLogger(__name__)
-OPENAI_KEY = os.getenv("OPENAI_API_KEY", "")
-client = OpenAI(api_key=OPENAI_KEY) if OPENAI_KEY else None
-if client is None:
-    logger.warning(
-        "OPENAI_API_KEY not set; AI features disabled (returns 'hold')"
-    )
 
 
 # ──────────────────────────────────────────────
-# 간단한 메모리 기반 TTL 캐시 구현
+# AI 응답 캐시
+# - 모든 ask_* 응답은 ai_cache.py의 공용 SQLite 캐시(종류별 TTL + LRU)에 저장
+# - 캐시 DB는 첫 조회 시점에 열리므로 이 모듈 import 시 파일 I/O 없음
+# - 모든 호출은 ai_schemas.py의 JSON Schema(strict)로 응답 형식을 강제하고 검증
+# - 캐시 미스인 같은 요청이 동시에 오면 single_flight로 한 번만 보내고 결과 공유
 # ──────────────────────────────────────────────
 
+T = TypeVar("T")
 
-class TTLCache:
-    def __init__(self, ttl_sec: float):
-        self.ttl = ttl_sec
-        self.store: Dict[Any, Tuple[float, Any]] = {}
 
-    def get(self, key: Any) -> Any:
-        entry = self.store.get(key)
-        now = time.time()
-        if entry and now - entry[0] < self.ttl:
-            return entry[1]
-        if entry:
-            del self.store[key]
+def _chat_structured(prompt: str, max_tokens: int, model: Type[T]) -> Optional[T]:
+    """스키마를 강제한 1회 호출. 시간 초과·취소 시 None, 스키마 위반은 SchemaError."""
+    raw = chat(
+        [{"role": "user", "content": prompt}],
+        max_tokens=max_tokens,
+        response_format=response_format(model),
+    )
+    if raw is None:
         return None
-
-    def set(self, key: Any, value: Any) -> None:
-        self.store[key] = (time.time(), value)
-
-
-# (1) ask_pattern_decision 캐시: 동일 패턴 이름 + 최근 10봉 해시를 300초(5분)간 재사용
-_pattern_decision_cache = TTLCache(ttl_sec=300.0)
-# (2) ask_ai_reflection 캐시: 같은 최근 20개 트레이드 + fear_idx 조합을
-# 39600초(약 11시간)간 재사용
-_reflection_cache = TTLCache(ttl_sec=39600.0)
-
-
-def _load_reflection_cache() -> None:
-    """Load reflection cache from disk if present."""
-    if not REFLECTION_CACHE_FILE.exists():
-        return
-    try:
-        with open(REFLECTION_CACHE_FILE, "r", encoding="utf-8") as f:
-            raw = json.load(f)
-        if isinstance(raw, dict):
-            for k_str, entry in raw.items():
-                if not isinstance(entry, list) or len(entry) != 2:
-                    continue
-                ts, value = entry
-                try:
-                    key = tuple(json.loads(k_str))
-                except Exception:
-                    continue
-                _reflection_cache.store[key] = (ts, value)
-    except Exception:
-        logger.warning("_load_reflection_cache 실패")
-
-
-def _save_reflection_cache() -> None:
-    """Persist reflection cache to disk."""
-    try:
-        os.makedirs(REFLECTION_CACHE_FILE.parent, exist_ok=True)
-        data = {
-            json.dumps(k): [ts, v]
-            for k, (ts, v) in _reflection_cache.store.items()
-        }
-        dirpath = REFLECTION_CACHE_FILE.parent
-        with tempfile.NamedTemporaryFile(
-            "w", dir=dirpath, delete=False, encoding="utf-8"
-        ) as tmpf:
-            json.dump(data, tmpf)
-            tmp_name = tmpf.name
-        os.replace(tmp_name, REFLECTION_CACHE_FILE)
-    except Exception:
-        logger.warning("_save_reflection_cache 실패")
-
-
-_load_reflection_cache()
-
-
-def _df_hashable_key(df: pd.DataFrame, rows: int = 10) -> str:
-    """
-    DataFrame의 마지막 rows개 행을 JSON 문자열로 직렬화해 캐시 키로 사용
-    """
-    subset = df.iloc[-rows:].astype(str)
-    return subset.to_json(orient="records")
+    return parse_response(model, raw)
 
 
+@instrumented("reflection")
 def ask_ai_reflection(
     df: pd.DataFrame,
     fear_idx: int,
     chart_df: Optional[pd.DataFrame] = None,
     recursive: bool = False,
     max_iter: int = 2,
+    perf_summary: str = "",
 ) -> Tuple[Optional[str], dict]:
     """Return an AI reflection text with optional recursive improvement.
 
@@ -130,92 +89,100 @@ def ask_ai_reflection(
         Whether the AI should refine its own answer.
     max_iter : int, default 2
         Maximum number of refinement iterations.
+    perf_summary : str, optional
+        Aggregated performance line from the rollup tables.
     """
 
-    if client is None:
+    if not ai_enabled():
         return None, {}
 
-    chart_json = (
-        chart_df.reset_index().to_json(orient="records") if chart_df is not None else ""
+    chart_text = (
+        encode_candles(chart_df, max_tokens=AI_PROMPT_TOKEN_BUDGET).text
+        if chart_df is not None and not chart_df.empty else "(none)"
     )
 
     key = (
-        "reflection",
-        df.to_json(orient="records"),
+        frame_fingerprint(df),
         fear_idx,
-        chart_json,
+        frame_fingerprint(chart_df, OHLCV_COLUMNS),
         recursive,
         max_iter,
+        perf_summary,
+    )
+    reflection, params = single_flight(
+        "reflection",
+        lambda: _ask_ai_reflection(df, fear_idx, chart_text, recursive, max_iter, perf_summary, key),
+        *key,
+        default=(None, {}),
     )
-    cached = _reflection_cache.get(key)
-    if cached is not None:
-        return cached
+    return reflection, params
 
+
+def _ask_ai_reflection(df: pd.DataFrame, fear_idx: int, chart_text: str, recursive: bool,
+                       max_iter: int, perf_summary: str, key: tuple) -> Tuple[Optional[str], dict]:
+    """ask_ai_reflection의 실제 AI 호출 (single_flight 실행자만 호출)."""
+    perf_line = f"Performance summary: {perf_summary}\n" if perf_summary else ""
     prompt = (
         "You are a crypto trading coach.\n"
-        f"Recent trades: {df.to_json(orient='records')}\n"
-        f"Recent candles: {chart_json}\n"
+        f"Recent trades (ts is UTC):\n{_trades_table(df)}\n"
+        f"Recent candles. {FORMAT_NOTE}\n{chart_text}\n"
+        f"{perf_line}"
         f"Fear-Greed index={fear_idx}\n"
-        "Respond in ≤120 words: what worked, what didn't, one improvement.\n"
-        "Include strategy tweaks using KEY=VALUE format (one per line)."
+        "In 'reflection', respond in ≤120 words: what worked, what didn't, one improvement.\n"
+        "In 'tweaks', give at least one strategy tweak as an .env KEY (upper case) "
+        "and a numeric or true/false VALUE."
     )
 
     try:
-        resp = client.chat.completions.create(
-            model="gpt-4o-2024-08-06",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=150,
-        )
-        reflection = resp.choices[0].message.content.strip()
+        result = _chat_structured(prompt, 300, Reflection)
+        if result is None:
+            return None, {}
+        # 예산 소진으로 중간에 끊긴 결과는 캐시하지 않음
+        complete = True
 
         if recursive and max_iter > 1:
             for _ in range(max_iter - 1):
                 follow = (
-                    "Here is your previous reflection:\n"
-                    f"{reflection}\n\n"
-                    "Critique and improve it. If it cannot be improved, answer 'NO FURTHER IMPROVEMENTS'."
+                    "Here is your previous reflection as JSON:\n"
+                    f"{json.dumps({'reflection': result.reflection, 'tweaks': result.tweaks})}\n\n"
+                    "Critique and improve it, keeping at least one tweak. "
+                    "If it cannot be improved, return it unchanged."
                 )
-                resp = client.chat.completions.create(
-                    model="gpt-4o-2024-08-06",
-                    messages=[{"role": "user", "content": follow}],
-                    max_tokens=150,
-                )
-                improved = resp.choices[0].message.content.strip()
-                if improved.upper().startswith("NO FURTHER IMPROVEMENTS"):
+                improved = _chat_structured(follow, 300, Reflection)
+                if improved is None:
+                    complete = False
+                    break
+                if improved == result:
                     break
-                reflection = improved
-
-        params = parse_env_suggestions(reflection)
-
-        tries = 0
-        while not params and tries < REFLECTION_KV_RETRY:
-            follow_up = (
-                "The previous reflection lacked KEY=VALUE tweaks. "
-                "Provide at least one KEY=VALUE line."
-            )
-            resp = client.chat.completions.create(
-                model="gpt-4o-2024-08-06",
-                messages=[{"role": "user", "content": follow_up}],
-                max_tokens=150,
-            )
-            reflection = resp.choices[0].message.content.strip()
-            params = parse_env_suggestions(reflection)
-            tries += 1
+                result = improved
 
+        tweak_lines = result.tweak_lines()
+        params = parse_env_suggestions(tweak_lines)
         if not params:
-            logger.warning(
-                "No KEY=VALUE suggestions after retries; keeping defaults."
-            )
-
-        result = (reflection, params)
-        _reflection_cache.set(key, result)
-        _save_reflection_cache()
-        return result
+            logger.warning("No KEY=VALUE suggestions in reflection; keeping defaults.")
+        reflection = f"{result.reflection}\n{tweak_lines}".strip()
+
+        if complete:
+            cache_set("reflection", [reflection, params], *key)
+        return reflection, params
+    except SchemaError as e:
+        logger.warning(f"ask_ai_reflection: 응답 스키마 검증 실패: {e}")
+        return None, {}
     except Exception:
         logger.exception("ask_ai_reflection() 호출 중 예외 발생")
         return None, {}
 
 
+def _trades_table(df: pd.DataFrame) -> str:
+    """거래 내역을 압축 표로 (epoch 초 ts는 분 단위 시각으로)."""
+    if df is None or df.empty:
+        return "(none)"
+    out = df.copy()
+    if "ts" in out.columns:
+        out["ts"] = pd.to_datetime(out["ts"], unit="s").dt.strftime("%m-%d %H:%M")
+    return encode_table(out)
+
+
 def parse_env_suggestions(text: str) -> dict:
     """Extract ``KEY=VALUE`` suggestions from reflection text.
 
@@ -230,10 +197,11 @@ def parse_env_suggestions(text: str) -> dict:
     return result
 
 
-def apply_to_env(params: dict, env_file: str = ".env") -> None:
+def apply_to_env(params: dict, env_file: str = str(ENV_PATH)) -> None:
     """Update ``env_file`` with the given parameters.
 
-    기본적으로 `.env` 파일을 수정합니다.
+    기본적으로 config가 읽는 저장소 루트의 `.env` 파일을 수정합니다
+    (상주 모드는 config_service가 변경을 감지해 다음 사이클부터 반영).
     """
     if not params:
         return
@@ -269,176 +237,170 @@ def apply_to_env(params: dict, env_file: str = ".env") -> None:
         logger.exception("apply_to_env() 호출 중 예외 발생")
 
 
-def load_pattern_history() -> List[Dict[str, Any]]:
+def load_pattern_history(pattern: Optional[str] = None) -> List[Dict[str, Any]]:
     """
-    pattern_history.json이 존재하면 불러와서 리스트로 반환.
-    - 파일이 없으면 빈 리스트 반환
-    - JSON 파싱 오류 시 원본을 .bak로 백업 후 빈 리스트 반환
+    pattern_history 테이블의 기록을 리스트로 반환.
+    - pattern 지정 시 해당 패턴만 인덱스로 조회
+    - 기존 pattern_history.json은 첫 접근 시 자동으로 테이블에 이전됨
     """
-    try:
-        if not PATTERN_HISTORY_FILE.exists():
-            return []
-
-        text = PATTERN_HISTORY_FILE.read_text(encoding="utf-8")
-        data = json.loads(text)
-        if isinstance(data, list):
-            return data
-        else:
-            logger.warning(
-                "load_pattern_history: 파일 내용이 리스트가 아님 → 빈 리스트 반환"
-            )
-            return []
-    except json.JSONDecodeError as e:
-        logger.warning(
-            f"load_pattern_history: JSON 디코드 오류({e}) → 파일 백업 후 빈 리스트 반환"
-        )
-        try:
-            bak_path = str(PATTERN_HISTORY_FILE) + ".bak"
-            os.replace(PATTERN_HISTORY_FILE, bak_path)
-            logger.info(f"load_pattern_history: 손상된 파일을 백업함 → {bak_path}")
-        except Exception:
-            logger.exception("load_pattern_history: 파일 백업 중 예외 발생")
-        return []
-    except Exception:
-        logger.exception("load_pattern_history() 호출 중 예외 발생 → 빈 리스트 반환")
-        return []
+    return load_pattern_entries(pattern)
 
 
 def save_pattern_history_entry(entry: Dict[str, Any]) -> None:
     """
     새로운 패턴 발생 기록(entry: {timestamp, pattern, decision, result})을
-    pattern_history.json에 append하여 저장.
-    - 임시 파일에 기록 후 os.replace()로 원본 덮어쓰기 + 파일 잠금 적용
+    pattern_history 테이블에 한 행 INSERT (파일 전체 재작성 없음).
     """
-    try:
-        os.makedirs(os.path.dirname(PATTERN_HISTORY_FILE), exist_ok=True)
-        history = load_pattern_history()
-        history.append(entry)
-
-        dirpath = os.path.dirname(PATTERN_HISTORY_FILE)
-        # 임시 파일 생성
-        with tempfile.NamedTemporaryFile(
-            "w", dir=dirpath, delete=False, encoding="utf-8"
-        ) as tmpf:
-            json.dump(history, tmpf, ensure_ascii=False, indent=2)
-            tmp_name = tmpf.name
+    append_pattern_entry(entry)
 
-        # 원자적 교체, 잠금
-        with open(tmp_name, "r+", encoding="utf-8") as f_tmp:
-            try:
-                fcntl.flock(f_tmp, fcntl.LOCK_EX)
-            except IOError:
-                logger.warning("save_pattern_history_entry: 임시 파일 잠금 실패")
 
-        # 기존 파일 잠금 및 교체
-        with open(PATTERN_HISTORY_FILE, "a+b") as f_orig:
-            try:
-                fcntl.flock(f_orig, fcntl.LOCK_EX)
-            except IOError:
-                logger.warning("save_pattern_history_entry: 원본 파일 잠금 실패")
-            os.replace(tmp_name, PATTERN_HISTORY_FILE)
+# ──────────────────────────────────────────────
+# 패턴 태깅 선행 계산 (pattern_prefetch.py)
+# - 상주 모드는 봉 마감 전에 '확정된 최근 PATTERN_PREFIX_BARS봉'을 미리 태깅해 캐시
+# - 마감 후 100봉 창의 캐시가 없으면, 창 끝에서 1~PATTERN_DELTA_MAX_BARS봉을 뺀 구간의
+#   캐시를 찾아 새 봉만 보내는 작은 delta 호출로 결과를 갱신
+# ──────────────────────────────────────────────
+PATTERN_PREFIX_BARS = 96
+PATTERN_DELTA_MAX_BARS = 4
+# delta 호출에 새 봉과 함께 보낼 직전 봉 수 (진행 중 패턴 판단용 문맥)
+PATTERN_DELTA_CONTEXT_BARS = 6
 
-    except Exception:
-        logger.exception("save_pattern_history_entry() 호출 중 예외 발생")
-        try:
-            if "tmp_name" in locals() and os.path.exists(tmp_name):
-                os.remove(tmp_name)
-        except Exception:
-            pass
+
+def candle_pattern_prompt(enc: EncodedCandles) -> str:
+    """전체 창 패턴 태깅 프롬프트 (scripts/prompt_encoding_ab.py도 같은 문구 사용)."""
+    return (
+        "You are a chart pattern recognition assistant.\n"
+        f"Below are the most recent {enc.rows} 15-minute candles. {FORMAT_NOTE}\n\n"
+        f"{enc.text}\n\n"
+        "List every composite chart pattern in 'patterns' with its name and the "
+        "'start'/'end' bar numbers (i) of the candles it spans. "
+        "Use an empty list if no patterns are found."
+    )
 
 
-def ask_candle_patterns(df_recent: pd.DataFrame) -> Optional[List[Dict[str, Any]]]:
+def _ask_candle_patterns_delta(known: List[Dict[str, Any]], df_recent: pd.DataFrame,
+                               new_bars: int) -> Optional[List[Dict[str, Any]]]:
+    """앞 구간 태깅 결과(known)에 마지막 new_bars개 새 봉을 반영한 전체 패턴 목록 요청."""
+    # 봉 번호는 전체 창 기준으로 이어 붙여 이전 결과와 같은 번호 체계를 씀
+    full = encode_candles(df_recent)
+    df_tail = df_recent.iloc[-(new_bars + PATTERN_DELTA_CONTEXT_BARS):]
+    enc = encode_candles(df_tail, start_index=full.bar_index(df_tail.index[0]), step=full.step)
+    prompt = (
+        "You are a chart pattern recognition assistant.\n"
+        f"These chart patterns were already identified in the preceding {PATTERN_PREFIX_BARS} "
+        "15-minute candles (bar numbers i as below):\n"
+        f"{json.dumps(patterns_to_bars(known, enc))}\n\n"
+        f"Below are the most recent {enc.rows} candles; the last {new_bars} "
+        f"are new since that analysis. {FORMAT_NOTE}\n\n"
+        f"{enc.text}\n\n"
+        "Return the complete, updated 'patterns' list: keep earlier patterns that are still "
+        "valid, extend 'end' when the new candles continue a pattern, and add any pattern "
+        "completed by the new candles. Use an empty list if there are none."
+    )
+    result = _chat_structured(prompt, 500, CandlePatternBars)
+    return bars_to_patterns(result.patterns, enc) if result is not None else None
+
+
+def _tag_from_prefix(df_recent: pd.DataFrame) -> Optional[List[Dict[str, Any]]]:
+    """선행 계산된 앞 구간 캐시가 있으면 delta 호출로 태깅 (없으면 None)."""
+    for new_bars in range(1, PATTERN_DELTA_MAX_BARS + 1):
+        prefix = df_recent.iloc[-(PATTERN_PREFIX_BARS + new_bars):-new_bars]
+        if len(prefix) < PATTERN_PREFIX_BARS:
+            break
+        known = cache_get("candle_patterns", frame_fingerprint(prefix, OHLCV_COLUMNS))
+        if known is None:
+            continue
+        logger.info(f"ask_candle_patterns: 선행 태깅 적중 → 새 봉 {new_bars}개만 delta 호출")
+        return _ask_candle_patterns_delta(known, df_recent, new_bars)
+    return None
+
+
+@instrumented("candle_patterns")
+def ask_candle_patterns(df_recent: pd.DataFrame,
+                        min_rows: int = 100) -> Optional[List[Dict[str, Any]]]:
     """
     최근 15분봉 DataFrame(예: 100봉)을 AI에게 보내어,
     복합 차트 패턴을 자동으로 태깅한 결과를 JSON으로 반환.
-    - 최소 100봉 이상일 때만 호출
-    - 코드 블록 제거는 정규표현식으로 처리
+    - 최소 min_rows봉(기본 100) 이상일 때만 호출
+    - 같은 창의 캐시 → 선행 태깅된 앞 구간 + delta 호출 → 전체 호출 순으로 시도
     """
-    if client is None:
+    if not ai_enabled():
         return None
 
-    if df_recent.shape[0] < 100:
+    if df_recent.shape[0] < min_rows:
         return None
 
-    key = ("candle_patterns", _df_hashable_key(df_recent))
+    key = (frame_fingerprint(df_recent, OHLCV_COLUMNS),)
+    return single_flight("candle_patterns", lambda: _ask_candle_patterns(df_recent, key), *key)
 
-    df_for_ai = df_recent.reset_index().rename(columns={"index": "datetime"})
-    records = df_for_ai.to_dict(orient="records")
-    data_json = json.dumps(records, default=str)
-
-    prompt = (
-        "You are a chart pattern recognition assistant.\n"
-        "Below is JSON for the most recent 100 15-minute candles. "
-        "Each object has keys: 'datetime','open','high','low','close','volume'.\n\n"
-        f"{data_json}\n\n"
-        "Return ONLY a JSON array. DO NOT wrap it in markdown code fences (```).\n"
-        "Do not return any extra text or explanation.\n"
-        "Each element of the array (if any) must be an object with keys: "
-        "'pattern','start','end'.\n"
-        "If no patterns are found, return [] (just the two characters)."
-    )
 
+def _ask_candle_patterns(df_recent: pd.DataFrame, key: tuple) -> Optional[List[Dict[str, Any]]]:
+    """ask_candle_patterns의 실제 AI 호출 (single_flight 실행자만 호출)."""
     try:
-        resp = client.chat.completions.create(
-            model="gpt-4o-2024-08-06",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=500,
-        )
-        raw = resp.choices[0].message.content.strip()
-
-        # 정규표현식으로 코드 블록 제거
-        # ```json ... ``` 또는 ``` ... ```
-        raw = re.sub(r"```(?:json)?\s*([\s\S]*?)\s*```", r"\1", raw).strip()
-
-        try:
-            patterns = json.loads(raw)
-            return patterns
-        except Exception:
-            logger.exception(f"ask_candle_patterns: JSON 파싱 오류, 원본 응답: {raw}")
-            return None
-
+        patterns = None
+        if df_recent.shape[0] > PATTERN_PREFIX_BARS:
+            patterns = _tag_from_prefix(df_recent)
+        if patterns is None:
+            enc = encode_candles(df_recent, max_tokens=AI_PROMPT_TOKEN_BUDGET)
+            result = _chat_structured(candle_pattern_prompt(enc), 500, CandlePatternBars)
+            if result is None:
+                return None
+            patterns = bars_to_patterns(result.patterns, enc, first_index=enc.start_index)
+        if patterns is not None:
+            cache_set("candle_patterns", patterns, *key)
+        return patterns
+
+    except SchemaError as e:
+        logger.warning(f"ask_candle_patterns: 응답 스키마 검증 실패: {e}")
+        return None
     except Exception:
         logger.exception("ask_candle_patterns() 호출 중 예외 발생")
         return None
 
 
+@instrumented("noise_filter")
 def ask_noise_filter(df_last5: pd.DataFrame) -> Optional[bool]:
     """
     최근 5봉 DataFrame을 AI에게 보여주어, 마지막 봉이 노이즈인지 판단.
     - 볼륨 감소가 (평균볼륨 × 0.10 이하)일 때만 AI 호출
     """
-    if client is None:
+    if not ai_enabled():
         return False
 
-    key = ("noise_filter", _df_hashable_key(df_last5))
+    key = (frame_fingerprint(df_last5, OHLCV_COLUMNS),)
+    return single_flight(
+        "noise_filter", lambda: _ask_noise_filter(df_last5, key), *key, default=False
+    )
 
-    records = df_last5.to_dict(orient="records")
-    data_json = json.dumps(records, default=str)
 
+def _ask_noise_filter(df_last5: pd.DataFrame, key: tuple) -> bool:
+    """ask_noise_filter의 실제 AI 호출 (single_flight 실행자만 호출)."""
     prompt = (
         "You are a data quality assistant specialized in cryptocurrency 15-minute candle data.\n"
-        "Below are 5 consecutive 15-minute candles (JSON with datetime, open, high, low, close, volume):\n\n"
-        f"{data_json}\n\n"
+        f"Below are 5 consecutive 15-minute candles. {FORMAT_NOTE}\n\n"
+        f"{encode_candles(df_last5).text}\n\n"
         "We want to detect only **clear** data glitches or API errors.\n"
-        "If you are absolutely certain that the most recent candle is a glitch or data error, answer strictly with 'yes'.\n"
-        "If there is **any chance** that it might be a genuine price movement, answer 'no'.\n"
-        "Do NOT guess. Answer only 'yes' or 'no'."
+        "Set 'is_glitch' to true only if you are absolutely certain that the most recent candle is a glitch or data error.\n"
+        "If there is **any chance** that it might be a genuine price movement, set it to false.\n"
+        "Do NOT guess."
     )
 
     try:
-        resp = client.chat.completions.create(
-            model="gpt-4o-2024-08-06",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=10,
-        )
-        answer = resp.choices[0].message.content.strip().lower()
-        is_noise = answer.startswith("yes")
+        verdict = _chat_structured(prompt, 20, NoiseVerdict)
+        if verdict is None:
+            return False
+        is_noise = verdict.is_glitch
+        cache_set("noise_filter", is_noise, *key)
         return is_noise
+    except SchemaError as e:
+        logger.warning(f"ask_noise_filter: 응답 스키마 검증 실패 → 노이즈 아님: {e}")
+        return False
     except Exception:
         logger.exception("ask_noise_filter() 호출 중 예외 발생")
         return False
 
 
+@instrumented("pattern_decision")
 def ask_pattern_decision(pattern_name: str, recent_data: pd.DataFrame) -> str:
     """
     AI에게 “이 패턴이 지금 나타났는데, 매수(buy), 매도(sell), 관망(hold) 중 어느 쪽이 좋을지를 판단해 달라” 요청.
@@ -447,45 +409,28 @@ def ask_pattern_decision(pattern_name: str, recent_data: pd.DataFrame) -> str:
     """
     logger.info(f"ask_pattern_decision 호출: pattern='{pattern_name}'")
 
-    if client is None:
+    if not ai_enabled():
         logger.info("OpenAI client 없음 → 'hold' 반환")
         return "hold"
 
-    key = ("pattern_decision", pattern_name, _df_hashable_key(recent_data, rows=10))
-    cached = _pattern_decision_cache.get(key)
-    if cached is not None:
-        logger.info(f"ask_pattern_decision cache hit: {cached}")
-        return cached
-
-    df_for_ai = (
-        recent_data.iloc[-10:].reset_index().rename(columns={"index": "datetime"})
+    key = (pattern_name, frame_fingerprint(recent_data, OHLCV_COLUMNS, rows=10))
+    return single_flight(
+        "pattern_decision",
+        lambda: _ask_pattern_decision(pattern_name, recent_data, key),
+        *key,
+        default="hold",
     )
-    records = df_for_ai.to_dict(orient="records")
-    data_json = json.dumps(records, default=str)
-
-    history = load_pattern_history()
-    matched = [h for h in history if h.get("pattern") == pattern_name]
-    wins = 0
-    losses = 0
-    profits: List[float] = []
-    for h in matched:
-        try:
-            val = float(h.get("result", 0))
-            profits.append(val)
-            if val > 0:
-                wins += 1
-            else:
-                losses += 1
-        except Exception:
-            pass
-
-    total = len(profits)
-    if total > 0:
-        win_rate = wins / total
-        avg_return = sum(profits) / total
+
+
+def _ask_pattern_decision(pattern_name: str, recent_data: pd.DataFrame, key: tuple) -> str:
+    """ask_pattern_decision의 실제 AI 호출 (single_flight 실행자만 호출)."""
+    # 누적 통계 인덱스에서 O(1) 조회 (히스토리 길이와 무관)
+    stats = get_pattern_stats(pattern_name)
+    if stats.count > 0:
         history_summary = (
-            f"This pattern appeared {total} times before. "
-            f"Win rate: {win_rate:.1%}, avg return: {avg_return:.2f}%. "
+            f"This pattern appeared {stats.count} times before. "
+            f"Win rate: {stats.win_rate:.1%}, avg return: {stats.avg_return:.2f}% "
+            f"(std {stats.std_return:.2f}%). "
         )
     else:
         history_summary = "No recorded history for this pattern. Proceed with caution. "
@@ -494,29 +439,25 @@ def ask_pattern_decision(pattern_name: str, recent_data: pd.DataFrame) -> str:
         f"You are an experienced crypto trading AI.\n"
         f"Pattern: '{pattern_name}' detected.\n"
         f"{history_summary}\n\n"
-        f"Below are the last 10 15-minute candles (JSON with datetime, open, high, low, close, volume):\n"
-        f"{data_json}\n\n"
+        f"Below are the last 10 15-minute candles. {FORMAT_NOTE}\n"
+        f"{encode_candles(recent_data.iloc[-10:]).text}\n\n"
         "Based on this pattern and recent price action plus historical performance (if any), "
-        "what should we do? Answer strictly with one of: 'buy', 'sell', or 'hold'.\n"
-        "Explain reasoning in one sentence, then return only the keyword."
+        "what should we do? Give your reasoning in one sentence in 'reasoning' "
+        "and choose 'decision' from 'buy', 'sell', or 'hold'."
     )
 
     try:
-        resp = client.chat.completions.create(
-            model="gpt-4o-2024-08-06",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=30,
-        )
-        raw = resp.choices[0].message.content.strip().lower()
-        if "buy" in raw:
-            decision = "buy"
-        elif "sell" in raw:
-            decision = "sell"
-        else:
-            decision = "hold"
-        _pattern_decision_cache.set(key, decision)
-        logger.info(f"ask_pattern_decision 결과: {decision}")
+        result = _chat_structured(prompt, 80, PatternDecision)
+        if result is None:
+            logger.info("ask_pattern_decision: AI 응답 없음(시간 초과) → 'hold'")
+            return "hold"
+        decision = result.decision
+        cache_set("pattern_decision", decision, *key)
+        logger.info(f"ask_pattern_decision 결과: {decision} ({result.reasoning})")
         return decision
+    except SchemaError as e:
+        logger.warning(f"ask_pattern_decision: 응답 스키마 검증 실패 → 'hold': {e}")
+        return "hold"
     except Exception:
         logger.exception("ask_pattern_decision() 호출 중 예외 발생")
         return "hold"
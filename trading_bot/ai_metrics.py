@@ -0,0 +1,317 @@
+# trading_bot/ai_metrics.py
+
+import argparse
+import contextvars
+import functools
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from trading_bot.config import (
+    AI_METRICS_FILE,
+    AI_METRICS_RETENTION_DAYS,
+    AI_PRICE_INPUT_PER_1M,
+    AI_PRICE_OUTPUT_PER_1M,
+)
+from trading_bot.db_helpers import with_db
+
+logger = logging.getLogger(__name__)
+
+# ──────────────────────────────────────────────────────────────────────
+# AI 호출 지표 (ai_call_metrics 테이블, data/ai_metrics.db)
+# - ask_* 헬퍼 1회 = 행 1개: 전체 소요 시간, API 요청 수·지연, 토큰, 추정 비용, 캐시 결과
+# - @instrumented(kind)가 호출 구간을 열고, 그 안에서
+#   ai_client.chat()은 note_request()로 요청별 지연·usage를,
+#   ai_cache.single_flight()는 note_cache()로 hit/miss/shared를 알림 (contextvar로 전달)
+# - 기록 실패는 매매를 막지 않도록 경고만 남김
+# - 보고서: python -m trading_bot.ai_metrics --days 7
+# ──────────────────────────────────────────────────────────────────────
+
+# 프로세스당 한 번만 스키마 확인 + 보존 기간 지난 행 삭제
+_ready = False
+
+# 헤지 기준 p95 지연 메모 {kind: (계산 시각, p95)}: 호출마다 DB를 읽지 않도록 P95_REFRESH_SEC 동안 재사용
+P95_REFRESH_SEC = 600
+P95_SAMPLE_ROWS = 200
+_p95_memo: Dict[str, tuple] = {}
+
+
+@dataclass
+class CallRecord:
+    """ask_* 호출 1회의 지표."""
+    kind: str
+    ts: float
+    wall_sec: float = 0.0
+    ai_sec: float = 0.0
+    requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    model: str = ""
+    # hit | miss | shared | wait_timeout ('' = 캐시 조회 전에 끝남)
+    cache: str = ""
+    # ok | timeout | cancelled | error | breaker_open (요청 중 가장 나쁜 결과)
+    status: str = "ok"
+
+    @property
+    def retries(self) -> int:
+        return max(0, self.requests - 1)
+
+
+_current: contextvars.ContextVar[Optional[CallRecord]] = contextvars.ContextVar(
+    "ai_call_record", default=None
+)
+
+
+def estimate_cost(prompt_tokens: int, completion_tokens: int) -> float:
+    """토큰 수 → 추정 비용(USD)."""
+    return (prompt_tokens * AI_PRICE_INPUT_PER_1M
+            + completion_tokens * AI_PRICE_OUTPUT_PER_1M) / 1_000_000
+
+
+def current_kind() -> Optional[str]:
+    """진행 중인 ask_* 호출 종류 (기록 구간 밖이면 None)."""
+    rec = _current.get()
+    return rec.kind if rec is not None else None
+
+
+def note_status(status: str) -> None:
+    """요청 없이 끝난 결과(breaker_open 등)를 현재 호출 기록에 남김."""
+    rec = _current.get()
+    if rec is not None:
+        rec.status = status
+
+
+def note_request(model: str, seconds: float, usage: Any = None, status: str = "ok",
+                 requests: int = 1) -> None:
+    """
+    API 요청의 지연·usage를 현재 호출 기록에 더함 (기록 구간 밖이면 무시).
+    - requests: 헤지로 같은 요청을 두 번 보냈으면 2 (usage는 먼저 온 응답 기준)
+    """
+    rec = _current.get()
+    if rec is None:
+        return
+    prompt = int(getattr(usage, "prompt_tokens", 0) or 0)
+    completion = int(getattr(usage, "completion_tokens", 0) or 0)
+    rec.requests += requests
+    rec.ai_sec += seconds
+    rec.prompt_tokens += prompt
+    rec.completion_tokens += completion
+    rec.cost_usd += estimate_cost(prompt, completion)
+    rec.model = model
+    if status != "ok":
+        rec.status = status
+
+
+def note_cache(outcome: str) -> None:
+    """캐시 조회 결과(hit/miss/shared/wait_timeout)를 현재 호출 기록에 남김."""
+    rec = _current.get()
+    if rec is not None:
+        rec.cache = outcome
+
+
+@with_db
+def _init_schema(conn: sqlite3.Connection) -> None:
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript("""
+    CREATE TABLE IF NOT EXISTS ai_call_metrics (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      ts REAL NOT NULL,
+      kind TEXT NOT NULL,
+      model TEXT NOT NULL,
+      wall_sec REAL NOT NULL,
+      ai_sec REAL NOT NULL,
+      requests INTEGER NOT NULL,
+      retries INTEGER NOT NULL,
+      prompt_tokens INTEGER NOT NULL,
+      completion_tokens INTEGER NOT NULL,
+      cost_usd REAL NOT NULL,
+      cache TEXT NOT NULL,
+      status TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_ai_call_metrics_ts ON ai_call_metrics(ts);
+    """)
+
+
+@with_db
+def _prune(conn: sqlite3.Connection, before: float) -> None:
+    conn.execute("DELETE FROM ai_call_metrics WHERE ts < ?", (before,))
+
+
+def _ensure_ready() -> None:
+    global _ready
+    if _ready:
+        return
+    AI_METRICS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    _init_schema(db_file=AI_METRICS_FILE)
+    _ready = True
+    _prune(time.time() - AI_METRICS_RETENTION_DAYS * 86400, db_file=AI_METRICS_FILE)
+
+
+@with_db
+def _insert(conn: sqlite3.Connection, row: Dict[str, Any]) -> None:
+    cols = ", ".join(row)
+    conn.execute(
+        f"INSERT INTO ai_call_metrics ({cols}) VALUES ({', '.join('?' * len(row))})",
+        tuple(row.values()),
+    )
+
+
+def record(rec: CallRecord) -> None:
+    """호출 기록 1건 저장 (캐시 조회도 API 요청도 없던 호출은 건너뜀)."""
+    if not rec.cache and rec.requests == 0:
+        return
+    try:
+        _ensure_ready()
+        row = asdict(rec)
+        row["retries"] = rec.retries
+        _insert(row, db_file=AI_METRICS_FILE)
+    except Exception as e:
+        logger.warning(f"record: AI 호출 지표 저장 실패: {e}")
+
+
+@contextmanager
+def track(kind: str) -> Iterator[CallRecord]:
+    """with 블록을 ask_* 호출 1회로 기록."""
+    rec = CallRecord(kind=kind, ts=time.time())
+    token = _current.set(rec)
+    t0 = time.perf_counter()
+    try:
+        yield rec
+    except BaseException:
+        rec.status = "error"
+        raise
+    finally:
+        rec.wall_sec = time.perf_counter() - t0
+        _current.reset(token)
+        record(rec)
+
+
+def instrumented(kind: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """ask_* 헬퍼 데코레이터: 호출마다 track(kind)로 감쌈."""
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with track(kind):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@with_db
+def _load(conn: sqlite3.Connection, since: float) -> List[sqlite3.Row]:
+    return conn.execute(
+        "SELECT * FROM ai_call_metrics WHERE ts >= ? ORDER BY ts", (since,)
+    ).fetchall()
+
+
+def load_metrics(days: float = 7.0) -> pd.DataFrame:
+    """최근 days일 호출 지표 DataFrame (오류 시 빈 DataFrame)."""
+    try:
+        _ensure_ready()
+        rows = _load(time.time() - days * 86400, db_file=AI_METRICS_FILE)
+        return pd.DataFrame([dict(r) for r in rows])
+    except Exception as e:
+        logger.exception(f"load_metrics: 예외 발생: {e}")
+        return pd.DataFrame()
+
+
+@with_db
+def _recent_latencies(conn: sqlite3.Connection, kind: str, limit: int) -> List[float]:
+    rows = conn.execute(
+        """SELECT ai_sec FROM ai_call_metrics
+           WHERE kind=? AND requests=1 AND status='ok'
+           ORDER BY id DESC LIMIT ?""",
+        (kind, limit),
+    ).fetchall()
+    return [r["ai_sec"] for r in rows]
+
+
+def request_latency_p95(kind: str) -> Optional[float]:
+    """최근 정상 요청(헤지 없음) 지연의 p95(초). 표본이 20건 미만이면 None."""
+    now = time.time()
+    memo = _p95_memo.get(kind)
+    if memo is not None and now - memo[0] < P95_REFRESH_SEC:
+        return memo[1]
+    try:
+        _ensure_ready()
+        samples = _recent_latencies(kind, P95_SAMPLE_ROWS, db_file=AI_METRICS_FILE)
+    except Exception as e:
+        logger.warning(f"request_latency_p95: 지연 기록 조회 실패: {e}")
+        return None
+    p95 = float(np.percentile(samples, 95)) if len(samples) >= 20 else None
+    _p95_memo[kind] = (now, p95)
+    return p95
+
+
+def summarize(df: pd.DataFrame) -> pd.DataFrame:
+    """종류별 호출 수, 지연 p50/p95/p99(초), 소요 시간 비중, 캐시 적중률, 토큰·비용 합계."""
+    if df.empty:
+        return pd.DataFrame()
+    out = []
+    total_wall = df["wall_sec"].sum()
+    for kind, g in df.groupby("kind", sort=True):
+        wall = g["wall_sec"].to_numpy()
+        looked_up = g["cache"] != ""
+        served = g["cache"].isin(["hit", "shared"])
+        out.append({
+            "kind": kind,
+            "calls": len(g),
+            "p50": float(np.percentile(wall, 50)),
+            "p95": float(np.percentile(wall, 95)),
+            "p99": float(np.percentile(wall, 99)),
+            "time_share": float(wall.sum() / total_wall) if total_wall > 0 else 0.0,
+            "hit_rate": float(served.sum() / looked_up.sum()) if looked_up.any() else 0.0,
+            "requests": int(g["requests"].sum()),
+            "retries": int(g["retries"].sum()),
+            "failures": int((g["status"] != "ok").sum()),
+            "prompt_tokens": int(g["prompt_tokens"].sum()),
+            "completion_tokens": int(g["completion_tokens"].sum()),
+            "cost_usd": float(g["cost_usd"].sum()),
+        })
+    return pd.DataFrame(out).set_index("kind")
+
+
+def daily_spend(df: pd.DataFrame) -> pd.DataFrame:
+    """UTC 날짜 × 종류별 추정 비용(USD) 표."""
+    if df.empty:
+        return pd.DataFrame()
+    day = pd.to_datetime(df["ts"], unit="s").dt.strftime("%Y-%m-%d")
+    return df.assign(day=day).pivot_table(
+        index="day", columns="kind", values="cost_usd", aggfunc="sum", fill_value=0.0
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AI 호출 지연·토큰·비용 보고서")
+    parser.add_argument("--days", type=float, default=7.0, help="최근 며칠을 집계할지")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    df = load_metrics(args.days)
+    if df.empty:
+        print(f"최근 {args.days:g}일 AI 호출 기록 없음")
+        return
+    summary = summarize(df)
+    print(f"=== AI 호출 종류별 요약 (최근 {args.days:g}일, 지연 단위: 초) ===")
+    for r in summary.itertuples():
+        print(
+            f"{r.Index}: calls={r.calls} p50={r.p50:.2f} p95={r.p95:.2f} p99={r.p99:.2f} "
+            f"time_share={r.time_share:.1%} cache_hit={r.hit_rate:.1%} requests={r.requests} "
+            f"retries={r.retries} failures={r.failures} tokens={r.prompt_tokens}+{r.completion_tokens} "
+            f"cost=${r.cost_usd:.4f}"
+        )
+    print("\n=== 일별 추정 비용 (USD) ===")
+    spend = daily_spend(df)
+    spend["total"] = spend.sum(axis=1)
+    print(spend.round(4).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# trading_bot/ai_schemas.py
+
+import json
+from dataclasses import dataclass
+from typing import Any, ClassVar, Dict, List, Type, TypeVar
+
+# ──────────────────────────────────────────────────────────────────────
+# AI 응답 스키마 (OpenAI Structured Outputs)
+# - 호출 종류마다 JSON Schema(strict)와 응답 데이터 클래스를 한 쌍으로 정의
+# - response_format()으로 요청에 스키마를 실어 보내고, parse_response()로 검증 후 변환
+# - 모델이 스키마를 지키도록 강제되므로 코드 블록 제거·부분 문자열 검사·재요청이 필요 없음
+#   (검증 실패는 SchemaError로 알려 호출 측이 기본값으로 처리)
+# ──────────────────────────────────────────────────────────────────────
+
+T = TypeVar("T")
+
+
+class SchemaError(ValueError):
+    """AI 응답이 JSON이 아니거나 스키마와 맞지 않을 때."""
+
+
+def _obj(**props: Dict[str, Any]) -> Dict[str, Any]:
+    # strict 모드: 모든 속성 필수 + 추가 속성 금지
+    return {
+        "type": "object",
+        "properties": props,
+        "required": list(props),
+        "additionalProperties": False,
+    }
+
+
+_STR = {"type": "string"}
+_INT = {"type": "integer"}
+
+
+def _check(schema: Dict[str, Any], value: Any, path: str) -> None:
+    """위 스키마들이 쓰는 부분집합(object/array/string/integer/boolean/enum)만 검증."""
+    kind = schema["type"]
+    if kind == "object":
+        if not isinstance(value, dict):
+            raise SchemaError(f"{path}: object가 아님")
+        props = schema["properties"]
+        missing = [k for k in props if k not in value]
+        extra = [k for k in value if k not in props]
+        if missing or extra:
+            raise SchemaError(f"{path}: 누락 {missing}, 추가 {extra}")
+        for k, sub in props.items():
+            _check(sub, value[k], f"{path}.{k}")
+    elif kind == "array":
+        if not isinstance(value, list):
+            raise SchemaError(f"{path}: array가 아님")
+        for i, item in enumerate(value):
+            _check(schema["items"], item, f"{path}[{i}]")
+    elif kind == "string":
+        if not isinstance(value, str):
+            raise SchemaError(f"{path}: string이 아님")
+        if "enum" in schema and value not in schema["enum"]:
+            raise SchemaError(f"{path}: 허용되지 않은 값 {value!r}")
+    elif kind == "integer":
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise SchemaError(f"{path}: integer가 아님")
+    elif kind == "boolean":
+        if not isinstance(value, bool):
+            raise SchemaError(f"{path}: boolean이 아님")
+    else:
+        raise SchemaError(f"{path}: 지원하지 않는 스키마 타입 {kind}")
+
+
+@dataclass(frozen=True)
+class CandlePatterns:
+    """복합 차트 패턴 태깅 결과: [{'pattern', 'start', 'end'}, ...]."""
+    patterns: List[Dict[str, str]]
+
+    NAME: ClassVar[str] = "candle_patterns"
+    SCHEMA: ClassVar[Dict[str, Any]] = _obj(
+        patterns={"type": "array", "items": _obj(pattern=_STR, start=_STR, end=_STR)}
+    )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CandlePatterns":
+        return cls([dict(p) for p in data["patterns"]])
+
+
+@dataclass(frozen=True)
+class CandlePatternBars:
+    """압축 인코딩 프롬프트용 태깅 결과: 시각 대신 봉 번호(i)로 구간 표시."""
+    patterns: List[Dict[str, Any]]
+
+    NAME: ClassVar[str] = "candle_pattern_bars"
+    SCHEMA: ClassVar[Dict[str, Any]] = _obj(
+        patterns={"type": "array", "items": _obj(pattern=_STR, start=_INT, end=_INT)}
+    )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CandlePatternBars":
+        return cls([dict(p) for p in data["patterns"]])
+
+
+@dataclass(frozen=True)
+class NoiseVerdict:
+    """마지막 봉이 명백한 데이터 오류인지 여부."""
+    is_glitch: bool
+
+    NAME: ClassVar[str] = "noise_verdict"
+    SCHEMA: ClassVar[Dict[str, Any]] = _obj(is_glitch={"type": "boolean"})
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "NoiseVerdict":
+        return cls(data["is_glitch"])
+
+
+@dataclass(frozen=True)
+class PatternDecision:
+    """패턴 출현 시 매매 결정 (reasoning은 로그용 한 문장)."""
+    reasoning: str
+    decision: str
+
+    NAME: ClassVar[str] = "pattern_decision"
+    SCHEMA: ClassVar[Dict[str, Any]] = _obj(
+        reasoning=_STR,
+        decision={"type": "string", "enum": ["buy", "sell", "hold"]},
+    )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PatternDecision":
+        return cls(data["reasoning"], data["decision"])
+
+
+@dataclass(frozen=True)
+class Reflection:
+    """반성문 본문 + .env 전략 조정안 [(KEY, VALUE), ...]."""
+    reflection: str
+    tweaks: List[Dict[str, str]]
+
+    NAME: ClassVar[str] = "reflection"
+    SCHEMA: ClassVar[Dict[str, Any]] = _obj(
+        reflection=_STR,
+        tweaks={"type": "array", "items": _obj(key=_STR, value=_STR)},
+    )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Reflection":
+        return cls(data["reflection"], [dict(t) for t in data["tweaks"]])
+
+    def tweak_lines(self) -> str:
+        """조정안을 KEY=VALUE 줄로 (reflection_log 기록·parse_env_suggestions 입력용)."""
+        return "\n".join(f"{t['key'].strip()}={t['value'].strip()}" for t in self.tweaks)
+
+
+def response_format(model: Type[Any]) -> Dict[str, Any]:
+    """chat.completions의 response_format 인자 (json_schema, strict)."""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": model.NAME, "strict": True, "schema": model.SCHEMA},
+    }
+
+
+def parse_response(model: Type[T], raw: str) -> T:
+    """응답 본문을 JSON으로 읽고 스키마 검증 후 데이터 클래스로 변환 (실패 시 SchemaError)."""
+    try:
+        data = json.loads(raw)
+    except (TypeError, json.JSONDecodeError) as e:
+        raise SchemaError(f"{model.NAME}: JSON 파싱 실패: {e}") from e
+    _check(model.SCHEMA, data, model.NAME)
+    return model.from_dict(data)
@@ -0,0 +1,344 @@
+# trading_bot/ai_stub_server.py
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+from trading_bot.ai_cache import make_key
+from trading_bot.prompt_encoding import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# ──────────────────────────────────────────────────────────────────────
+# 로컬 OpenAI 호환 스텁 서버 (POST /v1/chat/completions)
+# - 네트워크·API 키 없이 AI 분기를 포함한 전체 파이프라인을 실행·프로파일링하기 위한 대역
+# - 봇 쪽: OPENAI_BASE_URL=http://127.0.0.1:8765/v1 (키가 없으면 'stub' 키로 동작)
+# - 응답: 스크립트 파일(스키마 이름별 응답 목록, 순환) → 없으면 response_format 스키마에
+#   맞춘 최소 응답(빈 목록, hold, false 등)을 합성
+# - 지연: fixed:0.5 / uniform:0.2,1.5 / normal:0.8,0.2 / lognormal:-0.5,0.4 (초)
+#   --latency-for reflection=fixed:3 처럼 스키마 이름별로 따로 지정 가능
+# - record: 실제 API(--upstream)로 중계하면서 요청/응답/지연을 카세트(JSONL)에 기록
+#   replay: 같은 요청(model+messages+response_format)에 기록된 응답을 기록된 지연으로 재생
+# ──────────────────────────────────────────────────────────────────────
+
+DEFAULT_PORT = 8765
+DEFAULT_UPSTREAM = "https://api.openai.com/v1"
+
+Sampler = Callable[[], float]
+
+
+def parse_latency(spec: str, rng: Optional[random.Random] = None) -> Sampler:
+    """지연 분포 문자열 → 초 단위 표본 함수 (음수는 0으로)."""
+    rng = rng or random.Random()
+    name, _, args = spec.partition(":")
+    try:
+        params = [float(x) for x in args.split(",")] if args else []
+    except ValueError as e:
+        raise ValueError(f"지연 분포 인자 오류: {spec}") from e
+    makers: Dict[str, Tuple[int, Callable[..., float]]] = {
+        "fixed": (1, lambda s: s),
+        "uniform": (2, rng.uniform),
+        "normal": (2, rng.gauss),
+        "lognormal": (2, rng.lognormvariate),
+    }
+    if name not in makers or len(params) != makers[name][0]:
+        raise ValueError(f"지원하지 않는 지연 분포: {spec} (fixed:s, uniform:a,b, normal:m,sd, lognormal:mu,sigma)")
+    fn = makers[name][1]
+    return lambda: max(0.0, fn(*params))
+
+
+def synthesize(schema: Dict[str, Any]) -> Any:
+    """JSON Schema에 맞는 최소 값 (enum은 'hold'가 있으면 hold, 없으면 첫 값)."""
+    kind = schema.get("type")
+    if kind == "object":
+        return {k: synthesize(v) for k, v in schema.get("properties", {}).items()}
+    if kind == "array":
+        return []
+    if kind == "string":
+        enum = schema.get("enum")
+        if enum:
+            return "hold" if "hold" in enum else enum[0]
+        return ""
+    if kind == "integer":
+        return 0
+    if kind == "number":
+        return 0.0
+    if kind == "boolean":
+        return False
+    return None
+
+
+def schema_name(body: Dict[str, Any]) -> str:
+    fmt = body.get("response_format") or {}
+    return (fmt.get("json_schema") or {}).get("name", "text")
+
+
+def request_key(body: Dict[str, Any]) -> str:
+    """재생용 요청 키 (샘플링 인자·max_tokens는 제외)."""
+    return make_key("replay", [body.get("model"), body.get("messages"), body.get("response_format")])
+
+
+class Cassette:
+    """기록된 요청/응답 쌍 (JSONL: key, schema, request, response, latency)."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursors: Dict[str, Iterator[Dict[str, Any]]] = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        rec = json.loads(line)
+                        self._entries.setdefault(rec["key"], []).append(rec)
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._entries.values())
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """같은 요청이 여러 번 기록됐으면 기록 순서대로 순환."""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            if key not in self._cursors:
+                self._cursors[key] = itertools.cycle(self._entries[key])
+            return next(self._cursors[key])
+
+    def append(self, rec: Dict[str, Any]) -> None:
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            self._entries.setdefault(rec["key"], []).append(rec)
+
+
+@dataclass
+class StubConfig:
+    mode: str = "stub"                          # stub | record | replay
+    latency: Sampler = field(default=lambda: 0.0)
+    latency_by_schema: Dict[str, Sampler] = field(default_factory=dict)
+    # replay 시 기록된 지연 대신 latency 분포 사용
+    override_latency: bool = False
+    script: Dict[str, List[Any]] = field(default_factory=dict)
+    cassette: Optional[Cassette] = None
+    upstream: str = DEFAULT_UPSTREAM
+    # replay에서 기록이 없을 때 합성 응답 대신 404
+    strict: bool = False
+    error_rate: float = 0.0
+    rng: random.Random = field(default_factory=random.Random)
+
+    def __post_init__(self) -> None:
+        self._cursors: Dict[str, Iterator[Any]] = {}
+        self._lock = threading.Lock()
+        self.served = 0
+
+    def scripted(self, name: str) -> Optional[Any]:
+        with self._lock:
+            self.served += 1
+            responses = self.script.get(name) or self.script.get("*")
+            if not responses:
+                return None
+            if name not in self._cursors:
+                self._cursors[name] = itertools.cycle(responses)
+            return next(self._cursors[name])
+
+    def sample_latency(self, name: str) -> float:
+        return self.latency_by_schema.get(name, self.latency)()
+
+
+def completion_body(body: Dict[str, Any], content: str) -> Dict[str, Any]:
+    prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in body.get("messages", []))
+    completion_tokens = estimate_tokens(content)
+    return {
+        "id": f"chatcmpl-stub-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def _content_for(cfg: StubConfig, body: Dict[str, Any], name: str) -> str:
+    scripted = cfg.scripted(name)
+    if scripted is not None:
+        return scripted if isinstance(scripted, str) else json.dumps(scripted)
+    fmt = body.get("response_format") or {}
+    schema = (fmt.get("json_schema") or {}).get("schema")
+    return json.dumps(synthesize(schema)) if schema else "stub"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = "ai-stub/1"
+    config: StubConfig  # make_server()가 서버별 하위 클래스에 주입
+
+    def log_message(self, fmt: str, *args: Any) -> None:
+        logger.debug("ai_stub: " + fmt, *args)
+
+    def _send(self, status: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # 클라이언트가 시간 초과로 먼저 끊은 경우
+            logger.debug("ai_stub: 클라이언트 연결 종료 후 응답 생략")
+
+    def _error(self, status: int, message: str, kind: str) -> None:
+        self._send(status, {"error": {"message": message, "type": kind, "code": None}})
+
+    def do_POST(self) -> None:
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._error(404, f"unknown path {self.path}", "invalid_request_error")
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except json.JSONDecodeError:
+            self._error(400, "invalid JSON body", "invalid_request_error")
+            return
+
+        cfg = self.config
+        name = schema_name(body)
+        if cfg.mode == "record":
+            self._record(body, name)
+            return
+
+        latency = cfg.sample_latency(name)
+        if cfg.mode == "replay":
+            rec = cfg.cassette.lookup(request_key(body)) if cfg.cassette else None
+            if rec is None and cfg.strict:
+                self._error(404, "no recorded response for this request", "replay_miss")
+                return
+            if rec is not None:
+                if not cfg.override_latency:
+                    latency = rec["latency"]
+                time.sleep(latency)
+                self._send(200, rec["response"])
+                return
+
+        time.sleep(latency)
+        if cfg.error_rate and cfg.rng.random() < cfg.error_rate:
+            self._error(500, "injected stub error", "server_error")
+            return
+        self._send(200, completion_body(body, _content_for(cfg, body, name)))
+
+    def _record(self, body: Dict[str, Any], name: str) -> None:
+        cfg = self.config
+        auth = self.headers.get("Authorization") or f"Bearer {os.getenv('OPENAI_API_KEY', '')}"
+        t0 = time.perf_counter()
+        try:
+            resp = requests.post(
+                cfg.upstream.rstrip("/") + "/chat/completions",
+                json=body,
+                headers={"Authorization": auth},
+                timeout=120,
+            )
+        except requests.RequestException as e:
+            self._error(502, f"upstream error: {e}", "upstream_error")
+            return
+        latency = time.perf_counter() - t0
+        payload = resp.json()
+        if resp.status_code == 200 and cfg.cassette is not None:
+            cfg.cassette.append({
+                "key": request_key(body),
+                "schema": name,
+                "request": body,
+                "response": payload,
+                "latency": round(latency, 4),
+            })
+        self._send(resp.status_code, payload)
+
+
+def make_server(cfg: StubConfig, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"config": cfg})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_background(cfg: StubConfig, port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """스텁을 데몬 스레드로 띄우고 (서버, base_url) 반환 (port=0이면 빈 포트 자동 선택)."""
+    server = make_server(cfg, port=port)
+    threading.Thread(target=server.serve_forever, name="ai-stub", daemon=True).start()
+    host, real_port = server.server_address[:2]
+    return server, f"http://{host}:{real_port}/v1"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="로컬 OpenAI 호환 chat-completions 스텁")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--mode", choices=["stub", "record", "replay"], default="stub")
+    parser.add_argument("--latency", default="fixed:0", help="예: lognormal:-0.5,0.4")
+    parser.add_argument("--latency-for", action="append", default=[], metavar="SCHEMA=SPEC",
+                        help="스키마 이름별 지연 (여러 번 지정 가능)")
+    parser.add_argument("--script", help="스키마 이름별 응답 목록 JSON 파일 ('*'는 기본)")
+    parser.add_argument("--cassette", default="ai_cassette.jsonl", help="record/replay 카세트 경로")
+    parser.add_argument("--upstream", default=DEFAULT_UPSTREAM, help="record 모드 중계 대상")
+    parser.add_argument("--override-latency", action="store_true",
+                        help="replay 시 기록된 지연 대신 --latency 사용")
+    parser.add_argument("--strict", action="store_true", help="replay 기록이 없으면 404")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500 오류 주입 비율 (0~1)")
+    parser.add_argument("--seed", type=int, help="지연·오류 난수 시드")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    rng = random.Random(args.seed)
+    per_schema = {}
+    for item in args.latency_for:
+        key, _, spec = item.partition("=")
+        per_schema[key] = parse_latency(spec, rng)
+    script = {}
+    if args.script:
+        with open(args.script, "r", encoding="utf-8") as f:
+            script = {k: (v if isinstance(v, list) else [v]) for k, v in json.load(f).items()}
+    cassette = Cassette(Path(args.cassette)) if args.mode in ("record", "replay") else None
+
+    cfg = StubConfig(
+        mode=args.mode,
+        latency=parse_latency(args.latency, rng),
+        latency_by_schema=per_schema,
+        override_latency=args.override_latency,
+        script=script,
+        cassette=cassette,
+        upstream=args.upstream,
+        strict=args.strict,
+        error_rate=args.error_rate,
+        rng=rng,
+    )
+    server = make_server(cfg, port=args.port)
+    extra = f", 카세트 {len(cassette)}건" if cassette is not None else ""
+    logger.info(f"ai_stub: http://127.0.0.1:{args.port}/v1 (mode={args.mode}{extra})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("ai_stub: 종료")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
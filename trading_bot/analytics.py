@@ -0,0 +1,168 @@
+# trading_bot/analytics.py
+
+import logging
+import sqlite3
+
+import numpy as np
+
+from trading_bot.db_helpers import with_db
+
+logger = logging.getLogger(__name__)
+
+# ──────────────────────────────────────────────────────────────────────
+# trade_log 분석 쿼리
+# - 필터링·집계는 SQL에서 끝내고, 결과만 NumPy 구조화 배열로 받는다.
+# - 체결(percentage > 0)된 매도 1건 = 청산 1건. 진입가는 직전 체결 행의
+#   avg_price(매수 직후 평균단가)를 LAG로 가져온다. 전량 매도 후에는
+#   avg_price가 0으로 기록되므로 매도 행 자신의 avg_price는 쓸 수 없다.
+# ──────────────────────────────────────────────────────────────────────
+
+_CLOSED_TRADES_CTE = """
+WITH fills AS (
+  SELECT ts, decision, pattern, price,
+         LAG(avg_price) OVER (ORDER BY ts, id) AS entry_price,
+         LAG(pattern) OVER (ORDER BY ts, id) AS entry_pattern
+  FROM trade_log
+  WHERE percentage > 0 AND decision IN ('buy', 'sell')
+),
+closed AS (
+  SELECT ts, entry_pattern,
+         (price - entry_price) / entry_price * 100.0 AS pnl_pct
+  FROM fills
+  WHERE decision = 'sell' AND entry_price > 0 AND ts >= ?
+)
+"""
+
+SUMMARY_DTYPE = np.dtype([
+    ("total_trades", "i8"),
+    ("fills", "i8"),
+    ("closed", "i8"),
+    ("wins", "i8"),
+    ("pnl_sum", "f8"),
+    ("profit_sum", "f8"),
+    ("loss_sum", "f8"),
+    ("win_rate", "f8"),
+    ("avg_pnl_pct", "f8"),
+    ("avg_profit_pct", "f8"),
+    ("avg_loss_pct", "f8"),
+])
+
+PATTERN_DTYPE = np.dtype([
+    ("pattern", "U64"),
+    ("closed", "i8"),
+    ("wins", "i8"),
+    ("pnl_sum", "f8"),
+    ("win_rate", "f8"),
+    ("avg_pnl_pct", "f8"),
+])
+
+BUCKET_DTYPE = np.dtype([
+    ("bucket", "i8"),
+    ("closed", "i8"),
+    ("wins", "i8"),
+    ("pnl_sum", "f8"),
+    ("win_rate", "f8"),
+    ("avg_pnl_pct", "f8"),
+])
+
+
+def _ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    """den이 0인 칸은 NaN으로 채우는 나눗셈."""
+    num = np.asarray(num, dtype=np.float64)
+    den = np.asarray(den, dtype=np.float64)
+    return np.divide(num, den, out=np.full(num.shape, np.nan), where=den > 0)
+
+
+def _query(conn: sqlite3.Connection, sql: str, params: tuple,
+           dtype: np.dtype) -> np.ndarray:
+    """row_factory 없이 커서 튜플을 바로 구조화 배열에 적재."""
+    cur = conn.cursor()
+    cur.row_factory = None
+    cur.execute(sql, params)
+    return np.fromiter(cur, dtype=dtype)
+
+
+@with_db
+def trade_summary(conn: sqlite3.Connection, since_ts: float = 0.0) -> np.ndarray:
+    """
+    전체 성과 요약을 길이 1의 구조화 배열(SUMMARY_DTYPE)로 반환.
+    - win_rate는 0~1 비율, avg_* 값은 % 단위 (청산이 없으면 NaN)
+    """
+    try:
+        # since_ts가 없으면 ts 조건을 빼서 SQLite의 COUNT(*) 최적화 경로를 사용
+        params: tuple = (since_ts,)
+        total_sql = "SELECT COUNT(*) FROM trade_log"
+        if since_ts > 0:
+            total_sql += " WHERE ts >= ?"
+            params += (since_ts,)
+        params += (since_ts,)
+        sql = _CLOSED_TRADES_CTE + f"""
+        SELECT
+          ({total_sql}),
+          (SELECT COUNT(*) FROM trade_log WHERE percentage > 0 AND ts >= ?),
+          COUNT(*),
+          COALESCE(SUM(pnl_pct > 0), 0),
+          COALESCE(SUM(pnl_pct), 0.0),
+          COALESCE(SUM(CASE WHEN pnl_pct > 0 THEN pnl_pct END), 0.0),
+          COALESCE(SUM(CASE WHEN pnl_pct <= 0 THEN pnl_pct END), 0.0),
+          0.0, 0.0, 0.0, 0.0
+        FROM closed
+        """
+        out = _query(conn, sql, params, SUMMARY_DTYPE)
+    except Exception as e:
+        logger.exception(f"trade_summary: 예외 발생: {e}")
+        out = np.zeros(1, dtype=SUMMARY_DTYPE)
+
+    out["win_rate"] = _ratio(out["wins"], out["closed"])
+    out["avg_pnl_pct"] = _ratio(out["pnl_sum"], out["closed"])
+    out["avg_profit_pct"] = _ratio(out["profit_sum"], out["wins"])
+    out["avg_loss_pct"] = _ratio(out["loss_sum"], out["closed"] - out["wins"])
+    return out
+
+
+@with_db
+def pattern_stats(conn: sqlite3.Connection, since_ts: float = 0.0) -> np.ndarray:
+    """
+    진입 패턴별 청산 성과를 구조화 배열(PATTERN_DTYPE)로 반환 (청산 수 내림차순).
+    """
+    try:
+        sql = _CLOSED_TRADES_CTE + """
+        SELECT COALESCE(entry_pattern, ''), COUNT(*), SUM(pnl_pct > 0), SUM(pnl_pct),
+               0.0, 0.0
+        FROM closed
+        GROUP BY entry_pattern
+        ORDER BY COUNT(*) DESC
+        """
+        out = _query(conn, sql, (since_ts,), PATTERN_DTYPE)
+    except Exception as e:
+        logger.exception(f"pattern_stats: 예외 발생: {e}")
+        out = np.empty(0, dtype=PATTERN_DTYPE)
+
+    out["win_rate"] = _ratio(out["wins"], out["closed"])
+    out["avg_pnl_pct"] = _ratio(out["pnl_sum"], out["closed"])
+    return out
+
+
+@with_db
+def time_bucket_stats(conn: sqlite3.Connection, bucket_sec: int = 86400,
+                      since_ts: float = 0.0) -> np.ndarray:
+    """
+    청산 시각을 bucket_sec 단위로 묶은 성과를 구조화 배열(BUCKET_DTYPE)로 반환.
+    - bucket: 구간 시작 epoch(초), 오름차순
+    """
+    try:
+        sql = _CLOSED_TRADES_CTE + """
+        SELECT CAST(ts / ? AS INTEGER) * ?, COUNT(*), SUM(pnl_pct > 0), SUM(pnl_pct),
+               0.0, 0.0
+        FROM closed
+        GROUP BY 1
+        ORDER BY 1
+        """
+        out = _query(conn, sql, (since_ts, bucket_sec, bucket_sec), BUCKET_DTYPE)
+    except Exception as e:
+        logger.exception(f"time_bucket_stats: 예외 발생: {e}")
+        out = np.empty(0, dtype=BUCKET_DTYPE)
+
+    out["win_rate"] = _ratio(out["wins"], out["closed"])
+    out["avg_pnl_pct"] = _ratio(out["pnl_sum"], out["closed"])
+    return out
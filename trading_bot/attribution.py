@@ -0,0 +1,181 @@
+# trading_bot/attribution.py
+
+import argparse
+import bisect
+import logging
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+from trading_bot.config import ATTRIBUTION_WINDOW_SEC, TRADING_FEE
+from trading_bot.db_helpers import init_db, with_db
+from trading_bot.pattern_store import (
+    apply_pattern_results,
+    migrate_pattern_history_json,
+    normalize_pattern_name,
+)
+
+logger = logging.getLogger(__name__)
+
+# ──────────────────────────────────────────────────────────────────────
+# 매매 결과 귀속 (trade_log → pattern_history.result)
+# - 매수 체결들을 그 포지션을 청산한 매도 체결과 짝지어 수수료 차감 순손익(%) 계산
+# - 체결 직전 ATTRIBUTION_WINDOW_SEC 이내에 같은 패턴·같은 결정으로 기록된
+#   미확정(result IS NULL) 패턴 항목에 결과를 일괄 기록 → pattern_stats도 함께 갱신
+# - attribution_state에 처리 위치를 저장해 매 사이클 새 체결만 처리
+#   (미청산 포지션이 있으면 그 첫 매수부터 다시 읽음)
+# ──────────────────────────────────────────────────────────────────────
+
+
+def net_pnl_pct(entry_price: float, exit_price: float, fee: Optional[float] = None) -> float:
+    """매수·매도 양쪽 수수료(기본 TRADING_FEE)를 반영한 순손익률(%)."""
+    fee = TRADING_FEE if fee is None else fee
+    cost = entry_price * (1 + fee)
+    if cost <= 0:
+        return 0.0
+    return (exit_price * (1 - fee) - cost) / cost * 100
+
+
+def _pair_fills(fills: List[sqlite3.Row]) -> Tuple[List[Tuple[sqlite3.Row, float]], int]:
+    """
+    체결 목록(id 오름차순)을 포지션 단위로 묶어 (체결 행, 순손익%) 목록을 만든다.
+    - 매도는 항상 전량 청산(executor 기준)이므로 직전 매도 이후 매수들이 한 포지션
+    - 각 매수: 자기 체결가 → 청산가, 청산 매도: 마지막 평균단가 → 청산가
+    - 반환값: (귀속 대상 목록, 미청산 포지션 첫 매수 id 또는 0)
+    """
+    results: List[Tuple[sqlite3.Row, float]] = []
+    open_buys: List[sqlite3.Row] = []
+    for row in fills:
+        if row["decision"] == "buy":
+            open_buys.append(row)
+            continue
+        if not open_buys:
+            # 처리 범위 이전에 열린 포지션(또는 정리된 로그) → 짝이 없으므로 건너뜀
+            continue
+        exit_price = row["price"] or 0.0
+        for b in open_buys:
+            results.append((b, net_pnl_pct(b["price"] or 0.0, exit_price)))
+        entry = open_buys[-1]["avg_price"] or open_buys[-1]["price"] or 0.0
+        results.append((row, net_pnl_pct(entry, exit_price)))
+        open_buys = []
+    return results, (open_buys[0]["id"] if open_buys else 0)
+
+
+def _match_entries(conn: sqlite3.Connection,
+                   results: List[Tuple[sqlite3.Row, float]],
+                   window: float) -> List[Tuple[int, float]]:
+    """귀속 대상 체결마다 창 안의 가장 최근 미확정 패턴 항목 하나를 찾아 (id, result) 반환."""
+    if not results:
+        return []
+    lo = min(r["ts"] for r, _ in results) - window
+    hi = max(r["ts"] for r, _ in results)
+    pending: Dict[Tuple[str, str], Tuple[List[float], List[int]]] = {}
+    for e in conn.execute(
+        """SELECT id, ts, pattern, decision FROM pattern_history
+           WHERE result IS NULL AND ts BETWEEN ? AND ? ORDER BY ts ASC""",
+        (lo, hi),
+    ):
+        ts_list, id_list = pending.setdefault(
+            (normalize_pattern_name(e["pattern"]), e["decision"]), ([], [])
+        )
+        ts_list.append(e["ts"])
+        id_list.append(e["id"])
+
+    updates: List[Tuple[int, float]] = []
+    for trade, pnl in results:
+        bucket = pending.get((normalize_pattern_name(trade["pattern"]), trade["decision"]))
+        if not bucket:
+            continue
+        ts_list, id_list = bucket
+        pos = bisect.bisect_right(ts_list, trade["ts"]) - 1
+        if pos < 0 or ts_list[pos] < trade["ts"] - window:
+            continue
+        updates.append((id_list[pos], pnl))
+        # 한 패턴 항목은 한 번만 귀속
+        del ts_list[pos]
+        del id_list[pos]
+    return updates
+
+
+@with_db
+def _attribute(conn: sqlite3.Connection, rebuild: bool = False,
+               window: Optional[float] = None) -> int:
+    conn.execute("BEGIN IMMEDIATE")
+    window = float(ATTRIBUTION_WINDOW_SEC if window is None else window)
+
+    if rebuild:
+        # 귀속은 매수/매도 항목만 채우므로 hold 등 나머지 결과는 모두 예전 0.0 자리표시
+        resolved = [
+            (r["id"], None)
+            for r in conn.execute("SELECT id FROM pattern_history WHERE result IS NOT NULL")
+        ]
+        apply_pattern_results(conn, resolved)
+        conn.execute("DELETE FROM attribution_state")
+
+    state = conn.execute(
+        "SELECT last_trade_id, open_since_id FROM attribution_state WHERE id=1"
+    ).fetchone()
+    last_id, open_since = (state["last_trade_id"], state["open_since_id"]) if state else (0, 0)
+    start_id = open_since if open_since else last_id + 1
+
+    max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM trade_log").fetchone()[0]
+    if max_id <= last_id:
+        return 0
+
+    fills = conn.execute(
+        """SELECT id, ts, decision, pattern, avg_price, price FROM trade_log
+           WHERE id >= ? AND percentage > 0 AND decision IN ('buy', 'sell')
+           ORDER BY id ASC""",
+        (start_id,),
+    ).fetchall()
+    results, open_since = _pair_fills(fills)
+    updates = _match_entries(conn, results, window)
+    applied = apply_pattern_results(conn, updates)
+
+    conn.execute(
+        """INSERT INTO attribution_state (id, last_trade_id, open_since_id) VALUES (1, ?, ?)
+           ON CONFLICT(id) DO UPDATE SET
+             last_trade_id=excluded.last_trade_id, open_since_id=excluded.open_since_id""",
+        (max_id, open_since),
+    )
+    return applied
+
+
+def attribute_new_trades() -> int:
+    """
+    마지막 실행 이후 새 체결을 처리해 패턴 기록에 실현 손익을 귀속.
+    - 반환값: 결과가 기록된 패턴 항목 수 (오류 시 0)
+    """
+    try:
+        n = _attribute()
+        if n:
+            logger.info(f"attribute_new_trades: 패턴 결과 {n}건 귀속")
+        return n
+    except Exception as e:
+        logger.exception(f"attribute_new_trades: 예외 발생: {e}")
+        return 0
+
+
+def rebuild_attribution() -> int:
+    """
+    모든 패턴 항목의 결과를 미확정으로 되돌린 뒤 trade_log 전체로 매수/매도 항목에 다시 귀속.
+    - 예전 버전이 넣은 0.0 자리표시 결과(hold 항목 포함)도 이때 정리됨
+    """
+    n = _attribute(rebuild=True)
+    logger.info(f"rebuild_attribution: 패턴 결과 {n}건 재귀속")
+    return n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="trade_log 체결 결과를 패턴 기록에 귀속")
+    parser.add_argument("--rebuild", action="store_true", help="모든 귀속 결과를 지우고 처음부터 다시 계산")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    init_db()
+    migrate_pattern_history_json()
+    n = rebuild_attribution() if args.rebuild else attribute_new_trades()
+    print(f"패턴 결과 {n}건 귀속")
+
+
+if __name__ == "__main__":
+    main()
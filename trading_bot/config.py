@@ -4,9 +4,12 @@ from dotenv import load_dotenv
 from pathlib import Path
 import logging
 import os
+import sys
 
 # 환경 변수는 저장소 루트의 .env 파일에서 로드합니다
 ENV_PATH = Path(__file__).resolve().parent.parent / ".env"
+# .env보다 우선하는 프로세스 환경 변수 이름 (config_service가 핫 리로드에서 제외)
+PROCESS_ENV_KEYS = frozenset(os.environ)
 load_dotenv(ENV_PATH)
 
 logger = logging.getLogger(__name__)
@@ -21,6 +24,65 @@ def log_env_info() -> None:
     else:
         masked = "(empty)"
     logger.info(f".env 경로: {ENV_PATH}, OPENAI_API_KEY={masked}")
+    if MACD_1H_THRESHOLD is not None:
+        logger.warning(
+            f"MACD_1H_THRESHOLD={MACD_1H_THRESHOLD:g}(KRW)는 더 이상 권장되지 않음: {TICKER}에만 적용, "
+            f"다른 마켓은 MACD_1H_THRESHOLD_PCT={MACD_1H_THRESHOLD_PCT:g} 사용 → "
+            f"MACD_1H_THRESHOLD_PCT(현재가 대비 비율)로 옮기세요"
+        )
+
+
+def _cast_like(current, raw):
+    """raw를 현재 설정값과 같은 타입으로 변환 (.env 문자열 규칙: bool은 "true"/"false", 목록은 쉼표 구분)."""
+    if isinstance(current, bool):
+        return raw if isinstance(raw, bool) else str(raw).strip().lower() == "true"
+    if isinstance(current, list):
+        return list(raw) if isinstance(raw, (list, tuple)) else [
+            t.strip() for t in str(raw).split(",") if t.strip()
+        ]
+    if isinstance(current, (int, float, str, Path)):
+        if isinstance(raw, str) and not isinstance(current, (str, Path)):
+            raw = raw.split("#", 1)[0].strip()
+        return type(current)(raw)
+    raise ValueError(f"덮어쓸 수 없는 설정 타입: {type(current).__name__}")
+
+
+def apply_overrides(overrides: dict, dry_run: bool = False) -> dict:
+    """
+    설정 상수를 이 프로세스 안에서 덮어씀 (프로필 실행 등).
+    - config의 대문자 상수만 허용하고, 기존 값의 타입으로 변환 (변환 실패·알 수 없는 이름은 ValueError)
+    - `from trading_bot.config import X`로 값을 가져간 trading_bot 모듈의 전역도 함께 바꿈
+    - 파생 상수(예: REFLECTION_INTERVAL_SEC)는 따로 계산되지 않으므로 필요하면 직접 지정
+    - dry_run=True면 검증·변환만 하고 적용하지 않음
+    return: 적용한(dry_run이면 적용할) {이름: 값}
+    """
+    # sys.modules 대신 이 모듈의 전역을 직접 사용 (config가 다시 import된 경우에도 자기 값만 바꿈)
+    own = globals()
+    casted = {}
+    for key, raw in overrides.items():
+        if not key.isupper() or key not in own:
+            raise ValueError(f"알 수 없는 설정: {key}")
+        try:
+            casted[key] = _cast_like(own[key], raw)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"{key}={raw!r} 변환 실패: {e}") from e
+    if dry_run:
+        return casted
+
+    for key, value in casted.items():
+        old = own[key]
+        for name, mod in list(sys.modules.items()):
+            # `python -m trading_bot.main`처럼 __main__으로 실행된 모듈도 포함
+            spec_name = getattr(getattr(mod, "__spec__", None), "name", None) or name
+            if getattr(mod, "__dict__", None) is own or not spec_name.startswith("trading_bot."):
+                continue
+            if getattr(mod, key, None) is old and old is not None:
+                setattr(mod, key, value)
+        own[key] = value
+    if casted:
+        logger.info(f"설정 덮어쓰기: {casted}")
+    return casted
+
 
 # ──────────────────────────────────────────────────────────────────────
 # 프로젝트 기본 경로 및 환경 변수 로드
@@ -35,12 +97,16 @@ CACHE_FILE = DATA_DIR / "ohlcv_cache.json"
 LOG_DIR = PROJECT_ROOT / "logs"
 LOG_DIR.mkdir(exist_ok=True)
 
-# 패턴 히스토리 저장 파일 (ai_helpers.py에서 사용)
+# (구) 패턴 히스토리 JSON 파일: pattern_store.py가 첫 실행 시 pattern_history 테이블로 이전
 PATTERN_HISTORY_FILE = DATA_DIR / "pattern_history.json"
 # FNG 지수 캐시 파일 (utils.py에서 사용)
 FNG_CACHE_FILE = DATA_DIR / "fng_cache.json"
-# AI 반성문 캐시 파일 (ai_helpers.py에서 사용)
+# (구) AI 반성문 캐시 파일: 반성문 캐시는 ai_cache.db로 이동, 첫 접근 시 .bak로 정리
 REFLECTION_CACHE_FILE = DATA_DIR / "reflection_cache.json"
+# AI 응답 공용 캐시 DB (ai_cache.py에서 사용, 프로세스 간 공유)
+AI_CACHE_FILE = DATA_DIR / "ai_cache.db"
+# AI 호출 지표 DB (ai_metrics.py: 지연·토큰·비용·캐시 적중)
+AI_METRICS_FILE = DATA_DIR / "ai_metrics.db"
 # ──────────────────────────────────────────────────────────────────────
 
 # 1) 기본 환경 변수
@@ -48,8 +114,46 @@ TICKER = os.getenv("TICKER", "KRW-BTC")
 INTERVAL = os.getenv("INTERVAL", "minute15")
 CACHE_TTL = int(os.getenv("CACHE_TTL", "3600"))
 FG_CACHE_TTL = int(os.getenv("FG_CACHE_TTL", "82800"))
+# AI 응답 캐시 상한 (초과 시 가장 오래 안 쓰인 항목부터 삭제)
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "2000"))
+AI_CACHE_MAX_BYTES = int(os.getenv("AI_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+# 캐시 적중 시 LRU 시각·통계는 메모리에 모았다가 이 간격(초)마다 또는 다음 저장 때 한 번에 기록
+AI_CACHE_FLUSH_SEC = float(os.getenv("AI_CACHE_FLUSH_SEC", "30"))
+# AI 응답 종류별 캐시 TTL(초)
+AI_CACHE_TTL = {
+    "candle_patterns": int(os.getenv("AI_CACHE_TTL_CANDLE_PATTERNS", "900")),
+    "noise_filter": int(os.getenv("AI_CACHE_TTL_NOISE_FILTER", "86400")),
+    "pattern_decision": int(os.getenv("AI_CACHE_TTL_PATTERN_DECISION", "300")),
+    "reflection": int(os.getenv("AI_CACHE_TTL_REFLECTION", "39600")),
+}
 MIN_ORDER_KRW = int(os.getenv("MIN_ORDER_KRW", "5000"))
 
+# 1.1) 봉 히스토리 빈 구간 복구 (ohlcv_gaps.py)
+# 지표 계산에 필요한 직전 봉 수 (이 구간이 ohlcv 테이블에 빠짐없이 있어야 완전)
+OHLCV_LOOKBACK_BARS = int(os.getenv("OHLCV_LOOKBACK_BARS", "100"))
+# Upbit 시세 API 요청 사이 최소 간격(초) (초당 10회 제한)
+UPBIT_REQUEST_INTERVAL_SEC = float(os.getenv("UPBIT_REQUEST_INTERVAL_SEC", "0.12"))
+# 사이클 뒤 빈 구간 다시 받기 여부 / 1회 최대 요청 수 / 빈 구간당 최대 시도 횟수
+GAP_REPAIR = os.getenv("GAP_REPAIR", "true").lower() == "true"
+GAP_REPAIR_MAX_REQUESTS = int(os.getenv("GAP_REPAIR_MAX_REQUESTS", "20"))
+GAP_REPAIR_MAX_ATTEMPTS = int(os.getenv("GAP_REPAIR_MAX_ATTEMPTS", "3"))
+
+# 1.2) 다중 마켓 동시 매매 (markets.py, `python -m trading_bot.main --markets`)
+# 쉼표로 구분한 KRW 마켓 목록 (비우면 TICKER 하나)
+TICKERS = [t.strip() for t in os.getenv("TICKERS", "").split(",") if t.strip()] or [TICKER]
+# 시세 요청·지표 계산·DB 작업을 처리할 스레드 수
+MARKET_WORKERS = int(os.getenv("MARKET_WORKERS", "4"))
+# 한 마켓이 가질 수 있는 최대 평가금액 비중 (0이면 1/마켓 수)
+MARKET_MAX_SHARE = float(os.getenv("MARKET_MAX_SHARE", "0"))
+# 봉 마감 후 이 시간(초) 안에 판정을 못 끝낸 마켓은 이번 봉을 건너뜀
+MARKET_DECISION_TIMEOUT_SEC = float(os.getenv("MARKET_DECISION_TIMEOUT_SEC", "60"))
+
+# 1.3) 다중 프로필 모의 실행 (profiles.py): 같은 봉·지표로 여러 파라미터 세트를 동시에 판정
+# 프로필 정의 JSON ({"이름": {"SMA_WINDOW": 20, ...}}) / 프로필별 DB·로그 위치 / 판정 대기 시간(초)
+PROFILES_FILE = Path(os.getenv("PROFILES_FILE", str(PROJECT_ROOT.parent / "profiles.json")))
+PROFILE_DIR = DATA_DIR / "profiles"
+PROFILE_DECISION_TIMEOUT_SEC = float(os.getenv("PROFILE_DECISION_TIMEOUT_SEC", "30"))
+
 ACCESS_KEY = os.getenv("UPBIT_ACCESS_KEY", "").strip()
 SECRET_KEY = os.getenv("UPBIT_SECRET_KEY", "").strip()
 # Enable live trading only when the flag is "true" and both API keys are provided
@@ -95,6 +199,14 @@ NOISE_VOL_THRESHOLD = float(_raw.split("#", 1)[0].strip())
 _raw = os.getenv("PRICE_RANGE_THRESHOLD", "0.10")
 PRICE_RANGE_THRESHOLD = float(_raw.split("#", 1)[0].strip())
 
+# 4.3.1) 로컬 통계 노이즈 판정 (noise_detector.py)
+# 마지막 봉과 비교할 직전 봉 수 / 판정에 필요한 최소 봉 수
+NOISE_WINDOW = int(os.getenv("NOISE_WINDOW", "96"))
+NOISE_MIN_HISTORY = int(os.getenv("NOISE_MIN_HISTORY", "24"))
+# 신뢰도 ≥ NOISE_CONF_NOISE면 노이즈, < NOISE_CONF_CLEAN이면 정상, 그 사이만 AI에 질의
+NOISE_CONF_NOISE = float(os.getenv("NOISE_CONF_NOISE", "0.995"))
+NOISE_CONF_CLEAN = float(os.getenv("NOISE_CONF_CLEAN", "0.97"))
+
 # 4.4) 손절/익절 비율
 STOP_LOSS_PCT = float(os.getenv("STOP_LOSS_PCT", "0.06"))
 TAKE_PROFIT_PCT = float(os.getenv("TAKE_PROFIT_PCT", "0.05"))
@@ -102,6 +214,9 @@ TAKE_PROFIT_PCT = float(os.getenv("TAKE_PROFIT_PCT", "0.05"))
 # 4.5) 매매 수수료 (Upbit 시장가)
 TRADING_FEE = float(os.getenv("TRADING_FEE", "0.0005"))
 
+# 4.5.1) 패턴 기록 ↔ 체결 매칭 허용 시간(초): 체결 시각 이전 이 범위 안의 패턴 기록에 결과 귀속
+ATTRIBUTION_WINDOW_SEC = int(os.getenv("ATTRIBUTION_WINDOW_SEC", "900"))
+
 # 4.6) EMA 교차 밴드 임계치 (whipsaw 완화)
 EMA_CROSS_BAND = float(os.getenv("EMA_CROSS_BAND", "0.5"))
 
@@ -117,8 +232,14 @@ DOUBLE_PATTERN_LOOKBACK = int(os.getenv("DOUBLE_PATTERN_LOOKBACK", "3"))
 _raw = os.getenv("RSI_OVERRIDE", "40.0")
 RSI_OVERRIDE = float(_raw.split("#", 1)[0].strip())
 
-_raw = os.getenv("MACD_1H_THRESHOLD", "2500.0")
-MACD_1H_THRESHOLD = float(_raw.split("#", 1)[0].strip())
+# 1h MACD diff 예외 임계치: 현재가 대비 비율 (마켓마다 가격대가 달라 KRW 절대값은 쓰지 않음)
+# 예) 0.00002 → 1.25억 KRW BTC에서 2500 KRW, 800 KRW XRP에서 0.016 KRW
+_raw = os.getenv("MACD_1H_THRESHOLD_PCT", "0.00002")
+MACD_1H_THRESHOLD_PCT = float(_raw.split("#", 1)[0].strip())
+# (구) KRW 절대값 임계치: 기존 .env·반성문 조정값 호환용. 설정돼 있으면 TICKER 마켓에만 그대로 적용
+# (다른 마켓은 MACD_1H_THRESHOLD_PCT), 시작 시 경고 → MACD_1H_THRESHOLD_PCT로 옮길 것
+_raw = os.getenv("MACD_1H_THRESHOLD", "")
+MACD_1H_THRESHOLD = float(_raw.split("#", 1)[0].strip()) if _raw.split("#", 1)[0].strip() else None
 
 _raw = os.getenv("FG_EXTREME_FEAR", "50.0")
 FG_EXTREME_FEAR = float(_raw.split("#", 1)[0].strip())
@@ -128,8 +249,50 @@ REFLECTION_INTERVAL_HOURS = float(os.getenv("REFLECTION_INTERVAL_HOURS", "11"))
 REFLECTION_INTERVAL_SEC = int(REFLECTION_INTERVAL_HOURS * 3600)
 # AI 리플렉션을 GPT에게 한 번 더 개선 요청할지 여부 (기본 true)
 REFLECTION_RECURSIVE = os.getenv("REFLECTION_RECURSIVE", "true").lower() == "true"
-# KEY=VALUE 줄이 없을 때 추가 요청 시도 횟수 (기본 2)
-REFLECTION_KV_RETRY = int(os.getenv("REFLECTION_KV_RETRY", "2"))
+
+# 반성문 작업을 매매 사이클 종료 후 같은 프로세스에서 처리할지 여부
+# (false면 `python -m trading_bot.reflection_worker --loop`를 별도로 실행)
+REFLECTION_WORKER_INLINE = os.getenv("REFLECTION_WORKER_INLINE", "true").lower() == "true"
+# 반성문 작업 최대 시도 횟수 / 'running' 상태로 이 시간(초) 넘게 멈춘 작업은 다시 가져감
+REFLECTION_JOB_MAX_ATTEMPTS = int(os.getenv("REFLECTION_JOB_MAX_ATTEMPTS", "3"))
+REFLECTION_JOB_STALE_SEC = int(os.getenv("REFLECTION_JOB_STALE_SEC", "900"))
+# 실패한 반성문 작업의 재시도 대기(초): 시도마다 두 배 (AI 장애 중 시도 횟수를 한 번에 소진하지 않도록)
+REFLECTION_JOB_RETRY_SEC = int(os.getenv("REFLECTION_JOB_RETRY_SEC", "300"))
+
+# 7.1) AI 호출 공통 설정 (ai_client.py)
+AI_MODEL = os.getenv("AI_MODEL", "gpt-4o-2024-08-06")
+# 호출 1회 최대 대기(초)
+AI_CALL_TIMEOUT_SEC = float(os.getenv("AI_CALL_TIMEOUT_SEC", "20"))
+# 한 사이클(ai_trading 1회)에서 AI 호출에 쓸 수 있는 총 시간(초): 초과 시 남은 호출 취소
+AI_CYCLE_BUDGET_SEC = float(os.getenv("AI_CYCLE_BUDGET_SEC", "90"))
+# 동시에 실행할 수 있는 AI 헬퍼 호출 수
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "4"))
+# 프롬프트에 싣는 봉 데이터 1블록의 토큰 예산 (초과 시 오래된 봉부터 제외)
+AI_PROMPT_TOKEN_BUDGET = int(os.getenv("AI_PROMPT_TOKEN_BUDGET", "3000"))
+# 같은 요청이 이미 진행 중일 때(다른 스레드·프로세스) 결과를 기다리는 최대 시간(초)
+AI_SINGLE_FLIGHT_WAIT_SEC = float(os.getenv("AI_SINGLE_FLIGHT_WAIT_SEC", "45"))
+# 프로세스 간 실행 리스 유효 시간(초): 실행 중 프로세스가 죽어도 이 시간 뒤 다른 프로세스가 가져감
+AI_SINGLE_FLIGHT_LEASE_SEC = float(os.getenv("AI_SINGLE_FLIGHT_LEASE_SEC", "120"))
+# 비용 추정 단가 (USD / 100만 토큰, AI_MODEL 기준) 및 호출 지표 보존 기간(일)
+AI_PRICE_INPUT_PER_1M = float(os.getenv("AI_PRICE_INPUT_PER_1M", "2.5"))
+AI_PRICE_OUTPUT_PER_1M = float(os.getenv("AI_PRICE_OUTPUT_PER_1M", "10.0"))
+AI_METRICS_RETENTION_DAYS = int(os.getenv("AI_METRICS_RETENTION_DAYS", "30"))
+# 호출 종류별 회로 차단기 (ai_breaker.py): 연속 실패(시간 초과·오류·지연 SLO 초과) N회면 열림,
+# 열린 동안은 AI 호출 없이 기본값, 쿨다운 후 시험 호출 1건으로 복구 확인
+AI_BREAKER_FAILURES = int(os.getenv("AI_BREAKER_FAILURES", "3"))
+AI_BREAKER_SLO_SEC = float(os.getenv("AI_BREAKER_SLO_SEC", "15"))
+AI_BREAKER_COOLDOWN_SEC = float(os.getenv("AI_BREAKER_COOLDOWN_SEC", "300"))
+# 헤지 요청: 첫 요청이 해당 종류의 최근 p95 지연(최소 AI_HEDGE_MIN_SEC)을 넘으면 같은 요청을 한 번 더 보내
+# 먼저 온 응답 사용 (토큰 비용이 늘 수 있어 기본 꺼짐)
+AI_HEDGE = os.getenv("AI_HEDGE", "false").lower() == "true"
+AI_HEDGE_MIN_SEC = float(os.getenv("AI_HEDGE_MIN_SEC", "2"))
+
+# 7.2) 상주(--daemon) 모드 & 패턴 태깅 선행 계산 (pattern_prefetch.py)
+# 봉 마감 후 몇 초 뒤에 사이클을 시작할지 (거래소 봉 확정 대기)
+DAEMON_CLOSE_DELAY_SEC = float(os.getenv("DAEMON_CLOSE_DELAY_SEC", "5"))
+# 봉 마감 몇 초 전에 확정 봉 구간을 미리 AI 태깅할지 (false면 선행 계산 안 함)
+PATTERN_PREFETCH = os.getenv("PATTERN_PREFETCH", "true").lower() == "true"
+PATTERN_PREFETCH_LEAD_SEC = float(os.getenv("PATTERN_PREFETCH_LEAD_SEC", "300"))
 
 # 8) 데이터베이스 로그 보존 최대 행 수
 LOG_RETENTION_ROWS = int(os.getenv("LOG_RETENTION_ROWS", "5000"))
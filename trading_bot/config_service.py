@@ -0,0 +1,204 @@
+# trading_bot/config_service.py
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from dotenv import dotenv_values
+
+import trading_bot.config as cfg
+
+logger = logging.getLogger(__name__)
+
+# ──────────────────────────────────────────────────────────────────────
+# 상주 모드 설정 핫 리로드
+# - .env를 mtime(+크기·inode)으로 감시: apply_to_env()가 반성문 뒤 파일을 바꾸면 다음 사이클부터 반영
+# - 바뀐 값은 apply_overrides() 규칙으로 타입 변환 + 범위 검사, 하나라도 틀리면 전체를 거부하고 기존 값 유지
+# - 통과하면 사이클 사이(reload 호출 시점)에 config·모듈 전역을 한 번에 바꾸고 새 ConfigSnapshot으로 교체,
+#   바뀐 항목은 "이름: 이전 → 새 값"으로 로그
+# - 프로세스 환경 변수로 이미 지정된 이름(.env보다 우선)과 _STATIC 항목(마켓·모드·키·스레드 수)은 제외
+# - .env에서 지운 항목은 기본값으로 되돌리지 않고 현재 값을 유지
+# - 캐시·DB 연결·스레드 풀은 건드리지 않으므로 재시작 없이 워밍 상태 유지
+# - 리로드 대상 설정은 사용하는 쪽에서 호출 시점에 모듈 전역을 읽어야 함
+#   (함수 기본 인자·생성자에서 복사하면 바뀐 값이 반영되지 않음 → None 기본값 후 전역으로 대체)
+# ──────────────────────────────────────────────────────────────────────
+
+# 재시작해야 의미가 있는 설정 (실행 중 바꾸면 상태와 어긋남)
+_STATIC = frozenset({
+    "TICKER", "TICKERS", "INTERVAL", "LIVE_MODE", "ACCESS_KEY", "SECRET_KEY",
+    "DISCORD_WEBHOOK", "MARKET_WORKERS", "AI_MAX_CONCURRENCY", "AI_MODEL",
+})
+
+# 다른 설정에서 계산되는 값: {원본: (파생 이름, 계산 함수)}
+_DERIVED = {
+    "REFLECTION_INTERVAL_HOURS": ("REFLECTION_INTERVAL_SEC", lambda h: int(h * 3600)),
+}
+
+# 0 ≤ 값 < 1 이어야 하는 비율 설정
+_FRACTIONS = frozenset({"PLAY_RATIO", "RESERVE_RATIO", "BASE_RISK", "TRADING_FEE"})
+
+
+def reloadable_names() -> List[str]:
+    """핫 리로드 대상 설정 이름 (config의 대문자 상수 중 bool·숫자·문자열, _STATIC 제외)."""
+    return sorted(
+        name for name, value in vars(cfg).items()
+        if name.isupper() and name not in _STATIC and name not in cfg.PROCESS_ENV_KEYS
+        and isinstance(value, (bool, int, float, str))
+    )
+
+
+def _range_error(name: str, value: Any) -> Optional[str]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    if name.endswith("_WINDOW") and value <= 0:
+        return "0보다 커야 함"
+    if (name.endswith("_PCT") or name in _FRACTIONS) and not 0 <= value < 1:
+        return "0 이상 1 미만이어야 함"
+    if value < 0 and not name.endswith("_THRESHOLD"):
+        return "음수 불가"
+    return None
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """핫 리로드 대상 설정의 불변 스냅샷 (snap.SMA_WINDOW 또는 snap.values["SMA_WINDOW"])."""
+    values: Mapping[str, Any]
+    version: int
+    loaded: float
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "values":
+            raise AttributeError(name)
+        try:
+            return self.values[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def diff(self, values: Mapping[str, Any]) -> Dict[str, Tuple[Any, Any]]:
+        """values 중 이 스냅샷과 다른 항목: {이름: (이전, 새 값)}"""
+        return {k: (self.values.get(k), v) for k, v in values.items() if self.values.get(k) != v}
+
+
+def _snapshot_of_config(version: int) -> ConfigSnapshot:
+    values = {name: getattr(cfg, name) for name in reloadable_names()}
+    return ConfigSnapshot(MappingProxyType(values), version, time.time())
+
+
+class ConfigService:
+    """
+    .env 감시 + 검증 + 사이클 사이 원자적 교체.
+    - snapshot(): 현재 스냅샷 (참조 하나만 바꾸므로 다른 스레드도 항상 완전한 스냅샷을 봄)
+    - reload(): 파일이 바뀌었으면 검증 후 적용, 바뀐 항목 반환 (상주 루프가 사이클 사이에 호출)
+    """
+
+    def __init__(self, env_path: Path = cfg.ENV_PATH):
+        self.env_path = Path(env_path)
+        self._lock = threading.Lock()
+        self._snapshot = _snapshot_of_config(1)
+        self._stamp = self._stat()
+
+    def snapshot(self) -> ConfigSnapshot:
+        return self._snapshot
+
+    def _stat(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.env_path)
+            return st.st_mtime_ns, st.st_size, st.st_ino
+        except FileNotFoundError:
+            return None
+
+    def changed(self) -> bool:
+        return self._stat() != self._stamp
+
+    def load_candidate(self) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        .env를 읽어 리로드 대상 항목을 변환·검사.
+        return: (새 값 {이름: 값}, 오류 목록)
+        """
+        raw = dotenv_values(self.env_path)
+        names = set(self._snapshot.values)
+        values, errors = {}, []
+        for key, text in raw.items():
+            if key not in names or text is None or not text.strip():
+                continue
+            try:
+                value = cfg.apply_overrides({key: text}, dry_run=True)[key]
+            except ValueError as e:
+                errors.append(str(e))
+                continue
+            problem = _range_error(key, value)
+            if problem:
+                errors.append(f"{key}={value!r}: {problem}")
+                continue
+            values[key] = value
+        for source, (derived, fn) in _DERIVED.items():
+            if source in values and derived in names:
+                values[derived] = fn(values[source])
+        return values, errors
+
+    def reload(self) -> Dict[str, Tuple[Any, Any]]:
+        """
+        .env가 바뀌었으면 검증 후 적용 (하나라도 틀리면 전체 거부).
+        return: 적용한 변경 {이름: (이전, 새 값)} (변경 없음·거부 시 빈 dict)
+        """
+        with self._lock:
+            stamp = self._stat()
+            if stamp == self._stamp:
+                return {}
+            self._stamp = stamp
+            if stamp is None:
+                logger.warning(f"config_service: {self.env_path} 없음 → 현재 설정 유지")
+                return {}
+            try:
+                values, errors = self.load_candidate()
+            except Exception as e:
+                logger.exception(f"config_service: .env 읽기 중 예외 발생: {e}")
+                return {}
+            if errors:
+                logger.error(f"config_service: .env 검증 실패 → 변경 거부 ({'; '.join(errors)})")
+                return {}
+            changes = self._snapshot.diff(values)
+            if not changes:
+                return {}
+            cfg.apply_overrides({k: new for k, (_, new) in changes.items()})
+            old = self._snapshot
+            self._snapshot = ConfigSnapshot(
+                MappingProxyType({**old.values, **values}), old.version + 1, time.time()
+            )
+        logger.info(
+            f"config_service: 설정 v{self._snapshot.version} 적용 — "
+            + ", ".join(f"{k}: {a!r} → {b!r}" for k, (a, b) in sorted(changes.items()))
+        )
+        return changes
+
+
+_service: Optional[ConfigService] = None
+_service_lock = threading.Lock()
+
+
+def get_service() -> ConfigService:
+    """프로세스 공용 ConfigService (처음 호출 시 생성)."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ConfigService()
+        return _service
+
+
+def current() -> ConfigSnapshot:
+    """현재 설정 스냅샷."""
+    return get_service().snapshot()
+
+
+def reload_config() -> Dict[str, Tuple[Any, Any]]:
+    """상주 루프용: 사이클 사이에 호출 (예외는 로그만 남기고 빈 dict)."""
+    try:
+        return get_service().reload()
+    except Exception as e:
+        logger.exception(f"reload_config: 예외 발생: {e}")
+        return {}
@@ -34,3 +34,6 @@ class SignalContext:
 
     # ─ 보조 지표
     fear_idx: int
+
+    # ─ 마켓 (None이면 config.TICKER)
+    ticker: Optional[str] = None
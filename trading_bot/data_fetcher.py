@@ -2,6 +2,8 @@
 
 import pandas as pd
 import logging
+import threading
+import time
 from typing import Optional
 
 import pyupbit
@@ -10,16 +12,37 @@ from trading_bot.data_io import (
     load_cached_ohlcv,
     save_cached_ohlcv,
 )
-from trading_bot.config import TICKER, INTERVAL
+from trading_bot.ohlcv_gaps import refresh_gaps
+from trading_bot.ohlcv_store import index_to_epoch, upsert_ohlcv
+from trading_bot.ohlcv_validation import validate_batch
+from trading_bot.config import TICKER, INTERVAL, UPBIT_REQUEST_INTERVAL_SEC
 
 logger = logging.getLogger(__name__)
 
+# pyupbit 인덱스(KST 벽시계) ↔ Upbit API 시각(UTC) 차이
+_KST_OFFSET_SEC = 9 * 3600
+
+# Upbit 시세 API 요청 간격 제한 (프로세스 내 모든 스레드 공용)
+_throttle_lock = threading.Lock()
+_last_request = 0.0
+
+
+def _throttle() -> None:
+    """직전 요청 뒤 UPBIT_REQUEST_INTERVAL_SEC가 지날 때까지 대기."""
+    global _last_request
+    with _throttle_lock:
+        wait = _last_request + UPBIT_REQUEST_INTERVAL_SEC - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        _last_request = time.monotonic()
+
 
 def fetch_direct() -> Optional[pd.DataFrame]:
     """Upbit REST API(15분봉)로 데이터를 가져오는 백업 함수."""
     try:
         unit = INTERVAL.replace("minute", "")
         url = f"https://api.upbit.com/v1/candles/minutes/{unit}"
+        _throttle()
         resp = requests.get(url, params={"market": TICKER, "count": 100}, timeout=5)
         resp.raise_for_status()
         data = resp.json()[::-1]
@@ -40,6 +63,7 @@ def fetch_direct() -> Optional[pd.DataFrame]:
 def safe_ohlcv() -> Optional[pd.DataFrame]:
     """pyupbit.get_ohlcv() 실패 시 fetch_direct()로 백업."""
     try:
+        _throttle()
         df = pyupbit.get_ohlcv(TICKER, count=100, interval=INTERVAL)
         if df is None or df.empty:
             raise RuntimeError("pyupbit.get_ohlcv 빈 데이터")
@@ -53,6 +77,7 @@ def fetch_ohlcv_1h_via_rest(ticker: str, count: int = 100) -> Optional[pd.DataFr
     """Upbit REST API(1시간봉)로 데이터를 가져오는 백업 함수."""
     try:
         url = "https://api.upbit.com/v1/candles/minutes/60"
+        _throttle()
         resp = requests.get(url, params={"market": ticker, "count": count}, timeout=5)
         resp.raise_for_status()
         data = resp.json()[::-1]
@@ -69,25 +94,57 @@ def fetch_ohlcv_1h_via_rest(ticker: str, count: int = 100) -> Optional[pd.DataFr
         logger.exception("fetch_ohlcv_1h_via_rest() 실패")
         return None
 
-def fetch_data_15m() -> Optional[pd.DataFrame]:
+def fetch_ohlcv_before(ticker: str, interval: str, to_ts: int, count: int = 200) -> Optional[pd.DataFrame]:
+    """
+    to_ts(epoch 초, ohlcv 테이블 기준) 직전 count개 봉 (빈 구간 복구용, 요청 간격 제한 적용).
+    - ohlcv 테이블의 ts는 KST 벽시계 시각(pyupbit 인덱스)을 UTC로 본 값이고,
+      Upbit의 to 파라미터는 UTC 기준이므로 9시간을 빼서 넘김
+    """
+    try:
+        to = pd.to_datetime(int(to_ts) - _KST_OFFSET_SEC, unit="s").strftime("%Y-%m-%d %H:%M:%S")
+        _throttle()
+        df = pyupbit.get_ohlcv(ticker, interval=interval, to=to, count=min(int(count), 200))
+        if df is None or df.empty:
+            return None
+        return df[["open", "high", "low", "close", "volume"]]
+    except Exception:
+        logger.exception(f"fetch_ohlcv_before({ticker}, {interval}, {to_ts}) 실패")
+        return None
+
+
+def store_ohlcv(ticker: str, interval: str, df: pd.DataFrame) -> None:
+    """새로 받은 봉을 ohlcv 테이블에 upsert하고 그 구간의 빈 구간 색인 갱신 (실패해도 매매 흐름은 계속)."""
+    try:
+        upsert_ohlcv(ticker, interval, df)
+        ts = index_to_epoch(df.index)
+        refresh_gaps(ticker, interval, int(ts.min()), int(ts.max()))
+    except Exception:
+        logger.exception("store_ohlcv() 중 예외 발생(무시)")
+
+
+def fetch_data_15m(use_cache: bool = True) -> Optional[pd.DataFrame]:
     """
     15분봉 OHLCV 데이터 로드 (캐시 → 백업 API).
+    - use_cache=False: 캐시를 건너뛰고 항상 새로 받음 (상주 모드는 봉마다 최신 데이터 필요)
+    - 새로 받은 배치는 validate_batch()로 검증해 불량 행은 격리하고, 정상 행만 캐시·ohlcv 테이블에 저장
     실패 시 None 반환.
     """
     try:
         # 1) 캐시 시도
-        df = load_cached_ohlcv()
-        if df is not None and not df.empty:
-            return df
+        if use_cache:
+            df = load_cached_ohlcv()
+            if df is not None and not df.empty:
+                return df
 
-        # 2) pyupbit → fetch_direct 순으로 시도
-        df = safe_ohlcv()
+        # 2) pyupbit → fetch_direct 순으로 시도 → 검증 (캐시에는 검증된 행만 저장됨)
+        df = validate_batch(TICKER, INTERVAL, safe_ohlcv())
         if df is not None and not df.empty:
             try:
                 # 캐시에 저장해 두면 다음 호출 시 빠름
                 save_cached_ohlcv(df)
             except Exception:
                 logger.exception("save_cached_ohlcv() 중 예외 발생(무시)")
+            store_ohlcv(TICKER, INTERVAL, df)
             return df
 
         # 3) 모든 시도 실패
@@ -99,21 +156,47 @@ def fetch_data_15m() -> Optional[pd.DataFrame]:
         return None
 
 
+def fetch_market_15m(ticker: str, count: int = 100) -> Optional[pd.DataFrame]:
+    """
+    임의 마켓의 INTERVAL 봉 로드 (다중 마켓 모드용: JSON 캐시 없이 검증 → ohlcv 테이블 저장).
+    실패 시 None 반환.
+    """
+    try:
+        _throttle()
+        df = pyupbit.get_ohlcv(ticker, interval=INTERVAL, count=count)
+        if df is None or df.empty:
+            logger.error(f"fetch_market_15m({ticker}): pyupbit.get_ohlcv 빈 데이터")
+            return None
+        df = validate_batch(ticker, INTERVAL, df[["open", "high", "low", "close", "volume"]])
+        if df is not None:
+            store_ohlcv(ticker, INTERVAL, df)
+        return df
+    except Exception as e:
+        logger.exception(f"fetch_market_15m({ticker}) 예외 발생: {e}")
+        return None
+
+
 def fetch_data_1h(ticker: str, count: int = 100) -> Optional[pd.DataFrame]:
     """
-    1시간봉 OHLCV 데이터 로드 (pyupbit.get_ohlcv 사용).
+    1시간봉 OHLCV 데이터 로드 (pyupbit.get_ohlcv 사용, validate_batch()로 검증).
     실패 시 None 반환.
     """
     try:
+        _throttle()
         df = pyupbit.get_ohlcv(ticker, interval="minute60", count=count)
         if df is None or df.empty:
             raise RuntimeError("pyupbit.get_ohlcv 빈 데이터")
-        return df[["open", "high", "low", "close", "volume"]]
+        df = validate_batch(ticker, "minute60", df[["open", "high", "low", "close", "volume"]])
+        if df is None:
+            raise RuntimeError("검증을 통과한 봉 없음")
+        store_ohlcv(ticker, "minute60", df)
+        return df
     except Exception:
         logger.warning("pyupbit.get_ohlcv 실패 → REST 백업 시도")
         try:
-            df = fetch_ohlcv_1h_via_rest(ticker, count)
+            df = validate_batch(ticker, "minute60", fetch_ohlcv_1h_via_rest(ticker, count))
             if df is not None and not df.empty:
+                store_ohlcv(ticker, "minute60", df)
                 return df
         except Exception:
             logger.exception("fetch_ohlcv_1h_via_rest 실패")
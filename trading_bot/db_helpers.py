@@ -12,10 +12,11 @@ def with_db(fn: Callable[..., Any]):
     """
     SQLite 데이터베이스 연결을 자동으로 열고 닫아 주는 데코레이터.
     - timeout=5초 대기
+    - db_file 키워드 인자로 기본 DB_FILE 대신 다른 DB 파일을 지정 가능 (스크립트용)
     """
-    def wrapper(*args: Any, **kwargs: Any) -> Any:
+    def wrapper(*args: Any, db_file: Any = None, **kwargs: Any) -> Any:
         try:
-            conn = sqlite3.connect(DB_FILE, timeout=5.0)
+            conn = sqlite3.connect(db_file or DB_FILE, timeout=5.0)
             conn.row_factory = sqlite3.Row
             try:
                 result = fn(conn, *args, **kwargs)
@@ -79,7 +80,162 @@ def init_db(conn: sqlite3.Connection) -> None:
           ts REAL,
           reflection TEXT
         );
+
+        CREATE TABLE IF NOT EXISTS ohlcv (
+          ticker TEXT NOT NULL,
+          interval TEXT NOT NULL,
+          ts INTEGER NOT NULL,
+          open REAL,
+          high REAL,
+          low REAL,
+          close REAL,
+          volume REAL,
+          PRIMARY KEY (ticker, interval, ts)
+        ) WITHOUT ROWID;
+
+        -- 수집 검증에서 걸러진 봉 (ohlcv_validation: 사유·최초/최근 발견 시각·발견 횟수)
+        CREATE TABLE IF NOT EXISTS ohlcv_quarantine (
+          ticker TEXT NOT NULL,
+          interval TEXT NOT NULL,
+          raw_ts TEXT NOT NULL,
+          ts INTEGER,
+          open REAL,
+          high REAL,
+          low REAL,
+          close REAL,
+          volume REAL,
+          reason TEXT NOT NULL,
+          first_seen REAL NOT NULL,
+          last_seen REAL NOT NULL,
+          seen INTEGER NOT NULL DEFAULT 1,
+          PRIMARY KEY (ticker, interval, raw_ts)
+        );
+
+        -- ohlcv 빈 구간 색인 (ohlcv_gaps: 빠진 봉 구간 [start_ts, end_ts], 복구 시도 횟수)
+        CREATE TABLE IF NOT EXISTS ohlcv_gaps (
+          ticker TEXT NOT NULL,
+          interval TEXT NOT NULL,
+          start_ts INTEGER NOT NULL,
+          end_ts INTEGER NOT NULL,
+          bars INTEGER NOT NULL,
+          detected REAL NOT NULL,
+          attempts INTEGER NOT NULL DEFAULT 0,
+          last_attempt REAL,
+          PRIMARY KEY (ticker, interval, start_ts)
+        ) WITHOUT ROWID;
+
+        -- 다중 마켓 모드(markets.py) 마켓별 보유 수량 (KRW는 account 한 행을 공유)
+        CREATE TABLE IF NOT EXISTS positions (
+          ticker TEXT PRIMARY KEY,
+          qty REAL NOT NULL DEFAULT 0,
+          avg_price REAL NOT NULL DEFAULT 0,
+          updated REAL
+        );
+
+        -- 다중 마켓 모드 처리한 봉 장부 (마켓·봉마다 1행: 중복 처리 방지 + 판정 기록)
+        CREATE TABLE IF NOT EXISTS market_ledger (
+          ticker TEXT NOT NULL,
+          ts_end REAL NOT NULL,
+          claimed REAL NOT NULL,
+          decision TEXT,
+          pattern TEXT,
+          percentage REAL,
+          price REAL,
+          qty REAL,
+          PRIMARY KEY (ticker, ts_end)
+        ) WITHOUT ROWID;
+
+        -- 체결된 매매(percentage > 0)만 담는 부분 인덱스: 분석 쿼리가 hold 행을 건너뜀
+        CREATE INDEX IF NOT EXISTS idx_trade_log_fills
+          ON trade_log(ts) WHERE percentage > 0;
+
+        -- 성과 롤업: log_trade()가 trade_log와 같은 트랜잭션에서 증분 갱신
+        CREATE TABLE IF NOT EXISTS rollup_daily (
+          bucket INTEGER PRIMARY KEY,
+          rows INTEGER, fills INTEGER, buys INTEGER, sells INTEGER,
+          closed INTEGER, wins INTEGER, pnl_sum REAL, pnl_sq_sum REAL,
+          exposure_sum REAL, open_equity REAL, last_equity REAL,
+          peak_equity REAL, max_drawdown REAL
+        );
+
+        CREATE TABLE IF NOT EXISTS rollup_hourly (
+          bucket INTEGER PRIMARY KEY,
+          rows INTEGER, fills INTEGER, buys INTEGER, sells INTEGER,
+          closed INTEGER, wins INTEGER, pnl_sum REAL, pnl_sq_sum REAL,
+          exposure_sum REAL, open_equity REAL, last_equity REAL,
+          peak_equity REAL, max_drawdown REAL
+        );
+
+        CREATE TABLE IF NOT EXISTS rollup_pattern (
+          pattern TEXT PRIMARY KEY,
+          signals INTEGER, fills INTEGER, closed INTEGER, wins INTEGER,
+          pnl_sum REAL, pnl_sq_sum REAL, last_ts REAL
+        );
+
+        CREATE TABLE IF NOT EXISTS pattern_history (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          ts REAL,
+          pattern TEXT,
+          decision TEXT,
+          result REAL
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_pattern_history_pattern
+          ON pattern_history(pattern);
+
+        -- 결과 미확정 항목만 담는 부분 인덱스 (attribution이 시간 범위로 조회)
+        CREATE INDEX IF NOT EXISTS idx_pattern_history_pending
+          ON pattern_history(ts) WHERE result IS NULL;
+
+        -- 정규화된 패턴 이름별 누적 성과 (pattern_store가 INSERT/결과 갱신 시 유지)
+        CREATE TABLE IF NOT EXISTS pattern_stats (
+          pattern_key TEXT PRIMARY KEY,
+          seen INTEGER NOT NULL DEFAULT 0,
+          count INTEGER NOT NULL DEFAULT 0,
+          wins INTEGER NOT NULL DEFAULT 0,
+          sum_ret REAL NOT NULL DEFAULT 0,
+          sum_sq REAL NOT NULL DEFAULT 0
+        );
+
+        CREATE TABLE IF NOT EXISTS rollup_state (
+          id INTEGER PRIMARY KEY CHECK(id=1),
+          entry_price REAL,
+          entry_pattern TEXT,
+          peak_equity REAL,
+          last_trade_id INTEGER
+        );
+
+        -- 매매 결과 귀속 진행 상태 (마지막 처리 trade_log.id, 미청산 포지션 첫 매수 id)
+        CREATE TABLE IF NOT EXISTS attribution_state (
+          id INTEGER PRIMARY KEY CHECK(id=1),
+          last_trade_id INTEGER NOT NULL DEFAULT 0,
+          open_since_id INTEGER NOT NULL DEFAULT 0
+        );
+
+        -- AI 반성문 작업 큐 (reflection_worker가 처리 후 reflection_log 기록·trade_log 연결)
+        CREATE TABLE IF NOT EXISTS reflection_jobs (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          created REAL NOT NULL,
+          trade_id INTEGER NOT NULL DEFAULT 0,
+          payload TEXT NOT NULL DEFAULT '{}',
+          status TEXT NOT NULL DEFAULT 'pending',
+          attempts INTEGER NOT NULL DEFAULT 0,
+          started REAL,
+          finished REAL,
+          reflection_id INTEGER,
+          error TEXT,
+          next_attempt REAL NOT NULL DEFAULT 0
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_reflection_jobs_status
+          ON reflection_jobs(status, id);
         """)
+        # next_attempt 이전에 만든 reflection_jobs에 열 추가
+        columns = {r["name"] for r in conn.execute("PRAGMA table_info(reflection_jobs)")}
+        if "next_attempt" not in columns:
+            conn.execute(
+                "ALTER TABLE reflection_jobs ADD COLUMN next_attempt REAL NOT NULL DEFAULT 0"
+            )
     except Exception as e:
         logger.exception(f"init_db: 스키마 생성 중 예외 발생: {e}")
         raise
@@ -139,12 +295,14 @@ def log_indicator(conn: sqlite3.Connection, ts: float, sma: float, atr: float,
 @with_db
 def log_trade(conn: sqlite3.Connection, ts: float, decision: str, percentage: float,
               pattern: str, reason: str, btc_balance: float, krw_balance: float,
-              avg_price: float, price: float, mode: str, reflection_id: int) -> None:
+              avg_price: float, price: float, mode: str, reflection_id: int) -> int:
     """
-    매매가 이루어질 때마다 trade_log 테이블에 기록.
+    매매가 이루어질 때마다 trade_log 테이블에 기록하고, 새 행 id를 반환 (실패 시 0).
+    - 롤업 반영은 SAVEPOINT 안에서 수행: 실패하면 롤업 변경만 되돌리고 체결 기록은 남김
+      → rollup_state.last_trade_id가 뒤처진 채 남아 다음 log_trade()가 빠진 행부터 따라잡음
     """
     try:
-        conn.execute(
+        cur = conn.execute(
             """INSERT INTO trade_log
                (ts, decision, percentage, pattern, reason,
                 btc_balance, krw_balance, avg_price, price, mode, reflection_id)
@@ -152,8 +310,129 @@ def log_trade(conn: sqlite3.Connection, ts: float, decision: str, percentage: fl
             (ts, decision, percentage, pattern, reason,
              btc_balance, krw_balance, avg_price, price, mode, reflection_id)
         )
+        trade_id = cur.lastrowid
     except Exception as e:
         logger.exception(f"log_trade: 예외 발생: {e}")
+        return 0
+
+    conn.execute("SAVEPOINT trade_rollups")
+    try:
+        applied = replay_trade_rollups(conn)
+        conn.execute("RELEASE trade_rollups")
+        if applied > 1:
+            logger.warning(f"log_trade: 뒤처진 롤업 {applied - 1}행을 함께 반영")
+    except Exception as e:
+        conn.execute("ROLLBACK TO trade_rollups")
+        conn.execute("RELEASE trade_rollups")
+        logger.exception(f"log_trade: 롤업 반영 실패 (trade_id={trade_id}) → 다음 기록 때 다시 반영: {e}")
+    return trade_id
+
+
+def replay_trade_rollups(conn: sqlite3.Connection) -> int:
+    """
+    rollup_state.last_trade_id 이후의 trade_log 행을 id 순서대로 롤업에 반영.
+    - 평소에는 방금 INSERT한 한 행만 반영 (PK 범위 조회)
+    - 롤업 테이블을 비운 뒤 호출하면 전체 재생 (rebuild_rollups)
+    - 반환값: 반영한 행 수
+    """
+    state = conn.execute("SELECT last_trade_id FROM rollup_state WHERE id=1").fetchone()
+    last_id = (state["last_trade_id"] or 0) if state else 0
+    rows = conn.execute(
+        """SELECT id, ts, decision, percentage, pattern, btc_balance,
+                  krw_balance, avg_price, price
+           FROM trade_log WHERE id > ? ORDER BY id ASC""",
+        (last_id,),
+    ).fetchall()
+    for row in rows:
+        apply_trade_rollups(
+            conn, row["id"], row["ts"], row["decision"], row["percentage"] or 0.0,
+            row["pattern"] or "", row["btc_balance"] or 0.0, row["krw_balance"] or 0.0,
+            row["avg_price"] or 0.0, row["price"] or 0.0,
+        )
+    return len(rows)
+
+
+_ROLLUP_UPSERT = """
+INSERT INTO {table} (bucket, rows, fills, buys, sells, closed, wins, pnl_sum,
+                     pnl_sq_sum, exposure_sum, open_equity, last_equity,
+                     peak_equity, max_drawdown)
+VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(bucket) DO UPDATE SET
+  rows=rows+1, fills=fills+excluded.fills, buys=buys+excluded.buys,
+  sells=sells+excluded.sells, closed=closed+excluded.closed,
+  wins=wins+excluded.wins, pnl_sum=pnl_sum+excluded.pnl_sum,
+  pnl_sq_sum=pnl_sq_sum+excluded.pnl_sq_sum,
+  exposure_sum=exposure_sum+excluded.exposure_sum,
+  last_equity=excluded.last_equity, peak_equity=excluded.peak_equity,
+  max_drawdown=MAX(max_drawdown, excluded.max_drawdown)
+"""
+
+
+def apply_trade_rollups(conn: sqlite3.Connection, trade_id: int, ts: float,
+                        decision: str, percentage: float, pattern: str,
+                        btc_balance: float, krw_balance: float,
+                        avg_price: float, price: float) -> None:
+    """
+    trade_log 한 행을 rollup_daily/hourly/pattern 테이블에 O(1)로 반영.
+    - 청산 손익(%)은 직전 체결의 평균단가 대비 계산 (rollup_state에 보관)
+    - 낙폭은 지금까지의 최고 평가금액(peak_equity) 대비 %
+    """
+    state = conn.execute(
+        "SELECT entry_price, entry_pattern, peak_equity FROM rollup_state WHERE id=1"
+    ).fetchone()
+    entry_price = state["entry_price"] if state else 0.0
+    entry_pattern = state["entry_pattern"] if state else ""
+    peak = state["peak_equity"] if state else 0.0
+
+    filled = percentage > 0 and decision in ("buy", "sell")
+    closed = filled and decision == "sell" and entry_price > 0
+    pnl = (price - entry_price) / entry_price * 100.0 if closed else 0.0
+    win = int(closed and pnl > 0)
+
+    equity = krw_balance + btc_balance * price
+    peak = max(peak, equity)
+    drawdown = (peak - equity) / peak * 100.0 if peak > 0 else 0.0
+    exposure = btc_balance * price / equity * 100.0 if equity > 0 else 0.0
+
+    for table, size in (("rollup_daily", 86400), ("rollup_hourly", 3600)):
+        conn.execute(
+            _ROLLUP_UPSERT.format(table=table),
+            (int(ts // size) * size, int(filled), int(filled and decision == "buy"),
+             int(filled and decision == "sell"), int(closed), win, pnl, pnl * pnl,
+             exposure, equity, equity, peak, drawdown),
+        )
+
+    if pattern:
+        conn.execute(
+            """INSERT INTO rollup_pattern
+               (pattern, signals, fills, closed, wins, pnl_sum, pnl_sq_sum, last_ts)
+               VALUES (?, 1, ?, 0, 0, 0.0, 0.0, ?)
+               ON CONFLICT(pattern) DO UPDATE SET
+                 signals=signals+1, fills=fills+excluded.fills, last_ts=excluded.last_ts""",
+            (pattern, int(filled), ts),
+        )
+    if closed and entry_pattern:
+        conn.execute(
+            """INSERT INTO rollup_pattern
+               (pattern, signals, fills, closed, wins, pnl_sum, pnl_sq_sum, last_ts)
+               VALUES (?, 0, 0, 1, ?, ?, ?, ?)
+               ON CONFLICT(pattern) DO UPDATE SET
+                 closed=closed+1, wins=wins+excluded.wins,
+                 pnl_sum=pnl_sum+excluded.pnl_sum,
+                 pnl_sq_sum=pnl_sq_sum+excluded.pnl_sq_sum""",
+            (entry_pattern, win, pnl, pnl * pnl, ts),
+        )
+
+    if filled:
+        entry_price, entry_pattern = avg_price, pattern
+    conn.execute(
+        """INSERT INTO rollup_state (id, entry_price, entry_pattern, peak_equity, last_trade_id)
+           VALUES (1, ?, ?, ?, ?)
+           ON CONFLICT(id) DO UPDATE SET
+             entry_price=excluded.entry_price, entry_pattern=excluded.entry_pattern,
+             peak_equity=excluded.peak_equity, last_trade_id=excluded.last_trade_id""",
+        (entry_price, entry_pattern, peak, trade_id),
+    )
 
 
 @with_db
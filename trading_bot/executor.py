@@ -3,7 +3,7 @@
 import time
 import os
 import logging
-from typing import Tuple
+from typing import Callable, Optional, Tuple
 
 import pyupbit
 import requests
@@ -27,10 +27,14 @@ logger = logging.getLogger(__name__)
 
 
 def execute_trade(
-    ctx, buy_sig: bool, sell_sig: bool, pattern: str
+    ctx, buy_sig: bool, sell_sig: bool, pattern: str,
+    ticker: str = TICKER,
+    save: Optional[Callable[[float, float, float], None]] = None,
 ) -> Tuple[bool, float]:
     """
     실제 주문 실행 (시장가) + 동적 포지션 사이징 (ATR 기반 리스크 관리)
+    - ticker: 주문할 마켓 (ctx.btc는 그 마켓 코인의 보유 수량)
+    - save: 가상 모드 체결 후 (krw, qty, avg_price) 저장 함수 (기본 save_account)
     return: (executed, pct_of_equity)
     """
     executed = False
@@ -60,7 +64,7 @@ def execute_trade(
                             os.getenv("UPBIT_ACCESS_KEY", ""),
                             os.getenv("UPBIT_SECRET_KEY", ""),
                         )
-                        upbit.buy_market_order(TICKER, amt_krw)
+                        upbit.buy_market_order(ticker, amt_krw)
                     except Exception as e:
                         logger.exception(f"Upbit 매수 주문 실패: {e}")
                         executed = False  # 주문 실패 시 False 로 재설정
@@ -86,7 +90,7 @@ def execute_trade(
                             os.getenv("UPBIT_ACCESS_KEY", ""),
                             os.getenv("UPBIT_SECRET_KEY", ""),
                         )
-                        upbit.sell_market_order(TICKER, qty)
+                        upbit.sell_market_order(ticker, qty)
                     except Exception as e:
                         logger.exception(f"Upbit 매도 주문 실패: {e}")
                         executed = False
@@ -99,12 +103,12 @@ def execute_trade(
 
         # 실제 모드 주문 후 잔고 재동기화
         if LIVE_MODE and executed:
-            new_krw, new_btc, new_avg = sync_account_upbit()
+            new_krw, new_btc, new_avg = sync_account_upbit(ticker.split("-")[-1])
             ctx.krw, ctx.btc, ctx.avg_price = new_krw, new_btc, new_avg
             if ctx.btc == 0:
                 ctx.avg_price = 0.0
         elif executed:
-            save_account(ctx.krw, ctx.btc, ctx.avg_price)
+            (save or save_account)(ctx.krw, ctx.btc, ctx.avg_price)
 
     except Exception as e:
         logger.exception(f"execute_trade() 예외 발생: {e}")
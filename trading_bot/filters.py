@@ -1,27 +1,48 @@
 import logging
+from typing import Iterable
+
+import numpy as np
 import pandas as pd
 
-from trading_bot.noise_filters import is_rule_based_noise
+from trading_bot.noise_filters import is_rule_based_noise, rule_noise_history
+from trading_bot.noise_detector import AMBIGUOUS, NOISE, score_history, score_last_bar
 from trading_bot.ai_helpers import ask_noise_filter
 from trading_bot.config import AI_NOISE_VOL_THRESHOLD
 
 logger = logging.getLogger(__name__)
 
+# filter_noise_history 판정 값
+RULE_NOISE, LOCAL_NOISE, ASK_AI, PASS = "rule_noise", "local_noise", "ask_ai", "pass"
+
+
+def _ask_ai(df_last5: pd.DataFrame) -> bool:
+    try:
+        if ask_noise_filter(df_last5):
+            logger.info("AI 기반 노이즈 감지: 매매 스킵")
+            return True
+    except Exception:
+        logger.exception("filter_noise: ask_noise_filter 호출 중 예외 발생 → 노이즈 아님 처리")
+    return False
+
 
-def filter_noise(df_last5: pd.DataFrame) -> bool:
+def filter_noise(df_recent: pd.DataFrame) -> bool:
     """
-    - df_last5: 반드시 최근 5봉(df_last5.index[-5:] 형태)이어야 함.
+    - df_recent: 최근 봉들 (시간순, 마지막 행이 판정 대상). 룰 기반 검사와 AI 질의는 마지막 5봉,
+      로컬 통계 판정(noise_detector)은 최대 NOISE_WINDOW+1봉을 사용.
     - 행이 5 미만이거나 컬럼이 누락된 경우 False 반환 (노이즈가 아닌 것으로 간주).
+    - 로컬 판정이 noise/clean이면 AI 없이 결정하고, ambiguous일 때만 AI에 질의.
+      봉이 부족해 로컬 판정을 못 하면 기존처럼 거래량 급감 시에만 AI 호출.
     """
     # 1) 입력 데이터 유효성 검사
     required_cols = {"open", "high", "low", "close", "volume"}
-    if df_last5 is None or df_last5.shape[0] < 5:
-        logger.warning(f"filter_noise: DataFrame 행 개수 부족 ({df_last5.shape[0] if df_last5 is not None else 0} < 5) → 스킵")
+    if df_recent is None or df_recent.shape[0] < 5:
+        logger.warning(f"filter_noise: DataFrame 행 개수 부족 ({df_recent.shape[0] if df_recent is not None else 0} < 5) → 스킵")
         return False
-    if not required_cols.issubset(df_last5.columns):
-        missing = required_cols - set(df_last5.columns)
+    if not required_cols.issubset(df_recent.columns):
+        missing = required_cols - set(df_recent.columns)
         logger.warning(f"filter_noise: 필수 컬럼 누락 {missing} → 스킵")
         return False
+    df_last5 = df_recent.iloc[-5:]
 
     # 2) 룰 기반 노이즈 검사
     try:
@@ -32,28 +53,101 @@ def filter_noise(df_last5: pd.DataFrame) -> bool:
     except Exception:
         logger.exception("filter_noise: is_rule_based_noise 호출 중 예외 발생 → 노이즈 아님 처리")
 
-    # 3) AI 호출 전 볼륨 통계 확인
+    # 3) 로컬 통계 판정 (median/MAD z-score, OHLC 정합성, 시간 간격)
+    try:
+        score = score_last_bar(df_recent)
+    except Exception:
+        logger.exception("filter_noise: score_last_bar 호출 중 예외 발생 → 거래량 기준으로 진행")
+        score = None
+    if score is not None:
+        logger.info(
+            f"filter_noise: 로컬 판정 {score.label} (신뢰도 {score.confidence:.5f}, "
+            f"근거 {', '.join(score.reasons) or '-'})"
+        )
+        if score.label == NOISE:
+            logger.info("로컬 통계 노이즈 감지: 매매 스킵")
+            return True
+        if score.label == AMBIGUOUS:
+            return _ask_ai(df_last5)
+        return False
+
+    # 4) 로컬 판정 불가 → 거래량 급감(임계치 이하) 시 AI 호출
     last_vol = df_last5.iloc[-1]["volume"]
     prev4_vol = df_last5.iloc[:-1]["volume"].dropna()
     avg_vol4 = prev4_vol.mean() if not prev4_vol.empty else 0
 
-    # 4) 거래량 급감(임계치 이하) 시 AI 호출
     if avg_vol4 > 0 and last_vol <= avg_vol4 * AI_NOISE_VOL_THRESHOLD:
         logger.debug(
             f"filter_noise: 거래량 급감 감지 (last_vol={last_vol:.2f}, avg_vol4={avg_vol4:.2f}, "
             f"threshold={AI_NOISE_VOL_THRESHOLD})"
         )
-        try:
-            is_noise_ai = ask_noise_filter(df_last5)
-            if is_noise_ai:
-                logger.info("AI 기반 노이즈 감지: 매매 스킵")
-                return True
-        except Exception:
-            logger.exception("filter_noise: ask_noise_filter 호출 중 예외 발생 → 노이즈 아님 처리")
-    else:
-        logger.debug(
-            f"filter_noise: AI 호출 불필요 (last_vol={last_vol:.2f}, avg_vol4={avg_vol4:.2f}, "
-            f"기준 {avg_vol4 * AI_NOISE_VOL_THRESHOLD:.2f} 이상)"
-        )
-
+        return _ask_ai(df_last5)
+    logger.debug(
+        f"filter_noise: AI 호출 불필요 (last_vol={last_vol:.2f}, avg_vol4={avg_vol4:.2f}, "
+        f"기준 {avg_vol4 * AI_NOISE_VOL_THRESHOLD:.2f} 이상)"
+    )
     return False
+
+
+def filter_noise_history(df: pd.DataFrame, local: pd.DataFrame | None = None,
+                         vol_threshold: float | None = None,
+                         range_threshold: float | None = None) -> pd.DataFrame:
+    """
+    모든 봉에 대해 filter_noise(df.iloc[i - NOISE_WINDOW:i + 1])가 내릴 판정을 벡터 연산으로 계산.
+    - decision: rule_noise(룰 스킵) / local_noise(로컬 통계 스킵) / ask_ai(AI 질의) / pass(통과)
+      AI 답은 알 수 없으므로 ask_ai로 남김
+    - local: score_history(df) 결과 (임계치 스윕에서 재사용, 생략 시 계산)
+    - vol_threshold/range_threshold: 룰 임계치 (생략 시 NOISE_VOL_THRESHOLD/PRICE_RANGE_THRESHOLD)
+    """
+    rule = rule_noise_history(df, vol_threshold, range_threshold)
+    if local is None:
+        local = score_history(df)
+    label = local["label"].to_numpy(dtype=object)
+    volume = df["volume"].to_numpy(dtype=float)
+    avg_vol4 = rule["avg_vol4"].to_numpy()
+
+    # 로컬 판정 불가 구간은 기존 거래량 급감 기준으로 AI 호출
+    fallback_ai = (avg_vol4 > 0) & (volume <= avg_vol4 * AI_NOISE_VOL_THRESHOLD)
+    decision = np.select(
+        [
+            np.arange(len(df)) < 4,
+            rule["is_noise"].to_numpy(),
+            label == NOISE,
+            label == AMBIGUOUS,
+            pd.isna(label) & fallback_ai,
+        ],
+        [PASS, RULE_NOISE, LOCAL_NOISE, ASK_AI, ASK_AI],
+        default=PASS,
+    )
+    return pd.DataFrame({"decision": decision, "score": local["score"]}, index=df.index)
+
+
+def sweep_noise_thresholds(df: pd.DataFrame, vol_thresholds: Iterable[float],
+                           range_thresholds: Iterable[float]) -> pd.DataFrame:
+    """
+    NOISE_VOL_THRESHOLD × PRICE_RANGE_THRESHOLD 조합별로 전체 히스토리 판정 비율을 계산.
+    - 로컬 통계 판정은 임계치와 무관하므로 한 번만 계산해 재사용
+    - 열: rule_skip/local_skip/ask_ai/skip(룰+로컬) 비율, 스킵·통과 봉의 다음 봉 |수익률| 평균
+      (스킵 봉의 다음 봉 변동이 크면 실제 급변을 걸러내고 있다는 신호)
+    """
+    local = score_history(df)
+    close = df["close"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        next_abs_ret = np.abs(np.concatenate([np.diff(np.log(close)), [np.nan]]))
+
+    rows = []
+    for vol_thr in vol_thresholds:
+        for range_thr in range_thresholds:
+            decision = filter_noise_history(df, local, vol_thr, range_thr)["decision"].to_numpy()
+            skip = (decision == RULE_NOISE) | (decision == LOCAL_NOISE)
+            rows.append({
+                "vol_threshold": vol_thr,
+                "range_threshold": range_thr,
+                "rule_skip": float(np.mean(decision == RULE_NOISE)),
+                "local_skip": float(np.mean(decision == LOCAL_NOISE)),
+                "ask_ai": float(np.mean(decision == ASK_AI)),
+                "skip": float(np.mean(skip)),
+                "skip_next_abs_ret": float(np.nanmean(next_abs_ret[skip])) if skip.any() else np.nan,
+                "pass_next_abs_ret": float(np.nanmean(next_abs_ret[~skip])) if (~skip).any() else np.nan,
+            })
+    return pd.DataFrame(rows)
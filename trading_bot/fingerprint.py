@@ -0,0 +1,73 @@
+# trading_bot/fingerprint.py
+
+import hashlib
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+# ──────────────────────────────────────────────────────────────────────
+# DataFrame 내용 지문 (AI 캐시 키용)
+# - 인덱스와 컬럼의 원시 int64/float64 버퍼를 blake2b(16바이트)로 해시
+# - 문자열 직렬화(to_json/astype(str))를 거치지 않으므로 빠르고 키 길이가 고정
+# - 리틀엔디언 고정 + 날짜는 UTC 기준 ns → 프로세스/플랫폼/pandas 버전과 무관하게 동일
+# ──────────────────────────────────────────────────────────────────────
+
+# 해시 규칙을 바꾸면 올려서 기존 캐시 키와 섞이지 않게 함
+FINGERPRINT_VERSION = b"fp1"
+DIGEST_SIZE = 16
+
+_SEP = b"\x1f"
+
+
+def _index_bytes(index: pd.Index) -> bytes:
+    if isinstance(index, pd.DatetimeIndex):
+        idx = index.tz_convert("UTC").tz_localize(None) if index.tz is not None else index
+        return b"dt" + idx.as_unit("ns").asi8.astype("<i8").tobytes()
+    if pd.api.types.is_integer_dtype(index.dtype):
+        return b"i8" + np.asarray(index, dtype="<i8").tobytes()
+    if pd.api.types.is_float_dtype(index.dtype):
+        return b"f8" + np.asarray(index, dtype="<f8").tobytes()
+    return b"str" + _SEP.join(str(v).encode("utf-8") for v in index)
+
+
+def _column_bytes(s: pd.Series) -> bytes:
+    if pd.api.types.is_bool_dtype(s.dtype) or pd.api.types.is_integer_dtype(s.dtype):
+        if not s.isna().any():
+            return b"i8" + s.to_numpy(dtype="<i8").tobytes()
+    if pd.api.types.is_numeric_dtype(s.dtype):
+        arr = s.to_numpy(dtype="<f8", na_value=np.nan)
+        # NaN 비트 패턴을 하나로 통일
+        arr = np.where(np.isnan(arr), np.nan, arr).astype("<f8")
+        return b"f8" + arr.tobytes()
+    if isinstance(s.dtype, pd.DatetimeTZDtype) or pd.api.types.is_datetime64_dtype(s.dtype):
+        return b"dt" + _index_bytes(pd.DatetimeIndex(s))
+    return b"str" + _SEP.join(
+        b"\x00" if pd.isna(v) else str(v).encode("utf-8") for v in s.tolist()
+    )
+
+
+def frame_fingerprint(df: Optional[pd.DataFrame], columns: Optional[Iterable[str]] = None,
+                      rows: Optional[int] = None) -> str:
+    """
+    DataFrame의 (마지막 rows개 행의) 인덱스 + 지정 컬럼 내용을 16바이트 blake2b hex로 반환.
+    - columns 생략 시 전체 컬럼, 없는 컬럼은 '누락' 표시로 해시에 반영
+    - 숫자 컬럼은 float64/int64 버퍼, 그 외 컬럼은 문자열을 구분자로 이어 해시
+    - None이나 빈 DataFrame도 고정된 지문을 가짐
+    """
+    h = hashlib.blake2b(FINGERPRINT_VERSION, digest_size=DIGEST_SIZE)
+    if df is None:
+        h.update(b"none")
+        return h.hexdigest()
+    if rows is not None:
+        df = df.iloc[-rows:] if rows > 0 else df.iloc[0:0]
+
+    h.update(len(df).to_bytes(8, "little"))
+    h.update(_index_bytes(df.index))
+    for col in (list(df.columns) if columns is None else columns):
+        h.update(_SEP + str(col).encode("utf-8") + _SEP)
+        if col in df.columns:
+            h.update(_column_bytes(df[col]))
+        else:
+            h.update(b"missing")
+    return h.hexdigest()
@@ -4,7 +4,6 @@ import logging
 from ta.trend import SMAIndicator, EMAIndicator
 from ta.volatility import AverageTrueRange
 from ta.momentum import RSIIndicator
-from ta.utils import dropna
 
 from trading_bot.config import EMA_FAST_WINDOW, EMA_SLOW_WINDOW, RSI_WINDOW, ATR_WINDOW
 
@@ -21,7 +20,8 @@ def calc_indicators_1h(df: pd.DataFrame) -> pd.DataFrame:
       - MACD diff를 계산하려면 MACDIndicator를 import하거나 직접 계산
     """
     try:
-        df2 = dropna(df.copy())
+        # 입력은 수집 단계(ohlcv_validation)에서 검증된 봉 → 결측 제거 없이 복사만
+        df2 = df.copy()
 
         # (1) 1시간봉 SMA50
         df2["sma50_1h"] = SMAIndicator(
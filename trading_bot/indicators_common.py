@@ -3,7 +3,6 @@
 import pandas as pd
 from ta.trend import SMAIndicator, MACD
 from ta.volatility import AverageTrueRange
-from ta.utils import dropna
 import logging
 
 from trading_bot.config import SMA_WINDOW, ATR_WINDOW
@@ -19,8 +18,8 @@ def calc_indicators_15m(df: pd.DataFrame) -> pd.DataFrame:
       - MACD diff
     """
     try:
-        # NaN 제거 및 복사
-        df2 = dropna(df.copy())
+        # 입력은 수집 단계(ohlcv_validation)에서 검증된 봉 → 결측 제거 없이 복사만
+        df2 = df.copy()
 
         # (1) SMA
         df2["sma"] = SMAIndicator(
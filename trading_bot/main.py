@@ -15,19 +15,25 @@ from trading_bot.filters import filter_noise
 from trading_bot.indicators_common import calc_indicators_15m
 from trading_bot.indicators_1h import calc_indicators_1h
 from trading_bot.patterns import check_rule_patterns, check_ai_patterns
-from trading_bot.strategies import apply_strategy_A, apply_strategy_B
+from trading_bot.strategies import apply_strategy_A, apply_strategy_B, check_trend_1h
 from trading_bot.executor import execute_trade, log_and_notify
 
 from trading_bot.account_sync import sync_account_upbit
+from trading_bot.ai_client import cycle_budget, submit
+from trading_bot.ai_helpers import ask_candle_patterns
+from trading_bot.attribution import attribute_new_trades
+from trading_bot.config_service import get_service, reload_config
+from trading_bot.pattern_prefetch import next_close, run_prefetch, sleep_until
+from trading_bot.ohlcv_gaps import lookback_complete, repair_gaps
+from trading_bot.ohlcv_store import index_to_epoch, interval_seconds
+from trading_bot.reflection_worker import drain as drain_reflection_jobs, enqueue_reflection
 from trading_bot.db_helpers import (
     init_db,
     load_account,
     save_account,
     log_indicator,
     log_trade,
-    log_reflection,
     has_indicator,
-    get_recent_trades,
     get_last_reflection_ts,
     prune_old_logs,
 )
@@ -36,15 +42,20 @@ import trading_bot.config as cfg
 from trading_bot.config import (
     LIVE_MODE,
     TICKER,
+    INTERVAL,
     MIN_ORDER_KRW,
     VOLUME_SPIKE_THRESHOLD,
-    RSI_OVERRIDE,
-    MACD_1H_THRESHOLD,
-    FG_EXTREME_FEAR,
+    REFLECTION_INTERVAL_HOURS,
     REFLECTION_INTERVAL_SEC,
-    REFLECTION_RECURSIVE,
+    REFLECTION_WORKER_INLINE,
+    DAEMON_CLOSE_DELAY_SEC,
+    PATTERN_PREFETCH,
+    PATTERN_PREFETCH_LEAD_SEC,
     LOG_DIR,
     LOG_RETENTION_ROWS,
+    NOISE_WINDOW,
+    OHLCV_LOOKBACK_BARS,
+    GAP_REPAIR,
 )
 
 # 디버그 로그가 보이도록 레벨을 DEBUG로 설정
@@ -63,7 +74,7 @@ cfg.log_env_info()
 logger = logging.getLogger(__name__)
 
 
-def ai_trading():
+def ai_trading(use_cache: bool = True):
     logger.info("=== ai_trading() 시작 ===")
 
     # 1) DB 초기화
@@ -72,11 +83,17 @@ def ai_trading():
     logger.info("1) DB 초기화 완료 및 로그 정리")
 
     # 2) 15분봉 + 1시간봉 데이터 로드
-    df_15m = fetch_data_15m()
+    df_15m = fetch_data_15m(use_cache=use_cache)
     if df_15m is None or df_15m.empty:
         logger.error("15분봉 데이터 로드 실패 → 종료")
         return
     logger.info(f"2) 15분봉 데이터 로드 완료 (count={len(df_15m)})")
+    last_ts = int(index_to_epoch(df_15m.index[-1:])[0])
+    if not lookback_complete(TICKER, INTERVAL, last_ts, OHLCV_LOOKBACK_BARS):
+        logger.warning(
+            f"   ohlcv 테이블의 직전 {OHLCV_LOOKBACK_BARS}봉에 빈 구간 있음 "
+            "(사이클 뒤 repair_gaps로 복구)"
+        )
     df_1h_raw = fetch_data_1h(TICKER, count=100)
     if df_1h_raw is not None:
         df_1h = calc_indicators_1h(df_1h_raw)
@@ -85,10 +102,25 @@ def ai_trading():
         df_1h = None
         logger.info("   1시간봉 데이터 없음")
 
-    # 3) 노이즈 필터
-    df_last5 = df_15m.iloc[-5:].copy()
+    # 2-1) 반성문 주기 도래 여부 계산 (AI 패턴 검사도 이 주기에만 실행)
+    now = time.time()
+    try:
+        last_reflection = get_last_reflection_ts()
+    except Exception as e:
+        logger.exception("get_last_reflection_ts 예외: %s", e)
+        last_reflection = 0.0
+    should_reflect = now - last_reflection >= REFLECTION_INTERVAL_SEC
+
+    # 2-2) AI 패턴 태깅은 노이즈 판정과 독립적이므로 먼저 동시에 시작
+    #      (결과는 ai_cache에 저장되어 9)의 check_ai_patterns가 그대로 재사용)
+    tag_future = None
+    if should_reflect:
+        tag_future = submit(ask_candle_patterns, df_15m.dropna().iloc[-100:])
+
+    # 3) 노이즈 필터 (룰·AI는 마지막 5봉, 로컬 통계 판정은 직전 NOISE_WINDOW봉과 비교)
+    df_recent = df_15m.iloc[-(NOISE_WINDOW + 1):].copy()
     logger.info("3) 노이즈 필터 진입")
-    if filter_noise(df_last5):
+    if filter_noise(df_recent):
         logger.info("3) filter_noise()가 True를 반환하여 종료")
         return
     logger.info("3) 노이즈 필터 통과")
@@ -125,15 +157,6 @@ def ai_trading():
     # 5-1) 공포·탐욕 지수 가져오기 (캐시 기반 최대 하루 1회)
     fear_idx = get_fear_and_greed() or 0
 
-    # 5-2) 반성문 주기 도래 여부 계산
-    now = time.time()
-    try:
-        last_reflection = get_last_reflection_ts()
-    except Exception as e:
-        logger.exception("get_last_reflection_ts 예외: %s", e)
-        last_reflection = 0.0
-    should_reflect = now - last_reflection >= REFLECTION_INTERVAL_SEC
-
     equity = krw + btc * price
 
     ctx = SignalContext(
@@ -165,38 +188,13 @@ def ai_trading():
         return
 
     # 7) 상위 차트(1시간봉) 추세 필터 + 예외 조건(RSI, MACD, Fear)
+    trend_ok, trend_detail = check_trend_1h(ctx)
+    if not trend_ok:
+        logger.info(f"⏸ 거래 보류: {trend_detail}")
+        log_and_notify(ctx, False, False, "sma50_filter", False, 0.0)
+        return
     if ctx.df_1h is not None:
-        sma50_1h = float(ctx.last_1h["sma50_1h"])
-        rsi_1h = float(ctx.last_1h["rsi_1h"])
-        macd_1h = float(ctx.last_1h["macd_diff_1h"])
-        fear = int(ctx.fear_idx)
-
-        # ① 디버깅용 로그: 실제 지표값이 어떻게 나오는지 확인
-        logger.debug(
-            f"[1h 필터 직전] price={ctx.price:.0f}, sma50_1h={sma50_1h:.0f}, "
-            f"rsi_1h={rsi_1h:.1f}, macd_1h={macd_1h:.1f}, fear={fear}"
-        )
-
-        if ctx.price < sma50_1h:
-            # 예외 1) 1h RSI가 RSI_OVERRIDE 이하
-            cond_rsi = rsi_1h <= RSI_OVERRIDE
-            # 예외 2) 1h MACD diff 절대값 ≤ MACD_1H_THRESHOLD
-            cond_macd = abs(macd_1h) <= MACD_1H_THRESHOLD
-            # 예외 3) Fear ≤ FG_EXTREME_FEAR
-            cond_fear = fear <= FG_EXTREME_FEAR
-
-            if not (cond_rsi or cond_macd or cond_fear):
-                logger.info(
-                    f"⏸ 거래 보류: 현재가 {ctx.price:.0f} < 1h SMA50 {sma50_1h:.0f} "
-                    f"(RSI={rsi_1h:.1f}/{RSI_OVERRIDE}, |MACD1h|={abs(macd_1h):.2f}/{MACD_1H_THRESHOLD}, Fear={fear}/{FG_EXTREME_FEAR})"
-                )
-                log_and_notify(ctx, False, False, "sma50_filter", False, 0.0)
-                return
-            else:
-                logger.info(
-                    "1h SMA50 아래이지만 예외 조건 충족 → 진행 "
-                    f"(RSI={rsi_1h:.1f}/{RSI_OVERRIDE}, |MACD1h|={abs(macd_1h):.2f}/{MACD_1H_THRESHOLD}, Fear={fear}/{FG_EXTREME_FEAR})"
-                )
+        logger.info(trend_detail)
 
     # 8) 룰 기반 패턴
     df3 = ctx.df_15m.iloc[-3:][["open", "high", "low", "close", "volume"]]
@@ -206,6 +204,8 @@ def ai_trading():
 
     # 9) AI 복합 패턴 (룰 기반 신호 없을 때, 반성문 시점에만 실행)
     if not (buy_sig or sell_sig) and should_reflect:
+        if tag_future is not None:
+            tag_future.result()  # 2-2)에서 시작한 태깅 완료 대기 → 캐시 적중
         buy_ai, sell_ai, pat_ai = check_ai_patterns(ctx)
         if buy_ai or sell_ai:
             buy_sig, sell_sig, pattern = buy_ai, sell_ai, pat_ai
@@ -255,36 +255,8 @@ def ai_trading():
     executed, pct_used = execute_trade(ctx, buy_sig, sell_sig, pattern)
     logger.info(f"12) execute_trade() 결과: executed={executed}, pct={pct_used:.2f}%")
 
-    # ── "AI 반성문"은 매매 여부와 무관하게 주기적으로 실행 ───────────────────
-    reflection_id = 0
-    if should_reflect:
-        try:
-            recent_trades = get_recent_trades(limit=20)
-            from trading_bot.ai_helpers import ask_ai_reflection, apply_to_env
-
-            chart_recent = ctx.df_15m.tail(100)
-            reflection_text, updates = ask_ai_reflection(
-                recent_trades,
-                ctx.fear_idx,
-                chart_recent,
-                recursive=REFLECTION_RECURSIVE,
-            )
-            if reflection_text:
-                reflection_id = log_reflection(time.time(), reflection_text)
-                logger.info(f"반성문 저장 완료 (reflection_id={reflection_id})")
-            if updates:
-                apply_to_env(updates)
-                logger.info(f".env 업데이트: {updates}")
-        except Exception as e:
-            logger.exception(f"반성문 생성/저장 중 예외 발생: {e}")
-            reflection_id = 0
-    else:
-        logger.info(
-            "반성문 건너뜀: 마지막 작성 이후 %.1f시간 미만",
-            REFLECTION_INTERVAL_SEC / 3600,
-        )
-    # ── trade_log 기록 (반성문 ID 포함) ─────────────────────────────────────────────
-    log_trade(
+    # ── trade_log 기록 (반성문 ID는 reflection_worker가 작성 후 연결) ─────────────────
+    trade_id = log_trade(
         time.time(),
         "buy" if buy_sig else ("sell" if sell_sig else "hold"),
         pct_used,
@@ -295,9 +267,25 @@ def ai_trading():
         ctx.avg_price,
         ctx.price,
         ("live" if LIVE_MODE else "virtual"),
-        reflection_id,
+        0,
     )
 
+    # ── "AI 반성문"은 매매 여부와 무관하게 주기적으로 작업 큐에 등록 ─────────────────
+    #    (AI 호출은 매매 기록·알림 이후 reflection_worker가 처리)
+    if should_reflect:
+        try:
+            job_id = enqueue_reflection(trade_id, {"fear_idx": int(ctx.fear_idx)})
+            logger.info(f"반성문 작업 등록 (job_id={job_id}, trade_id={trade_id})")
+        except Exception as e:
+            logger.exception(f"반성문 작업 등록 중 예외 발생: {e}")
+    else:
+        logger.info(
+            "반성문 건너뜀: 마지막 작성 이후 %.1f시간 미만",
+            REFLECTION_INTERVAL_HOURS,
+        )
+
+    # ── 새 체결의 실현 손익을 패턴 기록(pattern_history)에 귀속 ─────────────────────
+    attribute_new_trades()
 
     # ── Discord 알림 호출 ───────────────────────────────────────────────────────────
     log_and_notify(ctx, buy_sig, sell_sig, pattern, executed, pct_used)
@@ -305,21 +293,17 @@ def ai_trading():
     logger.info("=== ai_trading() 종료 ===")
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Auto trading bot (intraday only)")
-    parser.add_argument(
-        "--mode",
-        choices=["intraday"],
-        default="intraday",
-        help="Trading mode: 'intraday' (15분봉 인트라데이)",
-    )
-    args = parser.parse_args()
-
-    # 전체 ai_trading()을 최대 3회 재시도 루프로 감싸기
+def run_cycle(use_cache: bool = True) -> bool:
+    """
+    ai_trading() 1회 실행 (네트워크 오류 시 최대 3회 재시도) 후 반성문 작업 처리.
+    - 반환값: 사용자 중단(Ctrl+C) 시 False
+    """
     max_retries = 3
     for attempt in range(1, max_retries + 1):
         try:
-            ai_trading()
+            # 사이클 전체 AI 호출 시간 예산: 초과 시 남은 요청 취소 후 기본값(hold)으로 진행
+            with cycle_budget():
+                ai_trading(use_cache=use_cache)
             break
         except requests.RequestException as e:
             logger.error(
@@ -331,7 +315,7 @@ def main():
                 logger.error("최대 재시도 횟수 초과, 프로그램 종료")
         except KeyboardInterrupt:
             logger.info("사용자 중단(Ctrl+C)")
-            break
+            return False
         except Exception as e:
             logger.error("Unexpected error: %s", e, exc_info=True)
             from trading_bot.config import DISCORD_WEBHOOK
@@ -345,6 +329,74 @@ def main():
                     logger.exception(f"Discord 알림 중 예외 발생: {post_err}")
             break
 
+    # 매매 기록·알림이 모두 끝난 뒤 같은 프로세스에서 반성문 작업 처리
+    # (REFLECTION_WORKER_INLINE=false면 별도 reflection_worker 프로세스가 처리)
+    if REFLECTION_WORKER_INLINE:
+        drain_reflection_jobs()
+    # 매매 결정 뒤 남는 시간에 ohlcv 빈 구간만 다시 받기 (요청 수 상한 있음)
+    if GAP_REPAIR:
+        try:
+            repair_gaps(TICKER, INTERVAL)
+        except Exception as e:
+            logger.exception(f"repair_gaps 중 예외 발생: {e}")
+    return True
+
+
+def run_daemon() -> None:
+    """
+    상주 모드: 봉 마감마다 사이클 실행.
+    - 사이클과 마감 사이(마감 PATTERN_PREFETCH_LEAD_SEC초 전)에 AI 패턴 태깅을 선행 계산
+    - 사이클 시작 전마다 .env 변경(반성문 뒤 apply_to_env 등)을 검증해 반영 (재시작·캐시 초기화 없음)
+    """
+    interval_sec = interval_seconds(INTERVAL)
+    get_service()  # 현재 .env 상태를 기준으로 감시 시작
+    logger.info(
+        f"상주 모드 시작: INTERVAL={INTERVAL} ({interval_sec}s), "
+        f"선행 태깅={'on' if PATTERN_PREFETCH else 'off'} (마감 {PATTERN_PREFETCH_LEAD_SEC:.0f}s 전)"
+    )
+    try:
+        while True:
+            reload_config()
+            if not run_cycle(use_cache=False):
+                break
+            close_ts = next_close(time.time(), interval_sec)
+            if PATTERN_PREFETCH:
+                sleep_until(close_ts - PATTERN_PREFETCH_LEAD_SEC)
+                run_prefetch(close_ts)
+            sleep_until(close_ts + DAEMON_CLOSE_DELAY_SEC)
+    except KeyboardInterrupt:
+        logger.info("사용자 중단(Ctrl+C)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auto trading bot (intraday only)")
+    parser.add_argument(
+        "--mode",
+        choices=["intraday"],
+        default="intraday",
+        help="Trading mode: 'intraday' (15분봉 인트라데이)",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="cron 대신 상주하며 봉 마감마다 실행 (AI 패턴 태깅 선행 계산 포함)",
+    )
+    parser.add_argument(
+        "--markets",
+        action="store_true",
+        help="TICKERS의 여러 마켓을 동시에 처리 (다중 마켓 엔진, --daemon과 함께 사용 가능)",
+    )
+    args = parser.parse_args()
+
+    if args.markets:
+        from trading_bot.markets import run_markets
+
+        run_markets(daemon=args.daemon)
+    elif args.daemon:
+        run_daemon()
+    else:
+        run_cycle()
+
 
 if __name__ == "__main__":
     main()
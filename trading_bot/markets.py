@@ -0,0 +1,450 @@
+# trading_bot/markets.py
+
+import argparse
+import asyncio
+import contextvars
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from trading_bot.ai_client import cycle_budget
+from trading_bot.config_service import get_service, reload_config
+from trading_bot.config import (
+    DAEMON_CLOSE_DELAY_SEC,
+    INTERVAL,
+    LIVE_MODE,
+    MARKET_DECISION_TIMEOUT_SEC,
+    MARKET_MAX_SHARE,
+    MARKET_WORKERS,
+    NOISE_WINDOW,
+    TICKER,
+    TICKERS,
+)
+from trading_bot.context import SignalContext
+from trading_bot.data_fetcher import fetch_data_1h, fetch_market_15m
+from trading_bot.db_helpers import init_db, load_account, with_db
+from trading_bot.executor import execute_trade
+from trading_bot.filters import filter_noise
+from trading_bot.indicators_1h import calc_indicators_1h
+from trading_bot.indicators_common import calc_indicators_15m
+from trading_bot.ohlcv_store import interval_seconds
+from trading_bot.pattern_prefetch import next_close, sleep_until
+from trading_bot.strategies import check_trend_1h, rule_signals
+from trading_bot.utils import get_fear_and_greed
+
+logger = logging.getLogger(__name__)
+
+# ──────────────────────────────────────────────────────────────────────
+# 다중 마켓 동시 매매 엔진 (`python -m trading_bot.main --markets`)
+# - TICKERS의 마켓마다 asyncio 태스크 1개, 블로킹 작업(시세 요청·지표·DB)은 공용 스레드 풀에서 실행
+#   (시세 요청은 data_fetcher의 요청 간격 제한을 모든 마켓이 공유)
+# - 마켓별 상태(MarketState): 봉은 ohlcv 테이블(ticker 키), 1시간봉 지표는 정시가 바뀔 때만 다시 받음
+# - 처리한 봉 장부(market_ledger): (ticker, ts_end)를 먼저 선점한 쪽만 판정 → 중복 매매 방지
+# - 보유 수량은 positions 테이블(마켓별), KRW는 account 한 행을 모든 마켓이 공유
+#   1단계(동시): 봉·지표 준비 → 최신 가격으로 평가금액 계산
+#   2단계(동시): 판정·주문. 매수 금액은 KrwAllocator가 마켓별 상한(평가금액 × 비중) 안에서 예약
+# - 봉 마감 후 MARKET_DECISION_TIMEOUT_SEC 안에 주문 단계에 닿지 못한 마켓은 이번 봉을 건너뜀
+#   (준비 단계는 그 절반까지만 기다려 나머지 마켓의 판정 시간을 남겨 둠)
+# - AI 패턴 검사·반성문·trade_log 기록은 단일 마켓 파이프라인(main.ai_trading)에만 있음
+# ──────────────────────────────────────────────────────────────────────
+
+
+@dataclass
+class MarketState:
+    """마켓 하나의 사이클 간 상태 (엔진이 보관, lock을 잡은 작업 하나만 접근)."""
+    ticker: str
+    df_15m: Optional[pd.DataFrame] = None
+    df_1h: Optional[pd.DataFrame] = None
+    hour_1h: Optional[int] = None      # df_1h를 받은 정시 (같은 시간 안에서는 재사용)
+    last_ts: float = 0.0               # 마지막으로 판정한 봉 시각
+    skipped: int = 0                   # 시간 초과·오류로 건너뛴 봉 수
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+class KrwAllocator:
+    """
+    공유 KRW를 마켓별로 나눠 주는 예약 장부 (스레드 안전).
+    - reserve(): min(남은 KRW, 마켓 상한 - 현재 보유 평가액)만큼 떼어 줌
+    - settle(): 예약액 중 쓰고 남은 돈과 매도 대금을 되돌림
+    """
+
+    def __init__(self, krw: float, equity: float, max_share: float):
+        self._lock = threading.Lock()
+        self.free = float(krw)
+        self.cap = float(equity) * max_share
+
+    def reserve(self, position_value: float) -> float:
+        with self._lock:
+            amount = max(0.0, min(self.free, self.cap - position_value))
+            self.free -= amount
+            return amount
+
+    def settle(self, amount: float) -> None:
+        with self._lock:
+            self.free += amount
+
+
+@with_db
+def load_positions(conn: sqlite3.Connection, tickers: List[str]) -> Dict[str, Tuple[float, float]]:
+    """
+    마켓별 (보유 수량, 평균단가).
+    - TICKER 행은 항상 account의 btc·avg_price에 맞춤 (단일 마켓 경로는 account만 갱신하므로
+      account가 기준, 값이 다를 때만 씀)
+    """
+    try:
+        conn.execute(
+            """INSERT INTO positions (ticker, qty, avg_price, updated)
+               SELECT ?, btc, avg_price, ? FROM account WHERE id=1
+               ON CONFLICT(ticker) DO UPDATE SET
+                 qty=excluded.qty, avg_price=excluded.avg_price, updated=excluded.updated
+               WHERE positions.qty IS NOT excluded.qty
+                  OR positions.avg_price IS NOT excluded.avg_price""",
+            (TICKER, time.time()),
+        )
+        rows = conn.execute(
+            f"SELECT ticker, qty, avg_price FROM positions "
+            f"WHERE ticker IN ({','.join('?' * len(tickers))})",
+            tickers,
+        ).fetchall()
+        found = {r["ticker"]: (r["qty"], r["avg_price"]) for r in rows}
+        return {t: found.get(t, (0.0, 0.0)) for t in tickers}
+    except Exception as e:
+        logger.exception(f"load_positions: 예외 발생: {e}")
+        return {t: (0.0, 0.0) for t in tickers}
+
+
+@with_db
+def apply_fill(conn: sqlite3.Connection, ticker: str, krw_delta: float,
+               qty: float, avg_price: float) -> None:
+    """
+    체결 반영: 공유 KRW 증감 + 마켓 보유 수량 갱신을 한 트랜잭션으로.
+    - TICKER 마켓은 단일 마켓 파이프라인과 맞추려고 account.btc·avg_price에도 기록
+    """
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("UPDATE account SET krw=krw+? WHERE id=1", (krw_delta,))
+        conn.execute(
+            """INSERT INTO positions (ticker, qty, avg_price, updated) VALUES (?, ?, ?, ?)
+               ON CONFLICT(ticker) DO UPDATE SET
+                 qty=excluded.qty, avg_price=excluded.avg_price, updated=excluded.updated""",
+            (ticker, qty, avg_price, time.time()),
+        )
+        if ticker == TICKER:
+            conn.execute("UPDATE account SET btc=?, avg_price=? WHERE id=1", (qty, avg_price))
+    except Exception as e:
+        conn.rollback()
+        logger.exception(f"apply_fill: 예외 발생: {e}")
+
+
+@with_db
+def claim_candle(conn: sqlite3.Connection, ticker: str, ts_end: float) -> bool:
+    """(ticker, ts_end) 봉을 처리 대상으로 선점. 이미 다른 사이클·프로세스가 가져갔으면 False."""
+    try:
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO market_ledger (ticker, ts_end, claimed) VALUES (?, ?, ?)",
+            (ticker, ts_end, time.time()),
+        )
+        return cur.rowcount == 1
+    except Exception as e:
+        logger.exception(f"claim_candle: 예외 발생: {e}")
+        return False
+
+
+@with_db
+def record_decision(conn: sqlite3.Connection, ticker: str, ts_end: float, decision: str,
+                    pattern: str, percentage: float, price: float, qty: float) -> None:
+    """선점한 봉의 판정 결과 기록."""
+    try:
+        conn.execute(
+            """UPDATE market_ledger SET decision=?, pattern=?, percentage=?, price=?, qty=?
+               WHERE ticker=? AND ts_end=?""",
+            (decision, pattern, percentage, price, qty, ticker, ts_end),
+        )
+    except Exception as e:
+        logger.exception(f"record_decision: 예외 발생: {e}")
+
+
+@with_db
+def load_ledger(conn: sqlite3.Connection, ticker: Optional[str] = None,
+                limit: int = 100) -> pd.DataFrame:
+    """최근 처리한 봉 장부 (ts_end 내림차순)."""
+    try:
+        where, params = "", []
+        if ticker:
+            where, params = "WHERE ticker=?", [ticker]
+        cur = conn.execute(
+            f"""SELECT ticker, ts_end, claimed, decision, pattern, percentage, price, qty
+                FROM market_ledger {where} ORDER BY ts_end DESC, ticker LIMIT ?""",
+            (*params, limit),
+        )
+        cols = [c[0] for c in cur.description]
+        return pd.DataFrame([tuple(r) for r in cur.fetchall()], columns=cols)
+    except Exception as e:
+        logger.exception(f"load_ledger: 예외 발생: {e}")
+        return pd.DataFrame()
+
+
+def prepare_market(state: MarketState) -> Optional[pd.DataFrame]:
+    """
+    1단계: 마켓 봉 로드 → 노이즈 필터 → 15분봉 지표 (1시간봉은 정시가 바뀌었을 때만 다시 받음).
+    노이즈이거나 데이터가 없으면 None.
+    """
+    df = fetch_market_15m(state.ticker)
+    if df is None or df.empty:
+        logger.error(f"[{state.ticker}] 봉 데이터 로드 실패 → 건너뜀")
+        return None
+    state.df_15m = df
+
+    hour = int(time.time() // 3600)
+    if state.df_1h is None or state.hour_1h != hour:
+        raw_1h = fetch_data_1h(state.ticker, count=100)
+        state.df_1h = calc_indicators_1h(raw_1h) if raw_1h is not None else None
+        state.hour_1h = hour
+
+    if filter_noise(df.iloc[-(NOISE_WINDOW + 1):].copy()):
+        logger.info(f"[{state.ticker}] 노이즈 봉 → 건너뜀")
+        return None
+    try:
+        return calc_indicators_15m(df)
+    except Exception as e:
+        logger.exception(f"[{state.ticker}] calc_indicators_15m 예외 발생: {e}")
+        return None
+
+
+def decide_market(state: MarketState, df_15m: pd.DataFrame, position: Tuple[float, float],
+                  equity: float, fear_idx: int, allocator: KrwAllocator,
+                  deadline: float) -> Tuple[str, float]:
+    """
+    2단계: 봉 선점 → 1h 추세 필터 → 룰 패턴 → 보조 전략 A/B → 주문.
+    return: (decision, pct_used) — decision은 buy/sell/hold/skip/filtered/late
+    """
+    last = df_15m.iloc[-1]
+    ts_end = last.name.floor("15min").timestamp()
+    if ts_end <= state.last_ts or not claim_candle(state.ticker, ts_end):
+        logger.info(f"[{state.ticker}] Candle {pd.to_datetime(ts_end, unit='s')} 이미 처리됨")
+        return "skip", 0.0
+    state.last_ts = ts_end
+
+    qty, avg_price = position
+    price = float(last["close"])
+    ctx = SignalContext(
+        df_15m=df_15m,
+        df_1h=state.df_1h,
+        last_15m=last,
+        last_1h=state.df_1h.iloc[-1] if state.df_1h is not None else None,
+        ts_end=ts_end,
+        price=price,
+        sma30=float(last["sma"]),
+        atr15=float(last["atr"]),
+        vol20=float(last["vol20"]),
+        macd=float(last["macd_diff"]),
+        volume=float(last["volume"]),
+        equity=equity,
+        krw=0.0,
+        btc=qty,
+        avg_price=avg_price,
+        fear_idx=fear_idx,
+        ticker=state.ticker,
+    )
+
+    trend_ok, trend_detail = check_trend_1h(ctx)
+    if not trend_ok:
+        logger.info(f"[{state.ticker}] ⏸ 거래 보류: {trend_detail}")
+        record_decision(state.ticker, ts_end, "filtered", "sma50_filter", 0.0, price, qty)
+        return "filtered", 0.0
+
+    buy_sig, sell_sig, pattern = rule_signals(ctx)
+
+    if time.time() > deadline:
+        logger.warning(f"[{state.ticker}] 판정 시간 초과 → 주문 생략 (buy={buy_sig}, sell={sell_sig})")
+        record_decision(state.ticker, ts_end, "late", pattern or "", 0.0, price, qty)
+        return "late", 0.0
+
+    reserved = 0.0
+    if buy_sig:
+        reserved = allocator.reserve(qty * price)
+        ctx.krw = reserved
+    executed, pct_used = False, 0.0
+    if buy_sig or sell_sig:
+        executed, pct_used = execute_trade(
+            ctx, buy_sig, sell_sig, pattern, ticker=state.ticker,
+            save=lambda krw, q, avg: apply_fill(state.ticker, krw - reserved, q, avg),
+        )
+        if executed and LIVE_MODE:
+            apply_fill(state.ticker, 0.0, ctx.btc, ctx.avg_price)
+    # 쓰고 남은 예약액 + 매도 대금을 공유 KRW로 되돌림 (수량 변화 × 가격 기준)
+    allocator.settle(reserved - (ctx.btc - qty) * price)
+
+    decision = "buy" if buy_sig else ("sell" if sell_sig else "hold")
+    record_decision(state.ticker, ts_end, decision, pattern or "", pct_used, price, ctx.btc)
+    logger.info(
+        f"[{state.ticker}] {decision} executed={executed} pct={pct_used:.2f}% "
+        f"pattern={pattern or 'none'} price={price:.4f} qty={ctx.btc:.6f}"
+    )
+    return decision, pct_used
+
+
+class MarketEngine:
+    """TICKERS 마켓들을 봉마다 동시에 처리하는 엔진 (상태·스레드 풀을 사이클 간 유지)."""
+
+    def __init__(self, tickers: Optional[List[str]] = None, workers: int = MARKET_WORKERS,
+                 max_share: Optional[float] = None):
+        self.tickers = list(dict.fromkeys(tickers or TICKERS))
+        self.states = {t: MarketState(t) for t in self.tickers}
+        self._max_share = max_share       # None이면 매 사이클 MARKET_MAX_SHARE (핫 리로드 반영)
+        self.workers = max(1, workers)
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="market")
+        self.fear_idx = 0                 # FNG 조회가 판정 시간 안에 끝나지 않으면 직전 값 사용
+
+    @property
+    def max_share(self) -> float:
+        share = MARKET_MAX_SHARE if self._max_share is None else self._max_share
+        return share if share > 0 else 1.0 / len(self.tickers)
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=True)
+
+    async def _in_pool(self, fn, *args):
+        # cycle_budget 등 컨텍스트 변수를 작업 스레드로 전달
+        ctx = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(self.pool, ctx.run, fn, *args)
+
+    @staticmethod
+    def _locked(state: MarketState, fn, *args):
+        # 시간 초과로 버려진 이전 작업이 아직 스레드에서 돌고 있으면 이번 봉은 건너뜀
+        if not state.lock.acquire(blocking=False):
+            logger.warning(f"[{state.ticker}] 이전 작업 진행 중 → 이번 봉 건너뜀")
+            return None
+        try:
+            return fn(state, *args)
+        finally:
+            state.lock.release()
+
+    async def _guarded(self, ticker: str, coro, timeout: float):
+        try:
+            return await asyncio.wait_for(coro, timeout=max(0.0, timeout))
+        except asyncio.TimeoutError:
+            self.states[ticker].skipped += 1
+            logger.warning(f"[{ticker}] 판정 시간 초과 → 이번 봉 건너뜀")
+        except Exception as e:
+            self.states[ticker].skipped += 1
+            logger.exception(f"[{ticker}] 예외 발생 → 이번 봉 건너뜀: {e}")
+        return None
+
+    async def cycle(self, deadline: Optional[float] = None) -> Dict[str, str]:
+        """
+        모든 마켓 1회 처리. return: {ticker: decision}
+        (데이터 없음·노이즈·시간 초과는 'none')
+        """
+        deadline = deadline or time.time() + MARKET_DECISION_TIMEOUT_SEC
+        # 느린 마켓 하나가 판정 시간을 다 쓰지 않도록 준비 단계는 남은 시간의 절반까지만 기다림
+        prepare_timeout = (deadline - time.time()) / 2
+
+        # FNG(HTTP·캐시 파일)는 준비 단계와 함께 작업 스레드에서 조회
+        fng = asyncio.ensure_future(self._in_pool(get_fear_and_greed))
+
+        # 1단계: 봉·지표 준비 (마켓별 동시)
+        frames = await asyncio.gather(*(
+            self._guarded(t, self._in_pool(self._locked, self.states[t], prepare_market),
+                          prepare_timeout)
+            for t in self.tickers
+        ))
+        ready = {t: df for t, df in zip(self.tickers, frames) if df is not None}
+
+        # 공유 KRW + 최신 가격 기준 보유 평가액으로 평가금액·마켓 상한 계산
+        positions = await self._in_pool(load_positions, self.tickers)
+        if LIVE_MODE:
+            from trading_bot.account_sync import sync_account_upbit
+
+            krw = (await self._in_pool(sync_account_upbit))[0]
+        else:
+            krw = (await self._in_pool(load_account))[0]
+        prices = {t: float(self.states[t].df_15m["close"].iloc[-1])
+                  for t in self.tickers if self.states[t].df_15m is not None}
+        equity = krw + sum(q * prices.get(t, avg) for t, (q, avg) in positions.items())
+        allocator = KrwAllocator(krw, equity, self.max_share)
+        try:
+            fear_idx = await asyncio.wait_for(fng, timeout=max(0.0, (deadline - time.time()) / 2))
+            self.fear_idx = fear_idx or self.fear_idx
+        except asyncio.TimeoutError:
+            logger.warning(f"FNG 조회 시간 초과 → 직전 값 {self.fear_idx} 사용")
+        except Exception as e:
+            logger.exception(f"FNG 조회 중 예외 발생 → 직전 값 {self.fear_idx} 사용: {e}")
+        fear_idx = self.fear_idx
+
+        # 2단계: 판정·주문 (마켓별 동시, KRW는 allocator로 나눔)
+        results = await asyncio.gather(*(
+            self._guarded(t, self._in_pool(
+                self._locked, self.states[t], decide_market,
+                df, positions[t], equity, fear_idx, allocator, deadline,
+            ), deadline - time.time())
+            for t, df in ready.items()
+        ))
+        decisions = {t: "none" for t in self.tickers}
+        decisions.update({t: r[0] for t, r in zip(ready, results) if r is not None})
+        logger.info(
+            f"다중 마켓 사이클 완료: {decisions} (KRW={allocator.free:.0f}, equity={equity:.0f})"
+        )
+        return decisions
+
+    def run_once(self, deadline: Optional[float] = None) -> Dict[str, str]:
+        with cycle_budget():
+            return asyncio.run(self.cycle(deadline))
+
+    def run_daemon(self) -> None:
+        """
+        봉 마감마다 모든 마켓 처리 (마감 + MARKET_DECISION_TIMEOUT_SEC가 판정 마감).
+        사이클 사이마다 .env 변경을 검증해 반영 (TICKERS·MARKET_WORKERS는 재시작 필요).
+        """
+        interval_sec = interval_seconds(INTERVAL)
+        get_service()
+        logger.info(
+            f"다중 마켓 상주 모드 시작: {self.tickers} (INTERVAL={INTERVAL}, "
+            f"스레드 {self.workers}개, 마켓당 상한 {self.max_share:.0%})"
+        )
+        try:
+            while True:
+                close_ts = next_close(time.time(), interval_sec)
+                sleep_until(close_ts + DAEMON_CLOSE_DELAY_SEC)
+                reload_config()
+                self.run_once(close_ts + MARKET_DECISION_TIMEOUT_SEC)
+        except KeyboardInterrupt:
+            logger.info("사용자 중단(Ctrl+C)")
+
+
+def run_markets(tickers: Optional[List[str]] = None, daemon: bool = False) -> None:
+    init_db()
+    engine = MarketEngine(tickers)
+    try:
+        if daemon:
+            engine.run_daemon()
+        else:
+            engine.run_once()
+    finally:
+        engine.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="다중 마켓 동시 매매 / 처리한 봉 장부 조회")
+    parser.add_argument("--tickers", help="쉼표로 구분한 마켓 목록 (기본 TICKERS)")
+    parser.add_argument("--daemon", action="store_true", help="봉 마감마다 실행")
+    parser.add_argument("--ledger", action="store_true", help="처리한 봉 장부만 출력")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    tickers = [t.strip() for t in args.tickers.split(",") if t.strip()] if args.tickers else None
+    if args.ledger:
+        init_db()
+        print(load_ledger().to_string(index=False))
+        return
+    run_markets(tickers, daemon=args.daemon)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+# trading_bot/noise_detector.py
+
+import logging
+import math
+import warnings
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from trading_bot.config import (
+    NOISE_CONF_CLEAN,
+    NOISE_CONF_NOISE,
+    NOISE_MIN_HISTORY,
+    NOISE_WINDOW,
+)
+
+logger = logging.getLogger(__name__)
+
+# ──────────────────────────────────────────────────────────────────────
+# 로컬 통계 노이즈 판정 (AI 노이즈 판정 호출을 대신하는 1차 판정)
+# - 마지막 봉을 직전 NOISE_WINDOW봉과 비교: 수익률·봉 범위·거래량의 rolling median/MAD z-score
+# - OHLC 정합성(high ≥ max(open, close) 등)·타임스탬프 역전/중복은 즉시 노이즈(신뢰도 1)
+# - 가격 이상치라도 거래량이 함께 늘었으면 실제 급변으로 보고 그만큼 점수를 깎고, 노이즈로 단정하지 않음
+# - 점수 s(z 단위)를 신뢰도로 환산: 특성 2개(가격·거래량)가 모두 |s| 미만일 확률을
+#   자유도 3 t분포로 계산 (코인 단기 수익률의 두꺼운 꼬리 반영, 정규 가정보다 보수적)
+#   ≥ NOISE_CONF_NOISE → noise, < NOISE_CONF_CLEAN → clean, 그 사이 → ambiguous (AI에 질의)
+# ──────────────────────────────────────────────────────────────────────
+
+NOISE, CLEAN, AMBIGUOUS = "noise", "clean", "ambiguous"
+# MAD → 표준편차 환산 계수 (정규분포)
+MAD_SCALE = 1.4826
+_PRICE_COLS = ["open", "high", "low", "close"]
+
+
+@dataclass(frozen=True)
+class NoiseScore:
+    """마지막 봉의 로컬 노이즈 판정."""
+    label: str
+    confidence: float
+    score: float
+    reasons: Tuple[str, ...] = ()
+    z: Dict[str, float] = field(default_factory=dict)
+
+
+def robust_z(history: np.ndarray, value: float) -> float:
+    """history의 median/MAD 기준 value의 z-score (분산이 0이면 같으면 0, 다르면 ±inf)."""
+    history = history[np.isfinite(history)]
+    if history.size == 0 or not np.isfinite(value):
+        return 0.0
+    med = float(np.median(history))
+    scale = MAD_SCALE * float(np.median(np.abs(history - med)))
+    if scale <= 0:
+        scale = float(np.std(history))
+    if scale <= 0:
+        return 0.0 if value == med else math.copysign(math.inf, value - med)
+    return (value - med) / scale
+
+
+def score_to_confidence(score: float) -> float:
+    """z 단위 점수 → 신뢰도 (독립 t(3) 특성 2개의 |값|이 모두 score 미만일 확률)."""
+    if not np.isfinite(score):
+        return 1.0
+    t = max(score, 0.0) / math.sqrt(3.0)
+    # t(3) 분포의 P(|T| < score) 닫힌 형태
+    inside = (2.0 / math.pi) * (t / (1.0 + t * t) + math.atan(t))
+    return min(max(inside, 0.0), 1.0) ** 2
+
+
+def _label(confidence: float) -> str:
+    if confidence >= NOISE_CONF_NOISE:
+        return NOISE
+    if confidence < NOISE_CONF_CLEAN:
+        return CLEAN
+    return AMBIGUOUS
+
+
+def _hard_violations(df: pd.DataFrame) -> Tuple[str, ...]:
+    """마지막 봉의 명백한 데이터 오류 목록."""
+    last = df.iloc[-1]
+    prices = last[_PRICE_COLS].to_numpy(dtype=float)
+    reasons = []
+    if not np.all(np.isfinite(prices)) or not np.isfinite(float(last["volume"])):
+        reasons.append("nan")
+        return tuple(reasons)
+    if np.any(prices <= 0):
+        reasons.append("non_positive_price")
+    if last["high"] < max(last["open"], last["close"]):
+        reasons.append("high_below_body")
+    if last["low"] > min(last["open"], last["close"]):
+        reasons.append("low_above_body")
+    if last["volume"] < 0:
+        reasons.append("negative_volume")
+    if len(df) >= 2 and df.index[-1] <= df.index[-2]:
+        reasons.append("timestamp_not_increasing")
+    return tuple(reasons)
+
+
+def score_last_bar(df: pd.DataFrame, step: Optional[pd.Timedelta] = None) -> Optional[NoiseScore]:
+    """
+    df(시간순 OHLCV, 마지막 행이 판정 대상)의 마지막 봉 노이즈 점수.
+    - 직전 최대 NOISE_WINDOW봉을 기준으로 사용, NOISE_MIN_HISTORY봉 미만이면 None (판정 불가)
+    - step: 봉 간격 (생략 시 인덱스 간격의 중앙값)
+    """
+    if df is None or len(df) < NOISE_MIN_HISTORY + 1:
+        return None
+    df = df.iloc[-(NOISE_WINDOW + 1):]
+
+    hard = _hard_violations(df)
+    if hard:
+        return NoiseScore(NOISE, 1.0, math.inf, hard)
+
+    close = df["close"].to_numpy(dtype=float)
+    log_ret = np.diff(np.log(close))
+    # 봉 범위는 오른쪽 꼬리가 길어 로그를 한 번 더 취해 대칭에 가깝게 만듦 (high == low 대비 하한)
+    log_range = np.log(np.maximum(
+        np.log(df["high"].to_numpy(dtype=float) / df["low"].to_numpy(dtype=float)), 1e-6
+    ))
+    # 거래량 0 근처도 비교되도록 직전 중앙값의 1/1000을 하한으로 둔 로그
+    volume = df["volume"].to_numpy(dtype=float)
+    vol_med = float(np.nanmedian(volume[:-1]))
+    log_vol = np.log(np.maximum(volume, max(vol_med, 1e-12) * 1e-3))
+
+    reasons = []
+    # 직전 봉과 간격이 벌어졌으면 수익률을 √(봉 수)로 나눠 1봉 기준으로 비교
+    if step is None:
+        step = pd.Series(df.index).diff().median()
+    valid_step = pd.notna(step) and step > pd.Timedelta(0)
+    gap_bars = (df.index[-1] - df.index[-2]) / step if valid_step else 1.0
+    if gap_bars > 1.5:
+        reasons.append(f"gap_{int(round(gap_bars)) - 1}_bars")
+    ret_last = log_ret[-1] / math.sqrt(max(gap_bars, 1.0))
+
+    z = {
+        "ret": robust_z(log_ret[:-1], ret_last),
+        "range": robust_z(log_range[:-1], log_range[-1]),
+        "volume": robust_z(log_vol[:-1], log_vol[-1]),
+    }
+    price_s = max(abs(z["ret"]), max(z["range"], 0.0))
+    # 실제 급변은 거래량이 동반됨 → 거래량 z만큼 가격 이상 점수를 낮춤
+    if z["volume"] > 0:
+        price_s = max(price_s - z["volume"], 0.0)
+    vol_s = max(-z["volume"], 0.0)
+    score = max(price_s, vol_s)
+    confidence = score_to_confidence(score)
+    label = _label(confidence)
+    if confidence >= NOISE_CONF_CLEAN:
+        reasons.append("price_outlier" if price_s >= vol_s else "volume_collapse")
+    # 거래량이 뒷받침하는 가격 급변은 단정하지 않고 AI에 넘김
+    if label == NOISE and price_s >= vol_s and z["volume"] > 0:
+        label = AMBIGUOUS
+
+    logger.debug(
+        f"score_last_bar: ret_z={z['ret']:.2f} range_z={z['range']:.2f} vol_z={z['volume']:.2f} "
+        f"score={score:.2f} conf={confidence:.5f} (history={len(df) - 1})"
+    )
+    return NoiseScore(label, confidence, score, tuple(reasons), z)
+
+
+# ──────────────────────────────────────────────────────────────────────
+# 전체 히스토리 일괄 판정 (백테스트·임계치 보정용)
+# - 봉마다 score_last_bar(df.iloc[i - NOISE_WINDOW:i + 1])와 같은 값을
+#   (봉 수 × 창 길이) 배열 한 번으로 계산. 창이 짧은 앞부분은 NaN 패딩으로 맞춤
+# ──────────────────────────────────────────────────────────────────────
+
+
+def _windows(values: np.ndarray, size: int) -> np.ndarray:
+    """i번째 행 = values[i - size + 1:i + 1] (앞쪽 부족분은 NaN)."""
+    padded = np.concatenate([np.full(size - 1, np.nan), values.astype(float)])
+    return np.lib.stride_tricks.sliding_window_view(padded, size)
+
+
+def _robust_z_rows(history: np.ndarray, value: np.ndarray) -> np.ndarray:
+    """robust_z의 행 단위 버전 (history: 봉 수 × 창 길이)."""
+    history = np.where(np.isfinite(history), history, np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        med = np.nanmedian(history, axis=1)
+        scale = MAD_SCALE * np.nanmedian(np.abs(history - med[:, None]), axis=1)
+        scale = np.where(scale > 0, scale, np.nanstd(history, axis=1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (value - med) / scale
+        flat = np.where(value == med, 0.0, np.copysign(np.inf, value - med))
+    z = np.where(scale > 0, z, flat)
+    empty = np.isnan(med) | ~np.isfinite(value)
+    return np.where(empty, 0.0, z)
+
+
+def score_history(df: pd.DataFrame, step: Optional[pd.Timedelta] = None) -> pd.DataFrame:
+    """
+    모든 봉에 대해 score_last_bar와 같은 판정을 벡터 연산으로 계산.
+    - 반환: df와 같은 인덱스의 DataFrame (label, confidence, score, z_ret, z_range, z_volume)
+    - 직전 봉이 NOISE_MIN_HISTORY개 미만인 앞부분은 label이 결측 (판정 불가)
+    - step: 봉 간격 (생략 시 봉마다 창 안 인덱스 간격의 중앙값, score_last_bar와 동일)
+    """
+    n = len(df)
+    size = NOISE_WINDOW + 1
+    prices = df[_PRICE_COLS].to_numpy(dtype=float)
+    open_, high, low, close = prices.T
+    volume = df["volume"].to_numpy(dtype=float)
+    ts = pd.DatetimeIndex(df.index).asi8.astype(float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_close = np.log(close)
+        log_ret = np.concatenate([[np.nan], np.diff(log_close)])
+        log_range = np.log(np.maximum(np.log(high / low), 1e-6))
+
+        # 간격: 창 안 타임스탬프 차이의 중앙값 대비 직전 봉과의 간격
+        dt = np.concatenate([[np.nan], np.diff(ts)])
+        if step is None:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                step_ns = np.nanmedian(_windows(dt, NOISE_WINDOW), axis=1)
+        else:
+            step_ns = np.full(n, float(pd.Timedelta(step).value))
+        valid_step = np.isfinite(step_ns) & (step_ns > 0)
+        gap_bars = np.where(valid_step, dt / step_ns, 1.0)
+        ret_last = log_ret / np.sqrt(np.maximum(np.nan_to_num(gap_bars, nan=1.0), 1.0))
+
+        vol_win = _windows(volume, size)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            vol_med = np.nanmedian(vol_win[:, :-1], axis=1)
+        log_vol_win = np.log(np.maximum(vol_win, (np.maximum(vol_med, 1e-12) * 1e-3)[:, None]))
+
+    z_ret = _robust_z_rows(_windows(log_ret, NOISE_WINDOW)[:, :-1], ret_last)
+    z_range = _robust_z_rows(_windows(log_range, size)[:, :-1], log_range)
+    z_vol = _robust_z_rows(log_vol_win[:, :-1], log_vol_win[:, -1])
+
+    with np.errstate(invalid="ignore"):
+        price_s = np.maximum(np.abs(z_ret), np.maximum(z_range, 0.0))
+        price_s = np.where(z_vol > 0, np.maximum(price_s - z_vol, 0.0), price_s)
+        vol_s = np.maximum(-z_vol, 0.0)
+        score = np.maximum(price_s, vol_s)
+        t = np.maximum(score, 0.0) / math.sqrt(3.0)
+        inside = (2.0 / np.pi) * (t / (1.0 + t * t) + np.arctan(t))
+    confidence = np.where(np.isfinite(score), np.clip(inside, 0.0, 1.0) ** 2, 1.0)
+
+    label = np.where(confidence >= NOISE_CONF_NOISE, NOISE,
+                     np.where(confidence < NOISE_CONF_CLEAN, CLEAN, AMBIGUOUS)).astype(object)
+    label[(label == NOISE) & (price_s >= vol_s) & (z_vol > 0)] = AMBIGUOUS
+
+    # OHLC 정합성·타임스탬프 위반은 즉시 노이즈
+    with np.errstate(invalid="ignore"):
+        nan_bar = ~np.isfinite(prices).all(axis=1) | ~np.isfinite(volume)
+        hard = (
+            nan_bar
+            | (prices <= 0).any(axis=1)
+            | (high < np.maximum(open_, close))
+            | (low > np.minimum(open_, close))
+            | (volume < 0)
+            | (np.concatenate([[False], np.diff(ts) <= 0]))
+        )
+    label[hard] = NOISE
+    confidence = np.where(hard, 1.0, confidence)
+    score = np.where(hard, np.inf, score)
+
+    unknown = np.arange(n) < NOISE_MIN_HISTORY
+    label[unknown] = None
+    no_z = unknown | hard
+    return pd.DataFrame({
+        "label": label,
+        "confidence": np.where(unknown, np.nan, confidence),
+        "score": np.where(unknown, np.nan, score),
+        "z_ret": np.where(no_z, np.nan, z_ret),
+        "z_range": np.where(no_z, np.nan, z_range),
+        "z_volume": np.where(no_z, np.nan, z_vol),
+    }, index=df.index)
@@ -1,4 +1,5 @@
 import logging
+import numpy as np
 import pandas as pd
 
 from trading_bot.config import NOISE_VOL_THRESHOLD, PRICE_RANGE_THRESHOLD
@@ -63,3 +64,34 @@ def is_rule_based_noise(last_five: pd.DataFrame) -> tuple[bool, float]:
     except Exception:
         logger.exception("is_rule_based_noise() 예외 발생 → 노이즈 아님 처리 (False, 0.0)")
         return False, 0.0
+
+
+def rule_noise_history(df: pd.DataFrame, vol_threshold: float | None = None,
+                       range_threshold: float | None = None) -> pd.DataFrame:
+    """
+    is_rule_based_noise를 전체 히스토리의 모든 봉에 한 번에 적용 (각 봉 = 직전 4봉 + 그 봉).
+    - 반환: df와 같은 인덱스의 DataFrame (is_noise: bool, avg_vol4: float)
+    - 앞 4봉은 입력 5개 미만이므로 (False, 0.0)
+    - vol_threshold/range_threshold 생략 시 NOISE_VOL_THRESHOLD/PRICE_RANGE_THRESHOLD (임계치 스윕용)
+    """
+    vol_thr = NOISE_VOL_THRESHOLD if vol_threshold is None else vol_threshold
+    range_thr = PRICE_RANGE_THRESHOLD if range_threshold is None else range_threshold
+    ohlcv = df[["open", "high", "low", "close", "volume"]].to_numpy(dtype=float)
+    volume = ohlcv[:, 4]
+
+    prev = pd.Series(volume).shift(1).rolling(4, min_periods=1)
+    prev_count = prev.count().to_numpy()
+    with np.errstate(invalid="ignore"):
+        avg_vol4 = np.where(prev_count > 0, prev.mean().to_numpy(), 0.0)
+
+        last_nan = np.isnan(ohlcv).any(axis=1)
+        no_prev_vol = prev_count == 0
+        low_vol = (avg_vol4 > 0) & (volume <= avg_vol4 * vol_thr)
+        wide = (ohlcv[:, 1] - ohlcv[:, 2]) > ohlcv[:, 3] * range_thr
+    is_noise = last_nan | no_prev_vol | low_vol | wide
+
+    # 앞 4봉은 판정 대상 아님
+    enough = np.arange(len(df)) >= 4
+    is_noise &= enough
+    avg_vol4 = np.where(enough, avg_vol4, 0.0)
+    return pd.DataFrame({"is_noise": is_noise, "avg_vol4": avg_vol4}, index=df.index)
@@ -0,0 +1,310 @@
+# trading_bot/ohlcv_gaps.py
+
+import argparse
+import logging
+import sqlite3
+import time
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from trading_bot.config import (
+    GAP_REPAIR_MAX_ATTEMPTS,
+    GAP_REPAIR_MAX_REQUESTS,
+    INTERVAL,
+    OHLCV_LOOKBACK_BARS,
+    TICKER,
+)
+from trading_bot.db_helpers import with_db
+from trading_bot.ohlcv_store import index_to_epoch, interval_seconds
+
+logger = logging.getLogger(__name__)
+
+# ──────────────────────────────────────────────────────────────────────
+# 봉 히스토리 빈 구간 색인 (ohlcv_gaps 테이블, trading.db) + 복구 작업
+# - 행 하나 = (ticker, interval)의 빠진 봉 구간 [start_ts, end_ts] (양끝 포함, 봉 시작 시각)
+# - 봉을 저장할 때마다 그 구간과 앞뒤 이웃 봉 사이만 다시 계산 (전체 스캔 없음)
+# - lookback_complete(): 필요한 직전 N봉이 모두 있는지 인덱스 조회 3번으로 확인
+# - repair_gaps(): 열린 빈 구간만 요청 간격 제한이 걸린 API로 다시 받아 채움
+#   거래가 없어 거래소에도 봉이 없는 구간은 GAP_REPAIR_MAX_ATTEMPTS회 시도 후 건너뜀
+# ──────────────────────────────────────────────────────────────────────
+
+# Upbit 캔들 API 1회 최대 봉 수
+MAX_BARS_PER_REQUEST = 200
+
+
+def _ts_column(conn: sqlite3.Connection, ticker: str, interval: str,
+               lo: int, hi: int) -> np.ndarray:
+    cur = conn.cursor()
+    cur.row_factory = None
+    cur.execute(
+        "SELECT ts FROM ohlcv WHERE ticker=? AND interval=? AND ts BETWEEN ? AND ? ORDER BY ts",
+        (ticker, interval, lo, hi),
+    )
+    return np.fromiter((r[0] for r in cur), dtype=np.int64)
+
+
+def _scalar(conn: sqlite3.Connection, sql: str, params: tuple) -> Optional[int]:
+    row = conn.execute(sql, params).fetchone()
+    return None if row is None or row[0] is None else int(row[0])
+
+
+@with_db
+def _refresh(conn: sqlite3.Connection, ticker: str, interval: str, lo: int, hi: int,
+             step: int) -> int:
+    conn.execute("BEGIN IMMEDIATE")
+    # 겹치는 기존 빈 구간까지 넓힌 뒤 양쪽 바깥의 가장 가까운 봉에서 끊음
+    row = conn.execute(
+        """SELECT MIN(start_ts), MAX(end_ts) FROM ohlcv_gaps
+           WHERE ticker=? AND interval=? AND end_ts>=? AND start_ts<=?""",
+        (ticker, interval, lo - step, hi + step),
+    ).fetchone()
+    if row[0] is not None:
+        lo, hi = min(lo, row[0]), max(hi, row[1])
+    prev_ts = _scalar(conn, "SELECT MAX(ts) FROM ohlcv WHERE ticker=? AND interval=? AND ts<?",
+                      (ticker, interval, lo))
+    next_ts = _scalar(conn, "SELECT MIN(ts) FROM ohlcv WHERE ticker=? AND interval=? AND ts>?",
+                      (ticker, interval, hi))
+    lo = prev_ts if prev_ts is not None else lo
+    hi = next_ts if next_ts is not None else hi
+
+    ts = _ts_column(conn, ticker, interval, lo, hi)
+    old = {
+        r["start_ts"]: r for r in conn.execute(
+            """SELECT start_ts, detected, attempts, last_attempt FROM ohlcv_gaps
+               WHERE ticker=? AND interval=? AND start_ts>=? AND end_ts<=?""",
+            (ticker, interval, lo, hi),
+        )
+    }
+    conn.execute(
+        "DELETE FROM ohlcv_gaps WHERE ticker=? AND interval=? AND start_ts>=? AND end_ts<=?",
+        (ticker, interval, lo, hi),
+    )
+    if len(ts) < 2:
+        return 0
+
+    diffs = np.diff(ts)
+    at = np.flatnonzero(diffs > step)
+    now = time.time()
+    rows = []
+    for i in at:
+        start = int(ts[i]) + step
+        end = int(ts[i + 1]) - step
+        bars = (end - start) // step + 1
+        prev = old.get(start)
+        rows.append((
+            ticker, interval, start, end, bars,
+            prev["detected"] if prev else now,
+            prev["attempts"] if prev else 0,
+            prev["last_attempt"] if prev else None,
+        ))
+    conn.executemany(
+        """INSERT INTO ohlcv_gaps
+           (ticker, interval, start_ts, end_ts, bars, detected, attempts, last_attempt)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+        rows,
+    )
+    new = [r for r in rows if r[2] not in old]
+    if new:
+        logger.warning(
+            f"ohlcv_gaps: {ticker} {interval} 새 빈 구간 {len(new)}개 "
+            f"(빠진 봉 {sum(r[4] for r in new)}개)"
+        )
+    return len(rows)
+
+
+def refresh_gaps(ticker: str, interval: str, lo: int, hi: int) -> int:
+    """
+    [lo, hi](epoch 초) 구간에 봉을 저장한 뒤 호출: 그 구간과 이웃 봉 사이의 빈 구간을 다시 계산.
+    - 채워진 빈 구간은 지우고, 일부만 채워지면 남은 부분으로 나눔 (같은 시작 시각이면 시도 횟수 유지)
+    - 반환값: 다시 계산한 범위 안의 빈 구간 수
+    """
+    try:
+        return _refresh(ticker, interval, int(lo), int(hi), interval_seconds(interval))
+    except Exception as e:
+        logger.exception(f"refresh_gaps: 예외 발생: {e}")
+        return 0
+
+
+@with_db
+def _bounds(conn: sqlite3.Connection, ticker: str, interval: str) -> tuple[Optional[int], Optional[int]]:
+    row = conn.execute(
+        "SELECT MIN(ts), MAX(ts) FROM ohlcv WHERE ticker=? AND interval=?", (ticker, interval)
+    ).fetchone()
+    return row[0], row[1]
+
+
+def rebuild_gaps(ticker: str, interval: str) -> int:
+    """ohlcv 테이블 전체 기준으로 빈 구간 색인을 다시 만듦 (기존 DB·백필 스크립트용)."""
+    first, last = _bounds(ticker, interval)
+    if first is None:
+        return 0
+    return refresh_gaps(ticker, interval, first, last)
+
+
+@with_db
+def load_gaps(conn: sqlite3.Connection, ticker: Optional[str] = None,
+              interval: Optional[str] = None) -> pd.DataFrame:
+    """빈 구간 목록 (최근 구간부터)."""
+    try:
+        where, params = [], []
+        if ticker:
+            where.append("ticker=?")
+            params.append(ticker)
+        if interval:
+            where.append("interval=?")
+            params.append(interval)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        cur = conn.execute(
+            f"""SELECT ticker, interval, start_ts, end_ts, bars, detected, attempts, last_attempt
+                FROM ohlcv_gaps {clause} ORDER BY start_ts DESC""",
+            params,
+        )
+        cols = [c[0] for c in cur.description]
+        return pd.DataFrame([tuple(r) for r in cur.fetchall()], columns=cols)
+    except Exception as e:
+        logger.exception(f"load_gaps: 예외 발생: {e}")
+        return pd.DataFrame()
+
+
+@with_db
+def _window_state(conn: sqlite3.Connection, ticker: str, interval: str,
+                  start: int, end: int) -> tuple[Optional[int], Optional[int], bool]:
+    first = _scalar(conn, "SELECT MIN(ts) FROM ohlcv WHERE ticker=? AND interval=?",
+                    (ticker, interval))
+    last = _scalar(conn, "SELECT MAX(ts) FROM ohlcv WHERE ticker=? AND interval=?",
+                   (ticker, interval))
+    gap = conn.execute(
+        """SELECT 1 FROM ohlcv_gaps
+           WHERE ticker=? AND interval=? AND start_ts<=? AND end_ts>=? LIMIT 1""",
+        (ticker, interval, end, start),
+    ).fetchone()
+    return first, last, gap is not None
+
+
+def lookback_complete(ticker: str, interval: str, end_ts: int,
+                      bars: Optional[int] = None) -> bool:
+    """
+    end_ts(포함)까지 직전 bars개(기본 OHLCV_LOOKBACK_BARS) 봉이 ohlcv 테이블에 빠짐없이 있는지.
+    - 봉을 세지 않고 처음/마지막 봉 시각과 빈 구간 색인만 조회 (인덱스 조회 3번)
+    - 조회 실패 시 False
+    """
+    try:
+        step = interval_seconds(interval)
+        bars = OHLCV_LOOKBACK_BARS if bars is None else bars
+        start = int(end_ts) - (bars - 1) * step
+        first, last, has_gap = _window_state(ticker, interval, start, int(end_ts))
+        return first is not None and first <= start and last >= end_ts and not has_gap
+    except Exception as e:
+        logger.exception(f"lookback_complete: 예외 발생: {e}")
+        return False
+
+
+@with_db
+def _repairable(conn: sqlite3.Connection, ticker: Optional[str], interval: Optional[str]) -> list:
+    where, params = ["attempts<?"], [GAP_REPAIR_MAX_ATTEMPTS]
+    if ticker:
+        where.append("ticker=?")
+        params.append(ticker)
+    if interval:
+        where.append("interval=?")
+        params.append(interval)
+    return [tuple(r) for r in conn.execute(
+        f"""SELECT ticker, interval, start_ts, end_ts FROM ohlcv_gaps
+            WHERE {' AND '.join(where)} ORDER BY end_ts DESC""",
+        params,
+    )]
+
+
+@with_db
+def _mark_attempt(conn: sqlite3.Connection, ticker: str, interval: str, lo: int, hi: int) -> None:
+    conn.execute(
+        """UPDATE ohlcv_gaps SET attempts=attempts+1, last_attempt=?
+           WHERE ticker=? AND interval=? AND start_ts<=? AND end_ts>=?""",
+        (time.time(), ticker, interval, hi, lo),
+    )
+
+
+def repair_gaps(ticker: Optional[str] = None, interval: Optional[str] = None,
+                max_requests: Optional[int] = None,
+                fetch: Optional[Callable[[str, str, int, int], Optional[pd.DataFrame]]] = None) -> dict:
+    """
+    열린 빈 구간(최근 구간부터)을 다시 받아 채움.
+    - 빈 구간 끝에서 과거 방향으로 최대 200봉씩 요청, 전체 요청 수는 max_requests(기본 GAP_REPAIR_MAX_REQUESTS) 이하
+    - 받은 봉은 수집과 같이 검증(validate_batch) 후 저장하고 색인 갱신
+    - fetch(ticker, interval, to_ts, count): 기본은 data_fetcher.fetch_ohlcv_before (요청 간격 제한)
+    - 반환: {"requests": 요청 수, "filled": 채운 봉 수, "remaining": 남은 빈 구간 수}
+    """
+    from trading_bot.data_fetcher import fetch_ohlcv_before, store_ohlcv
+    from trading_bot.ohlcv_validation import validate_batch
+
+    fetch = fetch or fetch_ohlcv_before
+    if max_requests is None:
+        max_requests = GAP_REPAIR_MAX_REQUESTS
+    requests_used = filled = 0
+    try:
+        gaps = _repairable(ticker, interval)
+    except Exception as e:
+        logger.exception(f"repair_gaps: 빈 구간 조회 실패: {e}")
+        return {"requests": 0, "filled": 0, "remaining": 0}
+
+    for g_ticker, g_interval, start, end in gaps:
+        step = interval_seconds(g_interval)
+        to_ts = end + step
+        while to_ts > start and requests_used < max_requests:
+            count = min(MAX_BARS_PER_REQUEST, (to_ts - start) // step)
+            requests_used += 1
+            df = validate_batch(g_ticker, g_interval, fetch(g_ticker, g_interval, to_ts, count))
+            if df is None:
+                break
+            ts = index_to_epoch(df.index)
+            in_gap = (ts >= start) & (ts <= end)
+            if in_gap.any():
+                store_ohlcv(g_ticker, g_interval, df[in_gap])
+                filled += int(in_gap.sum())
+            if ts.min() >= to_ts:
+                break
+            to_ts = int(ts.min())
+        _mark_attempt(g_ticker, g_interval, start, end)
+        if requests_used >= max_requests:
+            break
+
+    remaining = len(_repairable(ticker, interval))
+    if requests_used:
+        logger.info(
+            f"repair_gaps: 요청 {requests_used}회, 채운 봉 {filled}개, 남은 빈 구간 {remaining}개"
+        )
+    return {"requests": requests_used, "filled": filled, "remaining": remaining}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ohlcv 빈 구간 색인 조회·재구성·복구")
+    parser.add_argument("--ticker", default=TICKER)
+    parser.add_argument("--interval", default=INTERVAL)
+    parser.add_argument("--rebuild", action="store_true", help="ohlcv 테이블 전체로 색인 재구성")
+    parser.add_argument("--repair", action="store_true", help="빈 구간 다시 받기")
+    parser.add_argument("--max-requests", type=int, default=GAP_REPAIR_MAX_REQUESTS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    from trading_bot.db_helpers import init_db
+
+    init_db()
+    if args.rebuild:
+        print(f"빈 구간 {rebuild_gaps(args.ticker, args.interval)}개 색인")
+    if args.repair:
+        print(repair_gaps(args.ticker, args.interval, args.max_requests))
+
+    gaps = load_gaps(args.ticker, args.interval)
+    if gaps.empty:
+        print("빈 구간 없음")
+        return
+    for r in gaps.itertuples():
+        start = pd.to_datetime(r.start_ts, unit="s")
+        end = pd.to_datetime(r.end_ts, unit="s")
+        print(f"{start} ~ {end}  {r.bars}봉  시도 {r.attempts}회")
+
+
+if __name__ == "__main__":
+    main()
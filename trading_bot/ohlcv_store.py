@@ -0,0 +1,126 @@
+# trading_bot/ohlcv_store.py
+
+import logging
+import re
+import sqlite3
+from itertools import repeat
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from trading_bot.db_helpers import with_db
+
+logger = logging.getLogger(__name__)
+
+# ohlcv 테이블 한 행과 1:1로 대응하는 구조화 배열 dtype
+OHLCV_DTYPE = np.dtype([
+    ("ts", "i8"),
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "f8"),
+])
+
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+_UNIT_SEC = {"minute": 60, "day": 86400, "week": 604800}
+
+
+def interval_seconds(interval: str) -> int:
+    """pyupbit 봉 간격 문자열("minute15", "minute60", "day" 등)을 초 단위로 변환."""
+    m = re.fullmatch(r"(minute|day|week)(\d*)", interval.strip().lower())
+    if not m:
+        raise ValueError(f"지원하지 않는 INTERVAL: {interval}")
+    return _UNIT_SEC[m.group(1)] * int(m.group(2) or 1)
+
+
+def index_to_epoch(index: pd.Index) -> np.ndarray:
+    """
+    DatetimeIndex를 초 단위 epoch(int64) 배열로 변환.
+    - tz 정보가 없으면 main.py의 ``Timestamp.timestamp()``와 동일하게 UTC로 간주
+    """
+    idx = pd.DatetimeIndex(index)
+    if idx.tz is not None:
+        idx = idx.tz_convert("UTC").tz_localize(None)
+    return idx.as_unit("s").asi8.astype(np.int64)
+
+
+@with_db
+def upsert_ohlcv(conn: sqlite3.Connection, ticker: str, interval: str,
+                 df: pd.DataFrame) -> int:
+    """
+    OHLCV DataFrame을 ohlcv 테이블에 executemany로 일괄 upsert.
+    - (ticker, interval, ts)가 이미 있으면 값만 갱신 (진행 중인 봉 보정)
+    - 반환값: 처리한 행 수
+    """
+    if df is None or df.empty:
+        return 0
+    try:
+        ts = index_to_epoch(df.index)
+        cols = [df[c].to_numpy(dtype=np.float64) for c in OHLCV_COLUMNS]
+        rows = zip(
+            repeat(ticker), repeat(interval), ts.tolist(),
+            *(c.tolist() for c in cols),
+        )
+        conn.executemany(
+            """INSERT INTO ohlcv (ticker, interval, ts, open, high, low, close, volume)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(ticker, interval, ts) DO UPDATE SET
+                 open=excluded.open, high=excluded.high, low=excluded.low,
+                 close=excluded.close, volume=excluded.volume""",
+            rows,
+        )
+        return len(ts)
+    except Exception as e:
+        logger.exception(f"upsert_ohlcv: 예외 발생: {e}")
+        return 0
+
+
+@with_db
+def load_ohlcv_range(conn: sqlite3.Connection, ticker: str, interval: str,
+                     start_ts: Optional[int] = None, end_ts: Optional[int] = None,
+                     limit: Optional[int] = None) -> np.ndarray:
+    """
+    [start_ts, end_ts] 구간의 봉을 ts 오름차순 구조화 배열(OHLCV_DTYPE)로 반환.
+    - limit 지정 시 구간 내 가장 최근 limit개만 반환
+    - 커서 튜플을 np.fromiter로 바로 적재 (중간 DataFrame/Row 객체 없음)
+    """
+    try:
+        where = "ticker=? AND interval=?"
+        params: list = [ticker, interval]
+        if start_ts is not None:
+            where += " AND ts>=?"
+            params.append(int(start_ts))
+        if end_ts is not None:
+            where += " AND ts<=?"
+            params.append(int(end_ts))
+
+        sql = f"SELECT ts, open, high, low, close, volume FROM ohlcv WHERE {where}"
+        if limit is not None:
+            sql = f"SELECT * FROM ({sql} ORDER BY ts DESC LIMIT ?) ORDER BY ts ASC"
+            params.append(int(limit))
+        else:
+            sql += " ORDER BY ts ASC"
+
+        cur = conn.cursor()
+        cur.row_factory = None
+        cur.execute(sql, params)
+        return np.fromiter(cur, dtype=OHLCV_DTYPE)
+    except Exception as e:
+        logger.exception(f"load_ohlcv_range: 예외 발생: {e}")
+        return np.empty(0, dtype=OHLCV_DTYPE)
+
+
+def ohlcv_to_frame(arr: np.ndarray) -> pd.DataFrame:
+    """구조화 배열을 기존 모듈이 쓰는 DatetimeIndex 기반 DataFrame으로 변환."""
+    index = pd.to_datetime(arr["ts"], unit="s")
+    return pd.DataFrame({c: arr[c] for c in OHLCV_COLUMNS}, index=index)
+
+
+def load_ohlcv_frame(ticker: str, interval: str,
+                     start_ts: Optional[int] = None, end_ts: Optional[int] = None,
+                     limit: Optional[int] = None) -> pd.DataFrame:
+    """load_ohlcv_range() 결과를 DataFrame으로 반환 (백테스트·튜닝 스크립트용)."""
+    return ohlcv_to_frame(load_ohlcv_range(ticker, interval, start_ts, end_ts, limit))
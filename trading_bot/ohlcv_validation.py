@@ -0,0 +1,200 @@
+# trading_bot/ohlcv_validation.py
+
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from trading_bot.db_helpers import with_db
+from trading_bot.ohlcv_store import OHLCV_COLUMNS, index_to_epoch, interval_seconds
+
+logger = logging.getLogger(__name__)
+
+# ──────────────────────────────────────────────────────────────────────
+# 수집 단계 OHLCV 검증 + 격리 (ohlcv_quarantine 테이블, trading.db)
+# - 받은 배치 전체를 NumPy 배열 연산으로 한 번에 검사:
+#   타임스탬프 파싱 실패·중복·봉 간격 격자 이탈, 결측/비유한 값, 가격 ≤ 0,
+#   high < max(open, close), low > min(open, close), 거래량 < 0
+# - 불량 행은 사유와 함께 격리 테이블로, 정상 행만 시간순으로 반환
+# - 빠진 봉 수도 함께 집계 (봉 간격 격자 기준)
+# - 캐시·ohlcv 테이블·지표 계산은 검증을 통과한 행만 받으므로 각자 결측 검사를 반복하지 않음
+# ──────────────────────────────────────────────────────────────────────
+
+@dataclass
+class ValidationResult:
+    """배치 검증 결과."""
+    clean: pd.DataFrame       # 정상 행 (시간순, 중복 없음)
+    rejected: pd.DataFrame    # 불량 행 (원래 값 + raw_ts, ts, reason)
+    missing_bars: int         # 정상 행 사이에 빠진 봉 수
+
+
+def _grid_seconds(interval: str) -> Optional[int]:
+    """봉 간격(초). 알 수 없는 간격이면 None (격자·빠진 봉 검사 생략)."""
+    try:
+        return interval_seconds(interval)
+    except ValueError:
+        return None
+
+
+def validate_ohlcv(df: pd.DataFrame, interval: str) -> ValidationResult:
+    """
+    df(인덱스=봉 시각, open/high/low/close/volume 열)를 검증해 정상/불량 행으로 나눔.
+    - 같은 시각이 여러 번 오면 마지막 행을 남기고 앞의 행은 duplicate_ts로 격리
+    - 시간 역순으로 와도 정렬해서 반환 (격리 사유 아님)
+    - 한 행에 사유가 여럿이면 쉼표로 이어 붙임
+    """
+    if df is None or df.empty:
+        empty = pd.DataFrame(columns=OHLCV_COLUMNS)
+        return ValidationResult(df if df is not None else empty, empty, 0)
+    missing_cols = set(OHLCV_COLUMNS) - set(df.columns)
+    if missing_cols:
+        logger.warning(f"validate_ohlcv: 필수 컬럼 누락 {missing_cols} → 전체 격리")
+        rejected = df.assign(raw_ts=df.index.astype(str), ts=np.nan, reason="missing_columns")
+        return ValidationResult(df.iloc[0:0], rejected, 0)
+
+    n = len(df)
+    values = df[OHLCV_COLUMNS].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    open_, high, low, close, volume = values.T
+    idx = pd.to_datetime(df.index, errors="coerce")
+    bad_ts = np.asarray(idx.isna())
+    ts = np.zeros(n, dtype=np.int64)
+    if (~bad_ts).any():
+        ts[~bad_ts] = index_to_epoch(idx[~bad_ts])
+
+    # 시간순 정렬(안정 정렬) 후 같은 시각의 앞 행은 중복
+    order = np.argsort(np.where(bad_ts, np.iinfo(np.int64).max, ts), kind="stable")
+    dup_sorted = np.zeros(n, dtype=bool)
+    ts_sorted, bad_sorted = ts[order], bad_ts[order]
+    dup_sorted[:-1] = (ts_sorted[:-1] == ts_sorted[1:]) & ~bad_sorted[:-1] & ~bad_sorted[1:]
+    duplicate = np.zeros(n, dtype=bool)
+    duplicate[order] = dup_sorted
+
+    # 격자: 배치 대다수 봉과 같은 (ts mod 간격) 위치 (일봉은 KST 09:00 시작이라 0이 아님)
+    step = _grid_seconds(interval)
+    off_grid = np.zeros(n, dtype=bool)
+    if step and (~bad_ts).any():
+        residue = ts % step
+        values_r, counts = np.unique(residue[~bad_ts], return_counts=True)
+        off_grid = ~bad_ts & (residue != values_r[np.argmax(counts)])
+    with np.errstate(invalid="ignore"):
+        checks = [
+            ("bad_timestamp", bad_ts),
+            ("duplicate_ts", duplicate),
+            ("off_grid", off_grid),
+            ("nan", ~np.isfinite(values).all(axis=1)),
+            ("non_positive_price", (values[:, :4] <= 0).any(axis=1)),
+            ("high_below_body", high < np.maximum(open_, close)),
+            ("low_above_body", low > np.minimum(open_, close)),
+            ("negative_volume", volume < 0),
+        ]
+    reasons = np.full(n, "", dtype=object)
+    for name, mask in checks:
+        if mask.any():
+            reasons[mask] = reasons[mask] + name + ","
+    bad = reasons != ""
+
+    keep = order[~bad[order]]
+    clean = df.iloc[keep]
+    if not isinstance(clean.index, pd.DatetimeIndex):
+        clean = clean.set_axis(idx[keep])
+
+    missing = 0
+    if step and len(keep) >= 2:
+        gaps = np.diff(ts[keep]) // step - 1
+        missing = int(gaps[gaps > 0].sum())
+
+    rejected = df.iloc[np.flatnonzero(bad)][OHLCV_COLUMNS].assign(
+        raw_ts=df.index[bad].astype(str),
+        ts=np.where(bad_ts[bad], np.nan, ts[bad]),
+        reason=[r.rstrip(",") for r in reasons[bad]],
+    )
+    return ValidationResult(clean, rejected, missing)
+
+
+@with_db
+def save_quarantine(conn: sqlite3.Connection, ticker: str, interval: str,
+                    rejected: pd.DataFrame) -> int:
+    """
+    불량 행을 ohlcv_quarantine에 upsert (같은 봉이 다시 오면 seen·last_seen·값만 갱신).
+    반환값: 처리한 행 수
+    """
+    if rejected is None or rejected.empty:
+        return 0
+    try:
+        now = time.time()
+        ts = [None if pd.isna(t) else int(t) for t in rejected["ts"]]
+        cols = [
+            [None if pd.isna(v) else float(v)
+             for v in pd.to_numeric(rejected[c], errors="coerce")]
+            if c in rejected.columns else [None] * len(rejected)
+            for c in OHLCV_COLUMNS
+        ]
+        rows = [
+            (ticker, interval, raw, t, *vals, reason, now, now)
+            for raw, t, reason, *vals in zip(
+                rejected["raw_ts"], ts, rejected["reason"], *cols
+            )
+        ]
+        conn.executemany(
+            """INSERT INTO ohlcv_quarantine
+               (ticker, interval, raw_ts, ts, open, high, low, close, volume,
+                reason, first_seen, last_seen, seen)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+               ON CONFLICT(ticker, interval, raw_ts) DO UPDATE SET
+                 ts=excluded.ts, open=excluded.open, high=excluded.high,
+                 low=excluded.low, close=excluded.close, volume=excluded.volume,
+                 reason=excluded.reason, last_seen=excluded.last_seen, seen=seen+1""",
+            rows,
+        )
+        return len(rows)
+    except Exception as e:
+        logger.exception(f"save_quarantine: 예외 발생: {e}")
+        return 0
+
+
+@with_db
+def load_quarantine(conn: sqlite3.Connection, ticker: Optional[str] = None,
+                    limit: int = 100) -> pd.DataFrame:
+    """최근 격리 행 (last_seen 내림차순)."""
+    try:
+        where, params = "", []
+        if ticker:
+            where, params = "WHERE ticker=?", [ticker]
+        cur = conn.execute(
+            f"""SELECT ticker, interval, raw_ts, ts, open, high, low, close, volume,
+                       reason, first_seen, last_seen, seen
+                FROM ohlcv_quarantine {where} ORDER BY last_seen DESC LIMIT ?""",
+            (*params, limit),
+        )
+        cols = [c[0] for c in cur.description]
+        return pd.DataFrame([tuple(r) for r in cur.fetchall()], columns=cols)
+    except Exception as e:
+        logger.exception(f"load_quarantine: 예외 발생: {e}")
+        return pd.DataFrame()
+
+
+def validate_batch(ticker: str, interval: str, df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+    """
+    수집한 배치를 검증하고 불량 행은 격리한 뒤 정상 행만 반환 (정상 행이 없으면 None).
+    - 격리 저장이 실패해도 정상 행은 그대로 반환
+    """
+    if df is None or df.empty:
+        return None
+    result = validate_ohlcv(df, interval)
+    if not result.rejected.empty:
+        counts = result.rejected["reason"].str.split(",").explode().value_counts()
+        logger.warning(
+            f"validate_batch: {ticker} {interval} {len(result.rejected)}/{len(df)}행 격리 "
+            f"({', '.join(f'{k} {v}' for k, v in counts.items())})"
+        )
+        try:
+            save_quarantine(ticker, interval, result.rejected)
+        except Exception:
+            logger.exception("validate_batch: 격리 저장 중 예외 발생(무시)")
+    if result.missing_bars:
+        logger.warning(f"validate_batch: {ticker} {interval} 빠진 봉 {result.missing_bars}개")
+    return result.clean if not result.clean.empty else None
@@ -0,0 +1,92 @@
+# trading_bot/pattern_prefetch.py
+
+import logging
+import time
+from typing import Optional
+
+import pandas as pd
+
+from trading_bot.ai_client import cycle_budget
+from trading_bot.ai_helpers import PATTERN_PREFIX_BARS, ask_candle_patterns
+from trading_bot.config import AI_CYCLE_BUDGET_SEC, REFLECTION_INTERVAL_SEC
+from trading_bot.data_fetcher import fetch_data_15m
+from trading_bot.db_helpers import get_last_reflection_ts
+
+logger = logging.getLogger(__name__)
+
+# ──────────────────────────────────────────────────────────────────────
+# AI 패턴 태깅 선행 계산 (상주 모드 전용)
+# - 사이클이 끝난 뒤 봉 마감 PATTERN_PREFETCH_LEAD_SEC초 전(한가한 구간)에
+#   '진행 중 봉을 제외한 확정 봉 PATTERN_PREFIX_BARS개'를 미리 태깅해 ai_cache에 저장
+# - 마감 후 사이클의 ask_candle_patterns()는 같은 봉 지문으로 이 결과를 찾아
+#   새로 확정된 봉만 보내는 작은 delta 호출로 끝남 (전체 100봉 호출 생략)
+# - AI 패턴 검사는 반성문 주기에만 실행되므로 다음 사이클이 그 주기일 때만 선행 계산
+# ──────────────────────────────────────────────────────────────────────
+
+def next_close(now: float, interval_sec: int) -> float:
+    """now 이후 처음 오는 봉 마감 시각(epoch 초). Upbit 봉은 UTC 기준 간격에 정렬됨."""
+    return (now // interval_sec + 1) * interval_sec
+
+
+def sleep_until(ts: float) -> None:
+    delay = ts - time.time()
+    if delay > 0:
+        time.sleep(delay)
+
+
+def prefix_window(df: pd.DataFrame) -> Optional[pd.DataFrame]:
+    """진행 중인 마지막 봉을 뺀 확정 봉 중 최근 PATTERN_PREFIX_BARS개 (부족하면 None)."""
+    closed = df.dropna().iloc[:-1]
+    if len(closed) < PATTERN_PREFIX_BARS:
+        return None
+    return closed.iloc[-PATTERN_PREFIX_BARS:]
+
+
+def prefetch_due(close_ts: float) -> bool:
+    """close_ts에 시작할 사이클이 반성문 주기(=AI 패턴 검사 시점)인지 여부."""
+    try:
+        last_reflection = get_last_reflection_ts()
+    except Exception as e:
+        logger.exception(f"prefetch_due: 예외 발생: {e}")
+        return False
+    return close_ts - last_reflection >= REFLECTION_INTERVAL_SEC
+
+
+def prefetch_candle_patterns(df: Optional[pd.DataFrame] = None) -> bool:
+    """
+    확정 봉 구간을 태깅해 캐시에 저장 (이미 캐시에 있으면 호출 없이 적중).
+    - df 생략 시 최신 15분봉을 새로 받음
+    - 반환값: 태깅 결과를 캐시에 확보했는지 여부
+    """
+    try:
+        if df is None:
+            df = fetch_data_15m(use_cache=False)
+        if df is None or df.empty:
+            logger.warning("prefetch_candle_patterns: 15분봉 데이터 없음 → 생략")
+            return False
+        window = prefix_window(df)
+        if window is None:
+            logger.warning(
+                f"prefetch_candle_patterns: 확정 봉 부족 ({len(df)}봉) → 생략"
+            )
+            return False
+        patterns = ask_candle_patterns(window, min_rows=PATTERN_PREFIX_BARS)
+        if patterns is None:
+            return False
+        logger.info(
+            f"prefetch_candle_patterns: {window.index[-1]}까지 {len(window)}봉 선행 태깅 완료 "
+            f"(패턴 {len(patterns)}개)"
+        )
+        return True
+    except Exception as e:
+        logger.exception(f"prefetch_candle_patterns: 예외 발생: {e}")
+        return False
+
+
+def run_prefetch(close_ts: float) -> bool:
+    """다음 마감(close_ts) 전까지로 시간 예산을 제한해 선행 태깅 실행."""
+    remaining = close_ts - time.time()
+    if remaining <= 0 or not prefetch_due(close_ts):
+        return False
+    with cycle_budget(min(AI_CYCLE_BUDGET_SEC, remaining)):
+        return prefetch_candle_patterns()
@@ -0,0 +1,315 @@
+# trading_bot/pattern_store.py
+
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from trading_bot.config import PATTERN_HISTORY_FILE
+from trading_bot.db_helpers import init_db, with_db
+
+logger = logging.getLogger(__name__)
+
+# 프로세스당 한 번만 스키마 확인 + pattern_history.json 이전을 수행
+_ready = False
+
+
+@dataclass(frozen=True)
+class PatternStats:
+    """정규화된 패턴 하나의 누적 성과 (결과가 기록된 항목만 count에 포함)."""
+    pattern_key: str
+    seen: int = 0
+    count: int = 0
+    wins: int = 0
+    sum_ret: float = 0.0
+    sum_sq: float = 0.0
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.count if self.count else 0.0
+
+    @property
+    def avg_return(self) -> float:
+        return self.sum_ret / self.count if self.count else 0.0
+
+    @property
+    def std_return(self) -> float:
+        if self.count < 2:
+            return 0.0
+        var = (self.sum_sq - self.sum_ret ** 2 / self.count) / (self.count - 1)
+        return math.sqrt(max(var, 0.0))
+
+
+def normalize_pattern_name(name: str) -> str:
+    """
+    패턴 이름을 통계 키로 정규화.
+    - 소문자, '_'/'-' → 공백, 연속 공백 축약, 끝의 "pattern" 제거
+      (예: "Bull_Flag Pattern" → "bull flag")
+    """
+    key = re.sub(r"[\s_\-]+", " ", str(name or "").lower()).strip()
+    key = re.sub(r"\s*pattern$", "", key).strip()
+    return key
+
+
+def _stats_delta(conn: sqlite3.Connection, key: str, seen: int, count: int,
+                 wins: int, sum_ret: float, sum_sq: float) -> None:
+    """pattern_stats 한 행에 증감분을 더함 (없으면 생성)."""
+    conn.execute(
+        """INSERT INTO pattern_stats (pattern_key, seen, count, wins, sum_ret, sum_sq)
+           VALUES (?, ?, ?, ?, ?, ?)
+           ON CONFLICT(pattern_key) DO UPDATE SET
+             seen=seen+excluded.seen, count=count+excluded.count,
+             wins=wins+excluded.wins, sum_ret=sum_ret+excluded.sum_ret,
+             sum_sq=sum_sq+excluded.sum_sq""",
+        (key, seen, count, wins, sum_ret, sum_sq),
+    )
+
+
+def _result_terms(result: Optional[float]) -> Tuple[int, int, float, float]:
+    """결과 하나가 (count, wins, sum_ret, sum_sq)에 기여하는 값."""
+    if result is None:
+        return 0, 0, 0.0, 0.0
+    return 1, int(result > 0), result, result * result
+
+
+@with_db
+def migrate_pattern_history_json(conn: sqlite3.Connection) -> int:
+    """
+    기존 pattern_history.json을 pattern_history 테이블로 일괄 이전.
+    - BEGIN IMMEDIATE로 쓰기 잠금을 잡은 뒤 파일 존재를 다시 확인 (동시 실행 시 중복 방지)
+    - 예전 check_ai_patterns는 모든 항목(hold 포함)에 "result": 0.0 자리표시를 넣었으므로
+      0.0과 hold 항목의 결과는 미확정(NULL)으로 이전 (attribution이 실제 체결로 다시 채움)
+    - 이전 후 원본은 .migrated로, JSON 손상 시 .bak로 이름 변경
+    - 반환값: 이전한 항목 수
+    """
+    if not PATTERN_HISTORY_FILE.exists():
+        return 0
+
+    conn.execute("BEGIN IMMEDIATE")
+    if not PATTERN_HISTORY_FILE.exists():
+        return 0
+
+    try:
+        data = json.loads(PATTERN_HISTORY_FILE.read_text(encoding="utf-8"))
+    except json.JSONDecodeError as e:
+        bak_path = str(PATTERN_HISTORY_FILE) + ".bak"
+        os.replace(PATTERN_HISTORY_FILE, bak_path)
+        logger.warning(f"migrate_pattern_history_json: JSON 디코드 오류({e}) → {bak_path}로 백업")
+        return 0
+
+    rows = []
+    if isinstance(data, list):
+        for h in data:
+            if not isinstance(h, dict):
+                continue
+            try:
+                result = float(h["result"]) if h.get("result") is not None else None
+            except (TypeError, ValueError):
+                result = None
+            if result == 0.0 or h.get("decision") == "hold":
+                result = None
+            rows.append((
+                float(h.get("timestamp", 0.0) or 0.0),
+                str(h.get("pattern", "")),
+                str(h.get("decision", "")),
+                result,
+            ))
+
+    conn.executemany(
+        "INSERT INTO pattern_history (ts, pattern, decision, result) VALUES (?, ?, ?, ?)",
+        rows,
+    )
+    _rebuild_stats(conn)
+    # 파일 이름 변경은 커밋 직전에 수행: 실패하면 예외로 INSERT도 롤백됨
+    os.replace(PATTERN_HISTORY_FILE, str(PATTERN_HISTORY_FILE) + ".migrated")
+    logger.info(f"migrate_pattern_history_json: {len(rows)}건 이전 완료")
+    return len(rows)
+
+
+def _rebuild_stats(conn: sqlite3.Connection) -> None:
+    """pattern_history 전체로부터 pattern_stats를 다시 계산."""
+    conn.execute("DELETE FROM pattern_stats")
+    conn.create_function("normalize_pattern", 1, normalize_pattern_name, deterministic=True)
+    conn.execute(
+        """INSERT INTO pattern_stats (pattern_key, seen, count, wins, sum_ret, sum_sq)
+           SELECT normalize_pattern(pattern), COUNT(*), COUNT(result),
+                  COALESCE(SUM(result > 0), 0), COALESCE(SUM(result), 0.0),
+                  COALESCE(SUM(result * result), 0.0)
+           FROM pattern_history
+           GROUP BY normalize_pattern(pattern)"""
+    )
+
+
+@with_db
+def rebuild_pattern_stats(conn: sqlite3.Connection) -> None:
+    """pattern_stats 인덱스를 pattern_history로부터 재구축 (검증·복구용)."""
+    _rebuild_stats(conn)
+
+
+@with_db
+def _ensure_stats(conn: sqlite3.Connection) -> None:
+    """기존 pattern_history가 있는데 통계가 비어 있으면 한 번 재구축."""
+    has_stats = conn.execute("SELECT 1 FROM pattern_stats LIMIT 1").fetchone()
+    has_history = conn.execute("SELECT 1 FROM pattern_history LIMIT 1").fetchone()
+    if has_history and not has_stats:
+        _rebuild_stats(conn)
+
+
+def _ensure_ready() -> None:
+    """스키마 생성과 JSON 이전을 프로세스당 한 번만 실행."""
+    global _ready
+    if _ready:
+        return
+    init_db()
+    migrate_pattern_history_json()
+    _ensure_stats()
+    _ready = True
+
+
+@with_db
+def _insert_entry(conn: sqlite3.Connection, entry: Dict[str, Any]) -> int:
+    result = entry.get("result")
+    result = float(result) if result is not None else None
+    pattern = str(entry.get("pattern", ""))
+    cur = conn.execute(
+        "INSERT INTO pattern_history (ts, pattern, decision, result) VALUES (?, ?, ?, ?)",
+        (float(entry.get("timestamp", 0.0)), pattern, str(entry.get("decision", "")), result),
+    )
+    _stats_delta(conn, normalize_pattern_name(pattern), 1, *_result_terms(result))
+    return cur.lastrowid
+
+
+def apply_pattern_results(conn: sqlite3.Connection,
+                          updates: List[Tuple[int, Optional[float]]]) -> int:
+    """
+    이미 열린 연결(conn)에서 pattern_history.result를 갱신하고 pattern_stats에 증감분 반영.
+    - 호출자의 트랜잭션 안에서 실행 (attribution 등)
+    - 반환값: 실제로 존재해 갱신된 행 수
+    """
+    ids = [i for i, _ in updates]
+    old: Dict[int, sqlite3.Row] = {}
+    for chunk in range(0, len(ids), 500):
+        part = ids[chunk:chunk + 500]
+        marks = ",".join("?" * len(part))
+        for r in conn.execute(
+            f"SELECT id, pattern, result FROM pattern_history WHERE id IN ({marks})", part
+        ):
+            old[r["id"]] = r
+
+    rows = [(res, i) for i, res in updates if i in old]
+    conn.executemany("UPDATE pattern_history SET result=? WHERE id=?", rows)
+
+    deltas: Dict[str, List[float]] = {}
+    for res, i in rows:
+        key = normalize_pattern_name(old[i]["pattern"])
+        acc = deltas.setdefault(key, [0, 0, 0.0, 0.0])
+        for n, (new_v, old_v) in enumerate(zip(_result_terms(res), _result_terms(old[i]["result"]))):
+            acc[n] += new_v - old_v
+    for key, (count, wins, sum_ret, sum_sq) in deltas.items():
+        _stats_delta(conn, key, 0, int(count), int(wins), sum_ret, sum_sq)
+    return len(rows)
+
+
+@with_db
+def _update_results(conn: sqlite3.Connection,
+                    updates: List[Tuple[int, Optional[float]]]) -> int:
+    return apply_pattern_results(conn, updates)
+
+
+@with_db
+def _select_stats(conn: sqlite3.Connection, key: str) -> Optional[sqlite3.Row]:
+    return conn.execute(
+        "SELECT pattern_key, seen, count, wins, sum_ret, sum_sq FROM pattern_stats WHERE pattern_key=?",
+        (key,),
+    ).fetchone()
+
+
+@with_db
+def _select_entries(conn: sqlite3.Connection, pattern: Optional[str],
+                    limit: Optional[int]) -> List[Dict[str, Any]]:
+    sql = "SELECT id, ts, pattern, decision, result FROM pattern_history"
+    params: list = []
+    if pattern is not None:
+        sql += " WHERE pattern=?"
+        params.append(pattern)
+    if limit is not None:
+        sql = f"SELECT * FROM ({sql} ORDER BY id DESC LIMIT ?) ORDER BY id ASC"
+        params.append(int(limit))
+    else:
+        sql += " ORDER BY id ASC"
+    return [
+        {
+            "id": r["id"],
+            "timestamp": r["ts"],
+            "pattern": r["pattern"],
+            "decision": r["decision"],
+            "result": r["result"],
+        }
+        for r in conn.execute(sql, params).fetchall()
+    ]
+
+
+def append_pattern_entry(entry: Dict[str, Any]) -> int:
+    """
+    패턴 발생 기록(entry: {timestamp, pattern, decision, result})을 한 행 INSERT (O(1)).
+    - 반환값: 새 행 id (실패 시 0)
+    """
+    try:
+        _ensure_ready()
+        return _insert_entry(entry)
+    except Exception:
+        logger.exception("append_pattern_entry() 호출 중 예외 발생")
+        return 0
+
+
+def load_pattern_entries(pattern: Optional[str] = None,
+                         limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    pattern_history 행을 dict 리스트로 반환 (id 오름차순).
+    - pattern 지정 시 인덱스로 해당 패턴만 조회
+    - limit 지정 시 가장 최근 limit개만 반환
+    """
+    try:
+        _ensure_ready()
+        return _select_entries(pattern, limit)
+    except Exception:
+        logger.exception("load_pattern_entries() 호출 중 예외 발생 → 빈 리스트 반환")
+        return []
+
+
+def update_pattern_results(updates: Iterable[Tuple[int, Optional[float]]]) -> int:
+    """
+    (id, result) 목록으로 pattern_history.result를 일괄 갱신하고 pattern_stats도 함께 보정.
+    - result=None은 '미확정'으로 되돌림
+    - 반환값: 갱신된 행 수
+    """
+    updates = [(int(i), float(r) if r is not None else None) for i, r in updates]
+    if not updates:
+        return 0
+    try:
+        _ensure_ready()
+        return _update_results(updates)
+    except Exception:
+        logger.exception("update_pattern_results() 호출 중 예외 발생")
+        return 0
+
+
+def get_pattern_stats(pattern: str) -> PatternStats:
+    """
+    패턴 이름(정규화 후)의 누적 성과를 O(1) 기본키 조회로 반환.
+    - 기록이 없으면 0으로 채운 PatternStats
+    """
+    key = normalize_pattern_name(pattern)
+    try:
+        _ensure_ready()
+        row = _select_stats(key)
+    except Exception:
+        logger.exception("get_pattern_stats() 호출 중 예외 발생")
+        row = None
+    if row is None:
+        return PatternStats(pattern_key=key)
+    return PatternStats(**dict(row))
@@ -15,8 +15,8 @@ from trading_bot.ai_helpers import (
     ask_candle_patterns,
     ask_pattern_decision,
     save_pattern_history_entry,
-    load_pattern_history,
 )
+from trading_bot.pattern_store import get_pattern_stats
 from trading_bot.config import (
     VOLUME_SPIKE_THRESHOLD,
     DOJI_TOLERANCE,
@@ -156,29 +156,12 @@ def check_ai_patterns(ctx) -> Tuple[bool, bool, str]:
         logger.info(f"'{detected}'은 KNOWN_PATTERNS에 해당 → 룰 기반 처리 우선")
         return False, False, ""
 
-    # 5) 과거 히스토리 요약 및 로그에 남기기
-    history = load_pattern_history()
-    matched = [h for h in history if h.get("pattern", "").lower() in detected]
-    wins = 0
-    losses = 0
-    profits = []
-    for h in matched:
-        try:
-            val = float(h.get("result", 0.0))
-            profits.append(val)
-            if val > 0:
-                wins += 1
-            else:
-                losses += 1
-        except Exception:
-            continue
-
-    total = len(profits)
-    if total > 0:
-        win_rate = wins / total
-        avg_return = sum(profits) / total
+    # 5) 과거 히스토리 요약 및 로그에 남기기 (정규화된 패턴 이름 기준 누적 통계)
+    stats = get_pattern_stats(detected)
+    if stats.count > 0:
         logger.info(
-            f"check_ai_patterns: '{detected}' 과거 히스토리 → win_rate={win_rate:.1%}, avg_return={avg_return:.2f}%"
+            f"check_ai_patterns: '{detected}' 과거 히스토리 {stats.count}건 → "
+            f"win_rate={stats.win_rate:.1%}, avg_return={stats.avg_return:.2f}%"
         )
     else:
         logger.info(f"check_ai_patterns: '{detected}' 과거 히스토리 없음")
@@ -198,12 +181,12 @@ def check_ai_patterns(ctx) -> Tuple[bool, bool, str]:
 
     logger.info(f"check_ai_patterns: AI 매매 결정 → {decision}")
 
-    # 7) 패턴 히스토리 저장 (result 필드는 매매 체결 후 업데이트 예정)
+    # 7) 패턴 히스토리 저장 (result는 미확정(None): 결과가 채워질 때 통계에 반영)
     entry = {
         "timestamp": time.time(),
         "pattern": detected,
         "decision": decision,
-        "result": 0.0  # executor에서 실제 체결 후 이 값이 업데이트되어야 함
+        "result": None,
     }
     save_pattern_history_entry(entry)
 
@@ -0,0 +1,355 @@
+# trading_bot/profiles.py
+
+import argparse
+import json
+import logging
+import multiprocessing
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+import trading_bot.config as cfg
+from trading_bot.config import (
+    DAEMON_CLOSE_DELAY_SEC,
+    INTERVAL,
+    LOG_DIR,
+    NOISE_WINDOW,
+    PROFILE_DECISION_TIMEOUT_SEC,
+    PROFILE_DIR,
+    PROFILES_FILE,
+    TICKER,
+    apply_overrides,
+)
+from trading_bot.context import SignalContext
+from trading_bot.db_helpers import (
+    has_indicator,
+    init_db,
+    load_account,
+    log_indicator,
+    log_trade,
+    with_db,
+)
+from trading_bot.executor import execute_trade
+from trading_bot.indicators_1h import calc_indicators_1h
+from trading_bot.indicators_common import calc_indicators_15m
+from trading_bot.ohlcv_store import OHLCV_COLUMNS, interval_seconds
+from trading_bot.strategies import check_trend_1h, rule_signals
+
+logger = logging.getLogger(__name__)
+
+# ──────────────────────────────────────────────────────────────────────
+# 다중 프로필 모의 실행 (python -m trading_bot.profiles)
+# - 부모 프로세스: 봉마다 15분봉·1시간봉 로드, 노이즈 판정·지표·FNG를 한 번만 계산 → CandlePayload
+# - 프로필마다 전용 프로세스 1개 (spawn, 작업자 1개짜리 ProcessPoolExecutor):
+#   시작할 때 apply_overrides()로 파라미터를 덮어쓰고 DB는 PROFILE_DIR/<이름>.db,
+#   로그는 LOG_DIR/profiles/<이름>.log로 분리 → 가상 계좌·매매 기록·로그가 프로필끼리 섞이지 않음
+# - 프로세스는 계속 살아 있으므로 import·설정 비용은 시작할 때 한 번, 봉마다 드는 비용은 판정 로직뿐
+#   (지표 창 길이를 바꾼 프로필만 자기 창으로 지표를 다시 계산)
+# - 항상 가상 모드(LIVE_MODE=false), Discord 알림 없음, AI 패턴 검사 없음 (룰 패턴 + 보조 전략 A/B)
+# - 노이즈 판정은 부모 설정으로 한 번만 함 (노이즈 봉이면 모든 프로필이 건너뜀)
+# ──────────────────────────────────────────────────────────────────────
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+# 프로필 프로세스에서 항상 강제하는 설정
+_FORCED = {"LIVE_MODE": False, "DISCORD_WEBHOOK": ""}
+
+# 작업자 프로세스의 프로필 이름 (_init_worker가 설정)
+_profile: Optional[str] = None
+
+
+@dataclass
+class CandlePayload:
+    """봉 하나에 대해 모든 프로필이 공유하는 입력 (부모가 한 번 계산해 각 프로세스로 전달)."""
+    df_15m: pd.DataFrame            # 15분봉 + 부모 설정 지표
+    df_1h: Optional[pd.DataFrame]   # 1시간봉 + 부모 설정 지표
+    fear_idx: int
+    params_15m: tuple               # df_15m 지표를 계산한 창 길이
+    params_1h: tuple                # df_1h 지표를 계산한 창 길이
+
+
+def _params_15m() -> tuple:
+    return cfg.SMA_WINDOW, cfg.ATR_WINDOW
+
+
+def _params_1h() -> tuple:
+    return cfg.EMA_FAST_WINDOW, cfg.EMA_SLOW_WINDOW, cfg.RSI_WINDOW, cfg.ATR_WINDOW
+
+
+def load_profiles(path: Path = PROFILES_FILE) -> Dict[str, dict]:
+    """
+    프로필 정의 JSON 로드·검증: {"이름": {"SMA_WINDOW": 20, "STOP_LOSS_PCT": 0.04, ...}, ...}
+    이름은 영문·숫자·_·-만, 설정 이름·값은 apply_overrides 기준으로 검증 (실패 시 ValueError).
+    """
+    with open(path, encoding="utf-8") as f:
+        profiles = json.load(f)
+    if not isinstance(profiles, dict) or not profiles:
+        raise ValueError(f"{path}: 프로필이 없거나 형식이 잘못됨 (이름 → 설정 객체)")
+    for name, overrides in profiles.items():
+        validate_profile(name, overrides)
+    return profiles
+
+
+def validate_profile(name: str, overrides: dict) -> None:
+    if not _NAME_RE.match(name):
+        raise ValueError(f"프로필 이름은 영문·숫자·_·-만 사용: {name!r}")
+    if not isinstance(overrides, dict):
+        raise ValueError(f"프로필 {name}: 설정은 객체여야 함")
+    apply_overrides(overrides, dry_run=True)
+
+
+def make_payload(df_15m: pd.DataFrame, df_1h: Optional[pd.DataFrame],
+                 fear_idx: int) -> CandlePayload:
+    """원본 봉으로 공유 지표를 계산해 CandlePayload 생성."""
+    return CandlePayload(
+        df_15m=calc_indicators_15m(df_15m[OHLCV_COLUMNS]),
+        df_1h=calc_indicators_1h(df_1h[OHLCV_COLUMNS]) if df_1h is not None else None,
+        fear_idx=int(fear_idx),
+        params_15m=_params_15m(),
+        params_1h=_params_1h(),
+    )
+
+
+def build_payload(use_cache: bool = False) -> Optional[CandlePayload]:
+    """
+    부모 프로세스: 봉 로드 → 노이즈 필터 → 공유 지표·FNG. 데이터가 없거나 노이즈 봉이면 None.
+    """
+    from trading_bot.data_fetcher import fetch_data_15m, fetch_data_1h
+    from trading_bot.filters import filter_noise
+    from trading_bot.utils import get_fear_and_greed
+
+    df_15m = fetch_data_15m(use_cache=use_cache)
+    if df_15m is None or df_15m.empty:
+        logger.error("build_payload: 15분봉 데이터 로드 실패")
+        return None
+    if filter_noise(df_15m.iloc[-(NOISE_WINDOW + 1):].copy()):
+        logger.info("build_payload: 노이즈 봉 → 모든 프로필 건너뜀")
+        return None
+    return make_payload(df_15m, fetch_data_1h(TICKER, count=100), get_fear_and_greed() or 0)
+
+
+# ── 작업자 프로세스 ──────────────────────────────────────────────────────
+
+def _init_worker(name: str, overrides: dict, db_file: str, log_file: str) -> None:
+    """프로필 프로세스 시작: 로그 분리 → 설정 덮어쓰기 → 프로필 DB 초기화."""
+    global _profile
+    _profile = name
+    handler = RotatingFileHandler(log_file, maxBytes=1_000_000, backupCount=3)
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"%(asctime)s [%(levelname)s] [{name}] %(message)s",
+        handlers=[handler],
+        force=True,
+    )
+    apply_overrides({**overrides, **_FORCED, "DB_FILE": db_file})
+    init_db()
+    logger.info(f"프로필 {name} 시작 (설정 덮어쓰기 {len(overrides)}개)")
+
+
+def _ping() -> Optional[str]:
+    return _profile
+
+
+def decide_profile(payload: CandlePayload) -> dict:
+    """
+    작업자 프로세스: 공유 봉·지표로 이 프로필의 판정·가상 체결.
+    - 지표 창 길이가 부모와 다르면 원본 봉으로 다시 계산
+    - 프로필 DB의 indicator_log로 같은 봉 중복 처리 방지
+    """
+    t0 = time.perf_counter()
+    df_15m, df_1h = payload.df_15m, payload.df_1h
+    if payload.params_15m != _params_15m():
+        df_15m = calc_indicators_15m(df_15m[OHLCV_COLUMNS])
+    if df_1h is not None and payload.params_1h != _params_1h():
+        df_1h = calc_indicators_1h(df_1h[OHLCV_COLUMNS])
+
+    last = df_15m.iloc[-1]
+    ts_end = last.name.floor("15min").timestamp()
+    result = {"profile": _profile, "ts_end": ts_end, "decision": "skip", "executed": False,
+              "pct": 0.0, "pattern": "", "sma": float(last["sma"])}
+    if has_indicator(ts_end):
+        logger.info(f"Candle {pd.to_datetime(ts_end, unit='s')} 이미 처리됨")
+        return result
+
+    krw, btc, avg_price = load_account()
+    price = float(last["close"])
+    ctx = SignalContext(
+        df_15m=df_15m,
+        df_1h=df_1h,
+        last_15m=last,
+        last_1h=df_1h.iloc[-1] if df_1h is not None else None,
+        ts_end=ts_end,
+        price=price,
+        sma30=float(last["sma"]),
+        atr15=float(last["atr"]),
+        vol20=float(last["vol20"]),
+        macd=float(last["macd_diff"]),
+        volume=float(last["volume"]),
+        equity=krw + btc * price,
+        krw=krw,
+        btc=btc,
+        avg_price=avg_price,
+        fear_idx=payload.fear_idx,
+    )
+
+    trend_ok, trend_detail = check_trend_1h(ctx)
+    if trend_ok:
+        buy_sig, sell_sig, pattern = rule_signals(ctx)
+        executed, pct_used = execute_trade(ctx, buy_sig, sell_sig, pattern)
+        decision = "buy" if buy_sig else ("sell" if sell_sig else "hold")
+        log_trade(time.time(), decision, pct_used, pattern or "", pattern or "No signal",
+                  ctx.btc, ctx.krw, ctx.avg_price, ctx.price, "virtual", 0)
+    else:
+        logger.info(f"⏸ 거래 보류: {trend_detail}")
+        executed, pct_used, pattern, decision = False, 0.0, "sma50_filter", "filtered"
+    log_indicator(time.time(), ctx.sma30, ctx.atr15, ctx.vol20, ctx.macd, ctx.price, ctx.fear_idx)
+
+    result.update(decision=decision, executed=executed, pct=pct_used, pattern=pattern or "",
+                  krw=ctx.krw, btc=ctx.btc, equity=ctx.krw + ctx.btc * price,
+                  elapsed_ms=(time.perf_counter() - t0) * 1000)
+    logger.info(
+        f"{decision} executed={executed} pct={pct_used:.2f}% pattern={pattern or 'none'} "
+        f"KRW={ctx.krw:.0f} BTC={ctx.btc:.6f} ({result['elapsed_ms']:.1f}ms)"
+    )
+    return result
+
+
+# ── 부모 프로세스 ────────────────────────────────────────────────────────
+
+class ProfileRunner:
+    """프로필마다 전용 프로세스를 띄워 봉마다 같은 CandlePayload를 나눠 주는 실행기."""
+
+    def __init__(self, profiles: Dict[str, dict], root: Path = PROFILE_DIR,
+                 log_dir: Path = LOG_DIR / "profiles"):
+        for name, overrides in profiles.items():
+            validate_profile(name, overrides)
+        self.root, self.log_dir = Path(root), Path(log_dir)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        # fork는 부모의 스레드·DB 연결·로그 핸들러까지 복제하므로 spawn으로 깨끗하게 시작
+        mp_ctx = multiprocessing.get_context("spawn")
+        self.pools = {
+            name: ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=mp_ctx,
+                initializer=_init_worker,
+                initargs=(name, overrides, str(self.db_file(name)),
+                          str(self.log_dir / f"{name}.log")),
+            )
+            for name, overrides in profiles.items()
+        }
+
+    def db_file(self, name: str) -> Path:
+        return self.root / f"{name}.db"
+
+    def start(self, timeout: float = 120.0) -> None:
+        """모든 프로필 프로세스를 미리 띄워 둠 (첫 봉에서 import 비용이 들지 않도록)."""
+        futures = {name: pool.submit(_ping) for name, pool in self.pools.items()}
+        for name, fut in futures.items():
+            fut.result(timeout=timeout)
+        logger.info(f"프로필 프로세스 {len(futures)}개 준비 완료: {list(futures)}")
+
+    def run_candle(self, payload: CandlePayload,
+                   timeout: Optional[float] = None) -> List[dict]:
+        """
+        모든 프로필에 같은 봉을 보내 판정 결과를 모음 (시간 초과·오류 프로필은 decision='error').
+        - timeout 생략 시 PROFILE_DECISION_TIMEOUT_SEC
+        """
+        if timeout is None:
+            timeout = PROFILE_DECISION_TIMEOUT_SEC
+        deadline = time.time() + timeout
+        futures = {name: pool.submit(decide_profile, payload) for name, pool in self.pools.items()}
+        results = []
+        for name, fut in futures.items():
+            try:
+                results.append(fut.result(timeout=max(0.0, deadline - time.time())))
+            except FutureTimeout:
+                logger.warning(f"프로필 {name}: 판정 시간 초과")
+                results.append({"profile": name, "decision": "error", "error": "timeout"})
+            except Exception as e:
+                logger.exception(f"프로필 {name}: 예외 발생: {e}")
+                results.append({"profile": name, "decision": "error", "error": str(e)})
+        logger.info(
+            "프로필 판정: " + ", ".join(f"{r['profile']}={r['decision']}" for r in results)
+        )
+        return results
+
+    def summary(self) -> pd.DataFrame:
+        """프로필별 가상 계좌·매매 횟수."""
+        return profile_summary(list(self.pools), self.root)
+
+    def close(self) -> None:
+        for pool in self.pools.values():
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+@with_db
+def _account_stats(conn) -> dict:
+    acc = conn.execute("SELECT krw, btc, avg_price FROM account WHERE id=1").fetchone()
+    row = conn.execute(
+        """SELECT COUNT(*) AS fills, MAX(ts) AS last_ts,
+                  (SELECT price FROM trade_log ORDER BY id DESC LIMIT 1) AS last_price
+           FROM trade_log WHERE percentage > 0"""
+    ).fetchone()
+    krw, btc = (acc["krw"], acc["btc"]) if acc else (cfg.INITIAL_KRW, 0.0)
+    return {"krw": krw, "btc": btc, "fills": row["fills"],
+            "equity": krw + btc * (row["last_price"] or 0.0)}
+
+
+def profile_summary(names: List[str], root: Path = PROFILE_DIR) -> pd.DataFrame:
+    rows = []
+    for name in names:
+        path = Path(root) / f"{name}.db"
+        if not path.exists():
+            continue
+        try:
+            rows.append({"profile": name, **_account_stats(db_file=path)})
+        except Exception as e:
+            logger.exception(f"profile_summary: {name} 조회 중 예외 발생: {e}")
+    return pd.DataFrame(rows, columns=["profile", "krw", "btc", "fills", "equity"])
+
+
+def run_profiles(profiles: Dict[str, dict], daemon: bool = False) -> None:
+    from trading_bot.pattern_prefetch import next_close, sleep_until
+
+    init_db()
+    runner = ProfileRunner(profiles)
+    try:
+        runner.start()
+        interval_sec = interval_seconds(INTERVAL)
+        while True:
+            payload = build_payload(use_cache=not daemon)
+            if payload is not None:
+                runner.run_candle(payload)
+            if not daemon:
+                break
+            sleep_until(next_close(time.time(), interval_sec) + DAEMON_CLOSE_DELAY_SEC)
+    except KeyboardInterrupt:
+        logger.info("사용자 중단(Ctrl+C)")
+    finally:
+        runner.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="같은 봉으로 여러 파라미터 프로필을 모의 실행")
+    parser.add_argument("--profiles", type=Path, default=PROFILES_FILE, help="프로필 정의 JSON")
+    parser.add_argument("--daemon", action="store_true", help="봉 마감마다 실행")
+    parser.add_argument("--summary", action="store_true", help="프로필별 가상 계좌 요약만 출력")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    profiles = load_profiles(args.profiles)
+    if args.summary:
+        print(profile_summary(list(profiles)).to_string(index=False))
+        return
+    run_profiles(profiles, daemon=args.daemon)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+# trading_bot/prompt_encoding.py
+
+import json
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# ──────────────────────────────────────────────────────────────────────
+# AI 프롬프트용 압축 봉 인코딩
+# - JSON 레코드(행마다 날짜 문자열 + open/high/low/close/volume 키 반복) 대신
+#   헤더 1줄 + 컬럼 이름 1줄 + 숫자만 있는 행
+#   #candles v=c1 n=100 i0=0 t0=2024-01-01T00:00:00 step=15min ref=143250000 unit=bp
+#   i,o,h,l,c,v
+#   0,-3.1,4.2,-5,0,12.35
+# - 시각: t0 + i × step (i = 봉 번호, 빠진 봉은 번호가 건너뜀)
+# - 가격: 첫 봉 종가(ref) 대비 basis point, 소수 1자리 (0.1bp)
+# - 거래량: 유효숫자 4자리
+# - AI는 봉 번호(i)로 답하고, EncodedCandles.bar_time()으로 시각을 되돌림
+# - estimate_tokens(): BPE 토크나이저(cl100k/o200k) 분할 규칙을 흉내 낸 근사치
+#   (실제 값은 scripts/prompt_encoding_ab.py가 API usage로 측정)
+# ──────────────────────────────────────────────────────────────────────
+
+ENCODING_VERSION = "c1"
+PRICE_DECIMALS = 1
+VOLUME_DIGITS = 4
+DEFAULT_STEP = pd.Timedelta(minutes=15)
+
+# 영문 단어(앞 공백 포함) / 숫자 최대 3자리 / 공백 묶음 / 기호 1개
+_TOKEN_RE = re.compile(r" ?[^\W\d_]+| ?\d{1,3}|\s+|[^\w\s]|_")
+_HEADER_RE = re.compile(r"^#candles (.*)$")
+
+# 프롬프트에 함께 붙이는 형식 설명
+FORMAT_NOTE = (
+    "Candles are compact CSV. The '#candles' header gives t0 (first bar time), step and ref "
+    "(first close). Row i is the bar starting at t0 + (i - i0) * step; o,h,l,c are basis "
+    "points relative to ref; v is volume."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """프롬프트 토큰 수 근사치."""
+    return len(_TOKEN_RE.findall(text))
+
+
+def _fmt_fixed(x: float, decimals: int) -> str:
+    s = f"{x:.{decimals}f}".rstrip("0").rstrip(".")
+    return "0" if s in ("-0", "") else s
+
+
+def _fmt_sig(x: float, digits: int) -> str:
+    if not np.isfinite(x):
+        return ""
+    return np.format_float_positional(x, precision=digits, fractional=False, trim="-")
+
+
+@dataclass(frozen=True)
+class EncodedCandles:
+    """인코딩 결과 + 봉 번호 ↔ 시각 변환 정보."""
+    text: str
+    t0: pd.Timestamp
+    step: pd.Timedelta
+    start_index: int
+    last_index: int
+    rows: int
+    tokens: int
+
+    def bar_time(self, i: int) -> pd.Timestamp:
+        return self.t0 + (int(i) - self.start_index) * self.step
+
+    def bar_index(self, ts: Any) -> int:
+        delta = pd.Timestamp(ts) - self.t0
+        return self.start_index + int(round(delta / self.step))
+
+
+def _infer_step(index: pd.DatetimeIndex) -> pd.Timedelta:
+    if len(index) < 2:
+        return DEFAULT_STEP
+    diffs = index[1:] - index[:-1]
+    diffs = diffs[diffs > pd.Timedelta(0)]
+    return diffs.min() if len(diffs) else DEFAULT_STEP
+
+
+def _encode_rows(df: pd.DataFrame, start_index: int,
+                 step: pd.Timedelta) -> EncodedCandles:
+    t0 = pd.Timestamp(df.index[0])
+    ref = float(df["close"].iloc[0]) or 1.0
+    offsets = np.rint((df.index - t0) / step).astype(np.int64) + start_index
+    bp = (df[["open", "high", "low", "close"]].to_numpy(dtype=float) / ref - 1.0) * 1e4
+
+    header = (
+        f"#candles v={ENCODING_VERSION} n={len(df)} i0={start_index} t0={t0.isoformat()} "
+        f"step={_fmt_step(step)} ref={_fmt_sig(ref, 12)} unit=bp"
+    )
+    lines = [header, "i,o,h,l,c,v"]
+    for i, row, vol in zip(offsets, bp, df["volume"].to_numpy(dtype=float)):
+        lines.append(
+            f"{i}," + ",".join(_fmt_fixed(x, PRICE_DECIMALS) for x in row)
+            + f",{_fmt_sig(vol, VOLUME_DIGITS)}"
+        )
+    text = "\n".join(lines)
+    return EncodedCandles(
+        text, t0, step, start_index, int(offsets[-1]), len(df), estimate_tokens(text)
+    )
+
+
+def _fmt_step(step: pd.Timedelta) -> str:
+    minutes = step / pd.Timedelta(minutes=1)
+    return f"{minutes:g}min"
+
+
+def encode_candles(df: pd.DataFrame, start_index: int = 0,
+                   max_tokens: Optional[int] = None,
+                   step: Optional[pd.Timedelta] = None) -> EncodedCandles:
+    """
+    OHLCV DataFrame(DatetimeIndex)을 압축 텍스트로 인코딩.
+    - start_index: 첫 봉 번호 (delta 호출처럼 큰 창의 뒷부분만 보낼 때 번호를 이어 붙임)
+    - max_tokens: 토큰 예산. 넘으면 오래된 봉부터 잘라 예산 안으로 맞춤 (최소 1봉)
+    """
+    df = df[["open", "high", "low", "close", "volume"]].dropna()
+    if df.empty:
+        raise ValueError("encode_candles: 인코딩할 봉이 없음")
+    step = step or _infer_step(df.index)
+    enc = _encode_rows(df, start_index, step)
+    if max_tokens is None or enc.tokens <= max_tokens:
+        return enc
+
+    # 행당 토큰이 거의 일정하므로 비율로 한 번에 자른 뒤 초과분만 한 봉씩 조정
+    per_row = enc.tokens / len(df)
+    keep = max(1, min(len(df), int(max_tokens / per_row)))
+    while True:
+        part = df.iloc[-keep:]
+        skipped = int(round((part.index[0] - df.index[0]) / step))
+        trimmed = _encode_rows(part, start_index + skipped, step)
+        if trimmed.tokens <= max_tokens or keep == 1:
+            break
+        keep -= 1
+    logger.warning(
+        f"encode_candles: 토큰 예산 {max_tokens} 초과({enc.tokens}) → 최근 {keep}/{len(df)}봉만 사용"
+    )
+    return trimmed
+
+
+def decode_candles(text: str) -> pd.DataFrame:
+    """encode_candles() 출력을 DataFrame으로 복원 (정밀도만큼 오차 존재)."""
+    lines = text.strip().splitlines()
+    m = _HEADER_RE.match(lines[0])
+    if not m or lines[1] != "i,o,h,l,c,v":
+        raise ValueError("decode_candles: 형식이 맞지 않음")
+    meta = dict(kv.split("=", 1) for kv in m.group(1).split())
+    t0 = pd.Timestamp(meta["t0"])
+    step = pd.Timedelta(meta["step"])
+    i0 = int(meta["i0"])
+    ref = float(meta["ref"])
+
+    arr = np.array([[float(x) if x else np.nan for x in ln.split(",")] for ln in lines[2:]])
+    index = pd.DatetimeIndex([t0 + (int(i) - i0) * step for i in arr[:, 0]])
+    prices = ref * (1.0 + arr[:, 1:5] / 1e4)
+    out = pd.DataFrame(prices, index=index, columns=["open", "high", "low", "close"])
+    out["volume"] = arr[:, 5]
+    return out
+
+
+def candles_json(df: pd.DataFrame) -> str:
+    """(구) JSON 레코드 형식. A/B 비교 기준선용."""
+    df_for_ai = df.reset_index().rename(columns={"index": "datetime"})
+    return json.dumps(df_for_ai.to_dict(orient="records"), default=str)
+
+
+def encode_table(df: pd.DataFrame, digits: int = 6) -> str:
+    """
+    일반 표(예: 최근 거래 내역)를 헤더 1줄 + CSV 행으로 인코딩.
+    - 실수는 유효숫자 digits자리, 문자열의 쉼표·줄바꿈은 공백으로 바꿈
+    """
+    cols = list(df.columns)
+    lines = [",".join(str(c) for c in cols)]
+    for row in df.itertuples(index=False):
+        cells: List[str] = []
+        for v in row:
+            if v is None or (isinstance(v, float) and not np.isfinite(v)):
+                cells.append("")
+            elif isinstance(v, (float, np.floating)):
+                cells.append(_fmt_sig(float(v), digits))
+            else:
+                cells.append(re.sub(r"\s*[,\n\r]+\s*", " ", str(v)))
+        lines.append(",".join(cells))
+    return "\n".join(lines)
+
+
+def patterns_to_bars(patterns: List[Dict[str, Any]], enc: EncodedCandles) -> List[Dict[str, Any]]:
+    """시각 문자열 패턴 목록 → 봉 번호 패턴 목록 (delta 프롬프트에 이전 결과를 실을 때)."""
+    out = []
+    for p in patterns:
+        start = pd.to_datetime(p.get("start", ""), errors="coerce")
+        end = pd.to_datetime(p.get("end", ""), errors="coerce")
+        if pd.isna(start) or pd.isna(end):
+            continue
+        out.append({"pattern": p.get("pattern", ""),
+                    "start": enc.bar_index(start), "end": enc.bar_index(end)})
+    return out
+
+
+def bars_to_patterns(patterns: List[Dict[str, Any]], enc: EncodedCandles,
+                     first_index: int = 0) -> List[Dict[str, Any]]:
+    """
+    봉 번호 패턴 목록 → 시각 문자열 패턴 목록.
+    - [first_index, enc.last_index] 밖을 가리키는 항목은 버림 (AI가 없는 봉을 지목한 경우)
+    """
+    out = []
+    for p in patterns:
+        start, end = int(p["start"]), int(p["end"])
+        if start > end:
+            start, end = end, start
+        if start < first_index or end > enc.last_index:
+            logger.warning(f"bars_to_patterns: 범위 밖 봉 번호 무시: {p}")
+            continue
+        out.append({"pattern": p["pattern"],
+                    "start": str(enc.bar_time(start)), "end": str(enc.bar_time(end))})
+    return out
@@ -0,0 +1,196 @@
+# trading_bot/reflection_worker.py
+
+import argparse
+import json
+import logging
+import sqlite3
+import time
+from typing import Any, Dict, Optional
+
+from trading_bot.config import (
+    INTERVAL,
+    REFLECTION_JOB_MAX_ATTEMPTS,
+    REFLECTION_JOB_RETRY_SEC,
+    REFLECTION_JOB_STALE_SEC,
+    REFLECTION_RECURSIVE,
+    TICKER,
+)
+from trading_bot.db_helpers import (
+    get_recent_trades,
+    init_db,
+    log_reflection,
+    with_db,
+)
+
+logger = logging.getLogger(__name__)
+
+# ──────────────────────────────────────────────────────────────────────
+# AI 반성문 백그라운드 작업
+# - 매매 사이클은 enqueue_reflection()으로 reflection_jobs에 작업만 넣고 바로 진행
+# - 작업자는 작업을 하나씩 가져가(BEGIN IMMEDIATE) 반성문 생성 → reflection_log 기록
+#   → 작업을 만든 trade_log 행의 reflection_id 연결 → .env 조정 반영
+# - 실패한 작업은 next_attempt(REFLECTION_JOB_RETRY_SEC × 2^(시도-1) 뒤)까지 가져가지 않음
+#   → AI 장애·차단기 열림 중에 한 번의 drain()이 시도 횟수를 모두 소진하지 않음
+# - cron: 사이클 종료 후 drain()으로 같은 프로세스에서 처리 (REFLECTION_WORKER_INLINE)
+#   별도 프로세스: python -m trading_bot.reflection_worker --loop
+# ──────────────────────────────────────────────────────────────────────
+
+POLL_SEC = 30.0
+
+
+@with_db
+def enqueue_reflection(conn: sqlite3.Connection, trade_id: int,
+                       payload: Optional[Dict[str, Any]] = None) -> int:
+    """
+    반성문 작업을 큐에 추가하고 작업 id를 반환.
+    - 이미 대기/실행 중인 작업이 있으면 새로 만들지 않고 0 반환 (중복 반성문 방지)
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    busy = conn.execute(
+        "SELECT 1 FROM reflection_jobs WHERE status IN ('pending', 'running') LIMIT 1"
+    ).fetchone()
+    if busy:
+        return 0
+    cur = conn.execute(
+        "INSERT INTO reflection_jobs (created, trade_id, payload) VALUES (?, ?, ?)",
+        (time.time(), int(trade_id), json.dumps(payload or {})),
+    )
+    return cur.lastrowid
+
+
+@with_db
+def _claim_job(conn: sqlite3.Connection) -> Optional[Dict[str, Any]]:
+    """재시도 시각이 된 가장 오래된 대기 작업(또는 멈춘 실행 작업)을 'running'으로 바꾸고 반환."""
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    row = conn.execute(
+        """SELECT id, trade_id, payload, attempts FROM reflection_jobs
+           WHERE (status='pending' AND next_attempt <= ?)
+              OR (status='running' AND started < ?)
+           ORDER BY id ASC LIMIT 1""",
+        (now, now - REFLECTION_JOB_STALE_SEC),
+    ).fetchone()
+    if row is None:
+        return None
+    conn.execute(
+        "UPDATE reflection_jobs SET status='running', started=?, attempts=attempts+1 WHERE id=?",
+        (now, row["id"]),
+    )
+    return {
+        "id": row["id"],
+        "trade_id": row["trade_id"],
+        "payload": json.loads(row["payload"] or "{}"),
+        "attempts": row["attempts"] + 1,
+    }
+
+
+@with_db
+def _finish_job(conn: sqlite3.Connection, job: Dict[str, Any],
+                reflection_id: int, error: str = "") -> None:
+    if reflection_id:
+        conn.execute(
+            """UPDATE reflection_jobs SET status='done', finished=?, reflection_id=?, error=NULL
+               WHERE id=?""",
+            (time.time(), reflection_id, job["id"]),
+        )
+        if job["trade_id"]:
+            conn.execute(
+                "UPDATE trade_log SET reflection_id=? WHERE id=?",
+                (reflection_id, job["trade_id"]),
+            )
+        return
+    # 실패: 시도 횟수가 남았으면 대기 시간 뒤 다시 대기열로
+    now = time.time()
+    status = "failed" if job["attempts"] >= REFLECTION_JOB_MAX_ATTEMPTS else "pending"
+    retry_at = now + REFLECTION_JOB_RETRY_SEC * 2 ** (job["attempts"] - 1)
+    conn.execute(
+        "UPDATE reflection_jobs SET status=?, finished=?, error=?, next_attempt=? WHERE id=?",
+        (status, now, error, retry_at, job["id"]),
+    )
+    if status == "pending":
+        logger.warning(
+            f"_finish_job: 반성문 작업 실패 (job={job['id']}, 시도 {job['attempts']}회) → "
+            f"{retry_at - now:.0f}초 뒤 재시도: {error}"
+        )
+
+
+def run_job(job: Dict[str, Any]) -> int:
+    """
+    작업 하나 처리: 반성문 생성 → reflection_log 기록 → trade_log 연결 → .env 반영.
+    - 반환값: reflection_id (실패 시 0)
+    """
+    # AI 관련 모듈은 작업이 있을 때만 로드
+    from trading_bot.ai_client import cycle_budget
+    from trading_bot.ai_helpers import apply_to_env, ask_ai_reflection
+    from trading_bot.ohlcv_store import load_ohlcv_frame
+    from trading_bot.rollups import format_rollup_summary
+
+    payload = job["payload"]
+    reflection_id = 0
+    try:
+        recent_trades = get_recent_trades(limit=20)
+        chart_recent = load_ohlcv_frame(TICKER, INTERVAL, limit=100)
+        with cycle_budget():
+            reflection_text, updates = ask_ai_reflection(
+                recent_trades,
+                int(payload.get("fear_idx", 0)),
+                chart_recent if not chart_recent.empty else None,
+                recursive=REFLECTION_RECURSIVE,
+                perf_summary=format_rollup_summary(),
+            )
+        if reflection_text:
+            reflection_id = log_reflection(time.time(), reflection_text)
+            logger.info(
+                f"run_job: 반성문 저장 완료 (job={job['id']}, reflection_id={reflection_id}, "
+                f"trade_id={job['trade_id']})"
+            )
+        _finish_job(job, reflection_id, "" if reflection_id else "AI 응답 없음")
+        if reflection_id and updates:
+            apply_to_env(updates)
+            logger.info(f".env 업데이트: {updates}")
+    except Exception as e:
+        logger.exception(f"run_job: 예외 발생 (job={job['id']}): {e}")
+        _finish_job(job, 0, str(e))
+    return reflection_id
+
+
+def drain(max_jobs: Optional[int] = None) -> int:
+    """대기 중인 작업을 모두(또는 max_jobs개) 처리하고 처리한 작업 수를 반환."""
+    done = 0
+    while max_jobs is None or done < max_jobs:
+        try:
+            job = _claim_job()
+        except Exception as e:
+            logger.exception(f"drain: 작업 조회 실패: {e}")
+            break
+        if job is None:
+            break
+        run_job(job)
+        done += 1
+    return done
+
+
+def run_forever(poll_sec: float = POLL_SEC) -> None:
+    """별도 프로세스용: poll_sec 간격으로 큐를 확인하며 계속 처리."""
+    logger.info(f"reflection_worker: 시작 (poll={poll_sec}s)")
+    while True:
+        if drain() == 0:
+            time.sleep(poll_sec)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AI 반성문 작업 처리기")
+    parser.add_argument("--loop", action="store_true", help="큐를 계속 감시하며 처리")
+    parser.add_argument("--poll", type=float, default=POLL_SEC, help="--loop 시 확인 간격(초)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    init_db()
+    if args.loop:
+        run_forever(args.poll)
+    else:
+        print(f"반성문 작업 {drain()}건 처리")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# trading_bot/rollups.py
+
+import argparse
+import logging
+import sqlite3
+from typing import Optional
+
+import numpy as np
+
+from trading_bot.db_helpers import init_db, replay_trade_rollups, with_db
+
+logger = logging.getLogger(__name__)
+
+# ──────────────────────────────────────────────────────────────────────
+# 성과 롤업 조회·재구축
+# - 갱신은 db_helpers.log_trade()가 행을 쓸 때마다 replay_trade_rollups()로 수행
+#   (롤업 반영이 실패한 행은 다음 기록 때 함께 반영)
+# - 여기서는 O(구간 수) 크기의 요약만 읽는다 (trade_log 재스캔 없음)
+# - bucket은 UTC 기준 구간 시작 epoch(초)
+# ──────────────────────────────────────────────────────────────────────
+
+ROLLUP_TABLES = ("rollup_daily", "rollup_hourly", "rollup_pattern", "rollup_state")
+
+BUCKET_ROLLUP_DTYPE = np.dtype([
+    ("bucket", "i8"),
+    ("rows", "i8"),
+    ("fills", "i8"),
+    ("buys", "i8"),
+    ("sells", "i8"),
+    ("closed", "i8"),
+    ("wins", "i8"),
+    ("pnl_sum", "f8"),
+    ("pnl_sq_sum", "f8"),
+    ("exposure_sum", "f8"),
+    ("open_equity", "f8"),
+    ("last_equity", "f8"),
+    ("peak_equity", "f8"),
+    ("max_drawdown", "f8"),
+])
+
+PATTERN_ROLLUP_DTYPE = np.dtype([
+    ("pattern", "U64"),
+    ("signals", "i8"),
+    ("fills", "i8"),
+    ("closed", "i8"),
+    ("wins", "i8"),
+    ("pnl_sum", "f8"),
+    ("pnl_sq_sum", "f8"),
+    ("last_ts", "f8"),
+])
+
+
+def _fetch(conn: sqlite3.Connection, sql: str, params: tuple,
+           dtype: np.dtype) -> np.ndarray:
+    cur = conn.cursor()
+    cur.row_factory = None
+    cur.execute(sql, params)
+    return np.fromiter(cur, dtype=dtype)
+
+
+def _bucket_rollups(conn: sqlite3.Connection, table: str, since_ts: float,
+                    limit: Optional[int]) -> np.ndarray:
+    cols = ", ".join(BUCKET_ROLLUP_DTYPE.names)
+    sql = f"SELECT {cols} FROM {table} WHERE bucket >= ?"
+    params: tuple = (int(since_ts),)
+    if limit is not None:
+        sql = f"SELECT * FROM ({sql} ORDER BY bucket DESC LIMIT ?) ORDER BY bucket ASC"
+        params += (int(limit),)
+    else:
+        sql += " ORDER BY bucket ASC"
+    return _fetch(conn, sql, params, BUCKET_ROLLUP_DTYPE)
+
+
+@with_db
+def get_daily_rollups(conn: sqlite3.Connection, since_ts: float = 0.0,
+                      limit: Optional[int] = None) -> np.ndarray:
+    """일별 롤업을 구조화 배열(BUCKET_ROLLUP_DTYPE)로 반환 (bucket 오름차순)."""
+    try:
+        return _bucket_rollups(conn, "rollup_daily", since_ts, limit)
+    except Exception as e:
+        logger.exception(f"get_daily_rollups: 예외 발생: {e}")
+        return np.empty(0, dtype=BUCKET_ROLLUP_DTYPE)
+
+
+@with_db
+def get_hourly_rollups(conn: sqlite3.Connection, since_ts: float = 0.0,
+                       limit: Optional[int] = None) -> np.ndarray:
+    """시간별 롤업을 구조화 배열(BUCKET_ROLLUP_DTYPE)로 반환 (bucket 오름차순)."""
+    try:
+        return _bucket_rollups(conn, "rollup_hourly", since_ts, limit)
+    except Exception as e:
+        logger.exception(f"get_hourly_rollups: 예외 발생: {e}")
+        return np.empty(0, dtype=BUCKET_ROLLUP_DTYPE)
+
+
+@with_db
+def get_pattern_rollups(conn: sqlite3.Connection) -> np.ndarray:
+    """
+    패턴별 롤업을 구조화 배열(PATTERN_ROLLUP_DTYPE)로 반환 (청산 수 내림차순).
+    - signals/fills: 해당 패턴으로 기록된 신호·체결 수
+    - closed/wins/pnl_*: 해당 패턴으로 진입한 포지션의 청산 성과
+    """
+    try:
+        cols = ", ".join(PATTERN_ROLLUP_DTYPE.names)
+        return _fetch(
+            conn,
+            f"SELECT {cols} FROM rollup_pattern ORDER BY closed DESC, signals DESC",
+            (),
+            PATTERN_ROLLUP_DTYPE,
+        )
+    except Exception as e:
+        logger.exception(f"get_pattern_rollups: 예외 발생: {e}")
+        return np.empty(0, dtype=PATTERN_ROLLUP_DTYPE)
+
+
+def format_rollup_summary(days: int = 7) -> str:
+    """
+    최근 days일 롤업을 AI 반성문 프롬프트용 한 줄 요약으로 변환.
+    - 롤업이 비어 있으면 빈 문자열
+    """
+    daily = get_daily_rollups(limit=days)
+    if daily.size == 0:
+        return ""
+    closed = int(daily["closed"].sum())
+    wins = int(daily["wins"].sum())
+    pnl_sum = float(daily["pnl_sum"].sum())
+    rows = int(daily["rows"].sum())
+    exposure = float(daily["exposure_sum"].sum()) / rows if rows else 0.0
+    equity_change = float(daily["last_equity"][-1] - daily["open_equity"][0])
+    parts = [
+        f"Last {daily.size}d: {closed} closed trades",
+        f"win rate {wins / closed:.0%}" if closed else "win rate n/a",
+        f"sum PnL {pnl_sum:.2f}%",
+        f"equity change {equity_change:+.0f} KRW",
+        f"avg exposure {exposure:.1f}%",
+        f"max drawdown {float(daily['max_drawdown'].max()):.2f}%",
+    ]
+    return ", ".join(parts) + "."
+
+
+@with_db
+def rebuild_rollups(conn: sqlite3.Connection, verify_only: bool = False) -> list[str]:
+    """
+    롤업 테이블을 비우고 trade_log 전체를 처음부터 재생해 다시 만든다.
+    - verify_only=True이면 재구축 결과를 기존 롤업과 비교만 하고 롤백
+    - 반환값: 기존 롤업과 다른 테이블 이름 목록 (같으면 빈 리스트)
+    - 주의: prune_old_logs()로 지워진 trade_log 행은 재구축에 반영되지 않음
+    """
+    def snapshot() -> dict:
+        return {
+            t: conn.execute(f"SELECT * FROM {t} ORDER BY 1").fetchall()
+            for t in ROLLUP_TABLES
+        }
+
+    def same(a: list, b: list) -> bool:
+        if len(a) != len(b):
+            return False
+        for ra, rb in zip(a, b):
+            for va, vb in zip(tuple(ra), tuple(rb)):
+                if isinstance(va, float) and isinstance(vb, float):
+                    if not np.isclose(va, vb, rtol=1e-9, atol=1e-9):
+                        return False
+                elif va != vb:
+                    return False
+        return True
+
+    before = snapshot()
+    for t in ROLLUP_TABLES:
+        conn.execute(f"DELETE FROM {t}")
+
+    replay_trade_rollups(conn)
+
+    after = snapshot()
+    diff = [t for t in ROLLUP_TABLES if not same(before[t], after[t])]
+    if verify_only:
+        conn.rollback()
+    logger.info(f"rebuild_rollups: verify_only={verify_only}, 불일치 테이블={diff}")
+    return diff
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="trade_log 성과 롤업 재구축/검증")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--rebuild", action="store_true", help="롤업을 trade_log로부터 재구축")
+    group.add_argument("--verify", action="store_true", help="재구축 결과와 현재 롤업 비교(변경 없음)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    init_db()
+    diff = rebuild_rollups(verify_only=args.verify)
+    if args.verify:
+        print("롤업 일치" if not diff else f"롤업 불일치: {', '.join(diff)}")
+    else:
+        print("롤업 재구축 완료" + (f" (변경된 테이블: {', '.join(diff)})" if diff else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,17 +6,63 @@ from typing import Tuple
 from ta.trend import EMAIndicator
 
 from trading_bot.candle_patterns import is_volume_spike
+from trading_bot.patterns import check_rule_patterns
 from trading_bot.config import (
     VOLUME_SPIKE_THRESHOLD,
     SMA_WINDOW,
     EMA_FAST_WINDOW,
     EMA_SLOW_WINDOW,
     EMA_CROSS_BAND,
+    RSI_OVERRIDE,
+    MACD_1H_THRESHOLD,
+    MACD_1H_THRESHOLD_PCT,
+    TICKER,
+    FG_EXTREME_FEAR,
 )
 
 logger = logging.getLogger(__name__)
 
 
+def check_trend_1h(ctx) -> Tuple[bool, str]:
+    """
+    상위 차트(1시간봉) 추세 필터: 현재가 < 1h SMA50이면 보류.
+    - 예외: 1h RSI ≤ RSI_OVERRIDE, |1h MACD diff| / 현재가 ≤ MACD_1H_THRESHOLD_PCT,
+      Fear ≤ FG_EXTREME_FEAR 중 하나 (MACD는 가격 대비 비율이라 가격대가 다른 마켓에도 같은 기준)
+    - (구) MACD_1H_THRESHOLD(KRW)가 설정돼 있으면 TICKER 마켓에는 그 절대값 기준을 그대로 사용
+    - ctx.df_1h가 없으면 통과
+    return: (통과 여부, 로그용 설명)
+    """
+    if ctx.df_1h is None:
+        return True, "1h 데이터 없음"
+    sma50_1h = float(ctx.last_1h["sma50_1h"])
+    rsi_1h = float(ctx.last_1h["rsi_1h"])
+    macd_1h = float(ctx.last_1h["macd_diff_1h"])
+    if MACD_1H_THRESHOLD is not None and (ctx.ticker or TICKER) == TICKER:
+        macd_ok = abs(macd_1h) <= MACD_1H_THRESHOLD
+        macd_detail = f"|MACD1h|={abs(macd_1h):.2f}/{MACD_1H_THRESHOLD}"
+    else:
+        macd_ratio = abs(macd_1h) / ctx.price if ctx.price > 0 else float("inf")
+        macd_ok = macd_ratio <= MACD_1H_THRESHOLD_PCT
+        macd_detail = f"|MACD1h|/가격={macd_ratio:.6f}/{MACD_1H_THRESHOLD_PCT}"
+    fear = int(ctx.fear_idx)
+
+    # 디버깅용 로그: 실제 지표값이 어떻게 나오는지 확인
+    logger.debug(
+        f"[1h 필터 직전] price={ctx.price:.0f}, sma50_1h={sma50_1h:.0f}, "
+        f"rsi_1h={rsi_1h:.1f}, macd_1h={macd_1h:.1f}, fear={fear}"
+    )
+    if ctx.price >= sma50_1h:
+        return True, f"현재가 {ctx.price:.0f} ≥ 1h SMA50 {sma50_1h:.0f}"
+
+    detail = (
+        f"RSI={rsi_1h:.1f}/{RSI_OVERRIDE}, {macd_detail}, "
+        f"Fear={fear}/{FG_EXTREME_FEAR}"
+    )
+    if rsi_1h <= RSI_OVERRIDE or macd_ok or fear <= FG_EXTREME_FEAR:
+        return True, f"1h SMA50 아래이지만 예외 조건 충족 ({detail})"
+    return False, f"현재가 {ctx.price:.0f} < 1h SMA50 {sma50_1h:.0f} ({detail})"
+
+
 def apply_strategy_A(ctx) -> Tuple[bool, bool, str]:
     """
     보조 전략 A: 볼륨 스파이크 + price > SMA30 → 매수
@@ -126,3 +172,16 @@ def apply_strategy_B(ctx) -> Tuple[bool, bool, str]:
     except Exception:
         logger.exception("apply_strategy_B: 예외 발생 → 스킵")
         return False, False, ""
+
+
+def rule_signals(ctx) -> Tuple[bool, bool, str]:
+    """
+    룰 패턴 → 보조 전략 A → 보조 전략 B 순으로 처음 나온 신호 (AI 패턴 검사 제외).
+    다중 마켓(markets.py)·다중 프로필(profiles.py) 실행이 공통으로 사용.
+    """
+    buy_sig, sell_sig, pattern = check_rule_patterns(ctx)
+    for strategy in (apply_strategy_A, apply_strategy_B):
+        if buy_sig or sell_sig:
+            break
+        buy_sig, sell_sig, pattern = strategy(ctx)
+    return buy_sig, sell_sig, pattern